@@ -1,6 +1,9 @@
-from api.agents.basic import get_basic_agent
+from agents.basic import BASIC_AGENT_ID
+from agents.registry import agent_registry
+
+__all__ = ["BASIC_AGENT_ID", "agent_registry", "get_agents"]
 
 
 def get_agents() -> list:
-    basic_agent = get_basic_agent(debug_mode=True)
-    return [basic_agent]
\ No newline at end of file
+    # 每个 agent 只构建一次，运行时的 session/user 由 AgentOS 的请求参数传入
+    return [agent_registry.get(agent_id) for agent_id in agent_registry.ids()]
@@ -1,47 +1,67 @@
 from textwrap import dedent
-from typing import Optional
 
 from agno.agent import Agent
-from agno.db.postgres import PostgresDb
-from agno.models.deepseek import DeepSeek
 
+from configs import higgs_config
 from models.engine import engine
 
-db = PostgresDb(db_engine=engine)
+from .models import PooledDeepSeek
+from .registry import agent_registry
+from .session_history import BoundedPostgresDb
 
+BASIC_AGENT_ID = "basic-agent"
 
-def get_basic_agent(
-    user_id: Optional[str] = None,
-    session_id: Optional[str] = None,
-    debug_mode: bool = False,
-) -> Agent:
+BASIC_AGENT_INSTRUCTIONS = dedent("""\
+    You are an enthusiastic news reporter with a flair for storytelling! 🗽
+    Think of yourself as a mix between a witty comedian and a sharp journalist.
+
+    Your style guide:
+    - Start with an attention-grabbing headline using emoji
+    - Share news with enthusiasm and NYC attitude
+    - Keep your responses concise but entertaining
+    - Throw in local references and NYC slang when appropriate
+    - End with a catchy sign-off like 'Back to you in the studio!' or 'Reporting live from the Big Apple!'
+
+    Remember to verify all facts while keeping that NYC energy high!\
+""")
+
+
+def build_summary_model() -> PooledDeepSeek:
+    return PooledDeepSeek(
+        id="Pro/deepseek-ai/DeepSeek-V3",
+        base_url=higgs_config.AGENT_MODEL_BASE_URL,
+        provider="SiliconFlow",
+        max_tokens=1024,
+        temperature=0.2,
+    )
+
+
+db = BoundedPostgresDb(db_engine=engine, summary_model=build_summary_model)
+
+
+def build_basic_agent() -> Agent:
     return Agent(
         name="Basic Agent",
         role="Basic agent",
-        id="basic-agent",
-        session_id=session_id,
-        user_id=user_id,
-        model=DeepSeek(
+        id=BASIC_AGENT_ID,
+        model=PooledDeepSeek(
             id="Pro/deepseek-ai/DeepSeek-V3",
-            base_url="https://api.siliconflow.cn/v1",
+            base_url=higgs_config.AGENT_MODEL_BASE_URL,
             provider="SiliconFlow",
             max_tokens=8192,
             temperature=0.6,
+            response_cache_namespace=BASIC_AGENT_ID,
         ),
-        instructions=dedent("""\
-        You are an enthusiastic news reporter with a flair for storytelling! 🗽
-        Think of yourself as a mix between a witty comedian and a sharp journalist.
-
-        Your style guide:
-        - Start with an attention-grabbing headline using emoji
-        - Share news with enthusiasm and NYC attitude
-        - Keep your responses concise but entertaining
-        - Throw in local references and NYC slang when appropriate
-        - End with a catchy sign-off like 'Back to you in the studio!' or 'Reporting live from the Big Apple!'
-
-        Remember to verify all facts while keeping that NYC energy high!\
-        """),
+        instructions=BASIC_AGENT_INSTRUCTIONS,
         db=db,
+        # 会话中只保留最近的 run，更早的对话以摘要的形式加入上下文
+        add_history_to_context=True,
+        num_history_runs=higgs_config.SESSION_HISTORY_MAX_RUNS,
+        add_session_summary_to_context=True,
         stream_intermediate_steps=True,
         markdown=True,
+        debug_mode=higgs_config.DEBUG,
     )
+
+
+agent_registry.register(BASIC_AGENT_ID, build_basic_agent)
@@ -0,0 +1,243 @@
+import array
+import hashlib
+import logging
+import re
+import sys
+import threading
+import unicodedata
+import zlib
+from abc import ABC, abstractmethod
+from collections.abc import Sequence
+from typing import Any, Optional
+
+from sqlalchemy import text
+
+from configs import higgs_config
+from extensions.ext_redis import async_redis_client
+
+from .embeddings import Embedder
+
+logger = logging.getLogger(__name__)
+
+CACHE_TABLE = "embedding_cache"
+# 编码后的首字节标记格式，修改压缩设置后已有的缓存仍可读取
+RAW_FORMAT = b"f"
+ZLIB_FORMAT = b"z"
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(value: str) -> str:
+    # 只有空白或 Unicode 兼容字符不同的文本共用一个缓存项
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", value)).strip()
+
+
+def content_hash(value: str) -> str:
+    return hashlib.sha256(normalize_text(value).encode()).hexdigest()
+
+
+def encode_embedding(embedding: Sequence[float], compression: str = "none") -> bytes:
+    """Little-endian float32 vector, the precision the providers return, optionally zlib compressed."""
+    data = array.array("f", embedding)
+    if sys.byteorder == "big":
+        data.byteswap()
+    if compression == "zlib":
+        return ZLIB_FORMAT + zlib.compress(data.tobytes())
+    return RAW_FORMAT + data.tobytes()
+
+
+def decode_embedding(value: bytes) -> list[float]:
+    raw = zlib.decompress(value[1:]) if value[:1] == ZLIB_FORMAT else value[1:]
+    data = array.array("f")
+    data.frombytes(raw)
+    if sys.byteorder == "big":
+        data.byteswap()
+    return data.tolist()
+
+
+class EmbeddingCacheBackend(ABC):
+    @abstractmethod
+    async def get_many(self, model: str, hashes: Sequence[str]) -> dict[str, bytes]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def set_many(self, model: str, values: dict[str, bytes]) -> None:
+        raise NotImplementedError
+
+
+class PostgresEmbeddingCacheBackend(EmbeddingCacheBackend):
+    """Embeddings kept without expiry in a table of the pgvector database, keyed by (model, content hash)."""
+
+    def __init__(self):
+        self._ready = False
+
+    def _engine(self):
+        from models.engine import get_pgvector_engine
+
+        return get_pgvector_engine()
+
+    async def _ensure_table(self) -> None:
+        if self._ready:
+            return
+        async with self._engine().begin() as conn:
+            await conn.execute(
+                text(
+                    f"CREATE TABLE IF NOT EXISTS {CACHE_TABLE} ("
+                    "model VARCHAR(255) NOT NULL, "
+                    "hash CHAR(64) NOT NULL, "
+                    "embedding BYTEA NOT NULL, "
+                    "created_at TIMESTAMPTZ NOT NULL DEFAULT now(), "
+                    "PRIMARY KEY (model, hash))"
+                )
+            )
+        self._ready = True
+
+    async def get_many(self, model: str, hashes: Sequence[str]) -> dict[str, bytes]:
+        await self._ensure_table()
+        async with self._engine().connect() as conn:
+            rows = (
+                await conn.execute(
+                    text(f"SELECT hash, embedding FROM {CACHE_TABLE} WHERE model = :model AND hash = ANY(:hashes)"),
+                    {"model": model, "hashes": list(hashes)},
+                )
+            ).all()
+        return {row.hash: bytes(row.embedding) for row in rows}
+
+    async def set_many(self, model: str, values: dict[str, bytes]) -> None:
+        await self._ensure_table()
+        async with self._engine().begin() as conn:
+            await conn.execute(
+                text(
+                    f"INSERT INTO {CACHE_TABLE} (model, hash, embedding) VALUES (:model, :hash, :embedding) "
+                    "ON CONFLICT (model, hash) DO NOTHING"
+                ),
+                [{"model": model, "hash": hash, "embedding": value} for hash, value in values.items()],
+            )
+
+
+class RedisEmbeddingCacheBackend(EmbeddingCacheBackend):
+    def _key(self, model: str, hash: str) -> str:
+        return f"embedding:{model}:{hash}"
+
+    async def get_many(self, model: str, hashes: Sequence[str]) -> dict[str, bytes]:
+        values = await async_redis_client.mget([self._key(model, hash) for hash in hashes])
+        return {hash: value for hash, value in zip(hashes, values) if value is not None}
+
+    async def set_many(self, model: str, values: dict[str, bytes]) -> None:
+        async with async_redis_client.pipeline(transaction=False) as pipe:
+            for hash, value in values.items():
+                pipe.set(self._key(model, hash), value, ex=higgs_config.EMBEDDING_CACHE_REDIS_TTL)
+            await pipe.execute()
+
+
+class EmbeddingCache:
+    """Embeddings keyed by the model and the hash of the normalized text, looked up in batches.
+
+    A failing backend only turns lookups into misses, the embeddings are then requested from the provider.
+    """
+
+    def __init__(self):
+        self._backends: dict[str, EmbeddingCacheBackend] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        return higgs_config.EMBEDDING_CACHE_ENABLED
+
+    @property
+    def backend(self) -> EmbeddingCacheBackend:
+        name = higgs_config.EMBEDDING_CACHE_BACKEND
+        if name not in self._backends:
+            self._backends[name] = RedisEmbeddingCacheBackend() if name == "redis" else PostgresEmbeddingCacheBackend()
+        return self._backends[name]
+
+    def _count(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + value)
+
+    async def get_many(self, model: str, texts: Sequence[str]) -> list[Optional[list[float]]]:
+        hashes = [content_hash(value) for value in texts]
+        unique = list(dict.fromkeys(hashes))
+        found: dict[str, bytes] = {}
+        batch_size = higgs_config.EMBEDDING_CACHE_BATCH_SIZE
+        try:
+            for start in range(0, len(unique), batch_size):
+                found.update(await self.backend.get_many(model, unique[start : start + batch_size]))
+        except Exception:
+            logger.warning("Failed to read embedding cache", exc_info=True)
+            self._count("errors")
+        decoded = {hash: decode_embedding(value) for hash, value in found.items()}
+        embeddings = [decoded.get(hash) for hash in hashes]
+        hits = sum(embedding is not None for embedding in embeddings)
+        self._count("hits", hits)
+        self._count("misses", len(texts) - hits)
+        return embeddings
+
+    async def set_many(self, model: str, texts: Sequence[str], embeddings: Sequence[Sequence[float]]) -> None:
+        compression = higgs_config.EMBEDDING_CACHE_COMPRESSION
+        values = {
+            content_hash(value): encode_embedding(embedding, compression) for value, embedding in zip(texts, embeddings)
+        }
+        items = list(values.items())
+        batch_size = higgs_config.EMBEDDING_CACHE_BATCH_SIZE
+        try:
+            for start in range(0, len(items), batch_size):
+                await self.backend.set_many(model, dict(items[start : start + batch_size]))
+            self._count("stores", len(items))
+        except Exception:
+            logger.warning("Failed to write embedding cache", exc_info=True)
+            self._count("errors")
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "backend": higgs_config.EMBEDDING_CACHE_BACKEND,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "errors": self.errors,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+embedding_cache = EmbeddingCache()
+
+
+class CachedEmbedder(Embedder):
+    """Embedder that only sends the texts missing from the embedding cache to the wrapped embedder."""
+
+    def __init__(self, embedder: Embedder, cache: Optional[EmbeddingCache] = None):
+        super().__init__(embedder.model, embedder.base_url, embedder.dimensions, embedder.api_key)
+        self.embedder = embedder
+        self.cache = cache or embedding_cache
+
+    @property
+    def model_id(self) -> str:
+        # 同一模型输出不同维度时向量不同
+        return f"{self.model}:{self.dimensions}"
+
+    async def lookup(self, texts: list[str]) -> list[Optional[list[float]]]:
+        return await self.cache.get_many(self.model_id, texts)
+
+    async def store(self, texts: list[str], embeddings: list[list[float]]) -> None:
+        await self.cache.set_many(self.model_id, texts, embeddings)
+
+    async def aembed(self, texts: list[str]) -> list[list[float]]:
+        embeddings = await self.lookup(texts)
+        missing = [index for index, embedding in enumerate(embeddings) if embedding is None]
+        if missing:
+            missing_texts = [texts[index] for index in missing]
+            fresh = await self.embedder.aembed(missing_texts)
+            await self.store(missing_texts, fresh)
+            for index, embedding in zip(missing, fresh):
+                embeddings[index] = embedding
+        return embeddings  # type: ignore[return-value]
+
+
+def with_embedding_cache(embedder: Embedder) -> Embedder:
+    return CachedEmbedder(embedder) if higgs_config.EMBEDDING_CACHE_ENABLED else embedder
@@ -0,0 +1,73 @@
+import asyncio
+import hashlib
+import math
+import re
+from typing import Optional
+
+from openai import AsyncOpenAI
+
+from extensions.provider_pool import provider_pool
+
+
+class Embedder:
+    """OpenAI compatible embedding client on the shared provider pool."""
+
+    def __init__(self, model: str, base_url: str, dimensions: int, api_key: Optional[str] = None):
+        self.model = model
+        self.base_url = base_url
+        self.dimensions = dimensions
+        self.api_key = api_key
+
+    def _client(self) -> AsyncOpenAI:
+        return AsyncOpenAI(
+            api_key=self.api_key,
+            base_url=self.base_url,
+            timeout=provider_pool.timeout,
+            http_client=provider_pool.get_async_client(self.base_url),
+        )
+
+    async def aembed(self, texts: list[str]) -> list[list[float]]:
+        response = await self._client().embeddings.create(model=self.model, input=texts)
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+    async def aembed_one(self, text: str) -> list[float]:
+        return (await self.aembed([text]))[0]
+
+
+# 英文、数字按词切分，中日韩文字按单字切分后再组成二元组
+_WORDS = re.compile(r"[0-9a-z]+|[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af]+")
+
+
+class HashingEmbedder(Embedder):
+    """Deterministic local stand-in for an embedding model, for development and ingestion benchmarks.
+
+    Words and CJK bigrams are hashed into ``dimensions`` buckets with a hashed sign and the vector is
+    L2 normalized, so texts sharing terms get a higher cosine similarity without any network call.
+    """
+
+    def __init__(self, dimensions: int, model: str = "hashing"):
+        super().__init__(model=model, base_url="", dimensions=dimensions)
+
+    def _features(self, text: str) -> list[str]:
+        features = []
+        for word in _WORDS.findall(text.lower()):
+            if word.isascii():
+                features.append(word)
+            else:
+                features.extend(word[i : i + 2] for i in range(max(len(word) - 1, 1)))
+        return features
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        embeddings = []
+        for text in texts:
+            vector = [0.0] * self.dimensions
+            for feature in self._features(text):
+                digest = hashlib.blake2b(feature.encode(), digest_size=8).digest()
+                bucket = int.from_bytes(digest[:4], "little") % self.dimensions
+                vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+            norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+            embeddings.append([value / norm for value in vector])
+        return embeddings
+
+    async def aembed(self, texts: list[str]) -> list[list[float]]:
+        return await asyncio.to_thread(self.embed, texts)
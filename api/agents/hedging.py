@@ -0,0 +1,99 @@
+import math
+import threading
+import time
+from typing import Any
+
+from agno.models.base import Model
+
+from configs import higgs_config
+
+
+def backend_key(model: Model) -> str:
+    return f"{getattr(model, 'base_url', None) or model.provider}|{model.id}"
+
+
+def is_retriable(status_code: int) -> bool:
+    # 请求本身有问题（4xx）时换一个后端也不会成功
+    return status_code in (408, 429) or status_code >= 500
+
+
+class BackendStats:
+    def __init__(self):
+        # 首个 token（非流式为完整响应）延迟的 EWMA
+        self.latency = 0.0
+        self.samples = 0
+        self.failures = 0
+        self.last_failure = 0.0
+
+    def recently_failed(self, now: float) -> bool:
+        return now - self.last_failure < higgs_config.MODEL_FAILOVER_COOLDOWN
+
+
+class ModelHedging:
+    """Latency ranking of model backends and counters of hedged and failed over calls."""
+
+    def __init__(self):
+        self._backends: dict[str, BackendStats] = {}
+        self._lock = threading.Lock()
+        self.hedges_fired = 0
+        self.hedges_won = 0
+        self.hedges_wasted = 0
+        self.failovers = 0
+
+    def _stats(self, model: Model) -> BackendStats:
+        key = backend_key(model)
+        if key not in self._backends:
+            self._backends[key] = BackendStats()
+        return self._backends[key]
+
+    def rank(self, primary: Model, alternates: list[Model]) -> list[Model]:
+        """The primary first unless it failed recently, then the alternates by latency, healthy ones first."""
+        now = time.monotonic()
+        with self._lock:
+
+            def score(item: tuple[int, Model]) -> tuple[bool, float, int]:
+                stats = self._stats(item[1])
+                return stats.recently_failed(now), stats.latency if stats.samples else math.inf, item[0]
+
+            ranked = [model for _, model in sorted(enumerate(alternates), key=score)]
+            if self._stats(primary).recently_failed(now) and ranked and not self._stats(ranked[0]).recently_failed(now):
+                return [ranked[0], primary, *ranked[1:]]
+            return [primary, *ranked]
+
+    def record_success(self, model: Model, latency: float) -> None:
+        with self._lock:
+            stats = self._stats(model)
+            stats.latency = latency if not stats.samples else stats.latency * 0.8 + latency * 0.2
+            stats.samples += 1
+
+    def record_failure(self, model: Model) -> None:
+        with self._lock:
+            stats = self._stats(model)
+            stats.failures += 1
+            stats.last_failure = time.monotonic()
+
+    def record(self, name: str, count: int = 1) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + count)
+
+    def stats(self) -> dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "enabled": higgs_config.MODEL_HEDGING_ENABLED,
+            "hedges_fired": self.hedges_fired,
+            "hedges_won": self.hedges_won,
+            "hedges_wasted": self.hedges_wasted,
+            "failovers": self.failovers,
+            "backends": {
+                key: {
+                    "latency_ms": round(stats.latency * 1000, 2) if stats.samples else None,
+                    "samples": stats.samples,
+                    "failures": stats.failures,
+                    "recently_failed": stats.recently_failed(now),
+                }
+                for key, stats in list(self._backends.items())
+            },
+        }
+
+
+model_hedging = ModelHedging()
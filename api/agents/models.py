@@ -0,0 +1,672 @@
+import asyncio
+import copy
+import time
+from collections.abc import AsyncIterator, Iterator
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from agno.exceptions import ModelProviderError
+from agno.models.base import Model
+from agno.models.deepseek import DeepSeek
+from agno.models.message import Message
+from agno.models.metrics import Metrics
+from agno.models.response import ModelResponse
+from openai import AsyncOpenAI as AsyncOpenAIClient
+from openai import OpenAI as OpenAIClient
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+from configs import higgs_config
+from extensions.provider_admission import AdmissionRejectedError, provider_admission
+from extensions.provider_pool import provider_pool
+
+from .hedging import is_retriable, model_hedging
+from .response_cache import CacheRequest, response_cache
+
+# 未命中缓存时收集本次调用的原始 provider 响应
+_captured_responses: ContextVar[Optional[list[dict[str, Any]]]] = ContextVar("captured_responses", default=None)
+
+
+class ProviderPoolMixin:
+    """Build the clients of an OpenAI compatible model on the shared provider pool.
+
+    Without it agno creates a fresh httpx client (and a cold connection) for every call.
+    An explicitly configured ``http_client`` still takes precedence.
+    """
+
+    def _pooled_client_params(self, http_client) -> dict[str, Any]:
+        params: dict[str, Any] = self._get_client_params()  # type: ignore[attr-defined]
+        params.setdefault("timeout", provider_pool.timeout)
+        params["http_client"] = http_client
+        return params
+
+    def get_client(self) -> OpenAIClient:
+        if self.http_client is not None:  # type: ignore[attr-defined]
+            client: OpenAIClient = super().get_client()  # type: ignore[misc]
+            return client
+        return OpenAIClient(**self._pooled_client_params(provider_pool.get_client(self.base_url)))  # type: ignore[attr-defined]
+
+    def get_async_client(self) -> AsyncOpenAIClient:
+        if self.http_client is not None:  # type: ignore[attr-defined]
+            async_client: AsyncOpenAIClient = super().get_async_client()  # type: ignore[misc]
+            return async_client
+        http_client = provider_pool.get_async_client(self.base_url)  # type: ignore[attr-defined]
+        return AsyncOpenAIClient(**self._pooled_client_params(http_client))
+
+
+class ResponseCacheMixin:
+    """Serve completions of an OpenAI compatible model from the LLM response cache.
+
+    Only models with a ``response_cache_namespace`` are cached. Hits replay the stored raw provider
+    responses through the model's own parsers, so agno sees exactly what the provider returned;
+    streams are stored only once they completed.
+    """
+
+    response_cache_namespace: Optional[str]
+    response_cache_ttl: Optional[int]
+
+    def _cache_request(
+        self, messages: list[Message], response_format, tools, tool_choice, stream: bool
+    ) -> Optional[CacheRequest]:
+        if not response_cache.enabled or not self.response_cache_namespace:
+            return None
+        params = self.get_request_params(  # type: ignore[attr-defined]
+            response_format=response_format, tools=tools, tool_choice=tool_choice
+        )
+        return response_cache.build_request(
+            namespace=self.response_cache_namespace,
+            model=f"{self.base_url}/{self.id}",  # type: ignore[attr-defined]
+            messages=[self._format_message(m) for m in messages],  # type: ignore[attr-defined]
+            params=params,
+            stream=stream,
+            # 工具调用和结构化输出的结果依赖完整上下文，只走精确匹配
+            semantic=not tools and response_format is None,
+            ttl=self.response_cache_ttl,
+        )
+
+    @staticmethod
+    def _start_replay(assistant_message: Message, run_response) -> None:
+        if run_response and run_response.metrics:
+            run_response.metrics.set_time_to_first_token()
+        assistant_message.metrics.start_timer()
+
+    def _parse_provider_response(self, response: ChatCompletion, **kwargs) -> ModelResponse:
+        captured = _captured_responses.get()
+        if captured is not None:
+            captured.append(response.model_dump(mode="json"))
+        return super()._parse_provider_response(response, **kwargs)  # type: ignore[misc,no-any-return]
+
+    def _parse_provider_response_delta(self, response_delta: ChatCompletionChunk) -> ModelResponse:
+        captured = _captured_responses.get()
+        if captured is not None:
+            captured.append(response_delta.model_dump(mode="json"))
+        return super()._parse_provider_response_delta(response_delta)  # type: ignore[misc,no-any-return]
+
+    def invoke(
+        self,
+        messages: list[Message],
+        assistant_message: Message,
+        response_format=None,
+        tools=None,
+        tool_choice=None,
+        run_response=None,
+    ) -> ModelResponse:
+        request = self._cache_request(messages, response_format, tools, tool_choice, stream=False)
+        if request is None:
+            return super().invoke(messages, assistant_message, response_format, tools, tool_choice, run_response)  # type: ignore[misc,no-any-return]
+
+        cached = response_cache.get(request)
+        if cached is not None:
+            self._start_replay(assistant_message, run_response)
+            assistant_message.metrics.stop_timer()
+            return super()._parse_provider_response(  # type: ignore[misc,no-any-return]
+                ChatCompletion.model_validate(cached[0]), response_format=response_format
+            )
+
+        captured: list[dict[str, Any]] = []
+        token = _captured_responses.set(captured)
+        try:
+            model_response: ModelResponse = super().invoke(  # type: ignore[misc]
+                messages, assistant_message, response_format, tools, tool_choice, run_response
+            )
+        finally:
+            _captured_responses.reset(token)
+        if captured:
+            response_cache.set(request, captured)
+        return model_response
+
+    async def ainvoke(
+        self,
+        messages: list[Message],
+        assistant_message: Message,
+        response_format=None,
+        tools=None,
+        tool_choice=None,
+        run_response=None,
+    ) -> ModelResponse:
+        request = self._cache_request(messages, response_format, tools, tool_choice, stream=False)
+        if request is None:
+            return await super().ainvoke(  # type: ignore[misc,no-any-return]
+                messages, assistant_message, response_format, tools, tool_choice, run_response
+            )
+
+        cached, embedding = await response_cache.aget(request)
+        if cached is not None:
+            self._start_replay(assistant_message, run_response)
+            assistant_message.metrics.stop_timer()
+            return super()._parse_provider_response(  # type: ignore[misc,no-any-return]
+                ChatCompletion.model_validate(cached[0]), response_format=response_format
+            )
+
+        captured: list[dict[str, Any]] = []
+        token = _captured_responses.set(captured)
+        try:
+            model_response: ModelResponse = await super().ainvoke(  # type: ignore[misc]
+                messages, assistant_message, response_format, tools, tool_choice, run_response
+            )
+        finally:
+            _captured_responses.reset(token)
+        if captured:
+            await response_cache.aset(request, captured, embedding)
+        return model_response
+
+    def invoke_stream(
+        self,
+        messages: list[Message],
+        assistant_message: Message,
+        response_format=None,
+        tools=None,
+        tool_choice=None,
+        run_response=None,
+    ) -> Iterator[ModelResponse]:
+        stream = super().invoke_stream(  # type: ignore[misc]
+            messages, assistant_message, response_format, tools, tool_choice, run_response
+        )
+        request = self._cache_request(messages, response_format, tools, tool_choice, stream=True)
+        if request is None:
+            yield from stream
+            return
+
+        cached = response_cache.get(request)
+        if cached is not None:
+            stream.close()
+            self._start_replay(assistant_message, run_response)
+            for chunk in cached:
+                yield super()._parse_provider_response_delta(ChatCompletionChunk.model_validate(chunk))  # type: ignore[misc]
+            assistant_message.metrics.stop_timer()
+            return
+
+        captured: list[dict[str, Any]] = []
+        while True:
+            # 生成器在调用方的上下文中恢复执行，每次推进时都要重新设置
+            token = _captured_responses.set(captured)
+            try:
+                model_response = next(stream)
+            except StopIteration:
+                break
+            finally:
+                _captured_responses.reset(token)
+            yield model_response
+        if captured:
+            response_cache.set(request, captured)
+
+    async def ainvoke_stream(
+        self,
+        messages: list[Message],
+        assistant_message: Message,
+        response_format=None,
+        tools=None,
+        tool_choice=None,
+        run_response=None,
+    ) -> AsyncIterator[ModelResponse]:
+        stream = super().ainvoke_stream(  # type: ignore[misc]
+            messages, assistant_message, response_format, tools, tool_choice, run_response
+        )
+        request = self._cache_request(messages, response_format, tools, tool_choice, stream=True)
+        if request is None:
+            async for model_response in stream:
+                yield model_response
+            return
+
+        cached, embedding = await response_cache.aget(request)
+        if cached is not None:
+            await stream.aclose()
+            self._start_replay(assistant_message, run_response)
+            for chunk in cached:
+                yield super()._parse_provider_response_delta(ChatCompletionChunk.model_validate(chunk))  # type: ignore[misc]
+            assistant_message.metrics.stop_timer()
+            return
+
+        captured: list[dict[str, Any]] = []
+        while True:
+            token = _captured_responses.set(captured)
+            try:
+                model_response = await stream.__anext__()
+            except StopAsyncIteration:
+                break
+            finally:
+                _captured_responses.reset(token)
+            yield model_response
+        if captured:
+            await response_cache.aset(request, captured, embedding)
+
+
+class AdmissionControlMixin:
+    """Hold a provider admission lease (see ``extensions.provider_admission``) for the duration of each call.
+
+    The lease is charged with an estimate of the call's tokens and settled with the reported usage.
+    A 429 from the provider holds back new calls to it for PROVIDER_ADMISSION_THROTTLE_BACKOFF
+    seconds instead of letting every request retry on its own.
+    """
+
+    def _estimate_tokens(self, messages: list[Message]) -> int:
+        # 粗略按 4 个字符一个 token 估算 prompt，加上最大输出
+        prompt_chars = sum(len(str(m.content)) for m in messages if m.content is not None)
+        return prompt_chars // 4 + (self.max_tokens or 0)  # type: ignore[attr-defined]
+
+    def _rejected(self, e: AdmissionRejectedError) -> ModelProviderError:
+        return ModelProviderError(message=str(e), status_code=503, model_name=self.name, model_id=self.id)  # type: ignore[attr-defined]
+
+    @staticmethod
+    def _usage(model_response: Optional[ModelResponse]) -> Optional[int]:
+        if model_response is None or model_response.response_usage is None:
+            return None
+        return model_response.response_usage.total_tokens or None
+
+    def invoke(
+        self,
+        messages: list[Message],
+        assistant_message: Message,
+        response_format=None,
+        tools=None,
+        tool_choice=None,
+        run_response=None,
+    ) -> ModelResponse:
+        if not provider_admission.enabled:
+            return super().invoke(messages, assistant_message, response_format, tools, tool_choice, run_response)  # type: ignore[misc,no-any-return]
+
+        limiter = provider_admission.limiter(self.base_url)  # type: ignore[attr-defined]
+        try:
+            lease = limiter.acquire_sync(self._estimate_tokens(messages))
+        except AdmissionRejectedError as e:
+            raise self._rejected(e) from e
+        model_response: Optional[ModelResponse] = None
+        try:
+            model_response = super().invoke(  # type: ignore[misc]
+                messages, assistant_message, response_format, tools, tool_choice, run_response
+            )
+            return model_response
+        except ModelProviderError as e:
+            if e.status_code == 429:
+                limiter.throttle()
+            raise
+        finally:
+            lease.release(self._usage(model_response))
+
+    async def ainvoke(
+        self,
+        messages: list[Message],
+        assistant_message: Message,
+        response_format=None,
+        tools=None,
+        tool_choice=None,
+        run_response=None,
+    ) -> ModelResponse:
+        if not provider_admission.enabled:
+            return await super().ainvoke(  # type: ignore[misc,no-any-return]
+                messages, assistant_message, response_format, tools, tool_choice, run_response
+            )
+
+        limiter = provider_admission.limiter(self.base_url)  # type: ignore[attr-defined]
+        try:
+            lease = await limiter.acquire(self._estimate_tokens(messages))
+        except AdmissionRejectedError as e:
+            raise self._rejected(e) from e
+        model_response: Optional[ModelResponse] = None
+        try:
+            model_response = await super().ainvoke(  # type: ignore[misc]
+                messages, assistant_message, response_format, tools, tool_choice, run_response
+            )
+            return model_response
+        except ModelProviderError as e:
+            if e.status_code == 429:
+                await limiter.athrottle()
+            raise
+        finally:
+            await lease.arelease(self._usage(model_response))
+
+    def invoke_stream(
+        self,
+        messages: list[Message],
+        assistant_message: Message,
+        response_format=None,
+        tools=None,
+        tool_choice=None,
+        run_response=None,
+    ) -> Iterator[ModelResponse]:
+        stream = super().invoke_stream(  # type: ignore[misc]
+            messages, assistant_message, response_format, tools, tool_choice, run_response
+        )
+        if not provider_admission.enabled:
+            yield from stream
+            return
+
+        limiter = provider_admission.limiter(self.base_url)  # type: ignore[attr-defined]
+        try:
+            lease = limiter.acquire_sync(self._estimate_tokens(messages))
+        except AdmissionRejectedError as e:
+            raise self._rejected(e) from e
+        usage = None
+        try:
+            for model_response in stream:
+                usage = self._usage(model_response) or usage
+                yield model_response
+        except ModelProviderError as e:
+            if e.status_code == 429:
+                limiter.throttle()
+            raise
+        finally:
+            lease.release(usage)
+
+    async def ainvoke_stream(
+        self,
+        messages: list[Message],
+        assistant_message: Message,
+        response_format=None,
+        tools=None,
+        tool_choice=None,
+        run_response=None,
+    ) -> AsyncIterator[ModelResponse]:
+        stream = super().ainvoke_stream(  # type: ignore[misc]
+            messages, assistant_message, response_format, tools, tool_choice, run_response
+        )
+        if not provider_admission.enabled:
+            async for model_response in stream:
+                yield model_response
+            return
+
+        limiter = provider_admission.limiter(self.base_url)  # type: ignore[attr-defined]
+        try:
+            lease = await limiter.acquire(self._estimate_tokens(messages))
+        except AdmissionRejectedError as e:
+            raise self._rejected(e) from e
+        usage = None
+        try:
+            async for model_response in stream:
+                usage = self._usage(model_response) or usage
+                yield model_response
+        except ModelProviderError as e:
+            if e.status_code == 429:
+                await limiter.athrottle()
+            raise
+        finally:
+            await lease.arelease(usage)
+
+
+_EMPTY_STREAM = object()
+# provider 调用只会修改 assistant_message 和 run_response 中计时相关的指标
+_TIMING_METRICS = ("timer", "time_to_first_token", "duration")
+
+
+def _copy_timing(source: Optional[Metrics], target: Optional[Metrics]) -> None:
+    if source is None or target is None:
+        return
+    for name in _TIMING_METRICS:
+        setattr(target, name, getattr(source, name))
+
+
+@dataclass
+class _Attempt:
+    backend: Model
+    hedge: bool
+    started: float
+    task: asyncio.Task
+    # 本次尝试收集的原始响应，胜出后并入外层的 _captured_responses
+    captured: Optional[list[dict[str, Any]]]
+    # 本次尝试独占的 assistant_message 和 run_response 副本，胜出后把计时指标写回调用方的对象
+    assistant_message: Message
+    run_response: Any
+    stream: Optional[AsyncIterator[ModelResponse]] = None
+
+    def adopt_metrics(self, assistant_message: Message, run_response: Any) -> None:
+        _copy_timing(self.assistant_message.metrics, assistant_message.metrics)
+        if run_response is not None:
+            _copy_timing(self.run_response.metrics, run_response.metrics)
+
+
+class HedgingMixin:
+    """Hedge slow calls and fail over errored ones across ``fallback_models``.
+
+    Async calls that have not produced their first token (the whole response when not streaming)
+    after ``hedge_delay`` get a second request to the next ranked backend, or to the same one without
+    fallbacks; the first to answer wins and the others are cancelled. Calls failing with a retriable
+    error before their first token move on to the next backend of the latency ranking kept by
+    ``agents.hedging.model_hedging``. Sync calls only fail over.
+    """
+
+    fallback_models: list[Model]
+    hedge_delay: Optional[float]
+
+    def _hedging(self) -> bool:
+        return higgs_config.MODEL_HEDGING_ENABLED or bool(self.fallback_models)
+
+    def _backend_call(self, backend: Model, method: str, *args) -> Any:
+        if backend is self:
+            return getattr(super(), method)(*args)
+        return getattr(backend, method)(*args)
+
+    async def _arace(self, method: str, args: tuple, stream: bool) -> tuple[_Attempt, Any]:
+        outer = _captured_responses.get()
+        candidates = model_hedging.rank(self, self.fallback_models)  # type: ignore[arg-type]
+        delay = self.hedge_delay if self.hedge_delay is not None else higgs_config.MODEL_HEDGE_DELAY
+        hedges_left = higgs_config.MODEL_MAX_HEDGES if higgs_config.MODEL_HEDGING_ENABLED else 0
+        attempts: list[_Attempt] = []
+        next_candidate = 0
+        last_error: Optional[BaseException] = None
+
+        def launch(backend: Model, hedge: bool) -> None:
+            captured: Optional[list[dict[str, Any]]] = [] if outer is not None else None
+            # 并发的尝试各自计时，不能共享调用方的 metrics
+            messages, assistant_message, response_format, tools, tool_choice, run_response = args
+            attempt_message = assistant_message.model_copy(update={"metrics": Metrics()})
+            attempt_run_response = copy.copy(run_response)
+            if run_response is not None and run_response.metrics is not None:
+                attempt_run_response.metrics = copy.copy(run_response.metrics)
+            source = self._backend_call(
+                backend, method, messages, attempt_message, response_format, tools, tool_choice, attempt_run_response
+            )
+
+            async def first():
+                # task 内设置的 context var 不影响外层
+                _captured_responses.set(captured)
+                if not stream:
+                    return await source
+                try:
+                    return await source.__anext__()
+                except StopAsyncIteration:
+                    return _EMPTY_STREAM
+
+            task = asyncio.create_task(first())
+            attempts.append(
+                _Attempt(
+                    backend,
+                    hedge,
+                    time.monotonic(),
+                    task,
+                    captured,
+                    attempt_message,
+                    attempt_run_response,
+                    source if stream else None,
+                )
+            )
+
+        def take_candidate() -> Optional[Model]:
+            nonlocal next_candidate
+            if next_candidate >= len(candidates):
+                return None
+            next_candidate += 1
+            return candidates[next_candidate - 1]
+
+        launch(take_candidate(), hedge=False)  # type: ignore[arg-type]
+        winner: Optional[_Attempt] = None
+        try:
+            while winner is None:
+                pending = [attempt.task for attempt in attempts if not attempt.task.done()]
+                if not pending:
+                    assert last_error is not None
+                    raise last_error
+                timeout = None
+                if hedges_left:
+                    timeout = max(attempts[-1].started + delay - time.monotonic(), 0)
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedges_left -= 1
+                    backend = take_candidate() or (candidates[0] if len(candidates) == 1 else None)
+                    if backend is not None:
+                        model_hedging.record("hedges_fired")
+                        launch(backend, hedge=True)
+                    continue
+                for attempt in attempts:
+                    if attempt.task not in done or winner is not None:
+                        continue
+                    error = attempt.task.exception()
+                    if error is None:
+                        winner = attempt
+                        break
+                    model_hedging.record_failure(attempt.backend)
+                    last_error = error
+                    if not isinstance(error, ModelProviderError) or not is_retriable(error.status_code):
+                        raise error
+                    backend = take_candidate()
+                    if backend is not None:
+                        model_hedging.record("failovers")
+                        launch(backend, hedge=False)
+        finally:
+            losers = [attempt for attempt in attempts if attempt is not winner]
+            for attempt in losers:
+                attempt.task.cancel()
+            await asyncio.gather(*(attempt.task for attempt in losers), return_exceptions=True)
+            for attempt in losers:
+                if attempt.stream is not None:
+                    await attempt.stream.aclose()  # type: ignore[attr-defined]
+
+        model_hedging.record_success(winner.backend, time.monotonic() - winner.started)
+        hedges = sum(1 for attempt in attempts if attempt.hedge)
+        if winner.hedge:
+            model_hedging.record("hedges_won")
+            model_hedging.record("hedges_wasted", hedges - 1)
+        else:
+            model_hedging.record("hedges_wasted", hedges)
+        if outer is not None and winner.captured:
+            outer.extend(winner.captured)
+        winner.adopt_metrics(args[1], args[5])
+        return winner, winner.task.result()
+
+    def _failover(self, call) -> Any:
+        last_error: Optional[ModelProviderError] = None
+        for backend in model_hedging.rank(self, self.fallback_models):  # type: ignore[arg-type]
+            if last_error is not None:
+                model_hedging.record("failovers")
+            started = time.monotonic()
+            try:
+                result = call(backend)
+            except ModelProviderError as e:
+                model_hedging.record_failure(backend)
+                if not is_retriable(e.status_code):
+                    raise
+                last_error = e
+                continue
+            model_hedging.record_success(backend, time.monotonic() - started)
+            return result
+        assert last_error is not None
+        raise last_error
+
+    def invoke(
+        self,
+        messages: list[Message],
+        assistant_message: Message,
+        response_format=None,
+        tools=None,
+        tool_choice=None,
+        run_response=None,
+    ) -> ModelResponse:
+        args = (messages, assistant_message, response_format, tools, tool_choice, run_response)
+        if not self.fallback_models:
+            return super().invoke(*args)  # type: ignore[misc,no-any-return]
+        model_response: ModelResponse = self._failover(lambda backend: self._backend_call(backend, "invoke", *args))
+        return model_response
+
+    async def ainvoke(
+        self,
+        messages: list[Message],
+        assistant_message: Message,
+        response_format=None,
+        tools=None,
+        tool_choice=None,
+        run_response=None,
+    ) -> ModelResponse:
+        args = (messages, assistant_message, response_format, tools, tool_choice, run_response)
+        if not self._hedging():
+            return await super().ainvoke(*args)  # type: ignore[misc,no-any-return]
+        model_response: ModelResponse
+        _, model_response = await self._arace("ainvoke", args, stream=False)
+        return model_response
+
+    def invoke_stream(
+        self,
+        messages: list[Message],
+        assistant_message: Message,
+        response_format=None,
+        tools=None,
+        tool_choice=None,
+        run_response=None,
+    ) -> Iterator[ModelResponse]:
+        args = (messages, assistant_message, response_format, tools, tool_choice, run_response)
+        if not self.fallback_models:
+            yield from super().invoke_stream(*args)  # type: ignore[misc]
+            return
+
+        def start(backend: Model) -> tuple[Iterator[ModelResponse], Any]:
+            stream = self._backend_call(backend, "invoke_stream", *args)
+            return stream, next(stream, _EMPTY_STREAM)
+
+        stream, first = self._failover(start)
+        if first is not _EMPTY_STREAM:
+            yield first
+            yield from stream
+
+    async def ainvoke_stream(
+        self,
+        messages: list[Message],
+        assistant_message: Message,
+        response_format=None,
+        tools=None,
+        tool_choice=None,
+        run_response=None,
+    ) -> AsyncIterator[ModelResponse]:
+        args = (messages, assistant_message, response_format, tools, tool_choice, run_response)
+        if not self._hedging():
+            async for model_response in super().ainvoke_stream(*args):  # type: ignore[misc]
+                yield model_response
+            return
+
+        winner, first = await self._arace("ainvoke_stream", args, stream=True)
+        if first is _EMPTY_STREAM:
+            return
+        yield first
+        async for model_response in winner.stream:  # type: ignore[union-attr]
+            yield model_response
+        # 流结束时 provider 才停止计时
+        winner.adopt_metrics(assistant_message, run_response)
+
+
+# agno 的 Model 与 OpenAIChat 中 _parse_provider_response 的签名本身不一致
+@dataclass
+class PooledDeepSeek(ResponseCacheMixin, HedgingMixin, AdmissionControlMixin, ProviderPoolMixin, DeepSeek):  # type: ignore[misc]
+    # 为 None 时不缓存该模型的响应
+    response_cache_namespace: Optional[str] = None
+    response_cache_ttl: Optional[int] = None
+    # 对冲和故障转移的备用模型，按延迟排序
+    fallback_models: list[Model] = field(default_factory=list)
+    # 为 None 时使用 MODEL_HEDGE_DELAY
+    hedge_delay: Optional[float] = None
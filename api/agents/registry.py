@@ -0,0 +1,58 @@
+import threading
+from collections.abc import Callable
+from typing import Any
+
+from agno.agent import Agent
+
+AgentFactory = Callable[[], Agent]
+
+
+class AgentRegistry:
+    """Build each registered agent definition once, on first use, and serve that instance.
+
+    AgentOS passes the session and user of every run as arguments, so one instance per agent serves all
+    requests: the model and its HTTP client, the db, the tool schemas and the instructions are built once
+    per process instead of once per call.
+
+    Nothing is evicted: the instances are bounded by the registered definitions, one per agent, and
+    AgentOS keeps a reference to each from startup, so dropping one here would only build a second copy.
+    """
+
+    def __init__(self):
+        self._factories: dict[str, AgentFactory] = {}
+        self._agents: dict[str, Agent] = {}
+        self._lock = threading.Lock()
+        self.builds = 0
+        self.hits = 0
+
+    def register(self, agent_id: str, factory: AgentFactory) -> None:
+        with self._lock:
+            self._factories[agent_id] = factory
+            self._agents.pop(agent_id, None)
+
+    def ids(self) -> list[str]:
+        return list(self._factories)
+
+    def get(self, agent_id: str) -> Agent:
+        with self._lock:
+            agent = self._agents.get(agent_id)
+            if agent is not None:
+                self.hits += 1
+                return agent
+            factory = self._factories.get(agent_id)
+            if factory is None:
+                raise KeyError(f"Agent '{agent_id}' is not registered")
+            agent = self._agents[agent_id] = factory()
+            self.builds += 1
+            return agent
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "registered": len(self._factories),
+            "built": len(self._agents),
+            "builds": self.builds,
+            "hits": self.hits,
+        }
+
+
+agent_registry = AgentRegistry()
@@ -0,0 +1,305 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from sqlalchemy import text
+
+from configs import higgs_config
+from extensions.ext_redis import async_redis_client, redis_client
+from repositories.cache import LRUTTLCache
+
+from .embedding_cache import with_embedding_cache
+from .embeddings import Embedder
+
+logger = logging.getLogger(__name__)
+
+SEMANTIC_TABLE = "llm_response_cache"
+# 语义缓存过期数据的清理间隔（秒）
+SEMANTIC_PURGE_INTERVAL = 60
+
+
+@dataclass
+class CacheRequest:
+    namespace: str
+    # model、参数和最后一条用户消息之前的全部上下文（instructions + history）
+    context_key: str
+    # 最后一条用户消息，None 时不走语义缓存
+    prompt: Optional[str]
+    key: str
+    ttl: int
+
+
+def _digest(value: Any) -> str:
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _vector_literal(embedding: list[float]) -> str:
+    return "[" + ",".join(repr(float(value)) for value in embedding) + "]"
+
+
+class SemanticResponseStore:
+    """Responses indexed by the embedding of their prompt in pgvector, looked up with an HNSW cosine search."""
+
+    def __init__(self, dimensions: int):
+        self.dimensions = dimensions
+        self._ready = False
+        self._last_purge = 0.0
+
+    def _engine(self):
+        from models.engine import get_pgvector_engine
+
+        return get_pgvector_engine()
+
+    async def _ensure_table(self) -> None:
+        if self._ready:
+            return
+        async with self._engine().begin() as conn:
+            await conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+            await conn.execute(
+                text(
+                    f"CREATE TABLE IF NOT EXISTS {SEMANTIC_TABLE} ("
+                    "id BIGSERIAL PRIMARY KEY, "
+                    "namespace VARCHAR(255) NOT NULL, "
+                    "context_key CHAR(64) NOT NULL, "
+                    "prompt TEXT NOT NULL, "
+                    f"embedding vector({self.dimensions}) NOT NULL, "
+                    "responses JSONB NOT NULL, "
+                    "created_at TIMESTAMPTZ NOT NULL DEFAULT now(), "
+                    "expires_at TIMESTAMPTZ NOT NULL)"
+                )
+            )
+            await conn.execute(
+                text(
+                    f"CREATE INDEX IF NOT EXISTS {SEMANTIC_TABLE}_context_idx "
+                    f"ON {SEMANTIC_TABLE} (namespace, context_key)"
+                )
+            )
+            await conn.execute(
+                text(
+                    f"CREATE INDEX IF NOT EXISTS {SEMANTIC_TABLE}_embedding_idx "
+                    f"ON {SEMANTIC_TABLE} USING hnsw (embedding vector_cosine_ops)"
+                )
+            )
+        self._ready = True
+
+    async def search(
+        self, namespace: str, context_key: str, embedding: list[float]
+    ) -> Optional[tuple[float, list[dict[str, Any]]]]:
+        await self._ensure_table()
+        async with self._engine().connect() as conn:
+            row = (
+                await conn.execute(
+                    text(
+                        f"SELECT responses, 1 - (embedding <=> CAST(:embedding AS vector)) AS similarity "
+                        f"FROM {SEMANTIC_TABLE} "
+                        "WHERE namespace = :namespace AND context_key = :context_key AND expires_at > now() "
+                        "ORDER BY embedding <=> CAST(:embedding AS vector) LIMIT 1"
+                    ),
+                    {"embedding": _vector_literal(embedding), "namespace": namespace, "context_key": context_key},
+                )
+            ).first()
+        if row is None:
+            return None
+        return row.similarity, row.responses
+
+    async def insert(
+        self,
+        namespace: str,
+        context_key: str,
+        prompt: str,
+        embedding: list[float],
+        responses: list[dict[str, Any]],
+        ttl: int,
+    ) -> None:
+        await self._ensure_table()
+        async with self._engine().begin() as conn:
+            await conn.execute(
+                text(
+                    f"INSERT INTO {SEMANTIC_TABLE} (namespace, context_key, prompt, embedding, responses, expires_at) "
+                    "VALUES (:namespace, :context_key, :prompt, CAST(:embedding AS vector), CAST(:responses AS jsonb), "
+                    "now() + make_interval(secs => :ttl))"
+                ),
+                {
+                    "namespace": namespace,
+                    "context_key": context_key,
+                    "prompt": prompt,
+                    "embedding": _vector_literal(embedding),
+                    "responses": json.dumps(responses),
+                    "ttl": ttl,
+                },
+            )
+            if time.monotonic() - self._last_purge > SEMANTIC_PURGE_INTERVAL:
+                self._last_purge = time.monotonic()
+                await conn.execute(text(f"DELETE FROM {SEMANTIC_TABLE} WHERE expires_at <= now()"))
+
+
+class ResponseCache:
+    """Cache of raw provider responses (one completion, or the chunks of a stream) in front of the model.
+
+    The exact tier is keyed by a hash of the model, the formatted messages and the request parameters.
+    On a miss, the semantic tier looks for a cached answer to a similar last user message under the
+    same context (model, parameters, instructions and history), tool calling requests excluded.
+    """
+
+    def __init__(self):
+        self._local = LRUTTLCache(higgs_config.LLM_RESPONSE_CACHE_MAX_SIZE, higgs_config.LLM_RESPONSE_CACHE_TTL)
+        self._lock = threading.Lock()
+        self._embedder: Optional[Embedder] = None
+        self._semantic: Optional[SemanticResponseStore] = None
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        return higgs_config.LLM_RESPONSE_CACHE_ENABLED
+
+    @property
+    def semantic_enabled(self) -> bool:
+        return higgs_config.LLM_RESPONSE_CACHE_SEMANTIC_ENABLED
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    @property
+    def embedder(self) -> Embedder:
+        if self._embedder is None:
+            self._embedder = with_embedding_cache(
+                Embedder(
+                    model=higgs_config.LLM_RESPONSE_CACHE_EMBEDDING_MODEL,
+                    base_url=higgs_config.LLM_RESPONSE_CACHE_EMBEDDING_BASE_URL,
+                    dimensions=higgs_config.LLM_RESPONSE_CACHE_EMBEDDING_DIMENSIONS,
+                    api_key=higgs_config.LLM_RESPONSE_CACHE_EMBEDDING_API_KEY,
+                )
+            )
+        return self._embedder
+
+    @property
+    def semantic(self) -> SemanticResponseStore:
+        if self._semantic is None:
+            self._semantic = SemanticResponseStore(higgs_config.LLM_RESPONSE_CACHE_EMBEDDING_DIMENSIONS)
+        return self._semantic
+
+    def build_request(
+        self,
+        namespace: str,
+        model: str,
+        messages: list[dict[str, Any]],
+        params: dict[str, Any],
+        stream: bool,
+        semantic: bool,
+        ttl: Optional[int] = None,
+    ) -> CacheRequest:
+        prompt = None
+        context = messages
+        if semantic and messages and messages[-1].get("role") == "user" and isinstance(messages[-1]["content"], str):
+            prompt = messages[-1]["content"]
+            context = messages[:-1]
+        context_key = _digest({"model": model, "params": params, "stream": stream, "messages": context})
+        return CacheRequest(
+            namespace=namespace,
+            context_key=context_key,
+            prompt=prompt,
+            key=_digest({"namespace": namespace, "context": context_key, "prompt": prompt, "messages": messages}),
+            ttl=ttl or higgs_config.LLM_RESPONSE_CACHE_TTL,
+        )
+
+    def _redis_key(self, request: CacheRequest) -> str:
+        return f"llm_response:{request.namespace}:{request.key}"
+
+    def _use_redis(self) -> bool:
+        return higgs_config.LLM_RESPONSE_CACHE_BACKEND == "redis"
+
+    def get(self, request: CacheRequest) -> Optional[list[dict[str, Any]]]:
+        """Exact tier only, the semantic tier needs the async embedding and database clients."""
+        try:
+            if self._use_redis():
+                raw = redis_client.get(self._redis_key(request))
+                responses = json.loads(raw) if raw is not None else None
+            else:
+                responses = self._local.get(request.key)
+        except Exception:
+            logger.warning("Failed to read LLM response cache", exc_info=True)
+            self._count("errors")
+            responses = None
+        self._count("exact_hits" if responses is not None else "misses")
+        return responses
+
+    def set(self, request: CacheRequest, responses: list[dict[str, Any]]) -> None:
+        try:
+            if self._use_redis():
+                redis_client.set(self._redis_key(request), json.dumps(responses), ex=request.ttl)
+            else:
+                self._local.set(request.key, responses, ttl=request.ttl)
+            self._count("stores")
+        except Exception:
+            logger.warning("Failed to write LLM response cache", exc_info=True)
+            self._count("errors")
+
+    async def _aget_exact(self, request: CacheRequest) -> Optional[list[dict[str, Any]]]:
+        if self._use_redis():
+            raw = await async_redis_client.get(self._redis_key(request))
+            return json.loads(raw) if raw is not None else None
+        return self._local.get(request.key)
+
+    async def aget(self, request: CacheRequest) -> tuple[Optional[list[dict[str, Any]]], Optional[list[float]]]:
+        """Look up both tiers, also returns the prompt embedding computed on a semantic miss for ``aset``."""
+        try:
+            responses = await self._aget_exact(request)
+            if responses is not None:
+                self._count("exact_hits")
+                return responses, None
+
+            if self.semantic_enabled and request.prompt is not None:
+                embedding = await self.embedder.aembed_one(request.prompt)
+                found = await self.semantic.search(request.namespace, request.context_key, embedding)
+                if found is not None and found[0] >= higgs_config.LLM_RESPONSE_CACHE_SIMILARITY_THRESHOLD:
+                    self._count("semantic_hits")
+                    return found[1], None
+                self._count("misses")
+                return None, embedding
+        except Exception:
+            logger.warning("Failed to read LLM response cache", exc_info=True)
+            self._count("errors")
+        self._count("misses")
+        return None, None
+
+    async def aset(
+        self, request: CacheRequest, responses: list[dict[str, Any]], embedding: Optional[list[float]] = None
+    ) -> None:
+        try:
+            if self._use_redis():
+                await async_redis_client.set(self._redis_key(request), json.dumps(responses), ex=request.ttl)
+            else:
+                self._local.set(request.key, responses, ttl=request.ttl)
+            if embedding is not None and request.prompt is not None:
+                await self.semantic.insert(
+                    request.namespace, request.context_key, request.prompt, embedding, responses, request.ttl
+                )
+            self._count("stores")
+        except Exception:
+            logger.warning("Failed to write LLM response cache", exc_info=True)
+            self._count("errors")
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.exact_hits + self.semantic_hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "semantic_enabled": self.semantic_enabled,
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "errors": self.errors,
+            "hit_rate": round((self.exact_hits + self.semantic_hits) / lookups, 4) if lookups else None,
+        }
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,179 @@
+import json
+import logging
+import threading
+import uuid
+import weakref
+from typing import Any, Optional
+
+from pydantic_core import to_json
+from redis import RedisError
+
+from configs import higgs_config
+from extensions.ext_redis import redis_client
+from repositories.cache import LRUTTLCache
+from repositories.invalidation import invalidation_bus
+
+logger = logging.getLogger(__name__)
+
+
+class SessionCache:
+    """Write-through cache of agent session rows (as returned by ``get_session(deserialize=False)``).
+
+    The in-process tier keeps the serialized session with a version, the Redis tier keeps the session
+    and its version under two keys. With Redis, a local hit is only used when its version is still the
+    current one, so a worker never continues a conversation from a copy older than a sibling's last turn.
+    Without Redis the local tier relies on the invalidation bus, for single worker or sticky deployments.
+    """
+
+    def __init__(self, namespace: str):
+        self.namespace = namespace
+        self._local = LRUTTLCache(higgs_config.SESSION_CACHE_MAX_SIZE, higgs_config.SESSION_CACHE_TTL)
+        self._lock = threading.Lock()
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.stale_local = 0
+        self.misses = 0
+        self.writes = 0
+        self.invalidations = 0
+        self.errors = 0
+        invalidation_bus.subscribe(self.namespace, self.evict_local)
+        _caches.add(self)
+
+    @property
+    def enabled(self) -> bool:
+        return higgs_config.SESSION_CACHE_ENABLED
+
+    def _use_redis(self) -> bool:
+        return higgs_config.SESSION_CACHE_REDIS_ENABLED and redis_client.is_initialized()
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def data_key(self, session_id: str) -> str:
+        return f"{self.namespace}:{session_id}"
+
+    def version_key(self, session_id: str) -> str:
+        return f"{self.namespace}:{session_id}:version"
+
+    def get(self, session_id: str, user_id: Optional[str] = None) -> Optional[dict[str, Any]]:
+        if not self.enabled:
+            return None
+        local = self._local.get(session_id)
+        raw = None
+        if self._use_redis():
+            try:
+                if local is not None:
+                    version = redis_client.get(self.version_key(session_id))
+                    if version is not None and version.decode() == local[0]:
+                        raw = local[1]
+                        self._count("local_hits")
+                    else:
+                        self._local.delete(session_id)
+                        self._count("stale_local")
+                if raw is None:
+                    raw, version = redis_client.mget(self.data_key(session_id), self.version_key(session_id))
+                    if raw is not None and version is not None:
+                        self._local.set(session_id, (version.decode(), raw))
+                        self._count("redis_hits")
+                    else:
+                        raw = None
+            except RedisError:
+                logger.warning("Failed to read session cache from redis", exc_info=True)
+                self._count("errors")
+                raw = None
+        elif local is not None:
+            raw = local[1]
+            self._count("local_hits")
+
+        if raw is None:
+            self._count("misses")
+            return None
+        session: dict[str, Any] = json.loads(raw)
+        # 与 get_session 的 user_id 过滤一致
+        if user_id is not None and session.get("user_id") != user_id:
+            return None
+        return session
+
+    def set(self, session: dict[str, Any], fill: bool = False) -> None:
+        """Cache ``session``, ``fill`` for sessions read from the database (never overwrites a newer write)."""
+        if not self.enabled:
+            return
+        session_id = session["session_id"]
+        version = uuid.uuid4().hex
+        raw = to_json(session)
+        if self._use_redis():
+            try:
+                with redis_client.pipeline(transaction=True) as pipe:
+                    ttl = higgs_config.SESSION_CACHE_REDIS_TTL
+                    pipe.set(self.data_key(session_id), raw, ex=ttl, nx=fill)
+                    pipe.set(self.version_key(session_id), version, ex=ttl, nx=fill)
+                    stored, _ = pipe.execute()
+                if not stored:
+                    return
+            except RedisError:
+                logger.warning("Failed to write session cache to redis", exc_info=True)
+                self._count("errors")
+                # 无法确认 Redis 中的版本，本地不缓存
+                self._local.delete(session_id)
+                return
+        elif fill and self._local.get(session_id) is not None:
+            return
+        self._local.set(session_id, (version, raw))
+        self._count("writes")
+        if not fill:
+            # 其他进程的本地缓存失效
+            invalidation_bus.publish(self.namespace, [session_id])
+
+    def invalidate(self, session_ids: list[str]) -> None:
+        if not self.enabled:
+            return
+        self._count("invalidations")
+        for session_id in session_ids:
+            self._local.delete(session_id)
+        invalidation_bus.publish(self.namespace, session_ids)
+        if self._use_redis():
+            try:
+                redis_client.delete(
+                    *[
+                        key
+                        for session_id in session_ids
+                        for key in (self.data_key(session_id), self.version_key(session_id))
+                    ]
+                )
+            except RedisError:
+                logger.warning("Failed to invalidate session cache in redis", exc_info=True)
+                self._count("errors")
+
+    def evict_local(self, session_ids: Optional[list[Any]]) -> None:
+        """Evict sessions written by another node, the writer has already updated the Redis tier."""
+        if session_ids is None:
+            self._local.clear()
+            return
+        for session_id in session_ids:
+            self._local.delete(session_id)
+
+    def stats(self) -> dict[str, Any]:
+        hits = self.local_hits + self.redis_hits
+        lookups = hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "redis_enabled": higgs_config.SESSION_CACHE_REDIS_ENABLED,
+            "size": len(self._local),
+            "local_hits": self.local_hits,
+            "redis_hits": self.redis_hits,
+            "stale_local": self.stale_local,
+            "misses": self.misses,
+            "writes": self.writes,
+            "invalidations": self.invalidations,
+            "errors": self.errors,
+            # 每次命中都省掉一次会话表和摘要表的读取
+            "hit_rate": round(hits / lookups, 4) if lookups else None,
+        }
+
+
+_caches: "weakref.WeakSet[SessionCache]" = weakref.WeakSet()
+
+
+def session_cache_stats() -> dict[str, dict[str, Any]]:
+    return {cache.namespace: cache.stats() for cache in list(_caches)}
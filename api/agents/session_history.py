@@ -0,0 +1,417 @@
+import copy
+import logging
+import threading
+import time
+import uuid
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from textwrap import dedent
+from typing import Any, Optional, Union
+
+from agno.db.base import SessionType
+from agno.db.postgres import PostgresDb
+from agno.models.base import Model
+from agno.models.message import Message
+from agno.run.agent import RunOutput
+from agno.run.base import RunStatus
+from agno.session import AgentSession, Session
+from agno.session.summary import SessionSummary
+from sqlalchemy import JSON, Text, cast, delete, func, select, text, update
+from sqlalchemy.dialects import postgresql
+from sqlmodel import col
+
+from configs import higgs_config
+from extensions.provider_admission import Priority, admission_priority
+from models.agent_session import AgentSessionRun, AgentSessionSummary
+
+from .session_cache import SessionCache
+from .session_writer import PendingSession, SessionWriteBehind
+
+logger = logging.getLogger(__name__)
+
+# agno 会话表中随会话一起写入的列
+SESSION_COLUMNS = (
+    "agent_id",
+    "user_id",
+    "runs",
+    "agent_data",
+    "session_data",
+    "summary",
+    "metadata",
+    "created_at",
+    "updated_at",
+)
+
+# 进行中或等待确认的 run 还会被 agno 按 run_id 读取，不能归档
+UNFINISHED_STATUSES = (RunStatus.pending, RunStatus.running, RunStatus.paused)
+
+SUMMARY_INSTRUCTIONS = dedent("""\
+    You maintain the running summary of a long conversation between a user and an assistant.
+    Merge the new turns into the previous summary and return only the updated summary.
+    Keep facts, decisions, names and open questions the assistant may need later, drop small talk.
+    Stay under 300 words and do not make anything up.\
+""")
+
+
+def _estimate_tokens(run: RunOutput) -> int:
+    # 与 provider 准入控制一致，按 4 个字符一个 token 估算，不计入从历史带入的消息
+    return sum(len(str(message.content or "")) for message in run.messages or [] if not message.from_history) // 4
+
+
+@dataclass
+class HistoryWindow:
+    """Which runs of a session stay in the session row, the rest are archived and summarized."""
+
+    max_runs: int
+    # 0 表示只按 max_runs 限制
+    max_tokens: int = 0
+
+    def split(self, runs: list[RunOutput]) -> tuple[list[RunOutput], list[RunOutput]]:
+        """Split ``runs`` into (evicted, kept), the latest run is always kept."""
+        kept = 0
+        tokens = 0
+        for run in reversed(runs):
+            tokens += _estimate_tokens(run)
+            if kept and (kept >= self.max_runs or (self.max_tokens and tokens > self.max_tokens)):
+                break
+            kept += 1
+        boundary = len(runs) - kept
+        # 只归档已结束的 run，窗口之前未结束的 run 继续留在会话中
+        evicted = [run for run in runs[:boundary] if run.status not in UNFINISHED_STATUSES and run.run_id]
+        evicted_ids = {id(run) for run in evicted}
+        return evicted, [run for run in runs if id(run) not in evicted_ids]
+
+
+class RollingSummarizer:
+    """Background threads folding archived runs into the session summaries, one job per session at a time."""
+
+    def __init__(self, workers: int):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="session-summary")
+        self._lock = threading.Lock()
+        self._running: set[str] = set()
+        # 运行期间又有新的 run 被归档的会话，结束后再跑一轮
+        self._dirty: set[str] = set()
+        self.scheduled = 0
+        self.completed = 0
+        self.failed = 0
+
+    def schedule(self, session_id: str, job: Callable[[], object]) -> None:
+        with self._lock:
+            if session_id in self._running:
+                self._dirty.add(session_id)
+                return
+            self._running.add(session_id)
+            self.scheduled += 1
+        self._executor.submit(self._run, session_id, job)
+
+    def _run(self, session_id: str, job: Callable[[], object]) -> None:
+        while True:
+            try:
+                job()
+                with self._lock:
+                    self.completed += 1
+            except Exception:
+                logger.warning("Failed to summarize session %s", session_id, exc_info=True)
+                with self._lock:
+                    self.failed += 1
+            with self._lock:
+                if session_id not in self._dirty:
+                    self._running.discard(session_id)
+                    return
+                self._dirty.discard(session_id)
+
+    def shutdown(self) -> None:
+        # 未完成的摘要会在下一次归档时补上
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "enabled": higgs_config.SESSION_SUMMARY_ENABLED,
+            "running": len(self._running),
+            "scheduled": self.scheduled,
+            "completed": self.completed,
+            "failed": self.failed,
+        }
+
+
+session_summarizer = RollingSummarizer(higgs_config.SESSION_SUMMARY_WORKERS)
+
+
+class BoundedPostgresDb(PostgresDb):
+    """agno ``PostgresDb`` keeping only a window of recent runs in each agent session.
+
+    Runs leaving the window are moved to ``agent_session_run`` and folded into a rolling summary in
+    ``agent_session_summary`` by ``summary_model``, which is loaded back as the session summary.
+    Loading and saving a session therefore costs the same at the 10th and at the 1000th turn.
+
+    Agent sessions are saved through a ``SessionWriteBehind`` queue, the sessions and archived runs of a
+    batch are written in one transaction by a background thread instead of at the end of every stream.
+    Active sessions are read through a ``SessionCache`` (SESSION_CACHE_ENABLED) kept up to date on save.
+    """
+
+    def __init__(
+        self,
+        *args,
+        window: Optional[HistoryWindow] = None,
+        summary_model: Optional[Callable[[], Model]] = None,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self.window = window or HistoryWindow(
+            max_runs=higgs_config.SESSION_HISTORY_MAX_RUNS, max_tokens=higgs_config.SESSION_HISTORY_MAX_TOKENS
+        )
+        self.summary_model = summary_model
+        self.cache = SessionCache(namespace=f"agent_session:{self.session_table_name}")
+        self.writer = SessionWriteBehind(
+            self._write_sessions, delete=self._delete_written, name=f"session-writer-{self.session_table_name}"
+        )
+
+    def upsert_session(
+        self, session: Session, deserialize: Optional[bool] = True
+    ) -> Optional[Union[Session, dict[str, Any]]]:
+        if not isinstance(session, AgentSession):
+            return super().upsert_session(session, deserialize=deserialize)
+
+        evicted: list[RunOutput] = []
+        if session.runs:
+            evicted, session.runs = self.window.split(session.runs)
+        pending = PendingSession(
+            session_id=session.session_id,
+            session={
+                **session.to_dict(),
+                "created_at": session.created_at or int(time.time()),
+                "updated_at": int(time.time()),
+            },
+            # agno 创建 run 时总会生成 run_id，缺失时补一个，归档表以它去重
+            archived_runs={run.run_id or str(uuid.uuid4()): run.to_dict() for run in evicted},
+        )
+        if not (
+            higgs_config.SESSION_WRITE_BEHIND_ENABLED
+            and self.writer.put(pending.session_id, pending.session, pending.archived_runs)
+        ):
+            try:
+                self._write_sessions([pending])
+            except Exception:
+                logger.warning("Failed to write session %s", session.session_id, exc_info=True)
+                self.cache.invalidate([session.session_id])
+                return None
+        self.cache.set(pending.session)
+        return session if deserialize else copy.deepcopy(pending.session)
+
+    def get_session(
+        self,
+        session_id: str,
+        session_type: SessionType,
+        user_id: Optional[str] = None,
+        deserialize: Optional[bool] = True,
+    ) -> Optional[Union[Session, dict[str, Any]]]:
+        if session_type != SessionType.AGENT:
+            return super().get_session(session_id, session_type, user_id=user_id, deserialize=deserialize)
+
+        # 还在写入队列中的会话比数据库中的新，其次是缓存的会话
+        session = self.writer.get(session_id) or self.cache.get(session_id, user_id=user_id)
+        if session is None:
+            loaded = super().get_session(session_id, session_type, user_id=user_id, deserialize=False)
+            if not isinstance(loaded, dict):
+                return None
+            session = loaded
+            try:
+                row = self._get_summary(session_id)
+            except Exception:
+                logger.warning("Failed to read summary of session %s", session_id, exc_info=True)
+            else:
+                if row is not None:
+                    session["summary"] = SessionSummary(summary=row.summary, updated_at=row.updated_at).to_dict()
+                self.cache.set(session, fill=True)
+        elif user_id is not None and session.get("user_id") != user_id:
+            return None
+        return AgentSession.from_dict(session) if deserialize else session
+
+    def rename_session(
+        self, session_id: str, session_type: SessionType, session_name: str, deserialize: Optional[bool] = True
+    ) -> Optional[Union[Session, dict[str, Any]]]:
+        if session_type != SessionType.AGENT:
+            return super().rename_session(session_id, session_type, session_name, deserialize=deserialize)
+
+        def rename(session: dict[str, Any]) -> None:
+            session["session_data"] = {**(session.get("session_data") or {}), "session_name": session_name}
+
+        queued = self.writer.update(session_id, rename)
+        self.cache.invalidate([session_id])
+        table = self._get_table(table_type="sessions")
+        if table is None:
+            return None
+        # agno 的实现中 to_jsonb 的参数没有类型，psycopg2 下会报错，session_data 为空时也会丢失名称
+        session_data = func.jsonb_set(
+            # agno 把空的 session_data 存为 JSON null
+            func.coalesce(
+                func.nullif(cast(table.c.session_data, postgresql.JSONB), text("'null'::jsonb")), text("'{}'::jsonb")
+            ),
+            text("'{session_name}'"),
+            func.to_jsonb(cast(session_name, Text)),
+        )
+        try:
+            with self.Session() as sess, sess.begin():
+                renamed = sess.execute(
+                    update(table)
+                    .where(table.c.session_id == session_id, table.c.session_type == session_type.value)
+                    .values(session_data=cast(session_data, JSON))
+                ).rowcount
+        except Exception:
+            logger.warning("Failed to rename session %s", session_id, exc_info=True)
+            return None
+        if not renamed and queued is None:
+            return None
+        return self.get_session(session_id, session_type, deserialize=deserialize)
+
+    def delete_session(self, session_id: str) -> bool:
+        self.writer.discard([session_id])
+        self.cache.invalidate([session_id])
+        deleted = super().delete_session(session_id)
+        self._delete_history([session_id])
+        return deleted
+
+    def delete_sessions(self, session_ids: list[str]) -> None:
+        self.writer.discard(session_ids)
+        self.cache.invalidate(session_ids)
+        super().delete_sessions(session_ids)
+        self._delete_history(session_ids)
+
+    def _delete_written(self, session_ids: list[str]) -> None:
+        """Delete the sessions written by the writer after they were deleted, called from its thread."""
+        self.cache.invalidate(session_ids)
+        super().delete_sessions(session_ids)
+        self._delete_history(session_ids)
+
+    def get_archived_runs(self, session_id: str, limit: Optional[int] = None) -> list[RunOutput]:
+        """Runs of the session that left the history window, oldest first."""
+        with self.Session() as sess:
+            stmt = (
+                select(col(AgentSessionRun.run))
+                .where(col(AgentSessionRun.session_id) == session_id)
+                .order_by(col(AgentSessionRun.id))
+                .limit(limit)
+            )
+            return [RunOutput.from_dict(run) for run in sess.scalars(stmt)]
+
+    def _write_sessions(self, batch: list[PendingSession]) -> None:
+        """Archive the evicted runs and upsert the sessions of ``batch`` in one transaction."""
+        table = self._get_table(table_type="sessions", create_table_if_not_found=True)
+        if table is None:
+            raise RuntimeError("Sessions table is not available")
+        archive = AgentSessionRun.__table__  # type: ignore[attr-defined]
+        runs = [
+            {"session_id": pending.session_id, "run_id": run_id, "run": run, "created_at": datetime.utcnow()}
+            for pending in batch
+            for run_id, run in pending.archived_runs.items()
+        ]
+        sessions = [
+            {
+                "session_id": pending.session_id,
+                "session_type": SessionType.AGENT.value,
+                **{column: pending.session.get(column) for column in SESSION_COLUMNS},
+            }
+            for pending in batch
+        ]
+        with self.Session() as sess, sess.begin():
+            if runs:
+                # 上次写入失败后重试时，已归档的 run 跳过
+                sess.execute(postgresql.insert(archive).on_conflict_do_nothing(index_elements=[archive.c.run_id]), runs)
+            stmt = postgresql.insert(table)
+            sess.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=[table.c.session_id],
+                    set_={column: stmt.excluded[column] for column in SESSION_COLUMNS if column != "created_at"},
+                ),
+                sessions,
+            )
+
+        for pending in batch:
+            if pending.archived_runs:
+                self.schedule_summary(pending.session_id)
+
+    def _get_summary(self, session_id: str) -> Optional[AgentSessionSummary]:
+        table = AgentSessionSummary.__table__  # type: ignore[attr-defined]
+        with self.Session() as sess:
+            row = sess.execute(select(table).where(table.c.session_id == session_id)).first()
+        return AgentSessionSummary.model_validate(row._mapping) if row is not None else None
+
+    def _delete_history(self, session_ids: list[str]) -> None:
+        try:
+            with self.Session() as sess, sess.begin():
+                sess.execute(delete(AgentSessionRun).where(col(AgentSessionRun.session_id).in_(session_ids)))
+                sess.execute(delete(AgentSessionSummary).where(col(AgentSessionSummary.session_id).in_(session_ids)))
+        except Exception:
+            logger.warning("Failed to delete history of sessions %s", session_ids, exc_info=True)
+
+    def schedule_summary(self, session_id: str) -> None:
+        if higgs_config.SESSION_SUMMARY_ENABLED and self.summary_model is not None:
+            session_summarizer.schedule(session_id, lambda: self.summarize_session(session_id))
+
+    def summarize_session(self, session_id: str) -> Optional[str]:
+        """Fold the archived runs not yet in the summary into it, SESSION_SUMMARY_BATCH_RUNS at a time."""
+        if self.summary_model is None:
+            return None
+        current = self._get_summary(session_id)
+        while True:
+            last_run_id = current.last_run_id if current else 0
+            with self.Session() as sess:
+                rows = sess.execute(
+                    select(col(AgentSessionRun.id), col(AgentSessionRun.run))
+                    .where(col(AgentSessionRun.session_id) == session_id, col(AgentSessionRun.id) > last_run_id)
+                    .order_by(col(AgentSessionRun.id))
+                    .limit(higgs_config.SESSION_SUMMARY_BATCH_RUNS)
+                ).all()
+            if not rows:
+                return current.summary if current else None
+
+            transcript = "\n\n".join(_format_run(RunOutput.from_dict(row.run)) for row in rows)
+            previous = current.summary if current else "(none)"
+            prompt = f"<previous_summary>\n{previous}\n</previous_summary>\n\n<new_turns>\n{transcript}\n</new_turns>"
+            with admission_priority(Priority.BATCH):
+                response = self.summary_model().response(
+                    messages=[
+                        Message(role="system", content=SUMMARY_INSTRUCTIONS),
+                        Message(role="user", content=prompt),
+                    ]
+                )
+            if not response.content:
+                return previous
+
+            updated = AgentSessionSummary(
+                session_id=session_id,
+                summary=str(response.content).strip(),
+                summarized_runs=(current.summarized_runs if current else 0) + len(rows),
+                last_run_id=rows[-1].id,
+            )
+            if not self._save_summary(updated, last_run_id):
+                # 另一个进程已经更新了摘要，从它的进度继续
+                current = self._get_summary(session_id)
+                continue
+            # 缓存中的会话带着旧的摘要
+            self.cache.invalidate([session_id])
+            current = updated
+
+    def _save_summary(self, summary: AgentSessionSummary, previous_run_id: int) -> bool:
+        table = AgentSessionSummary.__table__  # type: ignore[attr-defined]
+        values = summary.model_dump()
+        stmt = postgresql.insert(table).values(**values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.session_id],
+            set_={key: stmt.excluded[key] for key in values if key != "session_id"},
+            where=table.c.last_run_id == previous_run_id,
+        )
+        with self.Session() as sess, sess.begin():
+            updated: int = sess.execute(stmt).rowcount
+        return updated > 0
+
+
+def _format_run(run: RunOutput) -> str:
+    lines = []
+    for message in run.messages or []:
+        if message.from_history or message.role not in ("user", "assistant") or not message.content:
+            continue
+        lines.append(f"{message.role.capitalize()}: {message.content}")
+    return "\n".join(lines)
@@ -0,0 +1,277 @@
+import asyncio
+import copy
+import logging
+import threading
+import time
+import weakref
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from configs import higgs_config
+
+logger = logging.getLogger(__name__)
+
+# 写入失败后重试的间隔（秒）
+RETRY_BACKOFF = 1.0
+
+
+@dataclass
+class PendingSession:
+    session_id: str
+    # session.to_dict() 的快照，同一个会话只保留最新的一份
+    session: dict[str, Any]
+    # 自上次写入以来移出历史窗口的 run，按 run_id 去重
+    archived_runs: dict[str, dict[str, Any]] = field(default_factory=dict)
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class SessionWriteBehind:
+    """Bounded queue of session writes, coalesced per session and flushed by one background thread.
+
+    ``put`` returns ``False`` when the queue stays full for SESSION_WRITE_BEHIND_ENQUEUE_TIMEOUT or the
+    writer is closed, the caller then writes the session inline. Called from an event loop, as agno's
+    async runs do, it does not wait for room. Sessions waiting to be written, or being written, are
+    returned by ``get`` so that the next turn served by this process reads its own writes. ``delete`` is
+    called by the writer thread with the sessions discarded while their write was in flight.
+    """
+
+    def __init__(
+        self,
+        flush: Callable[[list[PendingSession]], None],
+        delete: Optional[Callable[[list[str]], None]] = None,
+        name: str = "session-writer",
+    ):
+        self._flush = flush
+        self._delete = delete
+        self.name = name
+        self._pending: dict[str, PendingSession] = {}
+        self._inflight: dict[str, PendingSession] = {}
+        # 写入进行中被删除的会话，写入结束后由写入线程再删除一次
+        self._discarded: set[str] = set()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self.enqueued = 0
+        self.coalesced = 0
+        self.inline_writes = 0
+        self.backpressure_waits = 0
+        self.flushed = 0
+        self.batches = 0
+        self.failures = 0
+        self.dropped = 0
+        self.flush_latency = 0.0
+        self.max_flush_latency = 0.0
+        self.max_depth = 0
+        _writers.add(self)
+
+    def _start(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def put(self, session_id: str, session: dict[str, Any], archived_runs: dict[str, dict[str, Any]]) -> bool:
+        with self._cond:
+            if self._closed:
+                self.inline_writes += 1
+                return False
+            pending = self._pending.get(session_id)
+            if pending is not None:
+                pending.session = session
+                pending.archived_runs.update(archived_runs)
+                self.coalesced += 1
+                return True
+
+            # 正在写入的会话不受上限约束：内联写入可能先于进行中的写入提交，被旧的快照覆盖
+            if len(self._pending) >= higgs_config.SESSION_WRITE_BEHIND_MAX_PENDING and not self._is_inflight(
+                session_id
+            ):
+                if _in_event_loop():
+                    # 在事件循环中等待会阻塞这个进程的所有请求
+                    self.inline_writes += 1
+                    return False
+                self.backpressure_waits += 1
+                deadline = time.monotonic() + higgs_config.SESSION_WRITE_BEHIND_ENQUEUE_TIMEOUT
+                while len(self._pending) >= higgs_config.SESSION_WRITE_BEHIND_MAX_PENDING:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or self._closed:
+                        self.inline_writes += 1
+                        return False
+                    self._cond.wait(remaining)
+
+            self._pending[session_id] = PendingSession(session_id, session, dict(archived_runs))
+            self.enqueued += 1
+            self.max_depth = max(self.max_depth, len(self._pending))
+            self._start()
+            self._cond.notify_all()
+            return True
+
+    def _is_inflight(self, session_id: str) -> bool:
+        return session_id in self._inflight and session_id not in self._discarded
+
+    def get(self, session_id: str) -> Optional[dict[str, Any]]:
+        with self._cond:
+            pending = self._pending.get(session_id)
+            if pending is None and self._is_inflight(session_id):
+                pending = self._inflight[session_id]
+            # 调用方（agno 的 from_dict）会修改传入的 dict
+            return copy.deepcopy(pending.session) if pending is not None else None
+
+    def discard(self, session_ids: list[str]) -> None:
+        """Drop the queued writes of ``session_ids``, those in flight are deleted again once written."""
+        with self._cond:
+            for session_id in session_ids:
+                self._pending.pop(session_id, None)
+                if session_id in self._inflight:
+                    self._discarded.add(session_id)
+            self._cond.notify_all()
+
+    def update(self, session_id: str, mutate: Callable[[dict[str, Any]], None]) -> Optional[dict[str, Any]]:
+        """Apply ``mutate`` to the queued snapshot of a session edited outside of a run, e.g. renamed.
+
+        A session being written is queued again from its in-flight snapshot, so the in-flight write does
+        not overwrite an update made in the database meanwhile.
+        """
+        with self._cond:
+            pending = self._pending.get(session_id)
+            if pending is None and self._is_inflight(session_id):
+                pending = PendingSession(session_id, copy.deepcopy(self._inflight[session_id].session))
+                self._pending[session_id] = pending
+                self.enqueued += 1
+                self._start()
+                self._cond.notify_all()
+            if pending is None:
+                return None
+            mutate(pending.session)
+            return copy.deepcopy(pending.session)
+
+    def _take_batch(self) -> list[PendingSession]:
+        with self._cond:
+            while not self._pending and not self._closed:
+                self._cond.wait()
+            if not self._pending:
+                return []
+            if not self._closed:
+                # 攒一小段时间，让同一会话的多次保存合并、不同会话的保存一起提交
+                deadline = time.monotonic() + higgs_config.SESSION_WRITE_BEHIND_FLUSH_INTERVAL
+                while len(self._pending) < higgs_config.SESSION_WRITE_BEHIND_BATCH_SIZE and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+            session_ids = list(self._pending)[: higgs_config.SESSION_WRITE_BEHIND_BATCH_SIZE]
+            batch = [self._pending.pop(session_id) for session_id in session_ids]
+            self._inflight.update((pending.session_id, pending) for pending in batch)
+            self._cond.notify_all()
+            return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._take_batch()
+            if not batch:
+                return
+            with self._cond:
+                # 取出之后被删除的会话不再写入
+                for session_id in self._discarded & {pending.session_id for pending in batch}:
+                    self._inflight.pop(session_id, None)
+                    self._discarded.discard(session_id)
+                batch = [pending for pending in batch if pending.session_id in self._inflight]
+            if not batch:
+                continue
+            start = time.perf_counter()
+            try:
+                self._flush(batch)
+            except Exception:
+                logger.warning("Failed to write %d sessions", len(batch), exc_info=True)
+                failed = True
+            else:
+                failed = False
+            elapsed = time.perf_counter() - start
+            with self._cond:
+                discarded = [pending.session_id for pending in batch if pending.session_id in self._discarded]
+                for pending in batch:
+                    self._inflight.pop(pending.session_id, None)
+                    self._discarded.discard(pending.session_id)
+                if failed:
+                    self.failures += 1
+                    self._requeue([pending for pending in batch if pending.session_id not in discarded])
+                else:
+                    self.batches += 1
+                    self.flushed += len(batch)
+                    self.flush_latency = elapsed if self.batches == 1 else self.flush_latency * 0.8 + elapsed * 0.2
+                    self.max_flush_latency = max(self.max_flush_latency, elapsed)
+            if discarded and not failed and self._delete is not None:
+                try:
+                    self._delete(discarded)
+                except Exception:
+                    logger.warning("Failed to delete the discarded sessions %s", discarded, exc_info=True)
+            if failed and not self._closed:
+                time.sleep(RETRY_BACKOFF)
+
+    def _requeue(self, batch: list[PendingSession]) -> None:
+        if self._closed:
+            # 关闭时不再重试，避免进程无法退出
+            self.dropped += len(batch)
+            logger.error("Dropped writes of sessions %s", [pending.session_id for pending in batch])
+            return
+        for pending in batch:
+            newer = self._pending.get(pending.session_id)
+            if newer is None:
+                self._pending[pending.session_id] = pending
+            else:
+                # 保留更新的会话快照，合并两次之间归档的 run
+                newer.archived_runs = {**pending.archived_runs, **newer.archived_runs}
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Flush the pending writes and stop the writer thread."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                logger.error("%d session writes still pending after %ss", len(self._pending), timeout)
+
+    def stats(self) -> dict[str, Any]:
+        now = time.monotonic()
+        with self._cond:
+            oldest = min((pending.enqueued_at for pending in self._pending.values()), default=None)
+            return {
+                "depth": len(self._pending),
+                "inflight": len(self._inflight),
+                "max_depth": self.max_depth,
+                "oldest_pending_ms": round((now - oldest) * 1000, 2) if oldest is not None else None,
+                "enqueued": self.enqueued,
+                "coalesced": self.coalesced,
+                "inline_writes": self.inline_writes,
+                "backpressure_waits": self.backpressure_waits,
+                "flushed": self.flushed,
+                "batches": self.batches,
+                "failures": self.failures,
+                "dropped": self.dropped,
+                "flush_latency_ms": round(self.flush_latency * 1000, 2) if self.batches else None,
+                "max_flush_latency_ms": round(self.max_flush_latency * 1000, 2) if self.batches else None,
+            }
+
+
+def _in_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+_writers: "weakref.WeakSet[SessionWriteBehind]" = weakref.WeakSet()
+
+
+def close_session_writers(timeout: Optional[float] = None) -> None:
+    for writer in list(_writers):
+        writer.close(timeout)
+
+
+def session_writer_stats() -> dict[str, Any]:
+    return {
+        "enabled": higgs_config.SESSION_WRITE_BEHIND_ENABLED,
+        "writers": {writer.name: writer.stats() for writer in list(_writers)},
+    }
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 import time
 from contextlib import asynccontextmanager
@@ -6,6 +7,9 @@ from configs import higgs_config
 from contexts.wrapper import RecyclableContextVar
 from higgs_app import HiggsApp
 
+# 关闭时等待会话写入队列清空的最长时间（秒）
+SESSION_WRITERS_CLOSE_TIMEOUT = 30
+
 
 # ----------------------------
 # Application Factory Function
@@ -20,7 +24,43 @@ def create_fastapi_app_with_configs() -> HiggsApp:
     async def lifespan(app: HiggsApp):
         # add an unique identifier to each request
         RecyclableContextVar.increment_thread_recycles()
+        # 多副本部署时，监听其他节点的写入并失效本地缓存
+        from repositories.invalidation import invalidation_bus
+
+        if higgs_config.CACHE_INVALIDATION_ENABLED:
+            await invalidation_bus.start()
         yield
+        await invalidation_bus.stop()
+        # 取消后台的导入任务，未完成的文件在下次导入时重新处理
+        from rag.ingestion import ingestion_jobs
+
+        await ingestion_jobs.shutdown()
+        # 写入队列中还没保存的会话
+        from agents.session_writer import close_session_writers
+
+        await asyncio.to_thread(close_session_writers, SESSION_WRITERS_CLOSE_TIMEOUT)
+        # 释放异步引擎的连接池
+        from models.engine import async_engine, get_pgvector_engine
+
+        await async_engine.dispose()
+        if get_pgvector_engine.cache_info().currsize:
+            await get_pgvector_engine().dispose()
+
+        from extensions import ext_redis
+
+        await ext_redis.close()
+
+        from extensions.provider_pool import provider_pool
+
+        await provider_pool.aclose()
+
+        from agents.session_history import session_summarizer
+
+        session_summarizer.shutdown()
+
+        from rag.cpu_pool import shutdown_cpu_pool
+
+        shutdown_cpu_pool()
 
     higgs_app = HiggsApp(
         title="Higgs Agents OpenAPI", debug=higgs_config.DEBUG, version=higgs_config.CURRENT_VERSION, lifespan=lifespan
@@ -45,6 +85,8 @@ def initialize_extensions(app: HiggsApp):
         ext_compress,
         ext_exception,
         ext_logging,
+        ext_redis,
+        ext_request_cancellation,
         ext_router,
         ext_timezone,
         ext_warnings,
@@ -55,6 +97,8 @@ def initialize_extensions(app: HiggsApp):
         ext_app_metrics,
         ext_compress,
         ext_exception,
+        ext_redis,
+        ext_request_cancellation,
         ext_router,
         ext_timezone,
         ext_warnings,
@@ -0,0 +1,69 @@
+"""Measure agent acquire latency and allocations: a new agent per request against the registry instance.
+
+``build`` calls the agent factory every time, which is what every run paid before the registry; ``registry``
+is ``agent_registry.get``, what AgentOS uses now. Allocations are the bytes still held after one acquire
+(``tracemalloc``), which is the per-request garbage the old path left for the collector. No database or
+provider call is made, building an agent does not connect.
+
+    python -m benchmarks.agent_registry --requests 2000
+"""
+
+import argparse
+import gc
+import statistics
+import time
+import tracemalloc
+from collections.abc import Callable
+from functools import partial
+
+from agents import BASIC_AGENT_ID, agent_registry
+from agents.basic import build_basic_agent
+
+
+def latency_us(acquire: Callable[[], object], requests: int) -> tuple[float, float]:
+    timings = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        acquire()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return statistics.median(timings) * 1e6, timings[int(len(timings) * 0.99) - 1] * 1e6
+
+
+def allocated_bytes(acquire: Callable[[], object], requests: int) -> tuple[float, int]:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        kept = [acquire() for _ in range(requests)]
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    stats = after.compare_to(before, "filename")
+    total = sum(stat.size_diff for stat in stats)
+    blocks = sum(stat.count_diff for stat in stats)
+    del kept
+    return total / requests, blocks // requests
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--alloc-requests", type=int, default=200, help="requests traced by tracemalloc")
+    args = parser.parse_args()
+
+    # 先构建一次，两条路径都不计入导入和首次构建
+    agent_registry.get(BASIC_AGENT_ID)
+    paths: dict[str, Callable[[], object]] = {
+        "build": build_basic_agent,
+        "registry": partial(agent_registry.get, BASIC_AGENT_ID),
+    }
+    print(f"{'path':<10} {'p50':>10} {'p99':>10} {'bytes/req':>12} {'blocks/req':>11}")
+    for name, acquire in paths.items():
+        p50, p99 = latency_us(acquire, args.requests)
+        size, blocks = allocated_bytes(acquire, args.alloc_requests)
+        print(f"{name:<10} {p50:>8.1f}us {p99:>8.1f}us {size:>12,.0f} {blocks:>11,}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""Drive the AgentOS run endpoint at increasing concurrency and report TTFT, tokens/sec, latency and peak RSS.
+
+By default it starts ``benchmarks.mock_llm_server`` and the api (``uvicorn app:app``) pointed at it, so no
+provider tokens are spent. The api still needs its database, configured as usual through ``.env``.
+
+    python -m benchmarks.agent_throughput --concurrency 1,8,32,64 --requests 200 --workers 2
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Optional
+
+import httpx
+
+API_DIR = Path(__file__).resolve().parent.parent
+
+
+@dataclass
+class RunResult:
+    ok: bool
+    latency: float
+    ttft: Optional[float] = None
+    tokens: int = 0
+    error: Optional[str] = None
+
+
+@dataclass
+class LevelReport:
+    concurrency: int
+    requests: int
+    errors: int
+    duration: float
+    ttft_ms: dict[str, float] = field(default_factory=dict)
+    latency_ms: dict[str, float] = field(default_factory=dict)
+    tokens_per_second: float = 0.0
+    requests_per_second: float = 0.0
+    peak_rss_mb: dict[int, float] = field(default_factory=dict)
+
+
+def _percentiles(values: list[float]) -> dict[str, float]:
+    if not values:
+        return {}
+    ms = sorted(value * 1000 for value in values)
+    if len(ms) == 1:
+        return {"p50": round(ms[0], 1), "p95": round(ms[0], 1), "p99": round(ms[0], 1), "max": round(ms[0], 1)}
+    cuts = statistics.quantiles(ms, n=100, method="inclusive")
+    return {"p50": round(cuts[49], 1), "p95": round(cuts[94], 1), "p99": round(cuts[98], 1), "max": round(ms[-1], 1)}
+
+
+def _children(pid: int) -> list[int]:
+    children = []
+    for entry in Path("/proc").iterdir():
+        if not entry.name.isdigit():
+            continue
+        try:
+            stat = (entry / "stat").read_text()
+        except OSError:
+            continue
+        # comm 可能包含空格，ppid 在最后一个 ")" 之后的第二个字段
+        if int(stat.rpartition(")")[2].split()[1]) == pid:
+            children.append(int(entry.name))
+    return children
+
+
+def peak_rss_mb(pid: int) -> dict[int, float]:
+    """VmHWM (peak resident set size) of the uvicorn worker processes, or of ``pid`` itself without workers."""
+    pids = _children(pid) or [pid]
+    peaks = {}
+    for worker in pids:
+        try:
+            status = Path(f"/proc/{worker}/status").read_text()
+        except OSError:
+            continue
+        for line in status.splitlines():
+            if line.startswith("VmHWM:"):
+                peaks[worker] = round(int(line.split()[1]) / 1024, 1)
+    return peaks
+
+
+async def run_once(client: httpx.AsyncClient, agent_id: str, message: str) -> RunResult:
+    start = time.perf_counter()
+    ttft = None
+    tokens = 0
+    event = None
+    try:
+        async with client.stream(
+            "POST",
+            f"/agents/{agent_id}/runs",
+            data={"message": message, "stream": "true", "session_id": str(uuid.uuid4()), "user_id": "benchmark"},
+        ) as response:
+            if response.status_code != 200:
+                await response.aread()
+                return RunResult(False, time.perf_counter() - start, error=f"HTTP {response.status_code}")
+            async for line in response.aiter_lines():
+                if line.startswith("event:"):
+                    event = line[6:].strip()
+                elif line.startswith("data:") and event == "RunContent":
+                    content = json.loads(line[5:]).get("content")
+                    if content:
+                        tokens += 1
+                        if ttft is None:
+                            ttft = time.perf_counter() - start
+                elif line.startswith("data:") and event == "RunError":
+                    return RunResult(
+                        False, time.perf_counter() - start, ttft, tokens, json.loads(line[5:]).get("content")
+                    )
+    except httpx.HTTPError as e:
+        return RunResult(False, time.perf_counter() - start, ttft, tokens, repr(e))
+    return RunResult(True, time.perf_counter() - start, ttft, tokens)
+
+
+async def run_level(
+    base_url: str, agent_id: str, concurrency: int, requests: int, message: str, timeout: float
+) -> tuple[list[RunResult], float]:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout) as client:
+        queue: asyncio.Queue[int] = asyncio.Queue()
+        for index in range(requests):
+            queue.put_nowait(index)
+        results: list[RunResult] = []
+
+        async def worker():
+            while True:
+                try:
+                    queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                results.append(await run_once(client, agent_id, message))
+
+        start = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+        return results, time.perf_counter() - start
+
+
+def summarize(concurrency: int, results: list[RunResult], duration: float, server_pid: Optional[int]) -> LevelReport:
+    ok = [result for result in results if result.ok]
+    return LevelReport(
+        concurrency=concurrency,
+        requests=len(results),
+        errors=len(results) - len(ok),
+        duration=round(duration, 2),
+        ttft_ms=_percentiles([result.ttft for result in ok if result.ttft is not None]),
+        latency_ms=_percentiles([result.latency for result in ok]),
+        tokens_per_second=round(sum(result.tokens for result in ok) / duration, 1) if duration else 0.0,
+        requests_per_second=round(len(ok) / duration, 2) if duration else 0.0,
+        peak_rss_mb=peak_rss_mb(server_pid) if server_pid else {},
+    )
+
+
+def print_report(report: LevelReport) -> None:
+    def fmt(values: dict[str, float]) -> str:
+        return " / ".join(f"{values.get(key, float('nan')):.0f}" for key in ("p50", "p95", "p99"))
+
+    rss = ", ".join(f"{pid}={mb:.0f}MB" for pid, mb in report.peak_rss_mb.items()) or "-"
+    print(
+        f"c={report.concurrency:<4} n={report.requests:<5} err={report.errors:<4} "
+        f"rps={report.requests_per_second:<7} tok/s={report.tokens_per_second:<8} "
+        f"ttft p50/95/99={fmt(report.ttft_ms)}ms  latency p50/95/99={fmt(report.latency_ms)}ms  peak_rss {rss}",
+        flush=True,
+    )
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port: int = sock.getsockname()[1]
+        return port
+
+
+def _wait_ready(url: str, process: subprocess.Popen, timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{url} exited with code {process.returncode}")
+        try:
+            httpx.get(url, timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not become ready in {timeout}s")
+
+
+def start_mock_server(args: argparse.Namespace) -> subprocess.Popen:
+    command = [
+        sys.executable,
+        "-m",
+        "benchmarks.mock_llm_server",
+        "--port",
+        str(args.mock_port),
+        "--ttft",
+        str(args.ttft),
+        "--tokens-per-second",
+        str(args.tokens_per_second),
+        "--completion-tokens",
+        str(args.completion_tokens),
+        "--error-rate",
+        str(args.error_rate),
+    ]
+    process = subprocess.Popen(command, cwd=API_DIR)
+    _wait_ready(f"http://127.0.0.1:{args.mock_port}/v1/models", process)
+    return process
+
+
+def start_api_server(args: argparse.Namespace) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "AGENT_MODEL_BASE_URL": f"http://127.0.0.1:{args.mock_port}/v1",
+        "DEEPSEEK_API_KEY": os.environ.get("DEEPSEEK_API_KEY", "mock"),
+        "DEBUG": "false",
+    }
+    command = [
+        sys.executable,
+        "-m",
+        "uvicorn",
+        "app:app",
+        "--port",
+        str(args.api_port),
+        "--workers",
+        str(args.workers),
+        "--log-level",
+        "warning",
+    ]
+    process = subprocess.Popen(command, cwd=API_DIR, env=env)
+    _wait_ready(f"http://127.0.0.1:{args.api_port}/health", process)
+    return process
+
+
+def stop(process: Optional[subprocess.Popen]) -> None:
+    if process is None or process.poll() is not None:
+        return
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", default="1,4,16,64", help="comma separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=100, help="requests per concurrency level")
+    parser.add_argument("--agent-id", default="basic-agent")
+    parser.add_argument("--message", default="Tell me the latest news from the Big Apple")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--api-url", help="benchmark a running api instead of starting one")
+    parser.add_argument("--api-port", type=int, default=17777)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--mock-port", type=int, default=18000)
+    parser.add_argument("--ttft", type=float, default=0.2)
+    parser.add_argument("--tokens-per-second", type=float, default=50.0)
+    parser.add_argument("--completion-tokens", type=int, default=64)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--json", dest="json_path", help="also write the reports to this file")
+    args = parser.parse_args()
+
+    mock = api = None
+    try:
+        if args.api_url:
+            base_url, server_pid = args.api_url, None
+        else:
+            mock = start_mock_server(args)
+            api = start_api_server(args)
+            base_url, server_pid = f"http://127.0.0.1:{args.api_port}", api.pid
+
+        reports: list[dict[str, Any]] = []
+        for concurrency in (int(level) for level in args.concurrency.split(",")):
+            results, duration = asyncio.run(
+                run_level(base_url, args.agent_id, concurrency, args.requests, args.message, args.timeout)
+            )
+            report = summarize(concurrency, results, duration, server_pid)
+            print_report(report)
+            reports.append(vars(report))
+
+        if args.json_path:
+            Path(args.json_path).write_text(json.dumps(reports, indent=2))
+    finally:
+        stop(api)
+        stop(mock)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Measure rows/sec of the bulk user writes against one ``create`` per row at several batch sizes.
+
+Batches below BULK_COPY_THRESHOLD go through multi-row INSERT statements, larger ones through COPY into a
+staging table. ``upsert`` writes the same batch again so that every row takes the ON CONFLICT DO UPDATE
+branch. The per-row baseline is capped at ``--per-row-limit`` rows and extrapolated from there. It uses
+the database configured through ``.env`` and removes the users it inserts.
+
+    python -m benchmarks.bulk_insert --batch-sizes 100,10000,1000000
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+
+from sqlmodel import Session
+
+from benchmarks.fixtures import ensure_user_table, remove_users
+from models.engine import async_session_maker, engine
+from models.user import User
+from repositories.bulk import BULK_COPY_THRESHOLD
+from repositories.user_repository import AsyncUserRepository, UserRepository
+from services.user_service import USER_UPSERT_COLUMNS
+
+
+def parse_ints(value: str) -> list[int]:
+    return [int(item) for item in value.split(",") if item]
+
+
+def make_users(prefix: str, count: int) -> list[User]:
+    return [User(username=f"{prefix}-{index}", email=f"{prefix}-{index}@example.com") for index in range(count)]
+
+
+def rate(rows: int, seconds: float) -> str:
+    return f"{rows / seconds:>12,.0f} rows/s"
+
+
+def per_row(prefix: str, count: int) -> float:
+    with Session(engine, expire_on_commit=False) as session:
+        repo = UserRepository(session)
+        start = time.perf_counter()
+        for user in make_users(prefix, count):
+            repo.create(user)
+        return time.perf_counter() - start
+
+
+def sync_bulk(prefix: str, count: int) -> tuple[float, float]:
+    with Session(engine, expire_on_commit=False) as session:
+        repo = UserRepository(session)
+        start = time.perf_counter()
+        repo.bulk_create(make_users(prefix, count))
+        created = time.perf_counter()
+        repo.bulk_upsert(make_users(prefix, count), conflict_columns=["username"], update_columns=USER_UPSERT_COLUMNS)
+        return created - start, time.perf_counter() - created
+
+
+async def async_bulk(prefix: str, count: int) -> tuple[float, float]:
+    async with async_session_maker() as session:
+        repo = AsyncUserRepository(session)
+        start = time.perf_counter()
+        await repo.bulk_create(make_users(prefix, count))
+        created = time.perf_counter()
+        await repo.bulk_upsert(
+            make_users(prefix, count), conflict_columns=["username"], update_columns=USER_UPSERT_COLUMNS
+        )
+        return created - start, time.perf_counter() - created
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-sizes", type=parse_ints, default=parse_ints("100,10000,1000000"))
+    parser.add_argument("--per-row-limit", type=int, default=1000, help="rows written one by one per batch size")
+    args = parser.parse_args()
+
+    ensure_user_table()
+    for count in args.batch_sizes:
+        path = "COPY" if count >= BULK_COPY_THRESHOLD else "INSERT"
+        print(f"batch={count:,} ({path})", flush=True)
+        prefixes = [f"bench-{uuid.uuid4().hex[:8]}" for _ in range(3)]
+        try:
+            sample = min(count, args.per_row_limit)
+            print(f"  create per row      {rate(sample, per_row(prefixes[0], sample))}", flush=True)
+            created, upserted = sync_bulk(prefixes[1], count)
+            print(f"  bulk_create         {rate(count, created)}", flush=True)
+            print(f"  bulk_upsert         {rate(count, upserted)}", flush=True)
+            created, upserted = asyncio.run(async_bulk(prefixes[2], count))
+            print(f"  async bulk_create   {rate(count, created)}", flush=True)
+            print(f"  async bulk_upsert   {rate(count, upserted)}", flush=True)
+        finally:
+            for prefix in prefixes:
+                remove_users(prefix)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""User table rows shared by the database benchmarks, generated inside the database."""
+
+import uuid
+
+from sqlalchemy import inspect, text
+from sqlmodel import Session, col, delete
+
+from models.engine import engine
+from models.search import SEARCH_EXTENSION
+from models.user import User
+
+
+def ensure_user_table() -> None:
+    # 独立运行时可能还没有执行迁移
+    if inspect(engine).has_table(User.__tablename__):
+        return
+    with engine.begin() as conn:
+        conn.execute(text(f"CREATE EXTENSION IF NOT EXISTS {SEARCH_EXTENSION}"))
+    User.metadata.create_all(engine, tables=[User.__table__])  # type: ignore[attr-defined]
+
+
+def seed_users(count: int, batch: int = 100_000) -> str:
+    """Insert ``count`` users named ``<prefix>-<n>`` in batches and return the prefix."""
+    ensure_user_table()
+    prefix = f"bench-{uuid.uuid4().hex[:8]}"
+    for first in range(0, count, batch):
+        with engine.begin() as conn:
+            conn.execute(
+                text(
+                    'INSERT INTO "user" (username, email, full_name, is_active, created_at, updated_at) '
+                    "SELECT :prefix || '-' || i, :prefix || '-' || i || '@example.com', "
+                    "'User ' || md5(i::text), i % 10 <> 0, now() - i * interval '1 second', now() "
+                    "FROM generate_series(CAST(:first AS integer), CAST(:last AS integer)) i"
+                ),
+                {"prefix": prefix, "first": first, "last": min(first + batch, count) - 1},
+            )
+    with engine.begin() as conn:
+        conn.execute(text('ANALYZE "user"'))
+    return prefix
+
+
+def user_ids(prefix: str) -> list[int]:
+    with engine.connect() as conn:
+        return list(
+            conn.execute(text('SELECT id FROM "user" WHERE username LIKE :prefix'), {"prefix": f"{prefix}-%"}).scalars()
+        )
+
+
+def remove_users(prefix: str) -> None:
+    with Session(engine) as session:
+        session.exec(delete(User).where(col(User.username).startswith(f"{prefix}-")))  # type: ignore[call-overload]
+        session.commit()
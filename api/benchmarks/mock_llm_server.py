@@ -0,0 +1,224 @@
+"""OpenAI compatible mock provider for load testing the agents without calling a paid model.
+
+Run it with ``python -m benchmarks.mock_llm_server --port 18000`` and start the api with
+``AGENT_MODEL_BASE_URL=http://127.0.0.1:18000/v1``.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+@dataclass
+class MockLLMSettings:
+    # 首个 token 之前的延迟（秒）
+    ttft: float = 0.2
+    # 每秒输出的 token 数，0 表示不限速
+    tokens_per_second: float = 50.0
+    completion_tokens: int = 64
+    # 随机返回错误的比例（0 - 1）
+    error_rate: float = 0.0
+    error_status: int = 500
+    # 在流式响应中途断开的比例（0 - 1）
+    stream_abort_rate: float = 0.0
+    embedding_dimensions: int = 1024
+    seed: Optional[int] = None
+
+
+WORDS = ["higgs", "agent", "token", "stream", "latency", "mock", "reply", "bench", "server", "model"]
+
+
+class _MockStats:
+    def __init__(self):
+        self.requests = 0
+        self.streams = 0
+        self.errors = 0
+        self.aborts = 0
+        # 客户端在生成结束前断开的请求
+        self.cancelled = 0
+        self.tokens = 0
+
+
+def _error(status: int, message: str) -> JSONResponse:
+    return JSONResponse({"error": {"message": message, "type": "mock_error", "code": status}}, status_code=status)
+
+
+def _prompt_tokens(messages: list[dict[str, Any]]) -> int:
+    return sum(len(str(message.get("content") or "").split()) for message in messages)
+
+
+def create_mock_app(settings: Optional[MockLLMSettings] = None) -> FastAPI:
+    settings = settings or MockLLMSettings()
+    rng = random.Random(settings.seed)  # noqa: S311
+    stats = _MockStats()
+    app = FastAPI(title="Mock LLM provider")
+
+    def tokens() -> list[str]:
+        return [f"{rng.choice(WORDS)} " for _ in range(settings.completion_tokens)]
+
+    def usage(body: dict[str, Any]) -> dict[str, int]:
+        prompt = _prompt_tokens(body.get("messages", []))
+        completion = settings.completion_tokens
+        return {"prompt_tokens": prompt, "completion_tokens": completion, "total_tokens": prompt + completion}
+
+    async def token_interval() -> None:
+        if settings.tokens_per_second > 0:
+            await asyncio.sleep(1 / settings.tokens_per_second)
+
+    @app.get("/v1/models")
+    async def models():
+        return {"object": "list", "data": [{"id": "mock", "object": "model", "created": 0, "owned_by": "mock"}]}
+
+    @app.get("/stats")
+    async def mock_stats():
+        return vars(stats)
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        stats.requests += 1
+        if rng.random() < settings.error_rate:
+            stats.errors += 1
+            return _error(settings.error_status, "Injected mock error")
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+        model = body.get("model", "mock")
+
+        if not body.get("stream"):
+            await asyncio.sleep(settings.ttft)
+            content = tokens()
+            for _ in content:
+                if await request.is_disconnected():
+                    stats.cancelled += 1
+                    return Response(status_code=499)
+                await token_interval()
+            stats.tokens += len(content)
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [
+                    {
+                        "index": 0,
+                        "finish_reason": "stop",
+                        "message": {"role": "assistant", "content": "".join(content)},
+                    }
+                ],
+                "usage": usage(body),
+            }
+
+        stats.streams += 1
+        abort_at = rng.randrange(settings.completion_tokens) if rng.random() < settings.stream_abort_rate else None
+
+        def chunk(delta: dict[str, Any], finish_reason: Optional[str] = None, **extra) -> str:
+            data = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+                **extra,
+            }
+            return f"data: {json.dumps(data)}\n\n"
+
+        async def events():
+            try:
+                await asyncio.sleep(settings.ttft)
+                yield chunk({"role": "assistant", "content": ""})
+                for index, token in enumerate(tokens()):
+                    if index == abort_at:
+                        stats.aborts += 1
+                        raise RuntimeError("Injected mock stream abort")
+                    if index:
+                        await token_interval()
+                    stats.tokens += 1
+                    yield chunk({"content": token})
+            except (asyncio.CancelledError, GeneratorExit):
+                stats.cancelled += 1
+                raise
+            yield chunk({}, finish_reason="stop")
+            if (body.get("stream_options") or {}).get("include_usage"):
+                data = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [],
+                    "usage": usage(body),
+                }
+                yield f"data: {json.dumps(data)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        stats.requests += 1
+        if rng.random() < settings.error_rate:
+            stats.errors += 1
+            return _error(settings.error_status, "Injected mock error")
+        inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        dimensions = body.get("dimensions") or settings.embedding_dimensions
+        data = []
+        for index, text in enumerate(inputs):
+            # 相同的输入得到相同的向量
+            vector_rng = random.Random(hashlib.sha256(str(text).encode()).digest())  # noqa: S311
+            data.append(
+                {
+                    "object": "embedding",
+                    "index": index,
+                    "embedding": [vector_rng.uniform(-1, 1) for _ in range(dimensions)],
+                }
+            )
+        prompt_tokens = sum(len(str(text).split()) for text in inputs)
+        return {
+            "object": "list",
+            "data": data,
+            "model": body.get("model", "mock"),
+            "usage": {"prompt_tokens": prompt_tokens, "total_tokens": prompt_tokens},
+        }
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=18000)
+    parser.add_argument("--ttft", type=float, default=MockLLMSettings.ttft, help="seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=MockLLMSettings.tokens_per_second)
+    parser.add_argument("--completion-tokens", type=int, default=MockLLMSettings.completion_tokens)
+    parser.add_argument("--error-rate", type=float, default=MockLLMSettings.error_rate)
+    parser.add_argument("--error-status", type=int, default=MockLLMSettings.error_status)
+    parser.add_argument("--stream-abort-rate", type=float, default=MockLLMSettings.stream_abort_rate)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    settings = MockLLMSettings(
+        ttft=args.ttft,
+        tokens_per_second=args.tokens_per_second,
+        completion_tokens=args.completion_tokens,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        stream_abort_rate=args.stream_abort_rate,
+        seed=args.seed,
+    )
+    uvicorn.run(create_mock_app(settings), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
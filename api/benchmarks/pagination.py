@@ -0,0 +1,80 @@
+"""Measure the latency of one page of users at increasing depth with offset and keyset pagination.
+
+The offset path is ``UserRepository.get_all(skip=...)``, the keyset path ``UserRepository.get_page`` with
+the cursor of the row just before the page, taken outside the measurement, for ``id`` and ``created_at``
+order. Deep offsets make Postgres read and discard every earlier row, the keyset pages stay flat. It uses
+the database configured through ``.env`` and removes the users it inserts.
+
+    python -m benchmarks.pagination --rows 1000000 --pages 1,100,1000,10000
+"""
+
+import argparse
+import functools
+import statistics
+import time
+
+from sqlalchemy import text
+from sqlmodel import Session
+
+from benchmarks.fixtures import remove_users, seed_users
+from models.engine import engine
+from repositories.pagination import encode_cursor
+from repositories.user_repository import UserRepository
+
+
+def parse_ints(value: str) -> list[int]:
+    return [int(item) for item in value.split(",") if item]
+
+
+def median_ms(function, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def cursor_before(session: Session, order_by: str, skip: int) -> str | None:
+    if not skip:
+        return None
+    columns = "id" if order_by == "id" else f"{order_by}, id"
+    row = session.connection().execute(
+        text(f'SELECT {columns} FROM "user" ORDER BY {columns} OFFSET :skip LIMIT 1'), {"skip": skip - 1}
+    )
+    return encode_cursor(order_by, list(row.one()))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--pages", type=parse_ints, default=parse_ints("1,100,1000,10000"))
+    parser.add_argument("--limit", type=int, default=100, help="rows per page")
+    parser.add_argument("--repeat", type=int, default=5, help="measurements per page, the median is reported")
+    args = parser.parse_args()
+
+    prefix = seed_users(args.rows)
+    try:
+        with Session(engine) as session:
+            repo = UserRepository(session)
+            print(f"{'page':>7} {'offset':>12} {'keyset id':>12} {'keyset created_at':>18}", flush=True)
+            for page in args.pages:
+                skip = (page - 1) * args.limit
+                offset_ms = median_ms(functools.partial(repo.get_all, skip=skip, limit=args.limit), args.repeat)
+                keyset_ms = {}
+                for order_by in ("id", "created_at"):
+                    cursor = cursor_before(session, order_by, skip)
+                    keyset_ms[order_by] = median_ms(
+                        functools.partial(repo.get_page, cursor=cursor, limit=args.limit, order_by=order_by),
+                        args.repeat,
+                    )
+                print(
+                    f"{page:>7} {offset_ms:>10.2f}ms {keyset_ms['id']:>10.2f}ms {keyset_ms['created_at']:>16.2f}ms",
+                    flush=True,
+                )
+    finally:
+        remove_users(prefix)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""Compare requests/sec and latency of a user lookup served through the sync and the async database engine.
+
+Both routes are ``async def`` like the service API: ``/sync`` calls ``UserService`` on the psycopg2 engine,
+so every query blocks the event loop, ``/async`` calls ``AsyncUserService`` on the psycopg3 async engine.
+They are served by one uvicorn worker process and driven by ``--concurrency`` clients. ``--pg-sleep-ms``
+adds a ``pg_sleep`` to each request to stand for a slower query. It uses the database configured through
+``.env`` and removes the users it inserts.
+
+The sync route opens its session inline. Through ``SessionDep`` the session is closed in the threadpool,
+which the blocked event loop cannot schedule, so once more clients than sync pool connections are in
+flight every request waits for the pool timeout and the run measures nothing but that timeout.
+
+    python -m benchmarks.service_api --concurrency 200 --requests 5000 --pg-sleep-ms 5
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+from fastapi import FastAPI, HTTPException
+from sqlalchemy import text
+from sqlmodel import Session
+
+from benchmarks.agent_throughput import API_DIR, _wait_ready, stop
+from benchmarks.fixtures import remove_users, seed_users, user_ids
+from dependencies.services import AsyncUserServiceDep
+from models.engine import engine
+from services.user_service import UserService
+
+PG_SLEEP_ENV = "BENCHMARK_PG_SLEEP_MS"
+
+
+def create_app() -> FastAPI:
+    """App of the benchmark server, ``uvicorn --factory benchmarks.service_api:create_app``."""
+    app = FastAPI()
+    pg_sleep = float(os.environ.get(PG_SLEEP_ENV, "0")) / 1000
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    @app.get("/sync/users/{user_id}")
+    async def get_user_sync(user_id: int):
+        with Session(engine, expire_on_commit=False) as session:
+            if pg_sleep:
+                session.exec(text("SELECT pg_sleep(:seconds)"), params={"seconds": pg_sleep})  # type: ignore[call-overload]
+            user = UserService(session).get_user(user_id)
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        return user
+
+    @app.get("/async/users/{user_id}")
+    async def get_user_async(user_service: AsyncUserServiceDep, user_id: int):
+        if pg_sleep:
+            await user_service.session.exec(text("SELECT pg_sleep(:seconds)"), params={"seconds": pg_sleep})  # type: ignore[call-overload]
+        user = await user_service.get_user(user_id)
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        return user
+
+    return app
+
+
+def start_server(port: int, pg_sleep_ms: float) -> subprocess.Popen:
+    command = [
+        sys.executable,
+        "-m",
+        "uvicorn",
+        "--factory",
+        "benchmarks.service_api:create_app",
+        "--port",
+        str(port),
+        "--log-level",
+        "warning",
+        "--no-access-log",
+    ]
+    process = subprocess.Popen(command, cwd=API_DIR, env={**os.environ, PG_SLEEP_ENV: str(pg_sleep_ms)})
+    _wait_ready(f"http://127.0.0.1:{port}/health", process)
+    return process
+
+
+async def drive(
+    base_url: str, path: str, ids: list[int], requests: int, concurrency: int
+) -> tuple[float, list[float], int]:
+    latencies: list[float] = []
+    errors = 0
+    rng = random.Random(0)  # noqa: S311
+    remaining = iter(range(requests))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+
+        async def worker() -> None:
+            nonlocal errors
+            for _ in remaining:
+                start = time.perf_counter()
+                try:
+                    response = await client.get(f"{path}/{rng.choice(ids)}")
+                    response.raise_for_status()
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        # 预热连接池
+        await asyncio.gather(*(client.get(f"{path}/{ids[0]}") for _ in range(concurrency)), return_exceptions=True)
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return time.perf_counter() - start, latencies, errors
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--pg-sleep-ms", type=float, default=0.0, help="extra server-side time of each request")
+    parser.add_argument("--port", type=int, default=5011)
+    args = parser.parse_args()
+
+    prefix = seed_users(args.users)
+    ids = user_ids(prefix)
+    server = None
+    try:
+        server = start_server(args.port, args.pg_sleep_ms)
+        for name in ("sync", "async"):
+            duration, latencies, errors = asyncio.run(
+                drive(f"http://127.0.0.1:{args.port}", f"/{name}/users", ids, args.requests, args.concurrency)
+            )
+            cuts = statistics.quantiles([latency * 1000 for latency in latencies], n=100, method="inclusive")
+            print(
+                f"{name:<6} concurrency={args.concurrency} requests={len(latencies)} errors={errors} "
+                f"rps={len(latencies) / duration:8.1f}  p50={cuts[49]:7.1f}ms  p99={cuts[98]:7.1f}ms",
+                flush=True,
+            )
+    finally:
+        stop(server)
+        remove_users(prefix)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""Measure per-turn session load and save time of a long conversation with and without the history window.
+
+Every turn loads the agent session, appends one run and saves it, like an agent run does. The plain
+``PostgresDb`` rewrites the whole conversation each turn while ``BoundedPostgresDb`` keeps the window.
+With the write-behind queue (SESSION_WRITE_BEHIND_ENABLED) the save time is the enqueue time, the
+flush latency of the background writer is reported separately. The last store also reads through the
+in-process session cache, ``db_reads`` counts the SELECT statements of a load. It uses the database
+configured through ``.env``, summaries are not computed.
+
+    python -m benchmarks.session_history --turns 500 --report-every 100
+"""
+
+import argparse
+import statistics
+import time
+import uuid
+
+from agno.db.base import SessionType
+from agno.db.postgres import PostgresDb
+from agno.models.message import Message
+from agno.run.agent import RunOutput
+from agno.run.base import RunStatus
+from agno.session import AgentSession
+from sqlalchemy import event
+
+from agents.session_history import BoundedPostgresDb, HistoryWindow
+from configs import higgs_config
+from models.agent_session import AgentSessionRun, AgentSessionSummary
+from models.engine import engine
+
+SESSION_TABLE = "benchmark_sessions"
+AGENT_ID = "benchmark-agent"
+
+
+def make_run(session_id: str, turn: int, words: int) -> RunOutput:
+    text = " ".join(f"word{turn}-{index}" for index in range(words))
+    return RunOutput(
+        run_id=str(uuid.uuid4()),
+        agent_id=AGENT_ID,
+        session_id=session_id,
+        content=text,
+        status=RunStatus.completed,
+        messages=[
+            Message(role="user", content=f"Question {turn}: {text}"),
+            Message(role="assistant", content=f"Answer {turn}: {text}"),
+        ],
+        created_at=int(time.time()),
+    )
+
+
+_statements = {"select": 0}
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _count_selects(conn, cursor, statement, parameters, context, executemany):
+    if statement.lstrip().upper().startswith("SELECT"):
+        _statements["select"] += 1
+
+
+def run_conversation(
+    db: PostgresDb, turns: int, words: int, report_every: int, think_time: float
+) -> list[tuple[int, float, float, float, int]]:
+    session_id = str(uuid.uuid4())
+    db.upsert_session(
+        AgentSession(
+            session_id=session_id, agent_id=AGENT_ID, user_id="benchmark", runs=[], created_at=int(time.time())
+        )
+    )
+    loads: list[float] = []
+    saves: list[float] = []
+    reads: list[int] = []
+    reports = []
+    try:
+        for turn in range(1, turns + 1):
+            # 两轮对话之间的间隔，真实会话中写入队列在下一轮之前已经写入数据库
+            time.sleep(think_time)
+            selects = _statements["select"]
+            start = time.perf_counter()
+            session = db.get_session(session_id, SessionType.AGENT)
+            assert isinstance(session, AgentSession)
+            loaded = time.perf_counter()
+            reads.append(_statements["select"] - selects)
+            session.runs = [*(session.runs or []), make_run(session_id, turn, words)]
+            db.upsert_session(session)
+            saved = time.perf_counter()
+            loads.append(loaded - start)
+            saves.append(saved - loaded)
+            if turn % report_every == 0:
+                window = slice(-min(report_every, 20), None)
+                reports.append(
+                    (
+                        turn,
+                        statistics.median(loads[window]) * 1000,
+                        statistics.median(saves[window]) * 1000,
+                        statistics.mean(reads[-report_every:]),
+                        len(session.runs),
+                    )
+                )
+    finally:
+        db.delete_session(session_id)
+    return reports
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=500)
+    parser.add_argument("--words", type=int, default=150, help="words per user message and per answer")
+    parser.add_argument("--report-every", type=int, default=100)
+    parser.add_argument("--max-runs", type=int, default=20, help="history window of the bounded store")
+    parser.add_argument("--think-time", type=float, default=0.1, help="seconds between two turns, not measured")
+    args = parser.parse_args()
+
+    # 独立运行时可能还没有执行迁移
+    AgentSessionRun.metadata.create_all(
+        engine,
+        tables=[AgentSessionRun.__table__, AgentSessionSummary.__table__],  # type: ignore[attr-defined]
+    )
+
+    window = HistoryWindow(max_runs=args.max_runs)
+    stores = {
+        "PostgresDb": (PostgresDb(db_engine=engine, session_table=SESSION_TABLE), False),
+        "BoundedPostgresDb": (BoundedPostgresDb(db_engine=engine, session_table=SESSION_TABLE, window=window), False),
+        "BoundedPostgresDb + SessionCache": (
+            BoundedPostgresDb(db_engine=engine, session_table=SESSION_TABLE, window=window),
+            True,
+        ),
+    }
+    for name, (db, cached) in stores.items():
+        higgs_config.SESSION_CACHE_ENABLED = cached
+        print(f"{name}: median of the last 20 turns", flush=True)
+        reports = run_conversation(db, args.turns, args.words, args.report_every, args.think_time)
+        for turn, load_ms, save_ms, db_reads, runs in reports:
+            print(
+                f"  turn={turn:<5} load={load_ms:7.1f}ms  save={save_ms:7.1f}ms  "
+                f"db_reads/turn={db_reads:.2f}  runs_in_session={runs}",
+                flush=True,
+            )
+        if isinstance(db, BoundedPostgresDb):
+            db.writer.close()
+            stats = db.writer.stats()
+            print(
+                f"  write-behind: {stats['flushed']} sessions in {stats['batches']} batches, "
+                f"{stats['coalesced']} writes coalesced, flush latency {stats['flush_latency_ms']}ms "
+                f"(max {stats['max_flush_latency_ms']}ms)",
+                flush=True,
+            )
+
+
+if __name__ == "__main__":
+    main()
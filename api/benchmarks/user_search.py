@@ -0,0 +1,81 @@
+"""Measure user search latency with and without the GIN search indexes and show the plan Postgres picks.
+
+Runs the statement of ``UserRepository.search_by_name`` for random fragments of the seeded full names
+(``User <md5>``) and usernames, once as planned and once with index and bitmap scans disabled, which is
+the sequential scan the former ``LIKE '%q%'`` query always took. The indexes scanned in the plan are
+listed from ``EXPLAIN (FORMAT JSON)``. The database needs the pg_trgm (or, with PGVECTOR_PG_BIGM,
+pg_bigm) extension. It uses the database configured through ``.env`` and removes the users it inserts.
+
+    python -m benchmarks.user_search --rows 1000000 --queries 20
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+from sqlalchemy import text
+from sqlmodel import Session
+
+from benchmarks.fixtures import remove_users, seed_users
+from models.engine import engine
+from models.user import User
+from repositories.search import build_search_statement
+
+
+def plan_indexes(plan: dict) -> set[str]:
+    names = {plan["Index Name"]} if "Index Name" in plan else set()
+    for child in plan.get("Plans", []):
+        names |= plan_indexes(child)
+    return names
+
+
+def run_query(session: Session, query: str, limit: int, repeat: int) -> tuple[float, set[str]]:
+    statement = build_search_statement(User, [User.username, User.full_name], query, limit=limit)
+    compiled = str(statement.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        session.exec(statement).all()
+        timings.append(time.perf_counter() - start)
+    explain = session.connection().execute(text(f"EXPLAIN (FORMAT JSON) {compiled}")).scalar_one()
+    return statistics.median(timings) * 1000, plan_indexes(explain[0]["Plan"])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per query, the median is reported")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)  # noqa: S311
+    prefix = seed_users(args.rows)
+    queries = [f"{rng.getrandbits(16):04x}" for _ in range(args.queries // 2)]
+    queries += [f"{prefix}-{rng.randrange(args.rows)}" for _ in range(args.queries - len(queries))]
+    try:
+        with Session(engine) as session:
+            indexed = [run_query(session, query, args.limit, args.repeat) for query in queries]
+            # 关闭索引扫描，得到原先 LIKE '%q%' 的全表扫描
+            session.connection().execute(text("SET enable_bitmapscan = off"))
+            session.connection().execute(text("SET enable_indexscan = off"))
+            scanned = [run_query(session, query, args.limit, args.repeat) for query in queries]
+        for query, (indexed_ms, indexes), (scan_ms, _) in zip(queries, indexed, scanned):
+            print(
+                f"{query:<24} indexed={indexed_ms:9.2f}ms  seq_scan={scan_ms:9.2f}ms  "
+                f"indexes={','.join(sorted(indexes)) or '-'}",
+                flush=True,
+            )
+        print(
+            f"median over {len(queries)} queries: indexed={statistics.median(ms for ms, _ in indexed):.2f}ms "
+            f"seq_scan={statistics.median(ms for ms, _ in scanned):.2f}ms",
+            flush=True,
+        )
+    finally:
+        remove_users(prefix)
+
+
+if __name__ == "__main__":
+    main()
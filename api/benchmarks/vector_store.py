@@ -0,0 +1,143 @@
+"""Measure recall@k against latency of the pgvector store on a synthetic clustered corpus.
+
+The corpus is generated inside the database (``clusters`` random centers plus uniform noise) so that
+loading 1M vectors does not go through the client. Each query is compared with the exact top-k of a
+full scan, for HNSW at several ``ef_search`` and IVFFlat at several ``probes``. It uses the pgvector
+database configured through the PGVECTOR_* settings.
+
+    python -m benchmarks.vector_store --rows 1000000 --dimensions 128 --queries 100
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from sqlalchemy import text
+
+from models.engine import get_pgvector_engine
+from rag.vector_store.pgvector import IndexType, PGVectorStore
+
+COLLECTION = "benchmark"
+CENTERS_TABLE = "vector_benchmark_centers"
+
+
+def parse_ints(value: str) -> list[int]:
+    return [int(item) for item in value.split(",") if item]
+
+
+async def load_corpus(store: PGVectorStore, rows: int, clusters: int, noise: float, batch: int, rng: random.Random):
+    centers = [[rng.uniform(-1, 1) for _ in range(store.dimensions)] for _ in range(clusters)]
+    await store.drop_collection()
+    await store.create_collection()
+    engine = get_pgvector_engine()
+    async with engine.begin() as conn:
+        await conn.execute(text(f"DROP TABLE IF EXISTS {CENTERS_TABLE}"))
+        await conn.execute(text(f"CREATE TABLE {CENTERS_TABLE} (id INTEGER PRIMARY KEY, center FLOAT8[] NOT NULL)"))
+        await conn.execute(
+            text(f"INSERT INTO {CENTERS_TABLE} (id, center) VALUES (:id, :center)"),
+            [{"id": index, "center": center} for index, center in enumerate(centers)],
+        )
+    start = time.perf_counter()
+    for first in range(0, rows, batch):
+        async with engine.begin() as conn:
+            await conn.execute(
+                text(
+                    f"INSERT INTO {store.table} (id, metadata, embedding) "
+                    "SELECT i::text, jsonb_build_object('cluster', c.id), "
+                    "(SELECT array_agg(c.center[j] + (random() - 0.5) * :noise ORDER BY j) "
+                    " FROM generate_series(1, CAST(:dimensions AS integer)) j)::vector "
+                    f"FROM generate_series(CAST(:first AS integer), CAST(:last AS integer)) i "
+                    f"JOIN {CENTERS_TABLE} c ON c.id = i % CAST(:clusters AS integer)"
+                ),
+                {
+                    "noise": noise,
+                    "dimensions": store.dimensions,
+                    "first": first,
+                    "last": min(first + batch, rows) - 1,
+                    "clusters": clusters,
+                },
+            )
+        print(f"  loaded {min(first + batch, rows)}/{rows} vectors", flush=True)
+    async with engine.begin() as conn:
+        await conn.execute(text(f"DROP TABLE {CENTERS_TABLE}"))
+        await conn.execute(text(f"ANALYZE {store.table}"))
+    print(f"load: {rows / (time.perf_counter() - start):.0f} vectors/s", flush=True)
+    return centers
+
+
+async def measure(store: PGVectorStore, queries, truth, top_k: int, **options) -> tuple[float, float, float]:
+    latencies = []
+    recalls = []
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        results = await store.search(query, top_k=top_k, **options)
+        latencies.append(time.perf_counter() - start)
+        recalls.append(len({result.id for result in results} & expected) / top_k)
+    latencies.sort()
+    return (
+        statistics.mean(recalls),
+        statistics.median(latencies) * 1000,
+        latencies[int(len(latencies) * 0.95) - 1] * 1000,
+    )
+
+
+async def run(args) -> None:
+    rng = random.Random(args.seed)  # noqa: S311
+    # ivfflat 的集合创建时不建索引，数据写入后再由 create_index 建索引
+    store = PGVectorStore(COLLECTION, args.dimensions, index_type="ivfflat")
+    if args.reuse and await store.count() == args.rows:
+        centers = [[rng.uniform(-1, 1) for _ in range(args.dimensions)] for _ in range(args.clusters)]
+    else:
+        centers = await load_corpus(store, args.rows, args.clusters, args.noise, args.load_batch, rng)
+
+    queries = [
+        [value + rng.uniform(-0.5, 0.5) * args.noise for value in rng.choice(centers)] for _ in range(args.queries)
+    ]
+    start = time.perf_counter()
+    truth = [{result.id for result in await store.search(query, args.top_k, exact=True)} for query in queries]
+    print(f"exact search: {(time.perf_counter() - start) / len(queries) * 1000:.1f}ms/query", flush=True)
+
+    searches: list[tuple[IndexType, str, list[int]]] = [
+        ("hnsw", "ef_search", args.ef_search),
+        ("ivfflat", "probes", args.probes),
+    ]
+    for index_type, knob, values in searches:
+        if index_type not in args.index:
+            continue
+        start = time.perf_counter()
+        await store.create_index(index_type)
+        print(f"{index_type}: index built in {time.perf_counter() - start:.1f}s", flush=True)
+        for value in values:
+            recall, p50, p95 = await measure(store, queries, truth, args.top_k, **{knob: value})
+            print(
+                f"  {knob}={value:<5} recall@{args.top_k}={recall:.4f}  p50={p50:7.2f}ms  p95={p95:7.2f}ms",
+                flush=True,
+            )
+
+    if not args.keep:
+        await store.drop_collection()
+    await get_pgvector_engine().dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--dimensions", type=int, default=128)
+    parser.add_argument("--clusters", type=int, default=1000)
+    parser.add_argument("--noise", type=float, default=0.5, help="width of the uniform noise around a center")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--index", default="hnsw,ivfflat", help="index types to measure")
+    parser.add_argument("--ef-search", type=parse_ints, default=[10, 20, 40, 80, 160, 320])
+    parser.add_argument("--probes", type=parse_ints, default=[1, 2, 5, 10, 20, 50])
+    parser.add_argument("--load-batch", type=int, default=50_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--reuse", action="store_true", help="reuse a corpus of the same size left by --keep")
+    parser.add_argument("--keep", action="store_true", help="keep the corpus for a later --reuse")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,8 @@ from typing import Annotated, Literal, Optional
 from pydantic import (
     AliasChoices,
     Field,
+    NonNegativeFloat,
+    NonNegativeInt,
     PositiveFloat,
     PositiveInt,
     computed_field,
@@ -188,9 +190,364 @@ class LoggingConfig(BaseSettings):
     )
 
 
+class AgentConfig(BaseSettings):
+    """
+    Configuration settings for the agents
+    """
+
+    AGENT_MODEL_BASE_URL: str = Field(
+        description="Base url of the OpenAI compatible provider serving the agent models,"
+        " point it at benchmarks.mock_llm_server for load tests",
+        default="https://api.siliconflow.cn/v1",
+    )
+
+
+class ModelHedgingConfig(BaseSettings):
+    """
+    Configuration settings for hedged and fallback model calls
+    """
+
+    MODEL_HEDGING_ENABLED: bool = Field(
+        description="Send a second request when a model call has not produced its first token after MODEL_HEDGE_DELAY",
+        default=False,
+    )
+
+    MODEL_HEDGE_DELAY: PositiveFloat = Field(
+        description="Time in seconds without a first token after which a hedged request is fired",
+        default=2.0,
+    )
+
+    MODEL_MAX_HEDGES: PositiveInt = Field(
+        description="Maximum number of hedged requests fired for one model call",
+        default=1,
+    )
+
+    MODEL_FAILOVER_COOLDOWN: PositiveFloat = Field(
+        description="Time in seconds a failed model backend is ranked after the healthy ones",
+        default=30.0,
+    )
+
+
+class ProviderAdmissionConfig(BaseSettings):
+    """
+    Configuration settings for the admission control of LLM provider calls
+    """
+
+    PROVIDER_ADMISSION_ENABLED: bool = Field(
+        description="Queue and rate limit model calls per provider before they are sent",
+        default=False,
+    )
+
+    PROVIDER_ADMISSION_REDIS_ENABLED: bool = Field(
+        description="Share the concurrency and rate budgets of each provider across workers through Redis",
+        default=False,
+    )
+
+    PROVIDER_MAX_CONCURRENCY: PositiveInt = Field(
+        description="Maximum number of in-flight calls to each provider",
+        default=32,
+    )
+
+    PROVIDER_REQUESTS_PER_MINUTE: NonNegativeInt = Field(
+        description="Requests per minute budget of each provider, 0 for unlimited",
+        default=0,
+    )
+
+    PROVIDER_TOKENS_PER_MINUTE: NonNegativeInt = Field(
+        description="Tokens per minute budget of each provider, 0 for unlimited",
+        default=0,
+    )
+
+    PROVIDER_ADMISSION_QUEUE_SIZE: PositiveInt = Field(
+        description="Maximum number of calls waiting for admission per provider, further calls are shed",
+        default=1000,
+    )
+
+    PROVIDER_ADMISSION_INTERACTIVE_TIMEOUT: PositiveFloat = Field(
+        description="Time in seconds an interactive call may wait for admission before it is shed",
+        default=10.0,
+    )
+
+    PROVIDER_ADMISSION_BATCH_TIMEOUT: PositiveFloat = Field(
+        description="Time in seconds a batch call may wait for admission before it is shed",
+        default=300.0,
+    )
+
+    PROVIDER_ADMISSION_THROTTLE_BACKOFF: PositiveFloat = Field(
+        description="Time in seconds new calls to a provider are held back after it answered 429",
+        default=5.0,
+    )
+
+    PROVIDER_ADMISSION_LEASE_TTL: PositiveInt = Field(
+        description="Time in seconds after which a concurrency slot held in Redis by a dead worker is reclaimed",
+        default=600,
+    )
+
+    PROVIDER_ADMISSION_POLL_INTERVAL: PositiveFloat = Field(
+        description="Time in seconds between two admission attempts while the shared budget is exhausted",
+        default=0.05,
+    )
+
+
+class ProviderPoolConfig(BaseSettings):
+    """
+    Configuration settings for the shared outbound connection pool of LLM provider clients
+    """
+
+    PROVIDER_HTTP2_ENABLED: bool = Field(
+        description="Negotiate HTTP/2 with providers that support it, so concurrent calls share one connection",
+        default=True,
+    )
+
+    PROVIDER_MAX_CONNECTIONS: PositiveInt = Field(
+        description="Maximum number of concurrent connections to each provider base url",
+        default=100,
+    )
+
+    PROVIDER_MAX_KEEPALIVE_CONNECTIONS: PositiveInt = Field(
+        description="Maximum number of idle keep-alive connections kept open to each provider base url",
+        default=20,
+    )
+
+    PROVIDER_KEEPALIVE_EXPIRY: PositiveFloat = Field(
+        description="Time in seconds an idle provider connection is kept open",
+        default=60.0,
+    )
+
+    PROVIDER_DNS_CACHE_TTL: PositiveInt = Field(
+        description="Time in seconds provider host names are cached after resolution",
+        default=300,
+    )
+
+
+class SessionHistoryConfig(BaseSettings):
+    """
+    Configuration settings for the bounded history and rolling summaries of agent sessions
+    """
+
+    SESSION_HISTORY_MAX_RUNS: PositiveInt = Field(
+        description="Number of most recent runs kept in a session row and sent as history, older runs are archived",
+        default=20,
+    )
+
+    SESSION_HISTORY_MAX_TOKENS: NonNegativeInt = Field(
+        description="Token budget of the runs kept in a session row, 0 to bound by SESSION_HISTORY_MAX_RUNS only",
+        default=0,
+    )
+
+    SESSION_SUMMARY_ENABLED: bool = Field(
+        description="Fold archived runs into a rolling session summary in the background",
+        default=True,
+    )
+
+    SESSION_SUMMARY_BATCH_RUNS: PositiveInt = Field(
+        description="Maximum number of archived runs folded into the summary by one model call",
+        default=20,
+    )
+
+    SESSION_SUMMARY_WORKERS: PositiveInt = Field(
+        description="Number of background threads computing session summaries",
+        default=2,
+    )
+
+
+class SessionWriteBehindConfig(BaseSettings):
+    """
+    Configuration settings for the write-behind queue of agent session writes
+    """
+
+    SESSION_WRITE_BEHIND_ENABLED: bool = Field(
+        description="Save agent sessions from a background thread in batched transactions instead of inline",
+        default=True,
+    )
+
+    SESSION_WRITE_BEHIND_MAX_PENDING: PositiveInt = Field(
+        description="Maximum number of sessions waiting to be saved, further writes wait for a flush",
+        default=1000,
+    )
+
+    SESSION_WRITE_BEHIND_BATCH_SIZE: PositiveInt = Field(
+        description="Maximum number of sessions saved by one transaction",
+        default=100,
+    )
+
+    SESSION_WRITE_BEHIND_FLUSH_INTERVAL: PositiveFloat = Field(
+        description="Time in seconds the writer waits to collect more session writes before a flush",
+        default=0.05,
+    )
+
+    SESSION_WRITE_BEHIND_ENQUEUE_TIMEOUT: PositiveFloat = Field(
+        description="Time in seconds a write waits for room in a full queue before saving the session inline",
+        default=5.0,
+    )
+
+
+class RequestDeadlineConfig(BaseSettings):
+    """
+    Configuration settings for the cancellation of requests on client disconnect or deadline
+    """
+
+    REQUEST_CANCELLATION_ENABLED: bool = Field(
+        description="Cancel the handling of a request, model calls and queries included, when the client disconnects",
+        default=True,
+    )
+
+    REQUEST_DEADLINE: NonNegativeFloat = Field(
+        description="Time in seconds after which a request is cancelled, 0 for no deadline",
+        default=60.0,
+    )
+
+    REQUEST_DEADLINES: dict[str, NonNegativeFloat] = Field(
+        description="Deadlines of the routes matching these path patterns (fnmatch), the longest pattern wins",
+        default_factory=lambda: {
+            "/agents/*/runs*": 300.0,
+            "/teams/*/runs*": 300.0,
+            "/workflows/*/runs*": 600.0,
+            # 流式导出和批量写入的时长随数据量增长，不设截止时间
+            "/v1/demo/users/export": 0.0,
+            "/v1/demo/*/batch": 0.0,
+        },
+    )
+
+    REQUEST_DEADLINE_STATEMENT_TIMEOUT: bool = Field(
+        description="Bound the statement_timeout of the database sessions of a request by its remaining time",
+        default=True,
+    )
+
+
+class RetrievalConfig(BaseSettings):
+    """
+    Configuration settings for the retrieval of knowledge documents
+    """
+
+    RETRIEVAL_EMBEDDING_PROVIDER: Literal["openai", "hashing"] = Field(
+        description="Provider of the embeddings: an OpenAI compatible API, or a deterministic local feature"
+        " hashing stand-in for development and benchmarks",
+        default="openai",
+    )
+
+    RETRIEVAL_EMBEDDING_MODEL: str = Field(
+        description="OpenAI compatible embedding model of the knowledge collections",
+        default="BAAI/bge-m3",
+    )
+
+    RETRIEVAL_EMBEDDING_BASE_URL: str = Field(
+        description="Base url of the embedding provider",
+        default="https://api.siliconflow.cn/v1",
+    )
+
+    RETRIEVAL_EMBEDDING_API_KEY: Optional[str] = Field(
+        description="API key of the embedding provider, defaults to the OPENAI_API_KEY environment variable",
+        default=None,
+    )
+
+    RETRIEVAL_EMBEDDING_DIMENSIONS: PositiveInt = Field(
+        description="Dimensions of the embedding model output",
+        default=1024,
+    )
+
+    RETRIEVAL_TOP_K: PositiveInt = Field(
+        description="Number of documents returned by a retrieval",
+        default=4,
+    )
+
+    RETRIEVAL_CANDIDATES: PositiveInt = Field(
+        description="Number of candidates taken from the vector and the keyword search before fusing them,"
+        " at least top_k",
+        default=20,
+    )
+
+    RETRIEVAL_FUSION: Literal["rrf", "weighted"] = Field(
+        description="Fusion of the vector and keyword results: reciprocal rank fusion, or a weighted sum of the"
+        " min-max normalized scores",
+        default="rrf",
+    )
+
+    RETRIEVAL_RRF_K: PositiveInt = Field(
+        description="Rank constant of the reciprocal rank fusion, higher values flatten the weight of the top ranks",
+        default=60,
+    )
+
+    RETRIEVAL_VECTOR_WEIGHT: float = Field(
+        description="Weight of the vector search in the fusion, the keyword search gets the rest",
+        default=0.5,
+        ge=0,
+        le=1,
+    )
+
+    RETRIEVAL_SOURCE_TIMEOUT: PositiveFloat = Field(
+        description="Time in seconds a collection has to answer a multi-collection retrieval, the retrieval"
+        " returns without the collections that did not answer in time",
+        default=2.0,
+    )
+
+    RETRIEVAL_MMR_ENABLED: bool = Field(
+        description="Diversify the results of a multi-collection retrieval with maximal marginal relevance",
+        default=False,
+    )
+
+    RETRIEVAL_MMR_LAMBDA: float = Field(
+        description="Weight of the relevance against the novelty in maximal marginal relevance",
+        default=0.7,
+        ge=0,
+        le=1,
+    )
+
+
+class IngestionConfig(BaseSettings):
+    """
+    Configuration settings for the ingestion of knowledge documents
+    """
+
+    INGESTION_CHUNK_SIZE: PositiveInt = Field(
+        description="Maximum number of characters of a chunk",
+        default=1000,
+    )
+
+    INGESTION_CHUNK_OVERLAP: NonNegativeInt = Field(
+        description="Number of characters a chunk repeats from the end of the previous one",
+        default=100,
+    )
+
+    INGESTION_EMBEDDING_BATCH_SIZE: PositiveInt = Field(
+        description="Maximum number of chunks embedded in one request",
+        default=64,
+    )
+
+    INGESTION_EMBEDDING_BATCH_TOKENS: PositiveInt = Field(
+        description="Maximum estimated number of tokens embedded in one request, a batch is closed when either"
+        " limit is reached and split again when the provider rejects it as too large",
+        default=8192,
+    )
+
+    INGESTION_EMBEDDING_CONCURRENCY: PositiveInt = Field(
+        description="Maximum number of embedding requests in flight during an ingestion",
+        default=4,
+    )
+
+    INGESTION_FILE_CONCURRENCY: PositiveInt = Field(
+        description="Number of files read and parsed at the same time during an ingestion",
+        default=4,
+    )
+
+    INGESTION_MAX_PENDING_CHUNKS: PositiveInt = Field(
+        description="Maximum number of parsed chunks waiting to be embedded, parsing waits when it is reached",
+        default=2048,
+    )
+
+
 class FeatureConfig(
+    AgentConfig,
     HttpConfig,
+    IngestionConfig,
     LoggingConfig,
+    ModelHedgingConfig,
+    ProviderAdmissionConfig,
+    ProviderPoolConfig,
+    RequestDeadlineConfig,
+    RetrievalConfig,
     SecurityConfig,
+    SessionHistoryConfig,
+    SessionWriteBehindConfig,
 ):
     pass
@@ -5,7 +5,12 @@ from urllib.parse import parse_qsl, quote_plus
 from pydantic import Field, NonNegativeFloat, NonNegativeInt, PositiveFloat, PositiveInt, computed_field
 from pydantic_settings import BaseSettings
 
+from .cache.cache_invalidation_config import CacheInvalidationConfig
+from .cache.embedding_cache_config import EmbeddingCacheConfig
+from .cache.entity_cache_config import EntityCacheConfig
+from .cache.llm_response_cache_config import LLMResponseCacheConfig
 from .cache.redis_config import RedisConfig
+from .cache.session_cache_config import SessionCacheConfig
 from .storage.aliyun_oss_storage_config import AliyunOSSStorageConfig
 from .storage.opendal_storage_config import OpenDALStorageConfig
 from .storage.tencent_cos_storage_config import TencentCloudCOSStorageConfig
@@ -59,6 +64,16 @@ class KeywordStoreConfig(BaseSettings):
         default="jieba",
     )
 
+    KEYWORD_BM25_K1: NonNegativeFloat = Field(
+        description="BM25 term frequency saturation of the keyword search",
+        default=1.2,
+    )
+
+    KEYWORD_BM25_B: NonNegativeFloat = Field(
+        description="BM25 document length normalization of the keyword search, between 0 and 1",
+        default=0.75,
+    )
+
 
 class DatabaseConfig(BaseSettings):
     DB_HOST: str = Field(
@@ -101,18 +116,31 @@ class DatabaseConfig(BaseSettings):
         default="postgresql",
     )
 
-    @computed_field
-    def SQLALCHEMY_DATABASE_URI(self) -> str:
+    SQLALCHEMY_ASYNC_DATABASE_URI_SCHEME: str = Field(
+        description="Database URI scheme for the SQLAlchemy async engine, backed by psycopg 3.",
+        default="postgresql+psycopg",
+    )
+
+    def _build_database_uri(self, scheme: str) -> str:
         db_extras = (
             f"{self.DB_EXTRAS}&client_encoding={self.DB_CHARSET}" if self.DB_CHARSET else self.DB_EXTRAS
         ).strip("&")
         db_extras = f"?{db_extras}" if db_extras else ""
         return (
-            f"{self.SQLALCHEMY_DATABASE_URI_SCHEME}://"
+            f"{scheme}://"
             f"{quote_plus(self.DB_USERNAME)}:{quote_plus(self.DB_PASSWORD)}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_DATABASE}"
             f"{db_extras}"
         )
 
+    @computed_field
+    def SQLALCHEMY_DATABASE_URI(self) -> str:
+        return self._build_database_uri(self.SQLALCHEMY_DATABASE_URI_SCHEME)
+
+    @computed_field  # type: ignore[misc]
+    @property
+    def SQLALCHEMY_ASYNC_DATABASE_URI(self) -> str:
+        return self._build_database_uri(self.SQLALCHEMY_ASYNC_DATABASE_URI_SCHEME)
+
     SQLALCHEMY_POOL_SIZE: NonNegativeInt = Field(
         description="Maximum number of database connections in the pool.",
         default=30,
@@ -123,6 +151,16 @@ class DatabaseConfig(BaseSettings):
         default=10,
     )
 
+    SQLALCHEMY_ASYNC_POOL_SIZE: NonNegativeInt = Field(
+        description="Connections of SQLALCHEMY_POOL_SIZE given to the async engine, the sync engine keeps the rest.",
+        default=10,
+    )
+
+    SQLALCHEMY_ASYNC_MAX_OVERFLOW: NonNegativeInt = Field(
+        description="Connections of SQLALCHEMY_MAX_OVERFLOW given to the async engine, the sync engine keeps the rest.",
+        default=5,
+    )
+
     SQLALCHEMY_POOL_RECYCLE: NonNegativeInt = Field(
         description="Number of seconds after which a connection is automatically recycled.",
         default=3600,
@@ -143,9 +181,7 @@ class DatabaseConfig(BaseSettings):
         default=os.cpu_count() or 1,
     )
 
-    @computed_field  # type: ignore[misc]
-    @property
-    def SQLALCHEMY_ENGINE_OPTIONS(self) -> dict[str, Any]:
+    def _engine_options(self, pool_size: int, max_overflow: int) -> dict[str, Any]:
         # Parse DB_EXTRAS for 'options'
         db_extras_dict = dict(parse_qsl(self.DB_EXTRAS))
         options = db_extras_dict.get("options", "")
@@ -160,13 +196,34 @@ class DatabaseConfig(BaseSettings):
         connect_args = {"options": merged_options}
 
         return {
-            "pool_size": self.SQLALCHEMY_POOL_SIZE,
-            "max_overflow": self.SQLALCHEMY_MAX_OVERFLOW,
+            "pool_size": pool_size,
+            "max_overflow": max_overflow,
             "pool_recycle": self.SQLALCHEMY_POOL_RECYCLE,
             "pool_pre_ping": self.SQLALCHEMY_POOL_PRE_PING,
             "connect_args": connect_args,
         }
 
+    # 同步与异步引擎分摊 SQLALCHEMY_POOL_SIZE 和 SQLALCHEMY_MAX_OVERFLOW，每个进程的连接总数不变
+    @property
+    def _async_pool_split(self) -> tuple[int, int]:
+        # pool_size 为 0 时 QueuePool 不限制连接数，两个引擎都至少保留一个连接
+        pool_size = min(self.SQLALCHEMY_ASYNC_POOL_SIZE, max(self.SQLALCHEMY_POOL_SIZE - 1, 1))
+        max_overflow = min(self.SQLALCHEMY_ASYNC_MAX_OVERFLOW, self.SQLALCHEMY_MAX_OVERFLOW)
+        return max(pool_size, 1), max_overflow
+
+    @computed_field  # type: ignore[misc]
+    @property
+    def SQLALCHEMY_ENGINE_OPTIONS(self) -> dict[str, Any]:
+        async_pool_size, async_max_overflow = self._async_pool_split
+        return self._engine_options(
+            max(self.SQLALCHEMY_POOL_SIZE - async_pool_size, 1), self.SQLALCHEMY_MAX_OVERFLOW - async_max_overflow
+        )
+
+    @computed_field  # type: ignore[misc]
+    @property
+    def SQLALCHEMY_ASYNC_ENGINE_OPTIONS(self) -> dict[str, Any]:
+        return self._engine_options(*self._async_pool_split)
+
 
 class DatasetQueueMonitorConfig(BaseSettings):
     """
@@ -189,9 +246,14 @@ class DatasetQueueMonitorConfig(BaseSettings):
 
 class MiddlewareConfig(
     # place the configs in alphabet order
+    CacheInvalidationConfig,
     DatabaseConfig,
+    EmbeddingCacheConfig,
+    EntityCacheConfig,
     KeywordStoreConfig,
+    LLMResponseCacheConfig,
     RedisConfig,
+    SessionCacheConfig,
     # configs of storage and storage providers
     StorageConfig,
     AliyunOSSStorageConfig,
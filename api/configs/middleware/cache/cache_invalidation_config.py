@@ -0,0 +1,36 @@
+from typing import Literal
+
+from pydantic import Field, PositiveFloat, PositiveInt
+from pydantic_settings import BaseSettings
+
+
+class CacheInvalidationConfig(BaseSettings):
+    """
+    Configuration settings for the cross-node cache invalidation bus
+    """
+
+    CACHE_INVALIDATION_ENABLED: bool = Field(
+        description="Broadcast repository writes to the other API replicas so they evict their in-process caches",
+        default=False,
+    )
+
+    CACHE_INVALIDATION_BACKEND: Literal["postgres", "redis"] = Field(
+        description="Transport of invalidation events: Postgres LISTEN/NOTIFY or Redis pub/sub",
+        default="postgres",
+    )
+
+    CACHE_INVALIDATION_CHANNEL: str = Field(
+        description="Name of the NOTIFY / pub/sub channel used for invalidation events",
+        default="higgs_cache_invalidation",
+    )
+
+    CACHE_INVALIDATION_FLUSH_INTERVAL: PositiveFloat = Field(
+        description="Interval in seconds at which pending invalidation events are coalesced and published",
+        default=0.05,
+    )
+
+    CACHE_INVALIDATION_MAX_IDS: PositiveInt = Field(
+        description="Maximum number of ids of one model in a single event,"
+        " above that the receivers evict the whole model instead",
+        default=500,
+    )
@@ -0,0 +1,35 @@
+from typing import Literal
+
+from pydantic import Field, PositiveInt
+from pydantic_settings import BaseSettings
+
+
+class EmbeddingCacheConfig(BaseSettings):
+    """
+    Configuration settings for the content-hash cache of embeddings in front of the embedding providers
+    """
+
+    EMBEDDING_CACHE_ENABLED: bool = Field(
+        description="Reuse the embedding of a text already embedded by the same model instead of calling the provider",
+        default=False,
+    )
+
+    EMBEDDING_CACHE_BACKEND: Literal["postgres", "redis"] = Field(
+        description="Storage of the cached embeddings: a table of the pgvector database, or Redis with a TTL",
+        default="postgres",
+    )
+
+    EMBEDDING_CACHE_COMPRESSION: Literal["none", "zlib"] = Field(
+        description="Compression of the cached float32 vectors, entries written with another setting stay readable",
+        default="none",
+    )
+
+    EMBEDDING_CACHE_REDIS_TTL: PositiveInt = Field(
+        description="Time to live in seconds of the embeddings cached in Redis",
+        default=30 * 24 * 3600,
+    )
+
+    EMBEDDING_CACHE_BATCH_SIZE: PositiveInt = Field(
+        description="Maximum number of keys looked up or written in one query or Redis round trip",
+        default=500,
+    )
@@ -0,0 +1,33 @@
+from pydantic import Field, PositiveInt
+from pydantic_settings import BaseSettings
+
+
+class EntityCacheConfig(BaseSettings):
+    """
+    Configuration settings for the read-through entity cache in front of the repositories
+    """
+
+    ENTITY_CACHE_ENABLED: bool = Field(
+        description="Enable the read-through cache for get_by_id and unique-key lookups",
+        default=False,
+    )
+
+    ENTITY_CACHE_MAX_SIZE: PositiveInt = Field(
+        description="Maximum number of entities kept in the in-process cache of each model",
+        default=10000,
+    )
+
+    ENTITY_CACHE_TTL: PositiveInt = Field(
+        description="Time to live in seconds of entities in the in-process cache",
+        default=60,
+    )
+
+    ENTITY_CACHE_REDIS_ENABLED: bool = Field(
+        description="Use Redis as the second tier of the entity cache",
+        default=False,
+    )
+
+    ENTITY_CACHE_REDIS_TTL: PositiveInt = Field(
+        description="Time to live in seconds of entities in the Redis tier",
+        default=300,
+    )
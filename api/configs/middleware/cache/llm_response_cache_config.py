@@ -0,0 +1,62 @@
+from typing import Literal, Optional
+
+from pydantic import Field, PositiveInt
+from pydantic_settings import BaseSettings
+
+
+class LLMResponseCacheConfig(BaseSettings):
+    """
+    Configuration settings for the exact-match and semantic cache of LLM responses
+    """
+
+    LLM_RESPONSE_CACHE_ENABLED: bool = Field(
+        description="Enable the response cache for the agents that opt in with response_cache_namespace",
+        default=False,
+    )
+
+    LLM_RESPONSE_CACHE_BACKEND: Literal["memory", "redis"] = Field(
+        description="Storage of the exact-match tier: in-process memory or Redis",
+        default="memory",
+    )
+
+    LLM_RESPONSE_CACHE_TTL: PositiveInt = Field(
+        description="Time to live in seconds of cached responses, can be overridden per agent",
+        default=3600,
+    )
+
+    LLM_RESPONSE_CACHE_MAX_SIZE: PositiveInt = Field(
+        description="Maximum number of responses kept by the in-memory exact-match tier",
+        default=1000,
+    )
+
+    LLM_RESPONSE_CACHE_SEMANTIC_ENABLED: bool = Field(
+        description="Look up near-identical prompts in pgvector when the exact-match tier misses",
+        default=False,
+    )
+
+    LLM_RESPONSE_CACHE_SIMILARITY_THRESHOLD: float = Field(
+        description="Minimum cosine similarity between prompts for a semantic cache hit",
+        default=0.95,
+        ge=0.0,
+        le=1.0,
+    )
+
+    LLM_RESPONSE_CACHE_EMBEDDING_MODEL: str = Field(
+        description="OpenAI compatible embedding model used for the semantic tier",
+        default="BAAI/bge-m3",
+    )
+
+    LLM_RESPONSE_CACHE_EMBEDDING_BASE_URL: str = Field(
+        description="Base url of the embedding provider",
+        default="https://api.siliconflow.cn/v1",
+    )
+
+    LLM_RESPONSE_CACHE_EMBEDDING_API_KEY: Optional[str] = Field(
+        description="API key of the embedding provider, defaults to the OPENAI_API_KEY environment variable",
+        default=None,
+    )
+
+    LLM_RESPONSE_CACHE_EMBEDDING_DIMENSIONS: PositiveInt = Field(
+        description="Dimensions of the embedding model output",
+        default=1024,
+    )
@@ -34,6 +34,32 @@ class RedisConfig(BaseSettings):
         default=0,
     )
 
+    REDIS_MAX_CONNECTIONS: PositiveInt = Field(
+        description="Maximum number of connections in the Redis connection pool of each client",
+        default=50,
+    )
+
+    REDIS_SOCKET_TIMEOUT: Optional[PositiveFloat] = Field(
+        description="Socket timeout in seconds for Redis commands",
+        default=5.0,
+    )
+
+    REDIS_SOCKET_CONNECT_TIMEOUT: Optional[PositiveFloat] = Field(
+        description="Socket timeout in seconds for establishing Redis connections",
+        default=2.0,
+    )
+
+    REDIS_HEALTH_CHECK_INTERVAL: NonNegativeInt = Field(
+        description="Interval in seconds at which idle pooled connections are checked with PING before reuse,"
+        " 0 to disable",
+        default=30,
+    )
+
+    REDIS_BATCH_SIZE: PositiveInt = Field(
+        description="Number of keys sent per command by the Redis batching helpers",
+        default=500,
+    )
+
     REDIS_USE_SSL: bool = Field(
         description="Enable SSL/TLS for the Redis connection",
         default=False,
@@ -0,0 +1,33 @@
+from pydantic import Field, PositiveInt
+from pydantic_settings import BaseSettings
+
+
+class SessionCacheConfig(BaseSettings):
+    """
+    Configuration settings for the hot cache of active agent sessions in front of the session table
+    """
+
+    SESSION_CACHE_ENABLED: bool = Field(
+        description="Serve the agent sessions of active conversations from the cache instead of Postgres",
+        default=False,
+    )
+
+    SESSION_CACHE_MAX_SIZE: PositiveInt = Field(
+        description="Maximum number of sessions kept in the in-process cache",
+        default=1000,
+    )
+
+    SESSION_CACHE_TTL: PositiveInt = Field(
+        description="Time to live in seconds of sessions in the in-process cache",
+        default=300,
+    )
+
+    SESSION_CACHE_REDIS_ENABLED: bool = Field(
+        description="Share cached sessions between workers through Redis, in-process entries are validated against it",
+        default=True,
+    )
+
+    SESSION_CACHE_REDIS_TTL: PositiveInt = Field(
+        description="Time to live in seconds of sessions in Redis",
+        default=1800,
+    )
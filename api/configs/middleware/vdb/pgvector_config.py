@@ -1,6 +1,7 @@
-from typing import Optional
+from typing import Literal, Optional
+from urllib.parse import quote_plus
 
-from pydantic import Field, PositiveInt
+from pydantic import Field, NonNegativeInt, PositiveInt, computed_field
 from pydantic_settings import BaseSettings
 
 
@@ -48,3 +49,55 @@ class PGVectorConfig(BaseSettings):
         description="Whether to use pg_bigm module for full text search",
         default=False,
     )
+
+    PGVECTOR_DISTANCE: Literal["cosine", "l2", "inner_product"] = Field(
+        description="Distance of the vector search, 'inner_product' expects normalized embeddings",
+        default="cosine",
+    )
+
+    PGVECTOR_INDEX_TYPE: Literal["hnsw", "ivfflat"] = Field(
+        description="Approximate index of the vector collections, 'ivfflat' builds faster and is smaller,"
+        " 'hnsw' has a better recall at the same latency and can be created before loading the data",
+        default="hnsw",
+    )
+
+    PGVECTOR_HNSW_M: PositiveInt = Field(
+        description="Max connections per layer of the HNSW index",
+        default=16,
+    )
+
+    PGVECTOR_HNSW_EF_CONSTRUCTION: PositiveInt = Field(
+        description="Candidate list size used to build the HNSW index",
+        default=64,
+    )
+
+    PGVECTOR_HNSW_EF_SEARCH: PositiveInt = Field(
+        description="Candidate list size of an HNSW search (hnsw.ef_search), trades latency for recall,"
+        " raised to top_k when lower",
+        default=40,
+    )
+
+    PGVECTOR_IVFFLAT_LISTS: NonNegativeInt = Field(
+        description="Number of lists of the IVFFlat index, 0 to derive it from the row count when the index is built",
+        default=0,
+    )
+
+    PGVECTOR_IVFFLAT_PROBES: PositiveInt = Field(
+        description="Number of lists scanned by an IVFFlat search (ivfflat.probes), trades latency for recall",
+        default=10,
+    )
+
+    PGVECTOR_UPSERT_BATCH_SIZE: PositiveInt = Field(
+        description="Number of vectors written per statement by a batch upsert",
+        default=500,
+    )
+
+    @computed_field  # type: ignore[misc]
+    @property
+    def PGVECTOR_ASYNC_DATABASE_URI(self) -> Optional[str]:
+        if not self.PGVECTOR_HOST:
+            return None
+        return (
+            f"postgresql+psycopg://{quote_plus(self.PGVECTOR_USER or '')}:{quote_plus(self.PGVECTOR_PASSWORD or '')}"
+            f"@{self.PGVECTOR_HOST}:{self.PGVECTOR_PORT}/{self.PGVECTOR_DATABASE}"
+        )
@@ -0,0 +1,14 @@
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+# 当前请求的截止时间（time.monotonic()），由 ext_request_cancellation 设置
+request_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+def remaining_time() -> Optional[float]:
+    """Seconds left before the deadline of the current request, None outside of a request with a deadline."""
+    deadline = request_deadline.get()
+    if deadline is None:
+        return None
+    return max(deadline - time.monotonic(), 0.0)
@@ -1,6 +1,8 @@
 from fastapi import APIRouter
 
 from .demo import router as demo_router
+from .knowledge import router as knowledge_router
 
 service_api_router = APIRouter(prefix="/v1", dependencies=[])
 service_api_router.include_router(demo_router)
+service_api_router.include_router(knowledge_router)
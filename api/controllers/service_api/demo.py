@@ -1,14 +1,22 @@
-from typing import Optional
+from typing import Literal, Optional
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 
 from configs import higgs_config
-from dependencies.services import HeroServiceDep, UserServiceDep
-from models.hero import Hero
+from dependencies.services import AsyncHeroServiceDep, AsyncUserServiceDep
+from models.batch import BatchItemResult
+from models.engine import async_session_maker
+from models.hero import Hero, HeroCreate
 from models.user import UserCreate, UserRead, UserUpdate
+from repositories.pagination import PAGE_DEFAULT_LIMIT, PAGE_MAX_LIMIT
+from repositories.search import SEARCH_DEFAULT_LIMIT, SEARCH_MAX_LIMIT
+from services.user_service import EXPORT_MEDIA_TYPES, AsyncUserService, ExportFormat
 
 router = APIRouter(prefix="/demo", tags=["Demo"])
 
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
 
 @router.get("/index")
 async def index():
@@ -21,59 +29,109 @@ async def index():
 
 # Hero CRUD endpoints
 @router.get("/heroes", response_model=list[Hero])
-async def get_heroes(demo_service: HeroServiceDep, skip: int = 0, limit: int = 100):
-    return demo_service.get_all_heroes(skip=skip, limit=limit)
+async def get_heroes(
+    response: Response,
+    demo_service: AsyncHeroServiceDep,
+    skip: int = Query(default=0, ge=0),
+    limit: int = Query(default=PAGE_DEFAULT_LIMIT, ge=1, le=PAGE_MAX_LIMIT),
+    cursor: Optional[str] = None,
+):
+    # 传入 skip 时保留原有的 offset 分页，否则使用 keyset 分页并通过响应头返回下一页游标
+    if skip and not cursor:
+        return await demo_service.get_all_heroes(skip=skip, limit=limit)
+    heroes, next_cursor = await demo_service.get_heroes_page(cursor=cursor, limit=limit)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return heroes
 
 
 @router.get("/heroes/{hero_id}", response_model=Hero)
-async def get_hero(hero_id: int, demo_service: HeroServiceDep):
-    hero = demo_service.get_hero_by_id(hero_id)
+async def get_hero(hero_id: int, demo_service: AsyncHeroServiceDep):
+    hero = await demo_service.get_hero_by_id(hero_id)
     if not hero:
         raise HTTPException(status_code=404, detail="Hero not found")
     return hero
 
 
 @router.post("/heroes", response_model=Hero)
-async def create_hero(demo_service: HeroServiceDep, name: str, secret_name: str, age: Optional[int] = None):
-    return demo_service.create_hero(name=name, secret_name=secret_name, age=age)
+async def create_hero(demo_service: AsyncHeroServiceDep, name: str, secret_name: str, age: Optional[int] = None):
+    return await demo_service.create_hero(name=name, secret_name=secret_name, age=age)
+
+
+@router.post("/heroes/batch", response_model=list[BatchItemResult])
+async def create_heroes(demo_service: AsyncHeroServiceDep, heroes_data: list[HeroCreate]):
+    return await demo_service.bulk_create_heroes(heroes_data)
 
 
 # User CRUD endpoints
 @router.post("/users", response_model=UserRead)
-async def create_user(user_service: UserServiceDep, user_data: UserCreate):
+async def create_user(user_service: AsyncUserServiceDep, user_data: UserCreate):
     try:
-        return user_service.create_user(user_data)
+        return await user_service.create_user(user_data)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/users/batch", response_model=list[BatchItemResult])
+async def create_users(user_service: AsyncUserServiceDep, users_data: list[UserCreate], upsert: bool = False):
+    try:
+        return await user_service.bulk_create_users(users_data, upsert=upsert)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.get("/users", response_model=list[UserRead])
-async def get_users(user_service: UserServiceDep, skip: int = 0, limit: int = 100, active_only: bool = False):
+async def get_users(
+    user_service: AsyncUserServiceDep,
+    skip: int = Query(default=0, ge=0),
+    limit: int = Query(default=PAGE_DEFAULT_LIMIT, ge=1, le=PAGE_MAX_LIMIT),
+    active_only: bool = False,
+    cursor: Optional[str] = None,
+    order_by: Literal["id", "created_at"] = "id",
+):
     if active_only:
-        return user_service.get_active_users()
-    return user_service.get_all_users(skip=skip, limit=limit)
+        return await user_service.get_active_users()
+    if skip and not cursor:
+        return await user_service.get_all_users(skip=skip, limit=limit)
+    # 直接返回序列化好的 JSON，跳过 ORM 实例化和 response_model 的二次校验
+    content, next_cursor = await user_service.get_users_page_json(cursor=cursor, limit=limit, order_by=order_by)
+    response = Response(content=content, media_type="application/json")
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return response
+
+
+@router.get("/users/export")
+async def export_users(active_only: bool = True, format: ExportFormat = "ndjson"):
+    # 依赖注入的 session 在响应体发送前就会关闭，流式响应需要自己持有 session
+    async def stream():
+        async with async_session_maker() as session:
+            async for chunk in AsyncUserService(session).export_users(active_only=active_only, format=format):
+                yield chunk
+
+    return StreamingResponse(stream(), media_type=EXPORT_MEDIA_TYPES[format])
 
 
 @router.get("/users/{user_id}", response_model=UserRead)
-async def get_user(user_service: UserServiceDep, user_id: int):
-    user = user_service.get_user(user_id)
+async def get_user(user_service: AsyncUserServiceDep, user_id: int):
+    user = await user_service.get_user(user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
 
 
 @router.get("/users/username/{username}", response_model=UserRead)
-async def get_user_by_username(user_service: UserServiceDep, username: str):
-    user = user_service.get_user_by_username(username)
+async def get_user_by_username(user_service: AsyncUserServiceDep, username: str):
+    user = await user_service.get_user_by_username(username)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
 
 
 @router.put("/users/{user_id}", response_model=UserRead)
-async def update_user(user_service: UserServiceDep, user_id: int, user_data: UserUpdate):
+async def update_user(user_service: AsyncUserServiceDep, user_id: int, user_data: UserUpdate):
     try:
-        user = user_service.update_user(user_id, user_data)
+        user = await user_service.update_user(user_id, user_data)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         return user
@@ -82,12 +140,18 @@ async def update_user(user_service: UserServiceDep, user_id: int, user_data: Use
 
 
 @router.delete("/users/{user_id}")
-async def delete_user(user_service: UserServiceDep, user_id: int):
-    if not user_service.delete_user(user_id):
+async def delete_user(user_service: AsyncUserServiceDep, user_id: int):
+    if not await user_service.delete_user(user_id):
         raise HTTPException(status_code=404, detail="User not found")
     return {"message": "User deleted successfully"}
 
 
 @router.get("/users/search/{query}", response_model=list[UserRead])
-async def search_users(user_service: UserServiceDep, query: str):
-    return user_service.search_users(query)
+async def search_users(
+    user_service: AsyncUserServiceDep,
+    query: str,
+    skip: int = Query(default=0, ge=0),
+    limit: int = Query(default=SEARCH_DEFAULT_LIMIT, ge=1, le=SEARCH_MAX_LIMIT),
+):
+    # 按相似度排序返回，3 个字符及以上的查询可以使用 username / full_name 上的 GIN 索引
+    return await user_service.search_users(query, limit=limit, skip=skip)
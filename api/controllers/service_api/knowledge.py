@@ -0,0 +1,39 @@
+from typing import Any
+
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel
+
+from rag.ingestion import IngestionRunningError, ingestion_jobs
+
+router = APIRouter(prefix="/knowledge", tags=["Knowledge"])
+
+
+class IngestionRequest(BaseModel):
+    # 存储中要导入的路径前缀，为空时导入整个存储
+    prefix: str = ""
+    # 重新导入内容没有变化的文件
+    force: bool = False
+
+
+@router.post("/{collection}/ingestions", status_code=202)
+async def start_ingestion(collection: str, request: IngestionRequest) -> dict[str, Any]:
+    try:
+        job = ingestion_jobs.start(collection, request.prefix, request.force)
+    except IngestionRunningError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return job.to_dict()
+
+
+@router.get("/ingestions")
+async def list_ingestions() -> list[dict[str, Any]]:
+    return [job.to_dict() for job in ingestion_jobs.list()]
+
+
+@router.get("/ingestions/{job_id}")
+async def get_ingestion(job_id: str) -> dict[str, Any]:
+    job = ingestion_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Ingestion not found")
+    return job.to_dict()
@@ -2,13 +2,15 @@ from typing import Annotated
 
 from fastapi import Depends
 from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from models.engine import get_session
-from services.hero_service import HeroService
-from services.user_service import UserService
+from models.engine import get_async_session, get_session
+from services.hero_service import AsyncHeroService, HeroService
+from services.user_service import AsyncUserService, UserService
 
 # Module-level dependency annotations
 SessionDep = Annotated[Session, Depends(get_session)]
+AsyncSessionDep = Annotated[AsyncSession, Depends(get_async_session)]
 
 
 def get_hero_service(session: SessionDep) -> HeroService:
@@ -19,5 +21,15 @@ def get_user_service(session: SessionDep) -> UserService:
     return UserService(session)
 
 
+def get_async_hero_service(session: AsyncSessionDep) -> AsyncHeroService:
+    return AsyncHeroService(session)
+
+
+def get_async_user_service(session: AsyncSessionDep) -> AsyncUserService:
+    return AsyncUserService(session)
+
+
 UserServiceDep = Annotated[UserService, Depends(get_user_service)]
 HeroServiceDep = Annotated[HeroService, Depends(get_hero_service)]
+AsyncUserServiceDep = Annotated[AsyncUserService, Depends(get_async_user_service)]
+AsyncHeroServiceDep = Annotated[AsyncHeroService, Depends(get_async_hero_service)]
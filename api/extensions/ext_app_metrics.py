@@ -58,7 +58,7 @@ def init_app(app: HiggsApp):
 
     @app.get("/db-pool-stat")
     async def pool_stat():
-        from models.engine import engine
+        from models.engine import async_engine, engine
 
         return Response(
             json.dumps(
@@ -70,8 +70,146 @@ def init_app(app: HiggsApp):
                     "overflow_connections": engine.pool.overflow(),  # type: ignore
                     "connection_timeout": engine.pool.timeout(),  # type: ignore
                     "recycle_time": engine.pool._recycle,  # type: ignore
+                    "async_pool_size": async_engine.pool.size(),  # type: ignore
+                    "async_checked_out_connections": async_engine.pool.checkedout(),  # type: ignore
+                    "async_overflow_connections": async_engine.pool.overflow(),  # type: ignore
                 }
             ),
             status_code=200,
             media_type="application/json",
         )
+
+    @app.get("/redis-pool-stat")
+    async def redis_pool_stat():
+        from extensions.ext_redis import pool_stats
+
+        return Response(
+            json.dumps({"pid": os.getpid(), **pool_stats()}),
+            status_code=200,
+            media_type="application/json",
+        )
+
+    @app.get("/redis-health")
+    async def redis_health():
+        from redis import RedisError
+
+        from extensions.ext_redis import health_check
+
+        try:
+            latency = await health_check()
+        except RedisError as e:
+            return Response(
+                json.dumps({"pid": os.getpid(), "status": "error", "error": str(e)}),
+                status_code=503,
+                media_type="application/json",
+            )
+        return Response(
+            json.dumps({"pid": os.getpid(), "status": "ok", "latency_ms": latency}),
+            status_code=200,
+            media_type="application/json",
+        )
+
+    @app.get("/cache-stat")
+    async def cache_stat():
+        from agents.embedding_cache import embedding_cache
+        from agents.response_cache import response_cache
+        from agents.session_cache import session_cache_stats
+        from repositories.cache import entity_cache_stats
+        from repositories.invalidation import invalidation_bus
+
+        return Response(
+            json.dumps(
+                {
+                    "pid": os.getpid(),
+                    "enabled": higgs_config.ENTITY_CACHE_ENABLED,
+                    "redis_enabled": higgs_config.ENTITY_CACHE_REDIS_ENABLED,
+                    "entities": entity_cache_stats(),
+                    "invalidation": invalidation_bus.stats(),
+                    "llm_responses": response_cache.stats(),
+                    "agent_sessions": session_cache_stats(),
+                    "embeddings": embedding_cache.stats(),
+                }
+            ),
+            status_code=200,
+            media_type="application/json",
+        )
+
+    @app.get("/agent-stat")
+    async def agent_stat():
+        from agents import agent_registry
+
+        return Response(
+            json.dumps({"pid": os.getpid(), **agent_registry.stats()}),
+            status_code=200,
+            media_type="application/json",
+        )
+
+    @app.get("/provider-pool-stat")
+    async def provider_pool_stat():
+        from extensions.provider_pool import provider_pool
+
+        return Response(
+            json.dumps({"pid": os.getpid(), **provider_pool.stats()}),
+            status_code=200,
+            media_type="application/json",
+        )
+
+    @app.get("/provider-admission-stat")
+    async def provider_admission_stat():
+        from extensions.provider_admission import provider_admission
+
+        return Response(
+            json.dumps({"pid": os.getpid(), **provider_admission.stats()}),
+            status_code=200,
+            media_type="application/json",
+        )
+
+    @app.get("/model-hedging-stat")
+    async def model_hedging_stat():
+        from agents.hedging import model_hedging
+
+        return Response(
+            json.dumps({"pid": os.getpid(), **model_hedging.stats()}),
+            status_code=200,
+            media_type="application/json",
+        )
+
+    @app.get("/session-summary-stat")
+    async def session_summary_stat():
+        from agents.session_history import session_summarizer
+
+        return Response(
+            json.dumps({"pid": os.getpid(), **session_summarizer.stats()}),
+            status_code=200,
+            media_type="application/json",
+        )
+
+    @app.get("/session-writer-stat")
+    async def session_writer_stat():
+        from agents.session_writer import session_writer_stats
+
+        return Response(
+            json.dumps({"pid": os.getpid(), **session_writer_stats()}),
+            status_code=200,
+            media_type="application/json",
+        )
+
+    @app.get("/retrieval-stat")
+    async def retrieval_stat():
+        from rag.executor import retrieval_executor
+
+        return Response(
+            json.dumps({"pid": os.getpid(), **retrieval_executor.stats()}),
+            status_code=200,
+            media_type="application/json",
+        )
+
+    @app.get("/request-cancellation-stat")
+    async def request_cancellation_stat():
+        from extensions.ext_request_cancellation import cancellation_stats
+
+        return Response(
+            json.dumps({"pid": os.getpid(), **cancellation_stats.stats()}),
+            status_code=200,
+            media_type="application/json",
+        )
@@ -0,0 +1,239 @@
+import time
+from collections.abc import Mapping, Sequence
+from typing import Any, Optional
+
+import redis
+from redis.asyncio import Redis as AsyncRedis
+from redis.asyncio.cluster import ClusterNode as AsyncClusterNode
+from redis.asyncio.cluster import RedisCluster as AsyncRedisCluster
+from redis.asyncio.sentinel import Sentinel as AsyncSentinel
+from redis.cache import CacheConfig
+from redis.cluster import ClusterNode, RedisCluster
+from redis.sentinel import Sentinel
+
+from configs import higgs_config
+from higgs_app import HiggsApp
+
+
+class RedisClientWrapper:
+    """
+    A wrapper class for the Redis client so that `redis_client` can be imported
+    at module level and be initialized later in `init_app`
+    """
+
+    def __init__(self):
+        self._client: Optional[Any] = None
+
+    def initialize(self, client: Any) -> None:
+        if self._client is None:
+            self._client = client
+
+    def reset(self) -> None:
+        self._client = None
+
+    def is_initialized(self) -> bool:
+        return self._client is not None
+
+    def __getattr__(self, item):
+        if self._client is None:
+            raise RuntimeError("Redis client is not initialized. Call init_app first.")
+        return getattr(self._client, item)
+
+
+redis_client = RedisClientWrapper()
+async_redis_client = RedisClientWrapper()
+
+
+def _parse_nodes(nodes: Optional[str]) -> list[tuple[str, int]]:
+    if not nodes:
+        raise ValueError("No Redis nodes configured")
+    parsed = []
+    for node in nodes.split(","):
+        host, _, port = node.strip().rpartition(":")
+        parsed.append((host, int(port)))
+    return parsed
+
+
+def _connection_kwargs() -> dict[str, Any]:
+    return {
+        "username": higgs_config.REDIS_USERNAME,
+        "password": higgs_config.REDIS_PASSWORD or None,
+        "db": higgs_config.REDIS_DB,
+        "ssl": higgs_config.REDIS_USE_SSL,
+        "protocol": higgs_config.REDIS_SERIALIZATION_PROTOCOL,
+        "max_connections": higgs_config.REDIS_MAX_CONNECTIONS,
+        "socket_timeout": higgs_config.REDIS_SOCKET_TIMEOUT,
+        "socket_connect_timeout": higgs_config.REDIS_SOCKET_CONNECT_TIMEOUT,
+        "health_check_interval": higgs_config.REDIS_HEALTH_CHECK_INTERVAL,
+    }
+
+
+def _cache_kwargs() -> dict[str, Any]:
+    # client side cache 依赖 RESP3，只有同步客户端支持
+    if higgs_config.REDIS_ENABLE_CLIENT_SIDE_CACHE and higgs_config.REDIS_SERIALIZATION_PROTOCOL == 3:
+        return {"cache_config": CacheConfig()}
+    return {}
+
+
+def _create_standalone_clients() -> tuple[Any, Any]:
+    kwargs = {"host": higgs_config.REDIS_HOST, "port": higgs_config.REDIS_PORT, **_connection_kwargs()}
+    return redis.Redis(**kwargs, **_cache_kwargs()), AsyncRedis(**kwargs)
+
+
+def _create_sentinel_clients() -> tuple[Any, Any]:
+    sentinels = _parse_nodes(higgs_config.REDIS_SENTINELS)
+    sentinel_kwargs = {
+        "username": higgs_config.REDIS_SENTINEL_USERNAME,
+        "password": higgs_config.REDIS_SENTINEL_PASSWORD,
+        "socket_timeout": higgs_config.REDIS_SENTINEL_SOCKET_TIMEOUT,
+    }
+    service_name = higgs_config.REDIS_SENTINEL_SERVICE_NAME
+    if not service_name:
+        raise ValueError("REDIS_SENTINEL_SERVICE_NAME is required when REDIS_USE_SENTINEL is enabled")
+    kwargs = _connection_kwargs()
+    sync_client = Sentinel(sentinels, sentinel_kwargs=sentinel_kwargs).master_for(
+        service_name, **kwargs, **_cache_kwargs()
+    )
+    async_client = AsyncSentinel(sentinels, sentinel_kwargs=sentinel_kwargs).master_for(service_name, **kwargs)
+    return sync_client, async_client
+
+
+def _create_cluster_clients() -> tuple[Any, Any]:
+    nodes = _parse_nodes(higgs_config.REDIS_CLUSTERS)
+    kwargs = _connection_kwargs()
+    # cluster 模式只有 db 0
+    kwargs.pop("db")
+    kwargs["password"] = higgs_config.REDIS_CLUSTERS_PASSWORD or None
+    sync_client = RedisCluster(
+        startup_nodes=[ClusterNode(host, port) for host, port in nodes], **kwargs, **_cache_kwargs()
+    )
+    async_client = AsyncRedisCluster(startup_nodes=[AsyncClusterNode(host, port) for host, port in nodes], **kwargs)
+    return sync_client, async_client
+
+
+def init_app(app: HiggsApp):
+    if higgs_config.REDIS_USE_CLUSTERS:
+        sync_client, async_client = _create_cluster_clients()
+    elif higgs_config.REDIS_USE_SENTINEL:
+        sync_client, async_client = _create_sentinel_clients()
+    else:
+        sync_client, async_client = _create_standalone_clients()
+
+    redis_client.initialize(sync_client)
+    async_redis_client.initialize(async_client)
+
+
+def init_fake() -> None:
+    """Replace both clients with an in-memory fake sharing one keyspace, for tests and local runs without Redis."""
+    from extensions.fake_redis import FakeAsyncRedis, FakeRedis
+
+    sync_client = FakeRedis()
+    redis_client.reset()
+    async_redis_client.reset()
+    redis_client.initialize(sync_client)
+    async_redis_client.initialize(FakeAsyncRedis(sync_client))
+
+
+async def close() -> None:
+    if async_redis_client.is_initialized():
+        await async_redis_client.aclose()
+
+
+def _batches(items: Sequence[Any]) -> list[Sequence[Any]]:
+    size = higgs_config.REDIS_BATCH_SIZE
+    return [items[start : start + size] for start in range(0, len(items), size)]
+
+
+def mget_many(keys: Sequence[str]) -> list[Optional[bytes]]:
+    """MGET any number of keys in batches of REDIS_BATCH_SIZE, pipelined into a single round trip."""
+    if not keys:
+        return []
+    if higgs_config.REDIS_USE_CLUSTERS:
+        found: list[Optional[bytes]] = redis_client.mget_nonatomic(list(keys))
+        return found
+    with redis_client.pipeline(transaction=False) as pipe:
+        for batch in _batches(keys):
+            pipe.mget(batch)
+        return [value for values in pipe.execute() for value in values]
+
+
+def set_many(mapping: Mapping[str, Any], ex: Optional[int] = None) -> None:
+    """SET many keys with an optional expiry, REDIS_BATCH_SIZE commands per pipeline round trip."""
+    items = list(mapping.items())
+    for batch in _batches(items):
+        with redis_client.pipeline(transaction=False) as pipe:
+            for key, value in batch:
+                pipe.set(key, value, ex=ex)
+            pipe.execute()
+
+
+def delete_many(keys: Sequence[str]) -> int:
+    return sum(redis_client.delete(*batch) for batch in _batches(keys))
+
+
+async def amget_many(keys: Sequence[str]) -> list[Optional[bytes]]:
+    if not keys:
+        return []
+    if higgs_config.REDIS_USE_CLUSTERS:
+        found: list[Optional[bytes]] = await async_redis_client.mget_nonatomic(list(keys))
+        return found
+    async with async_redis_client.pipeline(transaction=False) as pipe:
+        for batch in _batches(keys):
+            pipe.mget(batch)
+        return [value for values in await pipe.execute() for value in values]
+
+
+async def aset_many(mapping: Mapping[str, Any], ex: Optional[int] = None) -> None:
+    items = list(mapping.items())
+    for batch in _batches(items):
+        async with async_redis_client.pipeline(transaction=False) as pipe:
+            for key, value in batch:
+                pipe.set(key, value, ex=ex)
+            await pipe.execute()
+
+
+async def adelete_many(keys: Sequence[str]) -> int:
+    deleted = 0
+    for batch in _batches(keys):
+        deleted += await async_redis_client.delete(*batch)
+    return deleted
+
+
+def _pool_stat(pool) -> dict[str, Any]:
+    return {
+        "max_connections": pool.max_connections,
+        "available_connections": len(pool._available_connections),
+        "in_use_connections": len(pool._in_use_connections),
+    }
+
+
+def _client_pool_stat(client) -> dict[str, Any]:
+    if isinstance(client, RedisCluster):
+        return {node.name: _pool_stat(node.redis_connection.connection_pool) for node in client.get_nodes()}
+    if isinstance(client, AsyncRedisCluster):
+        return {
+            node.name: {
+                "max_connections": node.max_connections,
+                "available_connections": len(node._free),
+                "in_use_connections": len(node._connections) - len(node._free),
+            }
+            for node in client.get_nodes()
+        }
+    pool = getattr(client, "connection_pool", None)
+    return _pool_stat(pool) if pool is not None else {}
+
+
+def pool_stats() -> dict[str, Any]:
+    if not redis_client.is_initialized():
+        return {}
+    return {
+        "sync": _client_pool_stat(redis_client._client),
+        "async": _client_pool_stat(async_redis_client._client),
+    }
+
+
+async def health_check() -> float:
+    """PING Redis and return the round trip latency in milliseconds, raises RedisError when unreachable."""
+    start = time.perf_counter()
+    await async_redis_client.ping()
+    return round((time.perf_counter() - start) * 1000, 2)
@@ -0,0 +1,150 @@
+import asyncio
+import fnmatch
+import functools
+import json
+import logging
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any
+
+import anyio
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from configs import higgs_config
+from contexts.deadline import request_deadline
+from higgs_app import HiggsApp
+
+logger = logging.getLogger(__name__)
+
+
+@functools.lru_cache(maxsize=1024)
+def route_deadline(path: str) -> float:
+    """Deadline in seconds of the requests to ``path``, 0 for none."""
+    for pattern in sorted(higgs_config.REQUEST_DEADLINES, key=len, reverse=True):
+        if fnmatch.fnmatchcase(path, pattern):
+            return higgs_config.REQUEST_DEADLINES[pattern]
+    return higgs_config.REQUEST_DEADLINE
+
+
+@contextmanager
+def collapse_excgroups() -> Iterator[None]:
+    """Raise the single exception of an exception group, nested groups included, instead of the group."""
+    try:
+        yield
+    except BaseExceptionGroup as group:
+        exc: BaseException = group
+        while isinstance(exc, BaseExceptionGroup) and len(exc.exceptions) == 1:
+            exc = exc.exceptions[0]
+        raise exc
+
+
+class CancellationStats:
+    def __init__(self):
+        self.requests = 0
+        self.disconnects = 0
+        self.deadlines = 0
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "enabled": higgs_config.REQUEST_CANCELLATION_ENABLED,
+            "default_deadline": higgs_config.REQUEST_DEADLINE,
+            "requests": self.requests,
+            "cancelled_on_disconnect": self.disconnects,
+            "cancelled_on_deadline": self.deadlines,
+        }
+
+
+cancellation_stats = CancellationStats()
+
+
+class RequestCancellationMiddleware:
+    """Cancel the handling of a request when its client disconnects or its deadline passes.
+
+    Starlette only notices a disconnect while a ``StreamingResponse`` is sending, a non streaming agent
+    run keeps calling the model after the client left. Here the incoming messages are read eagerly so
+    the disconnect is seen at any time, and the request task is cancelled: the awaited model request is
+    closed, pending tool calls are never started and psycopg cancels the running statement server side.
+    A request past its deadline gets a 504. When its response already started the body is left unfinished,
+    the server then closes the connection and the client sees a truncated response instead of a clean end.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        deadline = route_deadline(scope["path"])
+        if not deadline and not higgs_config.REQUEST_CANCELLATION_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        cancellation_stats.requests += 1
+        messages: asyncio.Queue[Message] = asyncio.Queue()
+        disconnected = False
+        response_started = False
+        response_finished = False
+        app_scope = anyio.CancelScope(deadline=anyio.current_time() + deadline if deadline else float("inf"))
+
+        async def listen() -> None:
+            nonlocal disconnected
+            while True:
+                message = await receive()
+                await messages.put(message)
+                if message["type"] == "http.disconnect":
+                    disconnected = True
+                    if higgs_config.REQUEST_CANCELLATION_ENABLED and not response_finished:
+                        app_scope.cancel()
+                    return
+
+        async def receive_message() -> Message:
+            if disconnected and messages.empty():
+                return {"type": "http.disconnect"}
+            return await messages.get()
+
+        async def send_message(message: Message) -> None:
+            nonlocal response_started, response_finished
+            if message["type"] == "http.response.start":
+                response_started = True
+            elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                response_finished = True
+            await send(message)
+
+        token = request_deadline.set(time.monotonic() + deadline if deadline else None)
+        try:
+            # 任务组把异常包成 ExceptionGroup，这里拆开，外层中间件看到的是原来的异常
+            with collapse_excgroups():
+                async with anyio.create_task_group() as task_group:
+                    task_group.start_soon(listen)
+                    with app_scope:
+                        await self.app(scope, receive_message, send_message)
+                    task_group.cancel_scope.cancel()
+        finally:
+            request_deadline.reset(token)
+
+        if not app_scope.cancelled_caught:
+            return
+        if disconnected:
+            cancellation_stats.disconnects += 1
+            logger.info("Cancelled %s %s, the client disconnected", scope["method"], scope["path"])
+            return
+
+        cancellation_stats.deadlines += 1
+        logger.warning("Cancelled %s %s after its deadline of %ss", scope["method"], scope["path"], deadline)
+        if not response_started:
+            body = json.dumps({"detail": "Request deadline exceeded"}).encode()
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": 504,
+                    "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+                }
+            )
+            await send({"type": "http.response.body", "body": body})
+        # 流式响应已经开始时不发送结束的 body，由服务器断开连接，避免截断的响应看起来是完整的 200
+
+
+def init_app(app: HiggsApp):
+    app.add_middleware(RequestCancellationMiddleware)
@@ -0,0 +1,355 @@
+import threading
+import time
+from collections.abc import Sequence
+from typing import Any, Optional
+
+from redis.exceptions import ResponseError
+
+
+def _encode(value: Any) -> bytes:
+    if isinstance(value, bytes):
+        return value
+    if isinstance(value, str):
+        return value.encode()
+    if isinstance(value, (int, float)):
+        return repr(value).encode()
+    raise TypeError(f"Invalid input of type: '{type(value).__name__}'")
+
+
+def _now() -> float:
+    return time.monotonic()
+
+
+def _score(value: Any) -> float:
+    return float(value.decode() if isinstance(value, bytes) else value)
+
+
+class _SortedSet(dict):
+    """Members of a sorted set mapped to their scores."""
+
+
+class FakeRedis:
+    """In-memory stand-in for the subset of the redis client API used by this project.
+
+    Values are stored as bytes like a real server returns them; expiry is checked lazily on access.
+    Lua scripts run on an embedded Lua 5.1 (the ``lupa`` package), atomically like on a server.
+    """
+
+    def __init__(self):
+        self._data: dict[str, tuple[bytes, Optional[float]]] = {}
+        self._lock = threading.RLock()
+
+    def _alive(self, name: str) -> Optional[bytes]:
+        item = self._data.get(name)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and expires_at <= _now():
+            del self._data[name]
+            return None
+        return value
+
+    def _typed(self, name: str, kind: type, create: bool = False) -> Any:
+        value = self._alive(name)
+        if value is None:
+            if not create:
+                return None
+            value = kind()
+            self._data[name] = (value, None)
+        if type(value) is not kind:
+            raise ResponseError("WRONGTYPE Operation against a key holding the wrong kind of value")
+        return value
+
+    def ping(self) -> bool:
+        return True
+
+    def time(self) -> tuple[int, int]:
+        now = time.time()
+        return int(now), int(now % 1 * 1_000_000)
+
+    def get(self, name: str) -> Optional[bytes]:
+        with self._lock:
+            value: Optional[bytes] = self._typed(name, bytes)
+            return value
+
+    def mget(self, keys, *args) -> list[Optional[bytes]]:
+        names = [keys, *args] if isinstance(keys, str) else [*keys, *args]
+        with self._lock:
+            return [self._alive(name) for name in names]
+
+    def mget_nonatomic(self, keys, *args) -> list[Optional[bytes]]:
+        return self.mget(keys, *args)
+
+    def set(
+        self,
+        name: str,
+        value: Any,
+        ex: Optional[float] = None,
+        px: Optional[float] = None,
+        nx: bool = False,
+        xx: bool = False,
+    ) -> Optional[bool]:
+        with self._lock:
+            exists = self._alive(name) is not None
+            if (nx and exists) or (xx and not exists):
+                return None
+            ttl = ex if ex is not None else (px / 1000 if px is not None else None)
+            self._data[name] = (_encode(value), _now() + ttl if ttl is not None else None)
+            return True
+
+    def setex(self, name: str, time: float, value: Any) -> bool:
+        return bool(self.set(name, value, ex=time))
+
+    def delete(self, *names: str) -> int:
+        deleted = 0
+        with self._lock:
+            for name in names:
+                if self._alive(name) is not None:
+                    del self._data[name]
+                    deleted += 1
+        return deleted
+
+    def exists(self, *names: str) -> int:
+        with self._lock:
+            return sum(1 for name in names if self._alive(name) is not None)
+
+    def expire(self, name: str, time: float) -> bool:
+        with self._lock:
+            value = self._alive(name)
+            if value is None:
+                return False
+            self._data[name] = (value, _now() + float(time))
+            return True
+
+    def ttl(self, name: str) -> int:
+        with self._lock:
+            if self._alive(name) is None:
+                return -2
+            expires_at = self._data[name][1]
+            return -1 if expires_at is None else int(expires_at - _now())
+
+    def pttl(self, name: str) -> int:
+        with self._lock:
+            if self._alive(name) is None:
+                return -2
+            expires_at = self._data[name][1]
+            return -1 if expires_at is None else int((expires_at - _now()) * 1000)
+
+    def incr(self, name: str, amount: int = 1) -> int:
+        with self._lock:
+            value = int(self._typed(name, bytes) or 0) + amount
+            expires_at = self._data[name][1] if name in self._data else None
+            self._data[name] = (_encode(value), expires_at)
+            return value
+
+    def hset(
+        self,
+        name: str,
+        key: Any = None,
+        value: Any = None,
+        mapping: Optional[dict] = None,
+        items: Optional[Sequence[Any]] = None,
+    ) -> int:
+        fields = dict(mapping or {})
+        if key is not None:
+            fields[key] = value
+        if items:
+            fields.update(zip(items[::2], items[1::2]))
+        with self._lock:
+            hash_ = self._typed(name, dict, create=True)
+            added = sum(1 for field in fields if _encode(field) not in hash_)
+            hash_.update({_encode(field): _encode(value) for field, value in fields.items()})
+            return added
+
+    def hget(self, name: str, key: Any) -> Optional[bytes]:
+        with self._lock:
+            return (self._typed(name, dict) or {}).get(_encode(key))
+
+    def hmget(self, name: str, keys, *args) -> list[Optional[bytes]]:
+        fields = [keys, *args] if isinstance(keys, (str, bytes)) else [*keys, *args]
+        with self._lock:
+            hash_ = self._typed(name, dict) or {}
+            return [hash_.get(_encode(field)) for field in fields]
+
+    def hgetall(self, name: str) -> dict[bytes, bytes]:
+        with self._lock:
+            return dict(self._typed(name, dict) or {})
+
+    def zadd(self, name: str, mapping: dict[Any, Any]) -> int:
+        with self._lock:
+            members = self._typed(name, _SortedSet, create=True)
+            added = sum(1 for member in mapping if _encode(member) not in members)
+            members.update({_encode(member): _score(score) for member, score in mapping.items()})
+            return added
+
+    def zrem(self, name: str, *values: Any) -> int:
+        with self._lock:
+            members = self._typed(name, _SortedSet) or {}
+            return sum(1 for value in values if members.pop(_encode(value), None) is not None)
+
+    def zcard(self, name: str) -> int:
+        with self._lock:
+            return len(self._typed(name, _SortedSet) or {})
+
+    def zscore(self, name: str, value: Any) -> Optional[float]:
+        with self._lock:
+            return (self._typed(name, _SortedSet) or {}).get(_encode(value))
+
+    def zremrangebyscore(self, name: str, min: Any, max: Any) -> int:
+        low, high = _score(min), _score(max)
+        with self._lock:
+            members = self._typed(name, _SortedSet) or {}
+            removed = [member for member, score in members.items() if low <= score <= high]
+            for member in removed:
+                del members[member]
+            return len(removed)
+
+    def register_script(self, script: str) -> "FakeScript":
+        return FakeScript(self, script)
+
+    def eval(self, script: str, numkeys: int, *keys_and_args: Any) -> Any:
+        from lupa.lua51 import LuaRuntime
+
+        lua = LuaRuntime(encoding=None)
+
+        def to_lua(value: Any) -> Any:
+            if value is None:
+                return False
+            if isinstance(value, bool):
+                return int(value)
+            if isinstance(value, (list, tuple)):
+                return lua.table_from([to_lua(item) for item in value])
+            if isinstance(value, str):
+                return value.encode()
+            if isinstance(value, float):
+                # Redis 把浮点数回复转成字符串
+                return repr(value).encode()
+            return value
+
+        def call(command: bytes, *args: Any) -> Any:
+            name = command.decode().lower()
+            args = tuple(arg.decode() if isinstance(arg, bytes) else arg for arg in args)
+            if name == "hset":
+                return to_lua(self.hset(args[0], items=args[1:]))
+            if name == "zadd":
+                return to_lua(self.zadd(args[0], dict(zip(args[2::2], args[1::2]))))
+            if name == "time":
+                return to_lua([str(part) for part in self.time()])
+            return to_lua(getattr(self, name)(*args))
+
+        def from_lua(value: Any) -> Any:
+            # 与 Redis 相同：数字截断为整数，false 和 nil 为 None，表只取数组部分
+            if value is None or value is False:
+                return None
+            if value is True:
+                return 1
+            if isinstance(value, (int, float)):
+                return int(value)
+            if isinstance(value, bytes):
+                return value
+            return [from_lua(value[index]) for index in range(1, len(value) + 1)]
+
+        keys, args = keys_and_args[:numkeys], keys_and_args[numkeys:]
+        lua_globals = lua.globals()
+        lua_globals.KEYS = to_lua([_encode(key) for key in keys])
+        lua_globals.ARGV = to_lua([_encode(arg) for arg in args])
+        lua_globals.redis = lua.table_from({b"call": call})
+        with self._lock:
+            return from_lua(lua.execute(script))
+
+    def publish(self, channel: str, message: Any) -> int:
+        return 0
+
+    def flushdb(self) -> bool:
+        with self._lock:
+            self._data.clear()
+            return True
+
+    def pipeline(self, transaction: bool = True) -> "FakePipeline":
+        return FakePipeline(self)
+
+    def close(self) -> None:
+        pass
+
+
+class FakeScript:
+    """Script registered on a ``FakeRedis``, called like a redis-py ``Script``."""
+
+    def __init__(self, client: FakeRedis, script: str):
+        self._client = client
+        self.script = script
+
+    def __call__(self, keys: Sequence[Any] = (), args: Sequence[Any] = (), client: Any = None) -> Any:
+        return self._client.eval(self.script, len(keys), *keys, *args)
+
+
+class FakeAsyncScript(FakeScript):
+    async def __call__(self, keys: Sequence[Any] = (), args: Sequence[Any] = (), client: Any = None) -> Any:  # type: ignore[override]
+        return super().__call__(keys, args)
+
+
+class FakePipeline:
+    """Buffers commands and runs them against the fake on ``execute``."""
+
+    def __init__(self, client: FakeRedis):
+        self._client = client
+        self._commands: list[tuple[str, tuple, dict]] = []
+
+    def __getattr__(self, item):
+        if not callable(getattr(self._client, item, None)):
+            raise AttributeError(item)
+
+        def command(*args, **kwargs):
+            self._commands.append((item, args, kwargs))
+            return self
+
+        return command
+
+    def execute(self) -> list[Any]:
+        commands, self._commands = self._commands, []
+        with self._client._lock:
+            return [getattr(self._client, name)(*args, **kwargs) for name, args, kwargs in commands]
+
+    def reset(self) -> None:
+        self._commands = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.reset()
+
+
+class FakeAsyncRedis:
+    """Async facade over a ``FakeRedis``, so sync and async clients can share one keyspace."""
+
+    def __init__(self, client: Optional[FakeRedis] = None):
+        self._client = client or FakeRedis()
+
+    def __getattr__(self, item):
+        method = getattr(self._client, item)
+
+        async def command(*args, **kwargs):
+            return method(*args, **kwargs)
+
+        return command
+
+    def pipeline(self, transaction: bool = True) -> "FakeAsyncPipeline":
+        return FakeAsyncPipeline(self._client)
+
+    def register_script(self, script: str) -> FakeAsyncScript:
+        return FakeAsyncScript(self._client, script)
+
+    async def aclose(self) -> None:
+        pass
+
+
+class FakeAsyncPipeline(FakePipeline):
+    async def execute(self) -> list[Any]:  # type: ignore[override]
+        return super().execute()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        self.reset()
@@ -0,0 +1,602 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import threading
+import time
+import uuid
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Any, Optional
+from urllib.parse import urlsplit
+
+from redis.commands.core import AsyncScript, Script
+from redis.exceptions import RedisError
+
+from configs import higgs_config
+from extensions.ext_redis import async_redis_client, redis_client
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    INTERACTIVE = 0
+    BATCH = 1
+
+
+_priority: ContextVar[Priority] = ContextVar("admission_priority", default=Priority.INTERACTIVE)
+
+
+@contextmanager
+def admission_priority(priority: Priority) -> Iterator[None]:
+    """Run the model calls made inside the block with ``priority``, e.g. ``Priority.BATCH`` for background jobs."""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class AdmissionRejectedError(Exception):
+    def __init__(self, provider: str, reason: str):
+        super().__init__(f"Call to {provider} shed by admission control: {reason}")
+        self.provider = provider
+        self.reason = reason
+
+
+class TokenBucket:
+    """Budget of ``per_minute`` units refilled continuously, the level may go negative when usage is settled."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount: float) -> None:
+        self.level -= min(amount, self.capacity)
+
+    def give(self, amount: float) -> None:
+        self.level = min(self.capacity, self.level + amount)
+
+
+class LocalAdmissionBackend:
+    """Concurrency and rate budgets of one provider enforced inside this process."""
+
+    def __init__(self, max_concurrency: int, requests_per_minute: int, tokens_per_minute: int):
+        self.max_concurrency = max_concurrency
+        self._requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self._tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self._leases: set[str] = set()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._leases)
+
+    def try_acquire(self, tokens: int) -> tuple[Optional[str], Optional[float]]:
+        """Return ``(lease_id, None)`` when admitted, otherwise ``(None, retry_after)``.
+
+        ``retry_after`` is None when the call has to wait for a concurrency slot to be released.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self._blocked_until > now:
+                return None, self._blocked_until - now
+            if len(self._leases) >= self.max_concurrency:
+                return None, None
+            wait = max(
+                self._requests.wait_time(1, now) if self._requests else 0.0,
+                self._tokens.wait_time(tokens, now) if self._tokens else 0.0,
+            )
+            if wait > 0:
+                return None, wait
+            if self._requests:
+                self._requests.take(1)
+            if self._tokens:
+                self._tokens.take(tokens)
+            lease_id = f"local:{uuid.uuid4().hex}"
+            self._leases.add(lease_id)
+            return lease_id, None
+
+    def release(self, lease_id: str) -> None:
+        with self._lock:
+            self._leases.discard(lease_id)
+
+    def settle(self, delta: int) -> None:
+        """Charge (positive) or refund (negative) the difference between actual and estimated tokens."""
+        if self._tokens is None or not delta:
+            return
+        with self._lock:
+            self._tokens._refill(time.monotonic())
+            if delta > 0:
+                self._tokens.take(delta)
+            else:
+                self._tokens.give(-delta)
+
+    def throttle(self, seconds: float) -> None:
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+    async def atry_acquire(self, tokens: int) -> tuple[Optional[str], Optional[float]]:
+        return self.try_acquire(tokens)
+
+    async def arelease(self, lease_id: str) -> None:
+        self.release(lease_id)
+
+    async def asettle(self, delta: int) -> None:
+        self.settle(delta)
+
+    async def athrottle(self, seconds: float) -> None:
+        self.throttle(seconds)
+
+
+# KEYS: slots, requests bucket, tokens bucket, throttle
+# ARGV: lease id, max concurrency, lease ttl, requests per minute, tokens per minute, tokens
+# 返回 {1, 0} 表示获得许可，否则 {0, 需要等待的秒数}，-1 表示等待并发槽位释放
+ACQUIRE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local throttled = redis.call('PTTL', KEYS[4])
+if throttled > 0 then
+  return {0, tostring(throttled / 1000)}
+end
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[2]) then
+  return {0, '-1'}
+end
+local function level(key, per_minute)
+  local state = redis.call('HMGET', key, 'level', 'updated')
+  local value = tonumber(state[1]) or per_minute
+  local updated = tonumber(state[2]) or now
+  return math.min(per_minute, value + (now - updated) * per_minute / 60)
+end
+local rpm = tonumber(ARGV[4])
+local tpm = tonumber(ARGV[5])
+local tokens = math.min(tonumber(ARGV[6]), tpm)
+local requests = 0
+local budget = 0
+local wait = 0
+if rpm > 0 then
+  requests = level(KEYS[2], rpm)
+  if requests < 1 then wait = math.max(wait, (1 - requests) * 60 / rpm) end
+end
+if tpm > 0 then
+  budget = level(KEYS[3], tpm)
+  if budget < tokens then wait = math.max(wait, (tokens - budget) * 60 / tpm) end
+end
+if wait > 0 then
+  return {0, tostring(wait)}
+end
+if rpm > 0 then
+  redis.call('HSET', KEYS[2], 'level', requests - 1, 'updated', now)
+  redis.call('EXPIRE', KEYS[2], 120)
+end
+if tpm > 0 then
+  redis.call('HSET', KEYS[3], 'level', budget - tokens, 'updated', now)
+  redis.call('EXPIRE', KEYS[3], 120)
+end
+redis.call('ZADD', KEYS[1], now + tonumber(ARGV[3]), ARGV[1])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return {1, '0'}
+"""
+
+# KEYS: tokens bucket
+# ARGV: tokens per minute, delta
+SETTLE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local tpm = tonumber(ARGV[1])
+local state = redis.call('HMGET', KEYS[1], 'level', 'updated')
+local value = tonumber(state[1]) or tpm
+local updated = tonumber(state[2]) or now
+value = math.min(tpm, value + (now - updated) * tpm / 60)
+redis.call('HSET', KEYS[1], 'level', math.min(tpm, value - tonumber(ARGV[2])), 'updated', now)
+redis.call('EXPIRE', KEYS[1], 120)
+return 1
+"""
+
+
+class RedisAdmissionBackend:
+    """Budgets of one provider shared by all workers, kept in Redis and updated by Lua scripts.
+
+    In-flight calls are leases in a sorted set scored by their expiry, so slots of a crashed worker
+    are reclaimed after ``PROVIDER_ADMISSION_LEASE_TTL``. When Redis is unreachable the calls are
+    admitted by the in-process ``fallback`` limits instead.
+    """
+
+    def __init__(self, provider: str, fallback: LocalAdmissionBackend):
+        self.fallback = fallback
+        self.max_concurrency = fallback.max_concurrency
+        # hash tag 保证 cluster 模式下同一个 provider 的 key 在同一个 slot
+        prefix = f"provider_admission:{{{provider}}}"
+        self._keys = [f"{prefix}:slots", f"{prefix}:requests", f"{prefix}:tokens", f"{prefix}:throttled"]
+        self._acquire: Optional[Script] = None
+        self._aacquire: Optional[AsyncScript] = None
+        self._settle: Optional[Script] = None
+        self._asettle: Optional[AsyncScript] = None
+
+    @property
+    def in_flight(self) -> int:
+        return self.fallback.in_flight
+
+    def _args(self, lease_id: str, tokens: int) -> list[Any]:
+        return [
+            lease_id,
+            self.max_concurrency,
+            higgs_config.PROVIDER_ADMISSION_LEASE_TTL,
+            higgs_config.PROVIDER_REQUESTS_PER_MINUTE,
+            higgs_config.PROVIDER_TOKENS_PER_MINUTE,
+            tokens,
+        ]
+
+    @staticmethod
+    def _result(lease_id: str, result: list) -> tuple[Optional[str], Optional[float]]:
+        admitted, wait = int(result[0]), float(result[1])
+        if admitted:
+            return lease_id, None
+        return None, None if wait < 0 else wait
+
+    def try_acquire(self, tokens: int) -> tuple[Optional[str], Optional[float]]:
+        script = self._acquire
+        if script is None:
+            script = self._acquire = redis_client.register_script(ACQUIRE_SCRIPT)
+        lease_id = uuid.uuid4().hex
+        try:
+            return self._result(lease_id, script(keys=self._keys, args=self._args(lease_id, tokens)))
+        except RedisError:
+            logger.warning("Provider admission falls back to local limits, Redis is unavailable", exc_info=True)
+            return self.fallback.try_acquire(tokens)
+
+    async def atry_acquire(self, tokens: int) -> tuple[Optional[str], Optional[float]]:
+        script = self._aacquire
+        if script is None:
+            script = self._aacquire = async_redis_client.register_script(ACQUIRE_SCRIPT)
+        lease_id = uuid.uuid4().hex
+        try:
+            return self._result(lease_id, await script(keys=self._keys, args=self._args(lease_id, tokens)))
+        except RedisError:
+            logger.warning("Provider admission falls back to local limits, Redis is unavailable", exc_info=True)
+            return await self.fallback.atry_acquire(tokens)
+
+    def release(self, lease_id: str) -> None:
+        if lease_id.startswith("local:"):
+            self.fallback.release(lease_id)
+            return
+        try:
+            redis_client.zrem(self._keys[0], lease_id)
+        except RedisError:
+            logger.warning("Failed to release provider admission lease %s", lease_id, exc_info=True)
+
+    async def arelease(self, lease_id: str) -> None:
+        if lease_id.startswith("local:"):
+            self.fallback.release(lease_id)
+            return
+        try:
+            await async_redis_client.zrem(self._keys[0], lease_id)
+        except RedisError:
+            logger.warning("Failed to release provider admission lease %s", lease_id, exc_info=True)
+
+    def settle(self, delta: int) -> None:
+        if not higgs_config.PROVIDER_TOKENS_PER_MINUTE or not delta:
+            return
+        script = self._settle
+        if script is None:
+            script = self._settle = redis_client.register_script(SETTLE_SCRIPT)
+        try:
+            script(keys=self._keys[2:3], args=[higgs_config.PROVIDER_TOKENS_PER_MINUTE, delta])
+        except RedisError:
+            self.fallback.settle(delta)
+
+    async def asettle(self, delta: int) -> None:
+        if not higgs_config.PROVIDER_TOKENS_PER_MINUTE or not delta:
+            return
+        script = self._asettle
+        if script is None:
+            script = self._asettle = async_redis_client.register_script(SETTLE_SCRIPT)
+        try:
+            await script(keys=self._keys[2:3], args=[higgs_config.PROVIDER_TOKENS_PER_MINUTE, delta])
+        except RedisError:
+            self.fallback.settle(delta)
+
+    def throttle(self, seconds: float) -> None:
+        try:
+            redis_client.set(self._keys[3], 1, px=int(seconds * 1000))
+        except RedisError:
+            self.fallback.throttle(seconds)
+
+    async def athrottle(self, seconds: float) -> None:
+        try:
+            await async_redis_client.set(self._keys[3], 1, px=int(seconds * 1000))
+        except RedisError:
+            self.fallback.throttle(seconds)
+
+
+AdmissionBackend = LocalAdmissionBackend | RedisAdmissionBackend
+
+
+@dataclass(order=True)
+class _Waiter:
+    priority: int
+    seq: int
+    tokens: int = field(compare=False)
+    future: asyncio.Future[str] = field(compare=False)
+
+
+class _PriorityStats:
+    def __init__(self):
+        self.admitted = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.shed: dict[str, int] = {}
+
+    def to_dict(self, queued: int) -> dict[str, Any]:
+        return {
+            "queued": queued,
+            "admitted": self.admitted,
+            "shed": dict(self.shed),
+            "wait_avg_ms": round(self.wait_total / self.admitted * 1000, 2) if self.admitted else None,
+            "wait_max_ms": round(self.wait_max * 1000, 2),
+        }
+
+
+@dataclass
+class Lease:
+    limiter: "ProviderLimiter"
+    lease_id: str
+    tokens: int
+    acquired_at: float
+
+    def _hold(self) -> None:
+        self.limiter.record_hold(time.monotonic() - self.acquired_at)
+
+    def release(self, actual_tokens: Optional[int] = None) -> None:
+        self._hold()
+        self.limiter.backend.release(self.lease_id)
+        if actual_tokens is not None:
+            self.limiter.backend.settle(actual_tokens - self.tokens)
+        self.limiter.notify()
+
+    async def arelease(self, actual_tokens: Optional[int] = None) -> None:
+        self._hold()
+        await self.limiter.backend.arelease(self.lease_id)
+        if actual_tokens is not None:
+            await self.limiter.backend.asettle(actual_tokens - self.tokens)
+        self.limiter.notify()
+
+
+class ProviderLimiter:
+    """Admission of the calls to one provider.
+
+    Async calls that cannot be admitted right away wait in a priority queue (interactive before batch,
+    FIFO within a priority) served by a single pump task, which retries the head of the queue whenever
+    a lease is released or the rate budget has refilled. A call is shed when the queue is full, when the
+    expected wait already exceeds its deadline, or when the deadline passes in the queue. Sync calls
+    poll the budgets until their deadline without joining the queue.
+    """
+
+    def __init__(self, provider: str, backend: AdmissionBackend):
+        self.provider = provider
+        self.backend = backend
+        self._waiters: list[_Waiter] = []
+        self._seq = itertools.count()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._pump_task: Optional[asyncio.Task] = None
+        self._lock = threading.Lock()
+        self._stats = {priority: _PriorityStats() for priority in Priority}
+        self.throttled = 0
+        # 每次调用持有许可的平均时长（EWMA），用来估算排队时间
+        self.hold_avg = 0.0
+
+    @staticmethod
+    def timeout(priority: Priority) -> float:
+        if priority == Priority.BATCH:
+            return higgs_config.PROVIDER_ADMISSION_BATCH_TIMEOUT
+        return higgs_config.PROVIDER_ADMISSION_INTERACTIVE_TIMEOUT
+
+    def record_hold(self, seconds: float) -> None:
+        with self._lock:
+            self.hold_avg = seconds if not self.hold_avg else self.hold_avg * 0.9 + seconds * 0.1
+
+    def _record_admit(self, priority: Priority, wait: float) -> None:
+        with self._lock:
+            stats = self._stats[priority]
+            stats.admitted += 1
+            stats.wait_total += wait
+            stats.wait_max = max(stats.wait_max, wait)
+
+    def _shed(self, priority: Priority, reason: str) -> AdmissionRejectedError:
+        with self._lock:
+            shed = self._stats[priority].shed
+            shed[reason] = shed.get(reason, 0) + 1
+        return AdmissionRejectedError(self.provider, reason)
+
+    def _queued(self, priority: Optional[Priority] = None) -> int:
+        return sum(
+            1
+            for waiter in self._waiters
+            if not waiter.future.done() and (priority is None or waiter.priority <= priority)
+        )
+
+    def _expected_wait(self, priority: Priority) -> float:
+        return self._queued(priority) * self.hold_avg / self.backend.max_concurrency
+
+    def notify(self) -> None:
+        loop, wakeup = self._loop, self._wakeup
+        if loop is None or wakeup is None or loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            wakeup.set()
+        else:
+            loop.call_soon_threadsafe(wakeup.set)
+
+    def _bind_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._wakeup = asyncio.Event()
+            self._waiters = []
+            self._pump_task = None
+
+    async def acquire(self, tokens: int, priority: Optional[Priority] = None) -> Lease:
+        priority = _priority.get() if priority is None else priority
+        timeout = self.timeout(priority)
+        started = time.monotonic()
+        self._bind_loop()
+
+        if not self._queued():
+            lease_id, _ = await self.backend.atry_acquire(tokens)
+            if lease_id is not None:
+                self._record_admit(priority, 0.0)
+                return Lease(self, lease_id, tokens, time.monotonic())
+        if self._queued() >= higgs_config.PROVIDER_ADMISSION_QUEUE_SIZE:
+            raise self._shed(priority, "queue_full")
+        if self._expected_wait(priority) > timeout:
+            raise self._shed(priority, "expected_wait")
+
+        waiter = _Waiter(priority, next(self._seq), tokens, asyncio.get_running_loop().create_future())
+        heapq.heappush(self._waiters, waiter)
+        if self._pump_task is None or self._pump_task.done():
+            self._pump_task = asyncio.create_task(self._pump())
+        else:
+            self.notify()
+
+        try:
+            granted = await asyncio.wait_for(waiter.future, timeout)
+        except (TimeoutError, asyncio.CancelledError) as e:
+            # 超时和授予许可同时发生时，归还已授予的许可
+            if waiter.future.done() and not waiter.future.cancelled():
+                await self.backend.arelease(waiter.future.result())
+                self.notify()
+            if isinstance(e, TimeoutError):
+                raise self._shed(priority, "deadline") from e
+            raise
+        self._record_admit(priority, time.monotonic() - started)
+        return Lease(self, granted, tokens, time.monotonic())
+
+    async def _pump(self) -> None:
+        assert self._wakeup is not None
+        while True:
+            while self._waiters and self._waiters[0].future.done():
+                heapq.heappop(self._waiters)
+            if not self._waiters:
+                return
+            head = self._waiters[0]
+            self._wakeup.clear()
+            try:
+                lease_id, retry_after = await self.backend.atry_acquire(head.tokens)
+            except Exception:
+                logger.exception("Provider admission failed for %s", self.provider)
+                lease_id, retry_after = None, higgs_config.PROVIDER_ADMISSION_POLL_INTERVAL
+            if lease_id is not None:
+                heapq.heappop(self._waiters)
+                if head.future.done():
+                    await self.backend.arelease(lease_id)
+                else:
+                    head.future.set_result(lease_id)
+                continue
+            if retry_after is None and isinstance(self.backend, RedisAdmissionBackend):
+                # 其他 worker 释放槽位时不会通知本进程，只能轮询
+                retry_after = higgs_config.PROVIDER_ADMISSION_POLL_INTERVAL
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), retry_after)
+            except TimeoutError:
+                pass
+
+    def acquire_sync(self, tokens: int, priority: Optional[Priority] = None) -> Lease:
+        priority = _priority.get() if priority is None else priority
+        started = time.monotonic()
+        deadline = started + self.timeout(priority)
+        while True:
+            lease_id, retry_after = self.backend.try_acquire(tokens)
+            if lease_id is not None:
+                self._record_admit(priority, time.monotonic() - started)
+                return Lease(self, lease_id, tokens, time.monotonic())
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise self._shed(priority, "deadline")
+            time.sleep(min(retry_after or higgs_config.PROVIDER_ADMISSION_POLL_INTERVAL, remaining))
+
+    def throttle(self) -> None:
+        with self._lock:
+            self.throttled += 1
+        self.backend.throttle(higgs_config.PROVIDER_ADMISSION_THROTTLE_BACKOFF)
+
+    async def athrottle(self) -> None:
+        with self._lock:
+            self.throttled += 1
+        await self.backend.athrottle(higgs_config.PROVIDER_ADMISSION_THROTTLE_BACKOFF)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "backend": "redis" if isinstance(self.backend, RedisAdmissionBackend) else "local",
+            "in_flight": self.backend.in_flight,
+            "queue_depth": self._queued(),
+            "throttled": self.throttled,
+            "hold_avg_ms": round(self.hold_avg * 1000, 2),
+            "priorities": {
+                priority.name.lower(): stats.to_dict(
+                    sum(1 for waiter in self._waiters if not waiter.future.done() and waiter.priority == priority)
+                )
+                for priority, stats in self._stats.items()
+            },
+        }
+
+
+class ProviderAdmission:
+    """Per provider admission control in front of the model calls, see ``ProviderLimiter``."""
+
+    def __init__(self):
+        self._limiters: dict[str, ProviderLimiter] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return higgs_config.PROVIDER_ADMISSION_ENABLED
+
+    def _create_backend(self, provider: str) -> AdmissionBackend:
+        local = LocalAdmissionBackend(
+            higgs_config.PROVIDER_MAX_CONCURRENCY,
+            higgs_config.PROVIDER_REQUESTS_PER_MINUTE,
+            higgs_config.PROVIDER_TOKENS_PER_MINUTE,
+        )
+        if higgs_config.PROVIDER_ADMISSION_REDIS_ENABLED and redis_client.is_initialized():
+            return RedisAdmissionBackend(provider, local)
+        return local
+
+    def limiter(self, base_url: str) -> ProviderLimiter:
+        parts = urlsplit(base_url)
+        provider = f"{parts.scheme}://{parts.netloc}"
+        with self._lock:
+            limiter = self._limiters.get(provider)
+            if limiter is None:
+                limiter = ProviderLimiter(provider, self._create_backend(provider))
+                self._limiters[provider] = limiter
+            return limiter
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "providers": {provider: limiter.stats() for provider, limiter in list(self._limiters.items())},
+        }
+
+
+provider_admission = ProviderAdmission()
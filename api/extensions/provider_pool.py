@@ -0,0 +1,312 @@
+import asyncio
+import ipaddress
+import socket
+import threading
+import time
+from typing import Any, Optional
+from urllib.parse import urlsplit
+
+import httpcore
+import httpx
+
+from configs import higgs_config
+
+
+class DNSCache:
+    """Cache host name resolution of provider hosts for ``ttl`` seconds, entries are dropped on connect errors."""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries: dict[tuple[str, int], tuple[float, str]] = {}
+        self._lock = threading.Lock()
+        self._resolving: dict[tuple[str, int], asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _is_ip(host: str) -> bool:
+        try:
+            ipaddress.ip_address(host)
+            return True
+        except ValueError:
+            return False
+
+    def _lookup(self, host: str, port: int) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get((host, port))
+            if entry is not None and entry[0] > time.monotonic():
+                self.hits += 1
+                return entry[1]
+            return None
+
+    def _store(self, host: str, port: int, infos: list) -> str:
+        address: str = infos[0][4][0]
+        with self._lock:
+            self.misses += 1
+            self._entries[(host, port)] = (time.monotonic() + self.ttl, address)
+        return address
+
+    def resolve(self, host: str, port: int) -> str:
+        if self._is_ip(host):
+            return host
+        address = self._lookup(host, port)
+        if address is None:
+            address = self._store(host, port, socket.getaddrinfo(host, port, type=socket.SOCK_STREAM))
+        return address
+
+    async def aresolve(self, host: str, port: int) -> str:
+        if self._is_ip(host):
+            return host
+        address = self._lookup(host, port)
+        if address is not None:
+            return address
+
+        # 冷启动时的并发连接共用同一次解析
+        pending = self._resolving.get((host, port))
+        if pending is None:
+            pending = asyncio.ensure_future(self._aresolve_uncached(host, port))
+            self._resolving[(host, port)] = pending
+            pending.add_done_callback(lambda _: self._resolving.pop((host, port), None))
+        else:
+            with self._lock:
+                self.hits += 1
+        return await asyncio.shield(pending)
+
+    async def _aresolve_uncached(self, host: str, port: int) -> str:
+        infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        return self._store(host, port, infos)
+
+    def forget(self, host: str, port: int) -> None:
+        with self._lock:
+            self._entries.pop((host, port), None)
+
+
+class ProviderStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.connections_opened = 0
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+
+    def record_request(self) -> None:
+        with self._lock:
+            self.requests += 1
+
+    def record_connection(self) -> None:
+        with self._lock:
+            self.connections_opened += 1
+
+    def record_queue_wait(self, wait: float) -> None:
+        with self._lock:
+            self.queue_wait_total += wait
+            self.queue_wait_max = max(self.queue_wait_max, wait)
+
+
+class _RequestTimer:
+    """Measure how long a request waited for a pooled connection through httpcore trace events.
+
+    The wait is the time until the request headers start being sent, minus the time spent opening
+    a new connection (TCP connect and TLS handshake) for this request.
+    """
+
+    CONNECT_STEPS = ("connection.connect_tcp", "connection.start_tls")
+
+    def __init__(self, stats: ProviderStats, trace=None):
+        self.stats = stats
+        self.started = time.perf_counter()
+        self.connecting = 0.0
+        self._marks: dict[str, float] = {}
+        self._recorded = False
+        self._trace = trace
+
+    def _event(self, name: str) -> None:
+        now = time.perf_counter()
+        step, _, phase = name.rpartition(".")
+        if step in self.CONNECT_STEPS:
+            if phase == "started":
+                self._marks[step] = now
+            else:
+                self.connecting += now - self._marks.pop(step, now)
+        elif step.endswith("send_request_headers") and phase == "started" and not self._recorded:
+            self._recorded = True
+            self.stats.record_queue_wait(max(now - self.started - self.connecting, 0.0))
+
+    def trace(self, name: str, info: dict[str, Any]) -> None:
+        self._event(name)
+        if self._trace is not None:
+            self._trace(name, info)
+
+    async def atrace(self, name: str, info: dict[str, Any]) -> None:
+        self._event(name)
+        if self._trace is not None:
+            await self._trace(name, info)
+
+
+class _CachedDNSBackend(httpcore.NetworkBackend):
+    def __init__(self, dns: DNSCache, stats: ProviderStats):
+        self._backend = httpcore.SyncBackend()
+        self._dns = dns
+        self._stats = stats
+
+    def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        # 只替换 TCP 连接的目标地址，TLS 的 SNI 和证书校验仍使用原始域名
+        address = self._dns.resolve(host, port)
+        self._stats.record_connection()
+        try:
+            return self._backend.connect_tcp(address, port, timeout, local_address, socket_options)
+        except httpcore.ConnectError:
+            self._dns.forget(host, port)
+            raise
+
+    def connect_unix_socket(self, path, timeout=None, socket_options=None):
+        return self._backend.connect_unix_socket(path, timeout, socket_options)
+
+    def sleep(self, seconds: float) -> None:
+        self._backend.sleep(seconds)
+
+
+class _AsyncCachedDNSBackend(httpcore.AsyncNetworkBackend):
+    def __init__(self, dns: DNSCache, stats: ProviderStats):
+        self._backend = httpcore.AnyIOBackend()
+        self._dns = dns
+        self._stats = stats
+
+    async def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        address = await self._dns.aresolve(host, port)
+        self._stats.record_connection()
+        try:
+            return await self._backend.connect_tcp(address, port, timeout, local_address, socket_options)
+        except httpcore.ConnectError:
+            self._dns.forget(host, port)
+            raise
+
+    async def connect_unix_socket(self, path, timeout=None, socket_options=None):
+        return await self._backend.connect_unix_socket(path, timeout, socket_options)
+
+    async def sleep(self, seconds: float) -> None:
+        await self._backend.sleep(seconds)
+
+
+def _pool_kwargs() -> dict[str, Any]:
+    return {
+        "ssl_context": httpx.create_ssl_context(),
+        "max_connections": higgs_config.PROVIDER_MAX_CONNECTIONS,
+        "max_keepalive_connections": higgs_config.PROVIDER_MAX_KEEPALIVE_CONNECTIONS,
+        "keepalive_expiry": higgs_config.PROVIDER_KEEPALIVE_EXPIRY,
+        "http1": True,
+        "http2": higgs_config.PROVIDER_HTTP2_ENABLED,
+    }
+
+
+class _ProviderTransport(httpx.HTTPTransport):
+    """httpx transport over a connection pool built with the DNS caching network backend."""
+
+    def __init__(self, dns: DNSCache, stats: ProviderStats):
+        self._pool = httpcore.ConnectionPool(network_backend=_CachedDNSBackend(dns, stats), **_pool_kwargs())
+        self.stats = stats
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        self.stats.record_request()
+        request.extensions["trace"] = _RequestTimer(self.stats, request.extensions.get("trace")).trace
+        return super().handle_request(request)
+
+
+class _AsyncProviderTransport(httpx.AsyncHTTPTransport):
+    def __init__(self, dns: DNSCache, stats: ProviderStats):
+        self._pool = httpcore.AsyncConnectionPool(network_backend=_AsyncCachedDNSBackend(dns, stats), **_pool_kwargs())
+        self.stats = stats
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.stats.record_request()
+        request.extensions["trace"] = _RequestTimer(self.stats, request.extensions.get("trace")).atrace
+        return await super().handle_async_request(request)
+
+
+class ProviderPool:
+    """Process-wide keep-alive clients for outbound LLM provider calls, one sync and one async per origin.
+
+    All models pointing at the same provider share the connections, so TLS handshakes are paid once
+    and ``PROVIDER_MAX_CONNECTIONS`` caps the sockets opened to each provider.
+    """
+
+    def __init__(self):
+        self.dns = DNSCache(higgs_config.PROVIDER_DNS_CACHE_TTL)
+        self._clients: dict[str, httpx.Client] = {}
+        self._async_clients: dict[str, httpx.AsyncClient] = {}
+        self._stats: dict[str, ProviderStats] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(
+            connect=higgs_config.HTTP_REQUEST_MAX_CONNECT_TIMEOUT,
+            read=higgs_config.HTTP_REQUEST_MAX_READ_TIMEOUT,
+            write=higgs_config.HTTP_REQUEST_MAX_WRITE_TIMEOUT,
+            pool=higgs_config.HTTP_REQUEST_MAX_CONNECT_TIMEOUT,
+        )
+
+    @staticmethod
+    def _key(base_url: str) -> str:
+        parts = urlsplit(base_url)
+        return f"{parts.scheme}://{parts.netloc}"
+
+    def _provider_stats(self, key: str) -> ProviderStats:
+        if key not in self._stats:
+            self._stats[key] = ProviderStats()
+        return self._stats[key]
+
+    def get_client(self, base_url: str) -> httpx.Client:
+        key = self._key(base_url)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                transport = _ProviderTransport(self.dns, self._provider_stats(key))
+                client = httpx.Client(transport=transport, timeout=self.timeout)
+                self._clients[key] = client
+            return client
+
+    def get_async_client(self, base_url: str) -> httpx.AsyncClient:
+        key = self._key(base_url)
+        with self._lock:
+            client = self._async_clients.get(key)
+            if client is None:
+                transport = _AsyncProviderTransport(self.dns, self._provider_stats(key))
+                client = httpx.AsyncClient(transport=transport, timeout=self.timeout)
+                self._async_clients[key] = client
+            return client
+
+    @staticmethod
+    def _connections(client: Optional[httpx.Client | httpx.AsyncClient]) -> list:
+        if client is None:
+            return []
+        return list(client._transport._pool.connections)  # type: ignore[union-attr]
+
+    def stats(self) -> dict[str, Any]:
+        providers = {}
+        for key, stats in list(self._stats.items()):
+            connections = self._connections(self._clients.get(key)) + self._connections(self._async_clients.get(key))
+            requests = stats.requests
+            providers[key] = {
+                "open_connections": sum(1 for conn in connections if not conn.is_closed()),
+                "idle_connections": sum(1 for conn in connections if conn.is_idle()),
+                "http2_connections": sum(1 for conn in connections if "HTTP/2" in conn.info()),
+                "requests": requests,
+                "connections_opened": stats.connections_opened,
+                "reuse_ratio": round(1 - stats.connections_opened / requests, 4) if requests else None,
+                "queue_wait_avg_ms": round(stats.queue_wait_total / requests * 1000, 2) if requests else None,
+                "queue_wait_max_ms": round(stats.queue_wait_max * 1000, 2),
+            }
+        return {"dns_cache": {"hits": self.dns.hits, "misses": self.dns.misses}, "providers": providers}
+
+    async def aclose(self) -> None:
+        with self._lock:
+            clients, self._clients = self._clients, {}
+            async_clients, self._async_clients = self._async_clients, {}
+        for client in clients.values():
+            client.close()
+        for async_client in async_clients.values():
+            await async_client.aclose()
+
+
+provider_pool = ProviderPool()
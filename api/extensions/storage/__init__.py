@@ -0,0 +1,24 @@
+import functools
+import importlib.util
+import os
+
+from configs import higgs_config
+
+from .base_storage import BaseStorage
+
+__all__ = ["BaseStorage", "get_storage"]
+
+
+@functools.cache
+def get_storage() -> BaseStorage:
+    if higgs_config.STORAGE_TYPE != "opendal":
+        raise ValueError(f"Storage type {higgs_config.STORAGE_TYPE} is not supported yet")
+    scheme = higgs_config.OPENDAL_SCHEME
+    if scheme == "fs" and importlib.util.find_spec("opendal") is None:
+        from .opendal_storage import LocalFileStorage
+
+        return LocalFileStorage(os.environ.get("OPENDAL_FS_ROOT", "storage"))
+
+    from .opendal_storage import OpenDALStorage
+
+    return OpenDALStorage(scheme)
@@ -0,0 +1,23 @@
+from abc import ABC, abstractmethod
+from collections.abc import Iterator
+
+
+class BaseStorage(ABC):
+    """Files of the storage configured by STORAGE_TYPE, addressed by their path relative to its root."""
+
+    @abstractmethod
+    def scan(self, prefix: str = "") -> Iterator[str]:
+        """Paths of the files under ``prefix``, recursively."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def load(self, path: str) -> bytes:
+        raise NotImplementedError
+
+    @abstractmethod
+    def load_stream(self, path: str, chunk_size: int = 1024 * 1024) -> Iterator[bytes]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def exists(self, path: str) -> bool:
+        raise NotImplementedError
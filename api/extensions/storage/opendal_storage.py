@@ -0,0 +1,67 @@
+import os
+from collections.abc import Iterator
+from pathlib import Path
+
+from .base_storage import BaseStorage
+
+
+def _scheme_options(scheme: str) -> dict[str, str]:
+    # 与 OpenDAL 的配置方式一致：OPENDAL_<SCHEME>_<KEY>，例如 OPENDAL_FS_ROOT、OPENDAL_S3_BUCKET
+    prefix = f"OPENDAL_{scheme.upper()}_"
+    return {key[len(prefix) :].lower(): value for key, value in os.environ.items() if key.startswith(prefix)}
+
+
+class OpenDALStorage(BaseStorage):
+    def __init__(self, scheme: str):
+        import opendal
+
+        self.operator = opendal.Operator(scheme, **_scheme_options(scheme))
+
+    def scan(self, prefix: str = "") -> Iterator[str]:
+        for entry in self.operator.list(prefix, recursive=True):
+            if not entry.path.endswith("/"):
+                yield entry.path
+
+    def load(self, path: str) -> bytes:
+        return bytes(self.operator.read(path))
+
+    def load_stream(self, path: str, chunk_size: int = 1024 * 1024) -> Iterator[bytes]:
+        with self.operator.open(path, "rb") as file:
+            while chunk := file.read(chunk_size):
+                yield bytes(chunk)
+
+    def exists(self, path: str) -> bool:
+        return bool(self.operator.exists(path))
+
+
+class LocalFileStorage(BaseStorage):
+    """The ``fs`` scheme of OpenDAL without the opendal package, rooted at OPENDAL_FS_ROOT."""
+
+    def __init__(self, root: str):
+        self.root = Path(root).resolve()
+
+    def _path(self, path: str) -> Path:
+        resolved = (self.root / path).resolve()
+        if not resolved.is_relative_to(self.root):
+            raise ValueError(f"Path {path} is outside of the storage root")
+        return resolved
+
+    def scan(self, prefix: str = "") -> Iterator[str]:
+        base = self._path(prefix)
+        if base.is_file():
+            yield base.relative_to(self.root).as_posix()
+            return
+        for directory, _, files in os.walk(base):
+            for name in sorted(files):
+                yield (Path(directory) / name).relative_to(self.root).as_posix()
+
+    def load(self, path: str) -> bytes:
+        return self._path(path).read_bytes()
+
+    def load_stream(self, path: str, chunk_size: int = 1024 * 1024) -> Iterator[bytes]:
+        with self._path(path).open("rb") as file:
+            while chunk := file.read(chunk_size):
+                yield chunk
+
+    def exists(self, path: str) -> bool:
+        return self._path(path).exists()
@@ -18,6 +18,8 @@ logger = logging.getLogger('alembic.env')
 from configs import higgs_config
 from models.base import Base
 from models.hero import Hero
+from models.agent_session import AgentSessionRun, AgentSessionSummary
+from models.ingestion import IngestionCheckpoint
 
 def get_metadata():
     return Base.metadata
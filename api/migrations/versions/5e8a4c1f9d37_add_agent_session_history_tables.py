@@ -0,0 +1,49 @@
+"""Add agent session history tables
+
+Revision ID: 5e8a4c1f9d37
+Revises: 7c41e9b05d2a
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e8a4c1f9d37'
+down_revision: Union[str, None] = '7c41e9b05d2a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('agent_session_run',
+    sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+    sa.Column('session_id', sqlmodel.sql.sqltypes.AutoString(length=255), nullable=False),
+    sa.Column('run_id', sqlmodel.sql.sqltypes.AutoString(length=255), nullable=False),
+    sa.Column('run', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id', name=op.f('agent_session_run_pkey')),
+    sa.UniqueConstraint('run_id', name=op.f('agent_session_run_run_id_key'))
+    )
+    op.create_index('agent_session_run_session_id_id_idx', 'agent_session_run', ['session_id', 'id'], unique=False)
+    op.create_table('agent_session_summary',
+    sa.Column('session_id', sqlmodel.sql.sqltypes.AutoString(length=255), nullable=False),
+    sa.Column('summary', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('summarized_runs', sa.Integer(), nullable=False),
+    sa.Column('last_run_id', sa.BigInteger(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('session_id', name=op.f('agent_session_summary_pkey'))
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('agent_session_summary')
+    op.drop_index('agent_session_run_session_id_id_idx', table_name='agent_session_run')
+    op.drop_table('agent_session_run')
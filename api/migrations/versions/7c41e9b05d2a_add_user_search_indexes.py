@@ -0,0 +1,50 @@
+"""Add user search indexes
+
+Revision ID: 7c41e9b05d2a
+Revises: 3f9c2d7a1b84
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from models.search import SEARCH_EXTENSION, SEARCH_INDEX_OPS
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c41e9b05d2a'
+down_revision: Union[str, None] = '3f9c2d7a1b84'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 使用 PGVECTOR_PG_BIGM 选择 pg_trgm 或 pg_bigm
+    op.execute(f"CREATE EXTENSION IF NOT EXISTS {SEARCH_EXTENSION}")
+    # 大表上建索引不阻塞写入
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'username_search_idx',
+            'user',
+            ['username'],
+            postgresql_using='gin',
+            postgresql_ops={'username': SEARCH_INDEX_OPS},
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'full_name_search_idx',
+            'user',
+            ['full_name'],
+            postgresql_using='gin',
+            postgresql_ops={'full_name': SEARCH_INDEX_OPS},
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('full_name_search_idx', table_name='user', postgresql_concurrently=True)
+        op.drop_index('username_search_idx', table_name='user', postgresql_concurrently=True)
@@ -1,12 +1,21 @@
-from .engine import get_session
-from .hero import Hero
+from .agent_session import AgentSessionRun, AgentSessionSummary
+from .batch import BatchItemResult
+from .engine import get_async_session, get_session
+from .hero import Hero, HeroCreate
+from .ingestion import IngestionCheckpoint
 from .user import User, UserCreate, UserRead, UserUpdate
 
 __all__ = [
+    "AgentSessionRun",
+    "AgentSessionSummary",
+    "BatchItemResult",
     "Hero",
+    "HeroCreate",
+    "IngestionCheckpoint",
     "User",
     "UserCreate",
     "UserRead",
     "UserUpdate",
+    "get_async_session",
     "get_session",
 ]
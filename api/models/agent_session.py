@@ -0,0 +1,36 @@
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import BigInteger, Column
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlmodel import Field, Index
+
+from .base import Base
+
+
+class AgentSessionRun(Base, table=True):
+    """Runs evicted from the history window of an agno session, in the order they were archived."""
+
+    __tablename__ = "agent_session_run"
+    __table_args__ = (
+        # 按会话顺序读取归档的 run
+        Index("agent_session_run_session_id_id_idx", "session_id", "id"),
+    )
+
+    id: int | None = Field(default=None, sa_column=Column(BigInteger, primary_key=True, autoincrement=True))
+    session_id: str = Field(max_length=255)
+    run_id: str = Field(max_length=255, unique=True)
+    run: dict[str, Any] = Field(sa_column=Column(JSONB, nullable=False))
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class AgentSessionSummary(Base, table=True):
+    """Rolling summary of the archived runs of a session, up to the archived run ``last_run_id``."""
+
+    __tablename__ = "agent_session_summary"
+
+    session_id: str = Field(max_length=255, primary_key=True)
+    summary: str
+    summarized_runs: int = Field(default=0)
+    last_run_id: int = Field(default=0, sa_type=BigInteger)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
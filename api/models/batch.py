@@ -0,0 +1,10 @@
+from typing import Literal, Optional
+
+from .base import Base
+
+
+class BatchItemResult(Base):
+    index: int
+    status: Literal["created", "updated", "skipped"]
+    id: Optional[int] = None
+    detail: Optional[str] = None
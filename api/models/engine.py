@@ -1,6 +1,12 @@
+import functools
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlmodel import MetaData, Session, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from configs import higgs_config
+from contexts.deadline import remaining_time
 
 POSTGRES_INDEXES_NAMING_CONVENTION = {
     "ix": "%(column_0_label)s_idx",
@@ -20,10 +26,53 @@ engine = create_engine(
     **higgs_config.SQLALCHEMY_ENGINE_OPTIONS,
 )
 
+# 异步引擎，供 async 路由使用，避免阻塞事件循环
+async_engine = create_async_engine(
+    url=higgs_config.SQLALCHEMY_ASYNC_DATABASE_URI,
+    echo=higgs_config.SQLALCHEMY_ECHO,
+    echo_pool=higgs_config.SQLALCHEMY_ECHO,
+    **higgs_config.SQLALCHEMY_ASYNC_ENGINE_OPTIONS,
+)
+
+async_session_maker = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+
+
+@event.listens_for(Session, "after_begin")
+def _bound_statement_timeout(session, transaction, connection):
+    """Bound the statements of a transaction opened by a request to the time left before its deadline."""
+    if not higgs_config.REQUEST_DEADLINE_STATEMENT_TIMEOUT:
+        return
+    remaining = remaining_time()
+    if remaining is None:
+        return
+    connection.exec_driver_sql(f"SET LOCAL statement_timeout = {max(int(remaining * 1000), 1)}")
+
+
+@functools.cache
+def get_pgvector_engine() -> AsyncEngine:
+    """Async engine of the pgvector database configured by PGVECTOR_*, created on first use."""
+    if not higgs_config.PGVECTOR_ASYNC_DATABASE_URI:
+        raise ValueError("PGVECTOR_HOST is not configured")
+    return create_async_engine(
+        url=higgs_config.PGVECTOR_ASYNC_DATABASE_URI,
+        echo=higgs_config.SQLALCHEMY_ECHO,
+        pool_size=higgs_config.PGVECTOR_MIN_CONNECTION,
+        max_overflow=max(higgs_config.PGVECTOR_MAX_CONNECTION - higgs_config.PGVECTOR_MIN_CONNECTION, 0),
+        pool_recycle=higgs_config.SQLALCHEMY_POOL_RECYCLE,
+    )
+
 
 def get_session():
-    with Session(engine) as session:
+    with Session(engine, expire_on_commit=False) as session:
+        try:
+            yield session
+        finally:
+            session.close()
+
+
+async def get_async_session():
+    async with async_session_maker() as session:
         try:
             yield session
         finally:
-            session.close()
\ No newline at end of file
+            await session.close()
@@ -8,3 +8,9 @@ class Hero(Base, table=True):
     name: str
     secret_name: str
     age: int | None = None
+
+
+class HeroCreate(Base):
+    name: str
+    secret_name: str
+    age: int | None = None
@@ -0,0 +1,28 @@
+from datetime import datetime
+from typing import Literal
+
+from sqlalchemy import BigInteger, Column, UniqueConstraint
+from sqlmodel import Field
+
+from .base import Base
+
+IngestionStatus = Literal["processing", "done", "failed"]
+
+
+class IngestionCheckpoint(Base, table=True):
+    """Ingestion state of a source file in a knowledge collection, so that an interrupted ingestion can resume.
+
+    A file is skipped while its ``content_hash`` is unchanged and its status is ``done``.
+    """
+
+    __tablename__ = "ingestion_checkpoint"
+    __table_args__ = (UniqueConstraint("collection", "source", name="ingestion_checkpoint_collection_source_key"),)
+
+    id: int | None = Field(default=None, sa_column=Column(BigInteger, primary_key=True, autoincrement=True))
+    collection: str = Field(max_length=64)
+    source: str = Field(max_length=1024)
+    content_hash: str = Field(max_length=64)
+    chunks: int = Field(default=0)
+    status: str = Field(default="processing", max_length=16)
+    error: str | None = Field(default=None)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
@@ -0,0 +1,7 @@
+from configs import higgs_config
+
+# pg_trgm 的 GIN 索引可以支撑 3 个字符及以上的 LIKE '%x%'，更短的查询取不出三元组，只能扫描整个索引。
+# 中文姓名的查询大多只有一两个字，需要开启 pg_bigm，它对一两个字的查询也能使用索引
+SEARCH_EXTENSION = "pg_bigm" if higgs_config.PGVECTOR_PG_BIGM else "pg_trgm"
+SEARCH_INDEX_OPS = "gin_bigm_ops" if higgs_config.PGVECTOR_PG_BIGM else "gin_trgm_ops"
+SEARCH_SIMILARITY_FUNCTION = "bigm_similarity" if higgs_config.PGVECTOR_PG_BIGM else "similarity"
@@ -1,11 +1,22 @@
 from datetime import datetime
 
-from sqlmodel import Field
+from sqlmodel import Field, Index
 
 from .base import Base
+from .search import SEARCH_INDEX_OPS
 
 
 class User(Base, table=True):
+    __table_args__ = (
+        # keyset 分页按 (created_at, id) 排序
+        Index("created_at_id_idx", "created_at", "id"),
+        # search_by_name 的子串搜索
+        Index("username_search_idx", "username", postgresql_using="gin", postgresql_ops={"username": SEARCH_INDEX_OPS}),
+        Index(
+            "full_name_search_idx", "full_name", postgresql_using="gin", postgresql_ops={"full_name": SEARCH_INDEX_OPS}
+        ),
+    )
+
     id: int | None = Field(default=None, primary_key=True)
     username: str = Field(index=True, unique=True)
     email: str = Field(index=True, unique=True)
@@ -35,4 +46,4 @@ class UserRead(Base):
     full_name: str | None = None
     is_active: bool
     created_at: datetime
-    updated_at: datetime
\ No newline at end of file
+    updated_at: datetime
@@ -0,0 +1,122 @@
+import csv
+import io
+import json
+import posixpath
+from collections import deque
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
+from typing import Any, Optional
+
+TEXT_EXTENSIONS = {".txt", ".md", ".markdown", ".rst", ".log"}
+HTML_EXTENSIONS = {".html", ".htm"}
+# 由粗到细的切分位置，最后按字符硬切
+SEPARATORS = ("\n\n", "\n", "。", ". ", "！", "？", "；", "; ", "，", ", ", " ", "")
+
+
+@dataclass
+class Chunk:
+    index: int
+    content: str
+    metadata: dict[str, Any] = field(default_factory=dict)
+
+
+class _HTMLText(HTMLParser):
+    BLOCKS = {"p", "div", "br", "li", "tr", "section", "article", "h1", "h2", "h3", "h4", "h5", "h6", "pre"}
+
+    def __init__(self):
+        super().__init__()
+        self.parts: list[str] = []
+        self._skip = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ("script", "style"):
+            self._skip += 1
+        elif tag in self.BLOCKS:
+            self.parts.append("\n\n")
+
+    def handle_endtag(self, tag):
+        if tag in ("script", "style"):
+            self._skip = max(self._skip - 1, 0)
+
+    def handle_data(self, data):
+        if not self._skip:
+            self.parts.append(data)
+
+
+def parse(path: str, data: bytes) -> Optional[str]:
+    """Text of a file by its extension, None when the format is not supported."""
+    extension = posixpath.splitext(path)[1].lower()
+    if extension not in TEXT_EXTENSIONS | HTML_EXTENSIONS | {".csv", ".json", ".jsonl"}:
+        return None
+    text = data.decode("utf-8-sig", errors="replace")
+    if extension in HTML_EXTENSIONS:
+        parser = _HTMLText()
+        parser.feed(text)
+        parser.close()
+        return "".join(parser.parts)
+    if extension == ".csv":
+        rows = csv.reader(io.StringIO(text))
+        header = next(rows, [])
+        # 每行一段，带上列名，切分后的片段仍可独立理解
+        return "\n\n".join(
+            "\n".join(f"{name}: {value}" for name, value in zip(header, row) if value) for row in rows if row
+        )
+    if extension == ".json":
+        return json.dumps(json.loads(text), ensure_ascii=False, indent=1)
+    if extension == ".jsonl":
+        return "\n\n".join(
+            json.dumps(json.loads(line), ensure_ascii=False, indent=1) for line in text.splitlines() if line.strip()
+        )
+    return text
+
+
+def _split(text: str, size: int, separators: tuple[str, ...]) -> list[str]:
+    if len(text) <= size:
+        return [text]
+    separator = next(separator for separator in separators if separator in text)
+    if not separator:
+        return [text[start : start + size] for start in range(0, len(text), size)]
+    remaining = separators[separators.index(separator) + 1 :]
+    parts = text.split(separator)
+    pieces = []
+    for index, part in enumerate(parts):
+        # 分隔符留在前一段的末尾
+        if index < len(parts) - 1:
+            part += separator
+        if part:
+            pieces.extend(_split(part, size, remaining) if len(part) > size else [part])
+    return pieces
+
+
+def split_text(text: str, size: int, overlap: int = 0) -> list[str]:
+    """Chunks of at most ``size`` characters cut at the coarsest separator possible.
+
+    Each chunk starts with up to ``overlap`` characters of whole pieces from the end of the previous one.
+    """
+    chunks = []
+    window: deque[str] = deque()
+    length = 0
+    for piece in _split(text, size, SEPARATORS):
+        if window and length + len(piece) > size:
+            chunks.append("".join(window))
+            while window and (length > overlap or length + len(piece) > size):
+                length -= len(window.popleft())
+        window.append(piece)
+        length += len(piece)
+    if window:
+        chunks.append("".join(window))
+    return [chunk.strip() for chunk in chunks if chunk.strip()]
+
+
+def parse_and_chunk(path: str, data: bytes, size: int, overlap: int) -> Optional[list[Chunk]]:
+    """Parse a file and split it into chunks, None when its format is not supported.
+
+    Runs in the retrieval process pool, so it only takes and returns plain data.
+    """
+    text = parse(path, data)
+    if text is None:
+        return None
+    return [
+        Chunk(index, content, {"source": path, "chunk": index})
+        for index, content in enumerate(split_text(text, size, overlap))
+    ]
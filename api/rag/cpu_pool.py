@@ -0,0 +1,49 @@
+import asyncio
+import functools
+import multiprocessing
+import threading
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Optional, TypeVar
+
+from configs import higgs_config
+
+T = TypeVar("T")
+
+_lock = threading.Lock()
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_cpu_pool() -> Optional[ProcessPoolExecutor]:
+    """Process pool of RETRIEVAL_SERVICE_EXECUTORS workers for CPU bound retrieval steps, None when set to 0."""
+    global _pool
+    if not higgs_config.RETRIEVAL_SERVICE_EXECUTORS:
+        return None
+    if _pool is None:
+        with _lock:
+            if _pool is None:
+                # 进程中已有多个线程（事件循环、写入队列、Redis），fork 可能复制被持有的锁
+                _pool = ProcessPoolExecutor(
+                    max_workers=higgs_config.RETRIEVAL_SERVICE_EXECUTORS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+    return _pool
+
+
+async def run_cpu_bound(func: Callable[..., T], *args: Any) -> T:
+    """Run ``func`` in the process pool, out of the GIL of the event loop, or in a thread without a pool.
+
+    ``func`` and its arguments are pickled, pass module level functions and plain data.
+    """
+    pool = get_cpu_pool()
+    if pool is None:
+        return await asyncio.to_thread(func, *args)
+    return await asyncio.get_running_loop().run_in_executor(pool, functools.partial(func, *args))
+
+
+def shutdown_cpu_pool() -> None:
+    global _pool
+    with _lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
@@ -0,0 +1,170 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+from typing import Any, Literal, Optional
+
+from configs import higgs_config
+from contexts.deadline import remaining_time
+
+from .cpu_pool import run_cpu_bound
+from .rerank import maximal_marginal_relevance
+from .retrieval import HybridRetriever, RetrievalMode, RetrievedDocument
+from .vector_store import MetadataFilter
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RetrievalSource:
+    collection: str
+    filters: Optional[MetadataFilter] = None
+    mode: RetrievalMode = "hybrid"
+    # 该来源在合并排序中的权重
+    weight: float = 1.0
+    # 秒，None 时使用 RETRIEVAL_SOURCE_TIMEOUT
+    timeout: Optional[float] = None
+
+
+@dataclass
+class SourceReport:
+    collection: str
+    status: Literal["ok", "timeout", "error"]
+    documents: int = 0
+    timings: dict[str, float] = field(default_factory=dict)
+    error: Optional[str] = None
+
+
+@dataclass
+class MultiRetrievalResult:
+    documents: list[RetrievedDocument]
+    sources: list[SourceReport]
+    # 毫秒：sources（等待各来源）、merge、mmr、total
+    timings: dict[str, float] = field(default_factory=dict)
+
+
+class RetrievalExecutor:
+    """Fan a query out to several collections and merge their rankings.
+
+    At most RETRIEVAL_SERVICE_EXECUTORS collections are searched at the same time. Each source has
+    its own timeout, bounded by the deadline of the request, and a source that misses it is reported
+    and left out instead of delaying the answer. The rankings are merged with a weighted reciprocal
+    rank fusion, optionally diversified by MMR in the retrieval process pool.
+    """
+
+    def __init__(self):
+        self._retrievers: dict[str, HybridRetriever] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._lock = threading.Lock()
+        self.queries = 0
+        self.source_queries = 0
+        self.timeouts = 0
+        self.errors = 0
+
+    @property
+    def max_concurrency(self) -> int:
+        return higgs_config.RETRIEVAL_SERVICE_EXECUTORS or os.cpu_count() or 1
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def retriever(self, collection: str) -> HybridRetriever:
+        retriever = self._retrievers.get(collection)
+        if retriever is None:
+            retriever = self._retrievers.setdefault(collection, HybridRetriever(collection))
+        return retriever
+
+    def _timeout(self, source: RetrievalSource) -> float:
+        timeout = source.timeout or higgs_config.RETRIEVAL_SOURCE_TIMEOUT
+        remaining = remaining_time()
+        return min(timeout, remaining) if remaining is not None else timeout
+
+    async def _retrieve_source(
+        self, query: str, source: RetrievalSource, top_k: int
+    ) -> tuple[SourceReport, list[RetrievedDocument]]:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._count("source_queries")
+        start = time.perf_counter()
+
+        async def run():
+            # 排队等待的时间也计入该来源的超时
+            async with self._semaphore:  # type: ignore[union-attr]
+                return await self.retriever(source.collection).retrieve(
+                    query, top_k=top_k, filters=source.filters, mode=source.mode
+                )
+
+        try:
+            result = await asyncio.wait_for(run(), self._timeout(source))
+        except TimeoutError:
+            self._count("timeouts")
+            elapsed = round((time.perf_counter() - start) * 1000, 2)
+            return SourceReport(source.collection, "timeout", timings={"total": elapsed}), []
+        except Exception as e:
+            logger.warning("Failed to retrieve from %s", source.collection, exc_info=True)
+            self._count("errors")
+            elapsed = round((time.perf_counter() - start) * 1000, 2)
+            return SourceReport(source.collection, "error", timings={"total": elapsed}, error=str(e)), []
+        return SourceReport(source.collection, "ok", len(result.documents), result.timings), result.documents
+
+    async def retrieve(
+        self,
+        query: str,
+        sources: Sequence[RetrievalSource],
+        top_k: Optional[int] = None,
+        mmr: Optional[bool] = None,
+    ) -> MultiRetrievalResult:
+        start = time.perf_counter()
+        self._count("queries")
+        top_k = top_k or higgs_config.RETRIEVAL_TOP_K
+        mmr = higgs_config.RETRIEVAL_MMR_ENABLED if mmr is None else mmr
+        # MMR 需要更多的候选文档才有选择的余地
+        per_source = max(top_k, higgs_config.RETRIEVAL_CANDIDATES) if mmr else top_k
+        outcomes = await asyncio.gather(*(self._retrieve_source(query, source, per_source) for source in sources))
+        timings = {"sources": round((time.perf_counter() - start) * 1000, 2)}
+
+        merge_start = time.perf_counter()
+        merged: dict[tuple[Optional[str], str], RetrievedDocument] = {}
+        scores: dict[tuple[Optional[str], str], float] = {}
+        for source, (_, documents) in zip(sources, outcomes):
+            for rank, document in enumerate(documents, start=1):
+                key = (document.collection, document.id)
+                merged.setdefault(key, document)
+                scores[key] = scores.get(key, 0.0) + source.weight / (higgs_config.RETRIEVAL_RRF_K + rank)
+        for key, document in merged.items():
+            document.score = scores[key]
+        ranked = sorted(merged.values(), key=lambda document: document.score, reverse=True)
+        timings["merge"] = round((time.perf_counter() - merge_start) * 1000, 2)
+
+        if mmr and len(ranked) > top_k:
+            mmr_start = time.perf_counter()
+            selected = await run_cpu_bound(
+                maximal_marginal_relevance,
+                [document.content for document in ranked],
+                [document.score for document in ranked],
+                top_k,
+                higgs_config.RETRIEVAL_MMR_LAMBDA,
+            )
+            ranked = [ranked[index] for index in selected]
+            timings["mmr"] = round((time.perf_counter() - mmr_start) * 1000, 2)
+
+        timings["total"] = round((time.perf_counter() - start) * 1000, 2)
+        return MultiRetrievalResult(ranked[:top_k], [report for report, _ in outcomes], timings)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "process_pool_workers": higgs_config.RETRIEVAL_SERVICE_EXECUTORS,
+            "collections": len(self._retrievers),
+            "queries": self.queries,
+            "source_queries": self.source_queries,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+        }
+
+
+retrieval_executor = RetrievalExecutor()
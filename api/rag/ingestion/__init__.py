@@ -0,0 +1,4 @@
+from .jobs import IngestionJob, IngestionRunningError, ingestion_jobs
+from .pipeline import IngestionPipeline, IngestionReport
+
+__all__ = ["IngestionJob", "IngestionPipeline", "IngestionReport", "IngestionRunningError", "ingestion_jobs"]
@@ -0,0 +1,57 @@
+"""Ingest the files of the configured storage into a knowledge collection.
+
+Files whose content did not change since their last successful ingestion are skipped, so an
+interrupted run can simply be started again. Set RETRIEVAL_EMBEDDING_PROVIDER=hashing to run it
+without an embedding provider.
+
+    python -m rag.ingestion docs --prefix handbook/
+"""
+
+import argparse
+import asyncio
+import json
+
+from .pipeline import IngestionPipeline
+
+PROGRESS_INTERVAL = 5
+
+
+async def run(args) -> int:
+    from models.engine import async_engine, get_pgvector_engine
+    from rag.cpu_pool import shutdown_cpu_pool
+
+    pipeline = IngestionPipeline(args.collection)
+
+    async def progress():
+        while True:
+            await asyncio.sleep(PROGRESS_INTERVAL)
+            report = pipeline.report
+            pipeline.tick()
+            print(
+                f"  {report.ingested + report.skipped + report.unsupported + report.failed}/{report.documents} files"
+                f"  {report.chunks} chunks  {report.docs_per_sec:.1f} docs/s  {report.chunks_per_sec:.1f} chunks/s",
+                flush=True,
+            )
+
+    progress_task = asyncio.create_task(progress())
+    try:
+        report = await pipeline.run(args.prefix, args.force)
+    finally:
+        progress_task.cancel()
+        await async_engine.dispose()
+        await get_pgvector_engine().dispose()
+        shutdown_cpu_pool()
+    print(json.dumps(report.to_dict(), ensure_ascii=False, indent=2))
+    return 0 if report.status == "done" and not report.failed else 1
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("collection")
+    parser.add_argument("--prefix", default="", help="only ingest the files under this path of the storage")
+    parser.add_argument("--force", action="store_true", help="also re-ingest the files that did not change")
+    raise SystemExit(asyncio.run(run(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
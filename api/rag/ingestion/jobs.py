@@ -0,0 +1,83 @@
+import asyncio
+import contextvars
+import logging
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Optional
+
+from .pipeline import IngestionPipeline
+
+logger = logging.getLogger(__name__)
+
+# 进程内保留的已结束任务数，任务的持久状态在检查点表中
+MAX_FINISHED_JOBS = 100
+
+
+class IngestionRunningError(Exception):
+    pass
+
+
+@dataclass
+class IngestionJob:
+    collection: str
+    prefix: str
+    force: bool
+    pipeline: IngestionPipeline
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+    def to_dict(self) -> dict[str, Any]:
+        if self.running:
+            self.pipeline.tick()
+        return {
+            "id": self.id,
+            "force": self.force,
+            "created_at": self.created_at.isoformat(),
+            **self.pipeline.report.to_dict(),
+        }
+
+
+class IngestionJobs:
+    """Ingestions running in the background of this process, at most one per collection."""
+
+    def __init__(self):
+        self._jobs: OrderedDict[str, IngestionJob] = OrderedDict()
+
+    def start(self, collection: str, prefix: str = "", force: bool = False) -> IngestionJob:
+        for job in self._jobs.values():
+            if job.collection == collection and job.running:
+                raise IngestionRunningError(f"Collection {collection} is already being ingested by job {job.id}")
+        job = IngestionJob(collection, prefix, force, IngestionPipeline(collection))
+        # 不继承请求的上下文，否则请求的截止时间会作用到后台任务的查询上
+        job.task = asyncio.create_task(job.pipeline.run(prefix, force), context=contextvars.Context())
+        self._jobs[job.id] = job
+        self._evict()
+        return job
+
+    def _evict(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if not job.running]
+        for job_id in finished[: max(len(finished) - MAX_FINISHED_JOBS, 0)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        return self._jobs.get(job_id)
+
+    def list(self) -> list[IngestionJob]:
+        return list(self._jobs.values())
+
+    async def shutdown(self) -> None:
+        running = [job.task for job in self._jobs.values() if job.task is not None and job.running]
+        for task in running:
+            task.cancel()
+        # 被取消的文件保持 processing 状态，下次导入时重新处理
+        await asyncio.gather(*running, return_exceptions=True)
+
+
+ingestion_jobs = IngestionJobs()
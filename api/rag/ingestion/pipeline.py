@@ -0,0 +1,345 @@
+import asyncio
+import hashlib
+import logging
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Literal, Optional
+
+import openai
+
+from agents.embedding_cache import CachedEmbedder
+from agents.embeddings import Embedder
+from configs import higgs_config
+from extensions.storage import BaseStorage, get_storage
+from models.engine import async_session_maker
+from models.ingestion import IngestionStatus
+from repositories.ingestion_repository import AsyncIngestionCheckpointRepository
+
+from ..chunking import Chunk, parse_and_chunk
+from ..cpu_pool import run_cpu_bound
+from ..executor import retrieval_executor
+from ..keyword_store import KeywordDocument
+from ..retrieval import HybridRetriever
+from ..vector_store import VectorDocument
+
+logger = logging.getLogger(__name__)
+
+# 嵌入请求遇到限流、连接错误或服务端错误时的重试次数和首次退避时间（秒）
+EMBEDDING_RETRIES = 3
+EMBEDDING_BACKOFF = 1.0
+TRANSIENT_ERRORS = (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError)
+# 批次被服务商拒绝后 token 上限最多缩小到的值
+MIN_BATCH_TOKENS = 256
+# 报告中保留的失败文件数
+MAX_REPORTED_FAILURES = 100
+
+PendingChunk = tuple[str, Chunk]
+
+
+def estimate_tokens(text: str) -> int:
+    # 与 provider 准入控制一致，按 4 个字符一个 token 估算
+    return len(text) // 4 + 1
+
+
+def chunk_id(source: str, index: int) -> str:
+    # 路径可能很长，用其摘要作为前缀，重新导入同一文件时片段的 id 保持不变
+    return f"{hashlib.blake2b(source.encode(), digest_size=16).hexdigest()}:{index}"
+
+
+@dataclass
+class IngestionReport:
+    collection: str
+    prefix: str = ""
+    status: Literal["running", "done", "failed", "cancelled"] = "running"
+    # 列出的文件数，以及其中导入完成、未变化而跳过、格式不支持和失败的文件数
+    documents: int = 0
+    ingested: int = 0
+    skipped: int = 0
+    unsupported: int = 0
+    failed: int = 0
+    chunks: int = 0
+    # 嵌入批次数，以及批次被拒绝后的拆分次数和临时错误的重试次数
+    batches: int = 0
+    splits: int = 0
+    retries: int = 0
+    # 在嵌入缓存中找到和未找到的片段数
+    embedding_cache_hits: int = 0
+    embedding_cache_misses: int = 0
+    # 秒
+    elapsed: float = 0.0
+    error: Optional[str] = None
+    failures: dict[str, str] = field(default_factory=dict)
+
+    @property
+    def docs_per_sec(self) -> float:
+        return self.ingested / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def chunks_per_sec(self) -> float:
+        return self.chunks / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def embedding_cache_hit_ratio(self) -> Optional[float]:
+        lookups = self.embedding_cache_hits + self.embedding_cache_misses
+        return self.embedding_cache_hits / lookups if lookups else None
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            **asdict(self),
+            "elapsed": round(self.elapsed, 3),
+            "docs_per_sec": round(self.docs_per_sec, 2),
+            "chunks_per_sec": round(self.chunks_per_sec, 2),
+            "embedding_cache_hit_ratio": (
+                round(self.embedding_cache_hit_ratio, 4) if self.embedding_cache_hit_ratio is not None else None
+            ),
+        }
+
+
+class IngestionPipeline:
+    """Ingest the files of the configured storage into the vector and keyword stores of a collection.
+
+    Files are read by INGESTION_FILE_CONCURRENCY workers and parsed and chunked in the retrieval process
+    pool. Their chunks wait in a queue bounded by INGESTION_MAX_PENDING_CHUNKS, so reading pauses while
+    embedding falls behind. A batch is only assembled once one of the INGESTION_EMBEDDING_CONCURRENCY
+    embedding slots is free, from the chunks queued in the meantime, up to INGESTION_EMBEDDING_BATCH_SIZE
+    chunks and a token budget that is halved whenever the provider rejects a batch as too large.
+
+    Each file has a checkpoint with the hash of its content. It is marked done once all its chunks are
+    written, and a later run skips the files whose content did not change since.
+    """
+
+    def __init__(
+        self, collection: str, storage: Optional[BaseStorage] = None, retriever: Optional[HybridRetriever] = None
+    ):
+        self.collection = collection
+        self.storage = storage or get_storage()
+        # 与检索共用同一个 retriever，关键词统计的缓存随写入失效
+        self.retriever = retriever or retrieval_executor.retriever(collection)
+        self.report = IngestionReport(collection)
+        self._batch_tokens = higgs_config.INGESTION_EMBEDDING_BATCH_TOKENS
+        # 每个文件还未写入的片段数
+        self._remaining: dict[str, int] = {}
+        self._failed: set[str] = set()
+        self._start = time.perf_counter()
+
+    def tick(self) -> None:
+        self.report.elapsed = time.perf_counter() - self._start
+
+    async def run(self, prefix: str = "", force: bool = False) -> IngestionReport:
+        """Ingest the files under ``prefix``, ``force`` also re-ingests the unchanged ones."""
+        self.report.prefix = prefix
+        self._start = time.perf_counter()
+        try:
+            await self._run(prefix, force)
+            self.report.status = "done"
+        except asyncio.CancelledError:
+            self.report.status = "cancelled"
+            raise
+        except Exception as e:
+            logger.exception("Failed to ingest %s into %s", prefix or "/", self.collection)
+            self.report.status = "failed"
+            self.report.error = str(e)
+        finally:
+            self.tick()
+        return self.report
+
+    async def _run(self, prefix: str, force: bool) -> None:
+        await asyncio.gather(
+            self.retriever.vector_store.create_collection(), self.retriever.keyword_store.create_collection()
+        )
+        sources = await asyncio.to_thread(lambda: list(self.storage.scan(prefix)))
+        self.report.documents = len(sources)
+        async with async_session_maker() as session:
+            checkpoints = await AsyncIngestionCheckpointRepository(session).get_checkpoints(self.collection)
+
+        files: asyncio.Queue[str] = asyncio.Queue()
+        for source in sources:
+            files.put_nowait(source)
+        chunks: asyncio.Queue[Optional[PendingChunk]] = asyncio.Queue(higgs_config.INGESTION_MAX_PENDING_CHUNKS)
+
+        async def read_files() -> None:
+            while not files.empty():
+                source = files.get_nowait()
+                checkpoint = checkpoints.get(source)
+                done_hash = None
+                if checkpoint is not None and checkpoint.status == "done" and not force:
+                    done_hash = checkpoint.content_hash
+                await self._read_file(source, done_hash, checkpoint is not None, chunks)
+
+        async def read_all() -> None:
+            await asyncio.gather(*(read_files() for _ in range(higgs_config.INGESTION_FILE_CONCURRENCY)))
+            await chunks.put(None)
+
+        tasks = [asyncio.create_task(read_all()), asyncio.create_task(self._embed_batches(chunks))]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _read_file(
+        self, source: str, done_hash: Optional[str], ingested_before: bool, queue: asyncio.Queue[Optional[PendingChunk]]
+    ) -> None:
+        try:
+            data = await asyncio.to_thread(self.storage.load, source)
+            content_hash = hashlib.sha256(data).hexdigest()
+            if content_hash == done_hash:
+                self.report.skipped += 1
+                return
+            chunks = await run_cpu_bound(
+                parse_and_chunk, source, data, higgs_config.INGESTION_CHUNK_SIZE, higgs_config.INGESTION_CHUNK_OVERLAP
+            )
+            del data
+            if chunks is None:
+                self.report.unsupported += 1
+                return
+            if ingested_before:
+                # 文件变化后片段可能变少，先删除上次导入的全部片段
+                await self.retriever.delete({"source": source})
+            status: IngestionStatus = "processing" if chunks else "done"
+            await self._save_checkpoint(source, content_hash, len(chunks), status)
+        except Exception as e:
+            logger.warning("Failed to read %s", source, exc_info=True)
+            await self._fail([source], e)
+            return
+
+        if not chunks:
+            self.report.ingested += 1
+            return
+        self._remaining[source] = len(chunks)
+        for chunk in chunks:
+            await queue.put((source, chunk))
+
+    async def _embed_batches(self, queue: asyncio.Queue[Optional[PendingChunk]]) -> None:
+        semaphore = asyncio.Semaphore(higgs_config.INGESTION_EMBEDDING_CONCURRENCY)
+        tasks: set[asyncio.Task] = set()
+        carry: Optional[PendingChunk] = None
+        try:
+            while True:
+                # 先等待空闲的嵌入并发再组批，等待期间解析出的片段在队列中累积成更大的批次
+                await semaphore.acquire()
+                item = carry if carry is not None else await queue.get()
+                carry = None
+                batch: list[PendingChunk] = []
+                tokens = 0
+                while item is not None:
+                    batch.append(item)
+                    tokens += estimate_tokens(item[1].content)
+                    if len(batch) >= higgs_config.INGESTION_EMBEDDING_BATCH_SIZE or queue.empty():
+                        break
+                    item = queue.get_nowait()
+                    if item is not None and tokens + estimate_tokens(item[1].content) > self._batch_tokens:
+                        carry = item
+                        break
+                if batch:
+                    task = asyncio.create_task(self._write_batch(batch, semaphore))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                else:
+                    semaphore.release()
+                if item is None:
+                    break
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _embed_batch(self, texts: list[str]) -> list[list[float]]:
+        embedder = self.retriever.embedder
+        if not isinstance(embedder, CachedEmbedder):
+            return await self._embed(embedder, texts)
+        # 先查缓存，只有缓存中没有的片段才请求服务商，批次拆分也只作用于它们
+        embeddings = await embedder.lookup(texts)
+        missing = [index for index, embedding in enumerate(embeddings) if embedding is None]
+        self.report.embedding_cache_hits += len(texts) - len(missing)
+        self.report.embedding_cache_misses += len(missing)
+        if missing:
+            missing_texts = [texts[index] for index in missing]
+            fresh = await self._embed(embedder.embedder, missing_texts)
+            await embedder.store(missing_texts, fresh)
+            for index, embedding in zip(missing, fresh):
+                embeddings[index] = embedding
+        return embeddings  # type: ignore[return-value]
+
+    async def _embed(self, embedder: Embedder, texts: list[str]) -> list[list[float]]:
+        configured = higgs_config.INGESTION_EMBEDDING_BATCH_TOKENS
+        for attempt in range(EMBEDDING_RETRIES + 1):
+            try:
+                embeddings = await embedder.aembed(texts)
+            except TRANSIENT_ERRORS:
+                if attempt == EMBEDDING_RETRIES:
+                    raise
+                self.report.retries += 1
+                await asyncio.sleep(EMBEDDING_BACKOFF * 2**attempt)
+                continue
+            except openai.APIStatusError as e:
+                if e.status_code not in (400, 413) or len(texts) == 1:
+                    raise
+                # 批次超过了服务商的限制：拆成两半重试，后续的批次也减半
+                self.report.splits += 1
+                self._batch_tokens = max(self._batch_tokens // 2, MIN_BATCH_TOKENS)
+                middle = len(texts) // 2
+                first, second = await asyncio.gather(
+                    self._embed(embedder, texts[:middle]), self._embed(embedder, texts[middle:])
+                )
+                return first + second
+            # 成功后逐步恢复到配置的上限
+            self._batch_tokens = min(self._batch_tokens + configured // 10, configured)
+            return embeddings
+        raise AssertionError("unreachable")
+
+    async def _write_batch(self, batch: list[PendingChunk], semaphore: asyncio.Semaphore) -> None:
+        try:
+            embeddings = await self._embed_batch([chunk.content for _, chunk in batch])
+            ids = [chunk_id(source, chunk.index) for source, chunk in batch]
+            await asyncio.gather(
+                self.retriever.vector_store.upsert(
+                    [
+                        VectorDocument(id, embedding, chunk.content, chunk.metadata)
+                        for id, (_, chunk), embedding in zip(ids, batch, embeddings)
+                    ]
+                ),
+                self.retriever.keyword_store.add(
+                    [KeywordDocument(id, chunk.content, chunk.metadata) for id, (_, chunk) in zip(ids, batch)]
+                ),
+            )
+        except Exception as e:
+            logger.warning("Failed to write a batch of %d chunks into %s", len(batch), self.collection, exc_info=True)
+            await self._fail(list(dict.fromkeys(source for source, _ in batch)), e)
+            return
+        finally:
+            semaphore.release()
+
+        self.report.batches += 1
+        self.report.chunks += len(batch)
+        completed = []
+        for source, _ in batch:
+            self._remaining[source] -= 1
+            if not self._remaining[source] and source not in self._failed:
+                completed.append(source)
+        if completed:
+            await self._set_status(completed, "done")
+            self.report.ingested += len(completed)
+        self.tick()
+
+    async def _fail(self, sources: list[str], error: Exception) -> None:
+        sources = [source for source in sources if source not in self._failed]
+        self._failed.update(sources)
+        self.report.failed += len(sources)
+        for source in sources:
+            if len(self.report.failures) < MAX_REPORTED_FAILURES:
+                self.report.failures[source] = str(error) or type(error).__name__
+        try:
+            await self._set_status(sources, "failed", str(error))
+        except Exception:
+            logger.warning("Failed to save the checkpoints of %s", sources, exc_info=True)
+
+    async def _save_checkpoint(self, source: str, content_hash: str, chunks: int, status: IngestionStatus) -> None:
+        async with async_session_maker() as session:
+            await AsyncIngestionCheckpointRepository(session).save(
+                self.collection, source, content_hash, chunks, status
+            )
+
+    async def _set_status(self, sources: list[str], status: IngestionStatus, error: Optional[str] = None) -> None:
+        async with async_session_maker() as session:
+            await AsyncIngestionCheckpointRepository(session).set_status(self.collection, sources, status, error)
@@ -0,0 +1,14 @@
+from configs import higgs_config
+
+from .base import KeywordDocument, KeywordSearchResult, KeywordStore
+
+__all__ = ["KeywordDocument", "KeywordSearchResult", "KeywordStore", "create_keyword_store"]
+
+
+def create_keyword_store(collection: str) -> KeywordStore:
+    """Keyword index of ``collection``, tokenized as selected by KEYWORD_STORE."""
+    if higgs_config.KEYWORD_STORE == "jieba":
+        from .postgres import PostgresKeywordStore
+
+        return PostgresKeywordStore(collection)
+    raise ValueError(f"Keyword store {higgs_config.KEYWORD_STORE} is not supported")
@@ -0,0 +1,60 @@
+from abc import ABC, abstractmethod
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from rag.vector_store.base import MetadataFilter
+
+
+@dataclass
+class KeywordDocument:
+    id: str
+    content: str
+    metadata: dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class KeywordSearchResult:
+    id: str
+    content: str
+    metadata: dict[str, Any]
+    # BM25 得分，只在同一次查询的结果之间可比
+    score: float
+
+
+class KeywordStore(ABC):
+    """Full-text index of a collection, updated document by document without rebuilds."""
+
+    def __init__(self, collection: str):
+        self.collection = collection
+
+    @abstractmethod
+    async def create_collection(self) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def drop_collection(self) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def add(self, documents: Sequence[KeywordDocument]) -> int:
+        """Index the documents, replacing the ones with the same id."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def delete(self, filters: MetadataFilter) -> int:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def delete_by_ids(self, ids: Sequence[str]) -> int:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def search(
+        self, query: str, top_k: int = 4, filters: Optional[MetadataFilter] = None
+    ) -> list[KeywordSearchResult]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def count(self) -> int:
+        raise NotImplementedError
@@ -0,0 +1,198 @@
+import asyncio
+import json
+import math
+import time
+from collections.abc import Sequence
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from configs import higgs_config
+from rag.cpu_pool import run_cpu_bound
+from rag.vector_store.base import MetadataFilter
+from rag.vector_store.pgvector import COLLECTION_NAME, build_filter
+
+from .base import KeywordDocument, KeywordSearchResult, KeywordStore
+from .tokenizer import batch_term_frequencies, tokenize
+
+# 文档数和平均长度的缓存时间（秒），它们随写入缓慢变化
+STATS_TTL = 60
+# 查询最多使用的检索词数
+MAX_QUERY_TERMS = 32
+
+
+class PostgresKeywordStore(KeywordStore):
+    """BM25 keyword search over a ``keyword_<collection>`` table in the pgvector database.
+
+    Each row keeps the distinct terms of its document under a GIN index and their frequencies. The
+    document frequencies are counted through the index at query time, so indexing a document is a
+    single row write and never requires rebuilding the collection.
+    """
+
+    def __init__(self, collection: str, engine: Optional[AsyncEngine] = None):
+        if not COLLECTION_NAME.match(collection):
+            raise ValueError(f"Invalid collection name: {collection}")
+        super().__init__(collection)
+        self.table = f"keyword_{collection}"
+        self._engine_override = engine
+        self._ready = False
+        # (过期时间, 文档数, 平均长度)
+        self._stats: Optional[tuple[float, int, float]] = None
+
+    def _engine(self) -> AsyncEngine:
+        if self._engine_override is not None:
+            return self._engine_override
+        from models.engine import get_pgvector_engine
+
+        return get_pgvector_engine()
+
+    async def create_collection(self) -> None:
+        if self._ready:
+            return
+        async with self._engine().begin() as conn:
+            await conn.execute(
+                text(
+                    f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                    "id VARCHAR(255) PRIMARY KEY, "
+                    "content TEXT NOT NULL, "
+                    "metadata JSONB NOT NULL DEFAULT '{}', "
+                    "terms TEXT[] NOT NULL, "
+                    "term_freqs JSONB NOT NULL, "
+                    "length INTEGER NOT NULL, "
+                    "created_at TIMESTAMPTZ NOT NULL DEFAULT now())"
+                )
+            )
+            await conn.execute(
+                text(f"CREATE INDEX IF NOT EXISTS {self.table}_terms_idx ON {self.table} USING gin (terms)")
+            )
+            await conn.execute(
+                text(
+                    f"CREATE INDEX IF NOT EXISTS {self.table}_metadata_idx "
+                    f"ON {self.table} USING gin (metadata jsonb_path_ops)"
+                )
+            )
+        self._ready = True
+
+    async def drop_collection(self) -> None:
+        async with self._engine().begin() as conn:
+            await conn.execute(text(f"DROP TABLE IF EXISTS {self.table}"))
+        self._ready = False
+        self._stats = None
+
+    async def add(self, documents: Sequence[KeywordDocument]) -> int:
+        if not documents:
+            return 0
+        await self.create_collection()
+        # 分词是 CPU 密集的，批量交给进程池
+        frequencies = await run_cpu_bound(batch_term_frequencies, [document.content for document in documents])
+        async with self._engine().begin() as conn:
+            await conn.execute(
+                text(
+                    f"INSERT INTO {self.table} (id, content, metadata, terms, term_freqs, length) "
+                    "VALUES (:id, :content, CAST(:metadata AS jsonb), CAST(:terms AS text[]), "
+                    "CAST(:term_freqs AS jsonb), :length) "
+                    "ON CONFLICT (id) DO UPDATE SET content = excluded.content, metadata = excluded.metadata, "
+                    "terms = excluded.terms, term_freqs = excluded.term_freqs, length = excluded.length"
+                ),
+                [
+                    {
+                        "id": document.id,
+                        "content": document.content,
+                        "metadata": json.dumps(document.metadata),
+                        "terms": list(freqs),
+                        "term_freqs": json.dumps(freqs, ensure_ascii=False),
+                        "length": sum(freqs.values()),
+                    }
+                    for document, freqs in zip(documents, frequencies)
+                ],
+            )
+        self._stats = None
+        return len(documents)
+
+    async def delete(self, filters: MetadataFilter) -> int:
+        if not filters:
+            raise ValueError("Deleting a whole collection needs drop_collection")
+        await self.create_collection()
+        where, params = build_filter(filters)
+        async with self._engine().begin() as conn:
+            result = await conn.execute(text(f"DELETE FROM {self.table} {where}"), params)
+        self._stats = None
+        return result.rowcount
+
+    async def delete_by_ids(self, ids: Sequence[str]) -> int:
+        if not ids:
+            return 0
+        await self.create_collection()
+        async with self._engine().begin() as conn:
+            result = await conn.execute(text(f"DELETE FROM {self.table} WHERE id = ANY(:ids)"), {"ids": list(ids)})
+        self._stats = None
+        return result.rowcount
+
+    async def _collection_stats(self, conn: AsyncConnection) -> tuple[int, float]:
+        now = time.monotonic()
+        if self._stats is None or self._stats[0] < now:
+            row = (await conn.execute(text(f"SELECT count(*), coalesce(avg(length), 0) FROM {self.table}"))).one()
+            self._stats = (now + STATS_TTL, row[0], float(row[1]))
+        return self._stats[1], self._stats[2]
+
+    async def search(
+        self, query: str, top_k: int = 4, filters: Optional[MetadataFilter] = None
+    ) -> list[KeywordSearchResult]:
+        # 查询很短，进程间传输的开销比分词本身更大
+        terms = list(dict.fromkeys(await asyncio.to_thread(tokenize, query)))[:MAX_QUERY_TERMS]
+        if not terms:
+            return []
+        await self.create_collection()
+        where, params = build_filter(filters)
+        where = f"{where} AND d.terms && CAST(:terms AS text[])" if where else "WHERE d.terms && CAST(:terms AS text[])"
+        async with self._engine().connect() as conn:
+            documents, avg_length = await self._collection_stats(conn)
+            if not documents:
+                return []
+            frequencies = (
+                await conn.execute(
+                    text(
+                        f"SELECT q.term, (SELECT count(*) FROM {self.table} d WHERE d.terms @> ARRAY[q.term]) "
+                        "FROM unnest(CAST(:terms AS text[])) AS q(term)"
+                    ),
+                    {"terms": terms},
+                )
+            ).all()
+            idfs = {
+                term: math.log(1 + (documents - frequency + 0.5) / (frequency + 0.5))
+                for term, frequency in frequencies
+                if frequency
+            }
+            if not idfs:
+                return []
+            rows = (
+                await conn.execute(
+                    text(
+                        "SELECT d.id, d.content, d.metadata, "
+                        "sum(q.idf * f.tf * (:k1 + 1) / (f.tf + :k1 * (1 - :b + :b * d.length / :avg_length))) "
+                        "AS score "
+                        f"FROM {self.table} d "
+                        "JOIN unnest(CAST(:terms AS text[]), CAST(:idfs AS float8[])) AS q(term, idf) "
+                        "ON q.term = ANY(d.terms) "
+                        "CROSS JOIN LATERAL (SELECT CAST(d.term_freqs ->> q.term AS float8) AS tf) f "
+                        f"{where} GROUP BY d.id ORDER BY score DESC, d.id LIMIT :top_k"
+                    ),
+                    {
+                        **params,
+                        "terms": list(idfs),
+                        "idfs": list(idfs.values()),
+                        "k1": higgs_config.KEYWORD_BM25_K1,
+                        "b": higgs_config.KEYWORD_BM25_B,
+                        "avg_length": max(avg_length, 1.0),
+                        "top_k": top_k,
+                    },
+                )
+            ).all()
+        return [KeywordSearchResult(row.id, row.content, row.metadata, float(row.score)) for row in rows]
+
+    async def count(self) -> int:
+        await self.create_collection()
+        async with self._engine().connect() as conn:
+            rows: int = (await conn.execute(text(f"SELECT count(*) FROM {self.table}"))).scalar_one()
+        return rows
@@ -0,0 +1,50 @@
+import logging
+import re
+import threading
+from collections import Counter
+
+# 不含任何文字或数字的片段（标点、空白）不作为检索词
+_WORD = re.compile(r"\w")
+
+STOPWORDS = frozenset(
+    [
+        "的", "了", "和", "是", "在", "就", "都", "而", "及", "与", "着", "或", "一个", "没有", "我们", "你们",
+        "他们", "它", "这", "那", "之", "也", "吗", "呢", "吧", "啊",
+        "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is", "it", "of", "on", "or",
+        "that", "the", "this", "to", "was", "with",
+    ]
+)  # fmt: skip
+
+_lock = threading.Lock()
+_initialized = False
+
+
+def _jieba():
+    global _initialized
+    import jieba
+
+    if not _initialized:
+        # 词典只加载一次，并发的首次调用不重复加载
+        with _lock:
+            if not _initialized:
+                jieba.setLogLevel(logging.WARNING)
+                jieba.initialize()
+                _initialized = True
+    return jieba
+
+
+def tokenize(text: str) -> list[str]:
+    """Search mode segmentation: long words are also split into the shorter words they contain."""
+    return [
+        token
+        for token in (word.strip().lower() for word in _jieba().lcut_for_search(text))
+        if token and _WORD.search(token) and token not in STOPWORDS
+    ]
+
+
+def term_frequencies(text: str) -> dict[str, int]:
+    return dict(Counter(tokenize(text)))
+
+
+def batch_term_frequencies(texts: list[str]) -> list[dict[str, int]]:
+    return [term_frequencies(text) for text in texts]
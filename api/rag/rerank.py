@@ -0,0 +1,28 @@
+from rag.keyword_store.tokenizer import tokenize
+
+
+def jaccard(left: frozenset[str], right: frozenset[str]) -> float:
+    if not left or not right:
+        return 0.0
+    return len(left & right) / len(left | right)
+
+
+def maximal_marginal_relevance(contents: list[str], scores: list[float], top_k: int, lambda_: float) -> list[int]:
+    """Indices of ``top_k`` documents, each chosen for its relevance minus its overlap with the chosen ones.
+
+    The overlap is the Jaccard similarity of the terms, so documents from collections embedded with
+    different models are still comparable. Runs in the retrieval process pool.
+    """
+    terms = [frozenset(tokenize(content)) for content in contents]
+    low, high = min(scores, default=0.0), max(scores, default=0.0)
+    relevance = [(score - low) / (high - low) if high > low else 1.0 for score in scores]
+    redundancy = [0.0] * len(contents)
+    remaining = list(range(len(contents)))
+    selected: list[int] = []
+    while remaining and len(selected) < top_k:
+        best = max(remaining, key=lambda index: lambda_ * relevance[index] - (1 - lambda_) * redundancy[index])
+        selected.append(best)
+        remaining.remove(best)
+        for index in remaining:
+            redundancy[index] = max(redundancy[index], jaccard(terms[index], terms[best]))
+    return selected
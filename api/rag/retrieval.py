@@ -0,0 +1,209 @@
+import asyncio
+import functools
+import time
+from collections.abc import Awaitable, Sequence
+from dataclasses import dataclass, field
+from typing import Any, Literal, Optional, TypeVar
+
+from agents.embedding_cache import with_embedding_cache
+from agents.embeddings import Embedder, HashingEmbedder
+from configs import higgs_config
+
+from .keyword_store import KeywordDocument, KeywordSearchResult, KeywordStore, create_keyword_store
+from .vector_store import MetadataFilter, VectorDocument, VectorSearchResult, VectorStore, create_vector_store
+
+RetrievalMode = Literal["hybrid", "vector", "keyword"]
+FusionMethod = Literal["rrf", "weighted"]
+
+T = TypeVar("T")
+
+
+@dataclass
+class RetrievedDocument:
+    id: str
+    content: str
+    metadata: dict[str, Any]
+    # 融合后的得分
+    score: float
+    # 在各路检索结果中的名次（从 1 开始）和原始得分，未被该路召回时为 None
+    vector_rank: Optional[int] = None
+    vector_score: Optional[float] = None
+    keyword_rank: Optional[int] = None
+    keyword_score: Optional[float] = None
+    collection: Optional[str] = None
+
+
+@dataclass
+class RetrievalResult:
+    documents: list[RetrievedDocument]
+    # 各阶段耗时（毫秒）：embedding、vector、keyword、fusion、total
+    timings: dict[str, float] = field(default_factory=dict)
+
+
+@functools.cache
+def get_retrieval_embedder() -> Embedder:
+    if higgs_config.RETRIEVAL_EMBEDDING_PROVIDER == "hashing":
+        return with_embedding_cache(HashingEmbedder(higgs_config.RETRIEVAL_EMBEDDING_DIMENSIONS))
+    return with_embedding_cache(
+        Embedder(
+            model=higgs_config.RETRIEVAL_EMBEDDING_MODEL,
+            base_url=higgs_config.RETRIEVAL_EMBEDDING_BASE_URL,
+            dimensions=higgs_config.RETRIEVAL_EMBEDDING_DIMENSIONS,
+            api_key=higgs_config.RETRIEVAL_EMBEDDING_API_KEY,
+        )
+    )
+
+
+def _merge(
+    vector_results: Sequence[VectorSearchResult], keyword_results: Sequence[KeywordSearchResult]
+) -> dict[str, RetrievedDocument]:
+    documents: dict[str, RetrievedDocument] = {}
+    for rank, vector_result in enumerate(vector_results, start=1):
+        documents[vector_result.id] = RetrievedDocument(
+            vector_result.id,
+            vector_result.content,
+            vector_result.metadata,
+            0.0,
+            vector_rank=rank,
+            vector_score=vector_result.score,
+        )
+    for rank, keyword_result in enumerate(keyword_results, start=1):
+        document = documents.setdefault(
+            keyword_result.id,
+            RetrievedDocument(keyword_result.id, keyword_result.content, keyword_result.metadata, 0.0),
+        )
+        document.keyword_rank = rank
+        document.keyword_score = keyword_result.score
+    return documents
+
+
+def reciprocal_rank_fusion(
+    vector_results: Sequence[VectorSearchResult],
+    keyword_results: Sequence[KeywordSearchResult],
+    k: int = 60,
+    vector_weight: float = 0.5,
+) -> list[RetrievedDocument]:
+    """Score each document by ``weight / (k + rank)`` summed over the searches that returned it.
+
+    Only the ranks are used, so the cosine similarities and the unbounded BM25 scores need no calibration.
+    """
+    documents = _merge(vector_results, keyword_results)
+    for document in documents.values():
+        if document.vector_rank is not None:
+            document.score += vector_weight / (k + document.vector_rank)
+        if document.keyword_rank is not None:
+            document.score += (1 - vector_weight) / (k + document.keyword_rank)
+    return sorted(documents.values(), key=lambda document: document.score, reverse=True)
+
+
+def _normalize(scores: list[float]) -> list[float]:
+    low, high = min(scores, default=0.0), max(scores, default=0.0)
+    if high == low:
+        return [1.0] * len(scores)
+    return [(score - low) / (high - low) for score in scores]
+
+
+def weighted_fusion(
+    vector_results: Sequence[VectorSearchResult],
+    keyword_results: Sequence[KeywordSearchResult],
+    vector_weight: float = 0.5,
+) -> list[RetrievedDocument]:
+    """Weighted sum of the scores of both searches, each min-max normalized over its own results."""
+    documents = _merge(vector_results, keyword_results)
+    vector_scores = _normalize([vector_result.score for vector_result in vector_results])
+    for vector_result, score in zip(vector_results, vector_scores):
+        documents[vector_result.id].score += vector_weight * score
+    keyword_scores = _normalize([keyword_result.score for keyword_result in keyword_results])
+    for keyword_result, score in zip(keyword_results, keyword_scores):
+        documents[keyword_result.id].score += (1 - vector_weight) * score
+    return sorted(documents.values(), key=lambda document: document.score, reverse=True)
+
+
+class HybridRetriever:
+    """Vector and keyword retrieval over one collection, run concurrently and fused into a single ranking."""
+
+    def __init__(
+        self,
+        collection: str,
+        embedder: Optional[Embedder] = None,
+        vector_store: Optional[VectorStore] = None,
+        keyword_store: Optional[KeywordStore] = None,
+    ):
+        self.collection = collection
+        self.embedder = embedder or get_retrieval_embedder()
+        self.vector_store = vector_store or create_vector_store(collection, self.embedder.dimensions)
+        self.keyword_store = keyword_store or create_keyword_store(collection)
+
+    async def add_documents(self, documents: Sequence[KeywordDocument]) -> int:
+        """Embed and index the documents in both stores, replacing the ones with the same id."""
+        if not documents:
+            return 0
+        embeddings = await self.embedder.aembed([document.content for document in documents])
+        await asyncio.gather(
+            self.vector_store.upsert(
+                [
+                    VectorDocument(document.id, embedding, document.content, document.metadata)
+                    for document, embedding in zip(documents, embeddings)
+                ]
+            ),
+            self.keyword_store.add(documents),
+        )
+        return len(documents)
+
+    async def delete(self, filters: MetadataFilter) -> None:
+        await asyncio.gather(self.vector_store.delete(filters), self.keyword_store.delete(filters))
+
+    async def delete_by_ids(self, ids: Sequence[str]) -> None:
+        await asyncio.gather(self.vector_store.delete_by_ids(ids), self.keyword_store.delete_by_ids(ids))
+
+    async def retrieve(
+        self,
+        query: str,
+        top_k: Optional[int] = None,
+        filters: Optional[MetadataFilter] = None,
+        mode: RetrievalMode = "hybrid",
+        fusion: Optional[FusionMethod] = None,
+        vector_weight: Optional[float] = None,
+    ) -> RetrievalResult:
+        start = time.perf_counter()
+        top_k = top_k or higgs_config.RETRIEVAL_TOP_K
+        candidates = top_k if mode != "hybrid" else max(top_k, higgs_config.RETRIEVAL_CANDIDATES)
+        timings: dict[str, float] = {}
+
+        async def timed(stage: str, awaitable: Awaitable[T]) -> T:
+            stage_start = time.perf_counter()
+            try:
+                return await awaitable
+            finally:
+                timings[stage] = round((time.perf_counter() - stage_start) * 1000, 2)
+
+        async def vector_search() -> list[VectorSearchResult]:
+            if mode == "keyword":
+                return []
+            embedding = await timed("embedding", self.embedder.aembed_one(query))
+            return await timed("vector", self.vector_store.search(embedding, candidates, filters))
+
+        async def keyword_search() -> list[KeywordSearchResult]:
+            if mode == "vector":
+                return []
+            return await timed("keyword", self.keyword_store.search(query, candidates, filters))
+
+        vector_results, keyword_results = await asyncio.gather(vector_search(), keyword_search())
+
+        fusion_start = time.perf_counter()
+        vector_weight = higgs_config.RETRIEVAL_VECTOR_WEIGHT if vector_weight is None else vector_weight
+        if mode == "vector":
+            vector_weight = 1.0
+        elif mode == "keyword":
+            vector_weight = 0.0
+        if (fusion or higgs_config.RETRIEVAL_FUSION) == "rrf":
+            documents = reciprocal_rank_fusion(
+                vector_results, keyword_results, higgs_config.RETRIEVAL_RRF_K, vector_weight
+            )
+        else:
+            documents = weighted_fusion(vector_results, keyword_results, vector_weight)
+        for document in documents[:top_k]:
+            document.collection = self.collection
+        timings["fusion"] = round((time.perf_counter() - fusion_start) * 1000, 2)
+        timings["total"] = round((time.perf_counter() - start) * 1000, 2)
+        return RetrievalResult(documents[:top_k], timings)
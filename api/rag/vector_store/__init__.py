@@ -0,0 +1,17 @@
+from configs import higgs_config
+
+from .base import MetadataFilter, VectorDocument, VectorSearchResult, VectorStore
+
+__all__ = ["MetadataFilter", "VectorDocument", "VectorSearchResult", "VectorStore", "create_vector_store"]
+
+
+def create_vector_store(collection: str, dimensions: int) -> VectorStore:
+    """Vector store of ``collection`` in the database selected by VECTOR_STORE."""
+    vector_store = higgs_config.VECTOR_STORE
+    if vector_store == "pgvector":
+        from .pgvector import PGVectorStore
+
+        return PGVectorStore(collection, dimensions)
+    if not vector_store:
+        raise ValueError("VECTOR_STORE is not configured")
+    raise ValueError(f"Vector store {vector_store} is not supported")
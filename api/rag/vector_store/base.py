@@ -0,0 +1,79 @@
+from abc import ABC, abstractmethod
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+# 元数据过滤条件：值为 list/tuple 时匹配其中任意一个，否则要求相等
+MetadataFilter = dict[str, Any]
+
+
+@dataclass
+class VectorDocument:
+    id: str
+    embedding: list[float]
+    content: str = ""
+    metadata: dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class VectorSearchResult:
+    id: str
+    content: str
+    metadata: dict[str, Any]
+    # 相似度，越大越相似
+    score: float
+
+
+class VectorStore(ABC):
+    """A collection of embedded documents in a vector database, addressed by document id.
+
+    Implementations create their collection on first use. Metadata filters select documents whose
+    metadata equals every given value, a list value matches any of its items.
+    """
+
+    def __init__(self, collection: str, dimensions: int):
+        self.collection = collection
+        self.dimensions = dimensions
+
+    def _check_dimensions(self, embedding: Sequence[float]) -> None:
+        if len(embedding) != self.dimensions:
+            raise ValueError(
+                f"Embedding of {len(embedding)} dimensions in collection {self.collection} of {self.dimensions}"
+            )
+
+    @abstractmethod
+    async def create_collection(self) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def drop_collection(self) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def upsert(self, documents: Sequence[VectorDocument]) -> int:
+        """Insert the documents or replace the ones with the same id, returns the number written."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def delete(self, filters: MetadataFilter) -> int:
+        """Delete the documents matching ``filters``, returns the number deleted."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def delete_by_ids(self, ids: Sequence[str]) -> int:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def search(
+        self,
+        embedding: Sequence[float],
+        top_k: int = 4,
+        filters: Optional[MetadataFilter] = None,
+        score_threshold: Optional[float] = None,
+    ) -> list[VectorSearchResult]:
+        """The ``top_k`` documents closest to ``embedding``, most similar first."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def count(self) -> int:
+        raise NotImplementedError
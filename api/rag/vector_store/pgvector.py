@@ -0,0 +1,281 @@
+import json
+import logging
+import math
+import re
+from collections.abc import Sequence
+from typing import Any, Literal, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from configs import higgs_config
+
+from .base import MetadataFilter, VectorDocument, VectorSearchResult, VectorStore
+
+logger = logging.getLogger(__name__)
+
+IndexType = Literal["hnsw", "ivfflat"]
+
+# distance: (operator, operator class)
+DISTANCE_OPERATORS = {
+    "cosine": ("<=>", "vector_cosine_ops"),
+    "l2": ("<->", "vector_l2_ops"),
+    "inner_product": ("<#>", "vector_ip_ops"),
+}
+
+# 集合名直接拼接到表名和索引名中
+COLLECTION_NAME = re.compile(r"^[a-z0-9_]{1,48}$")
+
+
+def vector_literal(embedding: Sequence[float]) -> str:
+    return "[" + ",".join(repr(float(value)) for value in embedding) + "]"
+
+
+def ivfflat_lists(rows: int) -> int:
+    # pgvector 的建议：100 万行以内 rows / 1000，以上 sqrt(rows)
+    return max(rows // 1000 if rows <= 1_000_000 else int(math.sqrt(rows)), 1)
+
+
+def build_filter(filters: Optional[MetadataFilter]) -> tuple[str, dict[str, Any]]:
+    """WHERE clause on the metadata column, containment conditions are served by its GIN index."""
+    if not filters:
+        return "", {}
+    clauses = []
+    params: dict[str, Any] = {}
+    equal = {key: value for key, value in filters.items() if not isinstance(value, (list, tuple))}
+    if equal:
+        clauses.append("metadata @> CAST(:filter AS jsonb)")
+        params["filter"] = json.dumps(equal)
+    any_of = [(key, value) for key, value in filters.items() if isinstance(value, (list, tuple))]
+    for index, (key, values) in enumerate(any_of):
+        clauses.append(f"CAST(:values_{index} AS jsonb) @> jsonb_build_array(metadata -> :key_{index})")
+        params[f"key_{index}"] = key
+        params[f"values_{index}"] = json.dumps(list(values))
+    return "WHERE " + " AND ".join(clauses), params
+
+
+class PGVectorStore(VectorStore):
+    """Collection stored in a pgvector table ``vector_<collection>`` with an HNSW or IVFFlat index.
+
+    HNSW indexes are created with the collection, an IVFFlat index needs the data to place its lists
+    so it is only built by ``create_index``, usually after the first load. An index that already exists
+    decides ``index_type`` over the configuration. Searches run with
+    ``hnsw.ef_search`` / ``ivfflat.probes`` set for their transaction only.
+    """
+
+    def __init__(
+        self,
+        collection: str,
+        dimensions: int,
+        index_type: Optional[IndexType] = None,
+        distance: Optional[str] = None,
+        engine: Optional[AsyncEngine] = None,
+    ):
+        if not COLLECTION_NAME.match(collection):
+            raise ValueError(f"Invalid collection name: {collection}")
+        super().__init__(collection, dimensions)
+        self.table = f"vector_{collection}"
+        self.index_type: IndexType = index_type or higgs_config.PGVECTOR_INDEX_TYPE
+        self.distance = distance or higgs_config.PGVECTOR_DISTANCE
+        self.operator, self.operator_class = DISTANCE_OPERATORS[self.distance]
+        self._engine_override = engine
+        self._ready = False
+
+    def _engine(self) -> AsyncEngine:
+        if self._engine_override is not None:
+            return self._engine_override
+        from models.engine import get_pgvector_engine
+
+        return get_pgvector_engine()
+
+    @property
+    def index_name(self) -> str:
+        return f"{self.table}_embedding_idx"
+
+    def _score(self, distance: float) -> float:
+        if self.distance == "cosine":
+            return 1 - distance
+        # <#> 返回内积的相反数，l2 距离越小越相似
+        return -distance
+
+    async def create_collection(self) -> None:
+        if self._ready:
+            return
+        async with self._engine().begin() as conn:
+            await conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+            await conn.execute(
+                text(
+                    f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                    "id VARCHAR(255) PRIMARY KEY, "
+                    "content TEXT NOT NULL DEFAULT '', "
+                    "metadata JSONB NOT NULL DEFAULT '{}', "
+                    f"embedding vector({self.dimensions}) NOT NULL, "
+                    "created_at TIMESTAMPTZ NOT NULL DEFAULT now())"
+                )
+            )
+            await conn.execute(
+                text(
+                    f"CREATE INDEX IF NOT EXISTS {self.table}_metadata_idx "
+                    f"ON {self.table} USING gin (metadata jsonb_path_ops)"
+                )
+            )
+            # 已有的索引以其实际的访问方法为准，配置只决定新建的索引
+            access_method = (
+                await conn.execute(
+                    text(
+                        "SELECT am.amname FROM pg_class c JOIN pg_am am ON am.oid = c.relam "
+                        "WHERE c.oid = to_regclass(:index)"
+                    ),
+                    {"index": self.index_name},
+                )
+            ).scalar_one_or_none()
+            if access_method in ("hnsw", "ivfflat"):
+                if access_method != self.index_type:
+                    logger.info("%s already has a %s index, not %s", self.table, access_method, self.index_type)
+                self.index_type = access_method
+            elif self.index_type == "hnsw":
+                await conn.execute(text(self._index_sql("hnsw")))
+        self._ready = True
+
+    async def drop_collection(self) -> None:
+        async with self._engine().begin() as conn:
+            await conn.execute(text(f"DROP TABLE IF EXISTS {self.table}"))
+        self._ready = False
+
+    def _index_sql(self, index_type: IndexType, lists: int = 0, concurrently: bool = False) -> str:
+        if index_type == "hnsw":
+            options = (
+                f"m = {higgs_config.PGVECTOR_HNSW_M}, ef_construction = {higgs_config.PGVECTOR_HNSW_EF_CONSTRUCTION}"
+            )
+        else:
+            options = f"lists = {lists}"
+        return (
+            f"CREATE INDEX {'CONCURRENTLY ' if concurrently else ''}IF NOT EXISTS {self.index_name} "
+            f"ON {self.table} USING {index_type} (embedding {self.operator_class}) WITH ({options})"
+        )
+
+    async def create_index(self, index_type: Optional[IndexType] = None, concurrently: bool = False) -> None:
+        """(Re)build the vector index, e.g. an IVFFlat index after a bulk load or to switch the index type.
+
+        ``concurrently`` keeps the collection writable during the build, at the cost of a slower build.
+        """
+        await self.create_collection()
+        index_type = index_type or self.index_type
+        lists = 0
+        if index_type == "ivfflat":
+            lists = higgs_config.PGVECTOR_IVFFLAT_LISTS or ivfflat_lists(await self.count())
+        drop = f"DROP INDEX {'CONCURRENTLY ' if concurrently else ''}IF EXISTS {self.index_name}"
+        if concurrently:
+            # CONCURRENTLY 不能在事务中执行
+            async with self._engine().connect() as conn:
+                conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+                await conn.execute(text(drop))
+                await conn.execute(text(self._index_sql(index_type, lists, concurrently=True)))
+        else:
+            async with self._engine().begin() as conn:
+                await conn.execute(text(drop))
+                await conn.execute(text(self._index_sql(index_type, lists)))
+        self.index_type = index_type
+        logger.info("Built %s index of %s", index_type, self.table)
+
+    async def upsert(self, documents: Sequence[VectorDocument]) -> int:
+        if not documents:
+            return 0
+        await self.create_collection()
+        for document in documents:
+            self._check_dimensions(document.embedding)
+        statement = text(
+            f"INSERT INTO {self.table} (id, content, metadata, embedding) "
+            "VALUES (:id, :content, CAST(:metadata AS jsonb), CAST(:embedding AS vector)) "
+            "ON CONFLICT (id) DO UPDATE SET "
+            "content = excluded.content, metadata = excluded.metadata, embedding = excluded.embedding"
+        )
+        batch_size = higgs_config.PGVECTOR_UPSERT_BATCH_SIZE
+        async with self._engine().begin() as conn:
+            for start in range(0, len(documents), batch_size):
+                # executemany 在 psycopg 3 中以 pipeline 方式发送，一个批次只需一次往返
+                await conn.execute(
+                    statement,
+                    [
+                        {
+                            "id": document.id,
+                            "content": document.content,
+                            "metadata": json.dumps(document.metadata),
+                            "embedding": vector_literal(document.embedding),
+                        }
+                        for document in documents[start : start + batch_size]
+                    ],
+                )
+        return len(documents)
+
+    async def delete(self, filters: MetadataFilter) -> int:
+        if not filters:
+            raise ValueError("Deleting a whole collection needs drop_collection")
+        await self.create_collection()
+        where, params = build_filter(filters)
+        async with self._engine().begin() as conn:
+            result = await conn.execute(text(f"DELETE FROM {self.table} {where}"), params)
+        return result.rowcount
+
+    async def delete_by_ids(self, ids: Sequence[str]) -> int:
+        if not ids:
+            return 0
+        await self.create_collection()
+        async with self._engine().begin() as conn:
+            result = await conn.execute(text(f"DELETE FROM {self.table} WHERE id = ANY(:ids)"), {"ids": list(ids)})
+        return result.rowcount
+
+    async def _set_search_options(
+        self, conn: AsyncConnection, top_k: int, ef_search: Optional[int], probes: Optional[int], exact: bool
+    ) -> None:
+        if exact:
+            await conn.execute(text("SET LOCAL enable_indexscan = off"))
+        elif self.index_type == "hnsw":
+            # ef_search 小于 top_k 时 HNSW 最多只返回 ef_search 行
+            ef_search = max(ef_search or higgs_config.PGVECTOR_HNSW_EF_SEARCH, top_k)
+            await conn.execute(text(f"SET LOCAL hnsw.ef_search = {int(ef_search)}"))
+        else:
+            await conn.execute(
+                text(f"SET LOCAL ivfflat.probes = {int(probes or higgs_config.PGVECTOR_IVFFLAT_PROBES)}")
+            )
+
+    async def search(
+        self,
+        embedding: Sequence[float],
+        top_k: int = 4,
+        filters: Optional[MetadataFilter] = None,
+        score_threshold: Optional[float] = None,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        exact: bool = False,
+    ) -> list[VectorSearchResult]:
+        """Approximate search through the index, ``exact`` scans the whole (filtered) collection instead.
+
+        pgvector applies ``filters`` after the index scan, a selective filter can return less than
+        ``top_k`` documents unless ``ef_search`` / ``probes`` is raised accordingly.
+        """
+        self._check_dimensions(embedding)
+        await self.create_collection()
+        where, params = build_filter(filters)
+        distance = f"embedding {self.operator} CAST(:embedding AS vector)"
+        async with self._engine().begin() as conn:
+            await self._set_search_options(conn, top_k, ef_search, probes, exact)
+            rows = (
+                await conn.execute(
+                    text(
+                        f"SELECT id, content, metadata, {distance} AS distance FROM {self.table} {where} "
+                        f"ORDER BY {distance} LIMIT :top_k"
+                    ),
+                    {**params, "embedding": vector_literal(embedding), "top_k": top_k},
+                )
+            ).all()
+        results = [VectorSearchResult(row.id, row.content, row.metadata, self._score(row.distance)) for row in rows]
+        if score_threshold is not None:
+            results = [result for result in results if result.score >= score_threshold]
+        return results
+
+    async def count(self) -> int:
+        await self.create_collection()
+        async with self._engine().connect() as conn:
+            rows: int = (await conn.execute(text(f"SELECT count(*) FROM {self.table}"))).scalar_one()
+        return rows
@@ -1,42 +1,413 @@
 from abc import ABC
-from typing import Generic, Optional, TypeVar
+from collections.abc import AsyncIterator, Iterator, Sequence
+from typing import Any, Generic, Optional, TypeVar
 
+from sqlalchemy import insert, update
+from sqlalchemy.orm import make_transient_to_detached
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlmodel.sql.expression import SelectOfScalar
+
+from .bulk import (
+    BULK_COPY_THRESHOLD,
+    BULK_INSERT_BATCH_SIZE,
+    build_bulk_insert,
+    bulk_values,
+    copy_sql,
+    create_staging_sql,
+    csv_buffer,
+    dedupe_values,
+    drop_staging_sql,
+    staging_table_name,
+)
+from .cache import get_entity_cache
+from .invalidation import invalidation_bus
+from .pagination import build_page, build_page_statement
+
+# 流式读取时每批从服务端游标拉取的行数
+STREAM_BATCH_SIZE = 1000
 
 ModelType = TypeVar("ModelType")
 
 
-class BaseRepository(Generic[ModelType], ABC):
+def _primary_key(row) -> Any:
+    return row["id"]
+
+
+class _RepositoryStatements(Generic[ModelType]):
+    """Statements and row handling shared by the sync and async repositories, which only add the I/O."""
+
+    model_class: type[ModelType]
+
+    def _publish(self, ids: list[Any]) -> None:
+        invalidation_bus.publish(self.model_class.__table__.name, ids)  # type: ignore[attr-defined]
+
+    def _insert_returning_statement(self, obj: ModelType):
+        values = bulk_values(self.model_class, [obj])[0]
+        return insert(self.model_class).values(**values).returning(self.model_class)
+
+    def _update_returning_statement(self, id: int, values: dict[str, Any]):
+        return (
+            update(self.model_class)
+            .where(self.model_class.id == id)  # type: ignore[attr-defined]
+            .values(**values)
+            .returning(self.model_class)
+        )
+
+    def _unique_statement(self, field: str, value: Any) -> SelectOfScalar[ModelType]:
+        return select(self.model_class).where(getattr(self.model_class, field) == value)
+
+    def _all_statement(self, skip: int, limit: int) -> SelectOfScalar[ModelType]:
+        return select(self.model_class).offset(skip).limit(limit)
+
+    def _insert_batch_statements(
+        self,
+        values: list[dict[str, Any]],
+        conflict_columns: Optional[list[str]],
+        update_columns: Optional[list[str]],
+    ) -> Iterator:
+        for start in range(0, len(values), BULK_INSERT_BATCH_SIZE):
+            yield build_bulk_insert(
+                self.model_class,
+                values=values[start : start + BULK_INSERT_BATCH_SIZE],
+                conflict_columns=conflict_columns,
+                update_columns=update_columns,
+                first_position=start,
+            )
+
+    def _insert_staged_statement(
+        self, columns: list[str], conflict_columns: Optional[list[str]], update_columns: Optional[list[str]]
+    ):
+        return build_bulk_insert(
+            self.model_class,
+            staging_table=staging_table_name(self.model_class),
+            columns=columns,
+            conflict_columns=conflict_columns,
+            update_columns=update_columns,
+        )
+
+    def _created_models(self, rows: list) -> list[ModelType]:
+        # 按输入顺序返回
+        return [self.model_class.model_validate(dict(row)) for row in sorted(rows, key=_primary_key)]  # type: ignore[attr-defined]
+
+    def _upserted_models(self, rows: list) -> list[tuple[ModelType, bool]]:
+        return [(self.model_class.model_validate(dict(row)), row["created"]) for row in rows]  # type: ignore[attr-defined]
+
+    def _detached(self, data: dict[str, Any]) -> ModelType:
+        # 缓存中的实体不经查询直接并入 session，后续 update/delete 可照常使用
+        obj: ModelType = self.model_class.model_validate(data)  # type: ignore[attr-defined]
+        make_transient_to_detached(obj)
+        return obj
+
+
+class BaseRepository(_RepositoryStatements[ModelType], ABC):
     def __init__(self, session: Session, model_class: type[ModelType]):
         self.session = session
         self.model_class = model_class
+        self.cache = get_entity_cache(model_class)
+
+    def _changed(self, ids: list[Any], created: bool = False) -> None:
+        """Evict written rows from the entity cache and broadcast the change to the other nodes."""
+        if not ids:
+            return
+        if self.cache is not None and not created:
+            self.cache.invalidate(*ids)
+        self._publish(ids)
 
     def create(self, obj: ModelType) -> ModelType:
         self.session.add(obj)
         self.session.commit()
         self.session.refresh(obj)
+        self._changed([obj.id], created=True)  # type: ignore[attr-defined]
         return obj
 
+    def create_returning(self, obj: ModelType) -> ModelType:
+        """Create a row with a single INSERT ... RETURNING instead of insert + refresh."""
+        statement = self._insert_returning_statement(obj)
+        obj = self.session.exec(statement).scalar_one()  # type: ignore[call-overload]
+        self.session.commit()
+        self._changed([obj.id], created=True)  # type: ignore[attr-defined]
+        return obj
+
+    def bulk_create(self, objs: Sequence[ModelType], conflict_columns: Optional[list[str]] = None) -> list[ModelType]:
+        """Insert many rows in one transaction, skipping the ones that hit a unique constraint.
+
+        The inserted rows are returned in input order.
+        """
+        rows = self._bulk_insert(bulk_values(self.model_class, objs), conflict_columns)
+        self.session.commit()
+        self._changed([row["id"] for row in rows], created=True)
+        return self._created_models(rows)
+
+    def bulk_upsert(
+        self, objs: Sequence[ModelType], conflict_columns: list[str], update_columns: list[str]
+    ) -> list[tuple[ModelType, bool]]:
+        """Insert or update many rows in one transaction, returns each row with whether it was created."""
+        values = dedupe_values(bulk_values(self.model_class, objs), conflict_columns)
+        rows = self._bulk_insert(values, conflict_columns, update_columns)
+        self.session.commit()
+        self._changed([row["id"] for row in rows if not row["created"]])
+        self._changed([row["id"] for row in rows if row["created"]], created=True)
+        return self._upserted_models(rows)
+
+    def _bulk_insert(
+        self,
+        values: list[dict[str, Any]],
+        conflict_columns: Optional[list[str]] = None,
+        update_columns: Optional[list[str]] = None,
+    ) -> list:
+        if not values:
+            return []
+
+        if len(values) < BULK_COPY_THRESHOLD:
+            rows: list = []
+            for statement in self._insert_batch_statements(values, conflict_columns, update_columns):
+                rows.extend(self.session.exec(statement).mappings().all())
+            return rows
+
+        # 大批量数据先 COPY 到临时表，再通过一条 INSERT ... SELECT 写入
+        columns = list(values[0].keys())
+        connection = self.session.connection()
+        preparer = connection.dialect.identifier_preparer
+        connection.exec_driver_sql(create_staging_sql(preparer, self.model_class, columns))
+        cursor = connection.connection.cursor()
+        try:
+            sql = copy_sql(preparer, self.model_class, columns, csv_format=True)
+            cursor.copy_expert(sql, csv_buffer(values, columns))
+        finally:
+            cursor.close()
+        statement = self._insert_staged_statement(columns, conflict_columns, update_columns)
+        rows = list(self.session.exec(statement).mappings().all())  # type: ignore[attr-defined]
+        connection.exec_driver_sql(drop_staging_sql(preparer, self.model_class))
+        return rows
+
+    def _from_cache(self, data: dict[str, Any]) -> ModelType:
+        return self.session.merge(self._detached(data), load=False)
+
     def get_by_id(self, id: int) -> Optional[ModelType]:
-        return self.session.get(self.model_class, id)
+        if self.cache is None:
+            return self.session.get(self.model_class, id)
+
+        data = self.cache.get(id)
+        if data is not None:
+            return self._from_cache(data)
+        obj = self.session.get(self.model_class, id)
+        if obj is not None:
+            self.cache.set(obj.model_dump())  # type: ignore[attr-defined]
+        return obj
+
+    def get_by_unique(self, field: str, value: Any) -> Optional[ModelType]:
+        """Look up a row by a unique column, read through the entity cache when it is enabled."""
+        if self.cache is not None:
+            data = self.cache.get_by_key(field, value)
+            if data is not None:
+                return self._from_cache(data)
+
+        statement = self._unique_statement(field, value)
+        obj = self.session.exec(statement).first()
+        if obj is not None and self.cache is not None:
+            self.cache.set(obj.model_dump())  # type: ignore[attr-defined]
+        return obj
 
     def get_all(self, skip: int = 0, limit: int = 100) -> list[ModelType]:
-        statement = select(self.model_class).offset(skip).limit(limit)
+        statement = self._all_statement(skip, limit)
         return list(self.session.exec(statement).all())
 
+    def get_page(
+        self, cursor: Optional[str] = None, limit: int = 100, order_by: str = "id"
+    ) -> tuple[list[ModelType], Optional[str]]:
+        statement = build_page_statement(self.model_class, cursor, limit, order_by)
+        return build_page(list(self.session.exec(statement).all()), limit, order_by)
+
+    def get_page_rows(
+        self, fields: list[str], cursor: Optional[str] = None, limit: int = 100, order_by: str = "id"
+    ) -> tuple[list[dict[str, Any]], Optional[str]]:
+        """Read-only variant of get_page that selects only ``fields`` and skips ORM hydration."""
+        statement = build_page_statement(self.model_class, cursor, limit, order_by, fields=fields)
+        rows = [dict(row) for row in self.session.exec(statement).mappings()]  # type: ignore[call-overload]
+        return build_page(rows, limit, order_by)
+
+    def iter_batches(self, statement, batch_size: int = STREAM_BATCH_SIZE) -> Iterator[list[ModelType]]:
+        """Read ``statement`` through a server-side cursor, ``batch_size`` rows at a time."""
+        result = self.session.exec(statement.execution_options(yield_per=batch_size))
+        for partition in result.partitions():
+            yield list(partition)
+
     def update(self, obj: ModelType) -> ModelType:
         self.session.add(obj)
         self.session.commit()
+        self._changed([obj.id])  # type: ignore[attr-defined]
         self.session.refresh(obj)
         return obj
 
+    def update_returning(self, id: int, values: dict[str, Any]) -> Optional[ModelType]:
+        """Update a row with a single UPDATE ... RETURNING, returns None when the row does not exist."""
+        statement = self._update_returning_statement(id, values)
+        obj: Optional[ModelType] = self.session.exec(statement).scalar_one_or_none()  # type: ignore[call-overload]
+        self.session.commit()
+        self._changed([id])
+        return obj
+
     def delete(self, obj: ModelType) -> None:
         self.session.delete(obj)
         self.session.commit()
+        self._changed([obj.id])  # type: ignore[attr-defined]
 
     def delete_by_id(self, id: int) -> bool:
         obj = self.get_by_id(id)
         if obj:
             self.delete(obj)
             return True
-        return False
\ No newline at end of file
+        return False
+
+
+class AsyncBaseRepository(_RepositoryStatements[ModelType], ABC):
+    def __init__(self, session: AsyncSession, model_class: type[ModelType]):
+        self.session = session
+        self.model_class = model_class
+        self.cache = get_entity_cache(model_class)
+
+    async def _changed(self, ids: list[Any], created: bool = False) -> None:
+        if not ids:
+            return
+        if self.cache is not None and not created:
+            await self.cache.ainvalidate(*ids)
+        self._publish(ids)
+
+    async def create(self, obj: ModelType) -> ModelType:
+        self.session.add(obj)
+        await self.session.commit()
+        await self.session.refresh(obj)
+        await self._changed([obj.id], created=True)  # type: ignore[attr-defined]
+        return obj
+
+    async def create_returning(self, obj: ModelType) -> ModelType:
+        statement = self._insert_returning_statement(obj)
+        obj = (await self.session.exec(statement)).scalar_one()  # type: ignore[call-overload]
+        await self.session.commit()
+        await self._changed([obj.id], created=True)  # type: ignore[attr-defined]
+        return obj
+
+    async def bulk_create(
+        self, objs: Sequence[ModelType], conflict_columns: Optional[list[str]] = None
+    ) -> list[ModelType]:
+        rows = await self._bulk_insert(bulk_values(self.model_class, objs), conflict_columns)
+        await self.session.commit()
+        await self._changed([row["id"] for row in rows], created=True)
+        return self._created_models(rows)
+
+    async def bulk_upsert(
+        self, objs: Sequence[ModelType], conflict_columns: list[str], update_columns: list[str]
+    ) -> list[tuple[ModelType, bool]]:
+        values = dedupe_values(bulk_values(self.model_class, objs), conflict_columns)
+        rows = await self._bulk_insert(values, conflict_columns, update_columns)
+        await self.session.commit()
+        await self._changed([row["id"] for row in rows if not row["created"]])
+        await self._changed([row["id"] for row in rows if row["created"]], created=True)
+        return self._upserted_models(rows)
+
+    async def _bulk_insert(
+        self,
+        values: list[dict[str, Any]],
+        conflict_columns: Optional[list[str]] = None,
+        update_columns: Optional[list[str]] = None,
+    ) -> list:
+        if not values:
+            return []
+
+        if len(values) < BULK_COPY_THRESHOLD:
+            rows: list = []
+            for statement in self._insert_batch_statements(values, conflict_columns, update_columns):
+                rows.extend((await self.session.exec(statement)).mappings().all())
+            return rows
+
+        # 大批量数据先 COPY 到临时表，再通过一条 INSERT ... SELECT 写入
+        columns = list(values[0].keys())
+        connection = await self.session.connection()
+        preparer = connection.dialect.identifier_preparer
+        await connection.exec_driver_sql(create_staging_sql(preparer, self.model_class, columns))
+        driver_connection = (await connection.get_raw_connection()).driver_connection
+        assert driver_connection is not None
+        async with driver_connection.cursor() as cursor:
+            async with cursor.copy(copy_sql(preparer, self.model_class, columns)) as copy:
+                for position, value in enumerate(values):
+                    await copy.write_row([*[value.get(name) for name in columns], position])
+        statement = self._insert_staged_statement(columns, conflict_columns, update_columns)
+        rows = list((await self.session.exec(statement)).mappings().all())  # type: ignore[attr-defined]
+        await connection.exec_driver_sql(drop_staging_sql(preparer, self.model_class))
+        return rows
+
+    async def _from_cache(self, data: dict[str, Any]) -> ModelType:
+        return await self.session.merge(self._detached(data), load=False)
+
+    async def get_by_id(self, id: int) -> Optional[ModelType]:
+        if self.cache is None:
+            return await self.session.get(self.model_class, id)
+
+        data = await self.cache.aget(id)
+        if data is not None:
+            return await self._from_cache(data)
+        obj = await self.session.get(self.model_class, id)
+        if obj is not None:
+            await self.cache.aset(obj.model_dump())  # type: ignore[attr-defined]
+        return obj
+
+    async def get_by_unique(self, field: str, value: Any) -> Optional[ModelType]:
+        if self.cache is not None:
+            data = await self.cache.aget_by_key(field, value)
+            if data is not None:
+                return await self._from_cache(data)
+
+        statement = self._unique_statement(field, value)
+        obj = (await self.session.exec(statement)).first()
+        if obj is not None and self.cache is not None:
+            await self.cache.aset(obj.model_dump())  # type: ignore[attr-defined]
+        return obj
+
+    async def get_all(self, skip: int = 0, limit: int = 100) -> list[ModelType]:
+        statement = self._all_statement(skip, limit)
+        return list((await self.session.exec(statement)).all())
+
+    async def get_page(
+        self, cursor: Optional[str] = None, limit: int = 100, order_by: str = "id"
+    ) -> tuple[list[ModelType], Optional[str]]:
+        statement = build_page_statement(self.model_class, cursor, limit, order_by)
+        return build_page(list((await self.session.exec(statement)).all()), limit, order_by)
+
+    async def get_page_rows(
+        self, fields: list[str], cursor: Optional[str] = None, limit: int = 100, order_by: str = "id"
+    ) -> tuple[list[dict[str, Any]], Optional[str]]:
+        statement = build_page_statement(self.model_class, cursor, limit, order_by, fields=fields)
+        rows = [dict(row) for row in (await self.session.exec(statement)).mappings()]  # type: ignore[call-overload]
+        return build_page(rows, limit, order_by)
+
+    async def iter_batches(self, statement, batch_size: int = STREAM_BATCH_SIZE) -> AsyncIterator[list[ModelType]]:
+        result = await self.session.stream_scalars(statement, execution_options={"yield_per": batch_size})
+        async for partition in result.partitions():
+            yield list(partition)
+
+    async def update(self, obj: ModelType) -> ModelType:
+        self.session.add(obj)
+        await self.session.commit()
+        await self._changed([obj.id])  # type: ignore[attr-defined]
+        await self.session.refresh(obj)
+        return obj
+
+    async def update_returning(self, id: int, values: dict[str, Any]) -> Optional[ModelType]:
+        statement = self._update_returning_statement(id, values)
+        obj: Optional[ModelType] = (await self.session.exec(statement)).scalar_one_or_none()  # type: ignore[call-overload]
+        await self.session.commit()
+        await self._changed([id])
+        return obj
+
+    async def delete(self, obj: ModelType) -> None:
+        await self.session.delete(obj)
+        await self.session.commit()
+        await self._changed([obj.id])  # type: ignore[attr-defined]
+
+    async def delete_by_id(self, id: int) -> bool:
+        obj = await self.get_by_id(id)
+        if obj:
+            await self.delete(obj)
+            return True
+        return False
@@ -0,0 +1,119 @@
+import io
+from collections.abc import Sequence
+from typing import Any, Optional
+
+from sqlalchemy import Integer, cast, column, literal_column, select, table
+from sqlalchemy import values as values_clause
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.sql.compiler import IdentifierPreparer
+from sqlalchemy.sql.expression import ColumnElement, FromClause
+
+# 每条多行 INSERT 语句包含的行数
+BULK_INSERT_BATCH_SIZE = 1000
+# 超过该行数时先 COPY 到临时表，再一次性 INSERT ... SELECT
+BULK_COPY_THRESHOLD = 10000
+# 输入行的序号，INSERT ... SELECT 按它排序写入，自增主键因此与输入顺序一致
+POSITION_COLUMN = "_bulk_position"
+
+
+def bulk_values(model_class: type, objs: Sequence[Any]) -> list[dict[str, Any]]:
+    """Dump model instances to column values, leaving unset primary keys to the database."""
+    primary_keys = {col.name for col in model_class.__table__.primary_key}  # type: ignore[attr-defined]
+    values = []
+    for obj in objs:
+        data = obj.model_dump()
+        values.append({k: v for k, v in data.items() if not (k in primary_keys and v is None)})
+    return values
+
+
+def dedupe_values(values: list[dict[str, Any]], conflict_columns: list[str]) -> list[dict[str, Any]]:
+    """ON CONFLICT DO UPDATE cannot touch the same row twice in one statement, keep the last value per key."""
+    deduped = {tuple(value[col] for col in conflict_columns): value for value in values}
+    return list(deduped.values())
+
+
+def build_bulk_insert(
+    model_class: type,
+    values: Optional[list[dict[str, Any]]] = None,
+    staging_table: Optional[str] = None,
+    columns: Optional[list[str]] = None,
+    conflict_columns: Optional[list[str]] = None,
+    update_columns: Optional[list[str]] = None,
+    first_position: int = 0,
+):
+    """Build an INSERT ... SELECT from a VALUES list (or a staging table) with ON CONFLICT and RETURNING.
+
+    Rows are selected in input order, which Postgres also follows when it assigns serial primary keys,
+    so the ids of the inserted rows ascend with their input position. Without ``update_columns``
+    conflicting rows are skipped, otherwise they are updated in place and the extra ``created`` column
+    tells inserted rows from updated ones.
+    """
+    target = model_class.__table__  # type: ignore[attr-defined]
+    source: FromClause
+    selected: list[ColumnElement[Any]]
+    if staging_table is not None and columns is not None:
+        source = table(staging_table, *[column(name) for name in [*columns, POSITION_COLUMN]])
+        selected = [source.c[name] for name in columns]
+    else:
+        assert values is not None
+        columns = list(values[0].keys())
+        source = values_clause(
+            *[column(name, target.c[name].type) for name in columns],
+            column(POSITION_COLUMN, Integer),
+            name="bulk_values",
+        ).data([(*[value[name] for name in columns], first_position + index) for index, value in enumerate(values)])
+        # VALUES 中的参数没有列类型，按目标列转换
+        selected = [cast(source.c[name], target.c[name].type) for name in columns]
+    statement = pg_insert(target).from_select(columns, select(*selected).order_by(source.c[POSITION_COLUMN]))
+
+    if update_columns:
+        statement = statement.on_conflict_do_update(
+            index_elements=conflict_columns,
+            set_={name: statement.excluded[name] for name in update_columns},
+        )
+        return statement.returning(*target.columns, literal_column("(xmax = 0)").label("created"))
+
+    statement = statement.on_conflict_do_nothing(index_elements=conflict_columns)
+    return statement.returning(*target.columns)
+
+
+def staging_table_name(model_class: type) -> str:
+    return f"_bulk_{model_class.__table__.name}"  # type: ignore[attr-defined]
+
+
+def create_staging_sql(preparer: IdentifierPreparer, model_class: type, columns: list[str]) -> str:
+    target = model_class.__table__  # type: ignore[attr-defined]
+    quoted = ", ".join(preparer.quote(name) for name in columns)
+    return (
+        f"CREATE TEMP TABLE {preparer.quote(staging_table_name(model_class))} ON COMMIT DROP AS "
+        f"SELECT {quoted}, CAST(NULL AS integer) AS {POSITION_COLUMN} FROM {preparer.format_table(target)} WITH NO DATA"
+    )
+
+
+def drop_staging_sql(preparer: IdentifierPreparer, model_class: type) -> str:
+    return f"DROP TABLE IF EXISTS {preparer.quote(staging_table_name(model_class))}"
+
+
+def copy_sql(preparer: IdentifierPreparer, model_class: type, columns: list[str], csv_format: bool = False) -> str:
+    quoted = ", ".join(preparer.quote(name) for name in [*columns, POSITION_COLUMN])
+    options = " WITH (FORMAT csv)" if csv_format else ""
+    return f"COPY {preparer.quote(staging_table_name(model_class))} ({quoted}) FROM STDIN{options}"
+
+
+def _csv_field(value: Any) -> str:
+    if value is None:
+        return ""
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+def csv_buffer(values: list[dict[str, Any]], columns: list[str]) -> io.StringIO:
+    """CSV payload for psycopg2 ``copy_expert``: NULL is an unquoted empty field, everything else is quoted.
+
+    Each line ends with the input position of the row.
+    """
+    buffer = io.StringIO()
+    for position, value in enumerate(values):
+        buffer.write(",".join(_csv_field(value.get(name)) for name in columns))
+        buffer.write(f",{position}\n")
+    buffer.seek(0)
+    return buffer
@@ -0,0 +1,291 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from pydantic_core import to_json
+from redis import RedisError
+
+from configs import higgs_config
+from extensions.ext_redis import async_redis_client, redis_client
+
+from .invalidation import invalidation_bus
+
+logger = logging.getLogger(__name__)
+
+
+class LRUTTLCache:
+    """A thread safe in-process cache bounded by both size (LRU eviction) and age (TTL)."""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: OrderedDict[Any, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Any) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Any, value: Any, ttl: Optional[float] = None) -> None:
+        """Store ``value``, ``ttl`` overrides the cache wide TTL for this entry."""
+        with self._lock:
+            self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Any) -> Optional[Any]:
+        with self._lock:
+            item = self._data.pop(key, None)
+            return item[1] if item else None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class EntityCache:
+    """Two tier read-through cache of entity column values, keyed by primary key.
+
+    The first tier is a per-process ``LRUTTLCache``, the second one is Redis (shared by all workers).
+    Unique-key lookups are cached as ``field:value -> id`` and always verified against the entity,
+    so a stale mapping can only cause a miss, never a wrong row.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        unique_fields: list[str],
+        max_size: int,
+        ttl: float,
+        redis_enabled: bool = False,
+        redis_ttl: int = 300,
+    ):
+        self.namespace = namespace
+        self.unique_fields = unique_fields
+        self.redis_enabled = redis_enabled
+        self.redis_ttl = redis_ttl
+        self._entities = LRUTTLCache(max_size, ttl)
+        self._keys = LRUTTLCache(max_size, ttl)
+        self._lock = threading.Lock()
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def entity_key(self, id: Any) -> str:
+        return f"entity:{self.namespace}:{id}"
+
+    def unique_key(self, field: str, value: Any) -> str:
+        return f"entity:{self.namespace}:{field}:{value}"
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def _use_redis(self, client) -> bool:
+        return self.redis_enabled and client.is_initialized()
+
+    def _local_get(self, id: Any) -> Optional[dict[str, Any]]:
+        data = self._entities.get(id)
+        if data is not None:
+            self._count("local_hits")
+        return data
+
+    def _remember(self, data: dict[str, Any]) -> None:
+        self._entities.set(data["id"], data)
+        for field in self.unique_fields:
+            if data.get(field) is not None:
+                self._keys.set((field, data[field]), data["id"])
+
+    def _forget(self, id: Any) -> list[str]:
+        """Drop ``id`` from the local tier and return the Redis keys to delete."""
+        self._count("invalidations")
+        keys = [self.entity_key(id)]
+        data = self._entities.delete(id)
+        if data is not None:
+            for field in self.unique_fields:
+                if data.get(field) is not None:
+                    self._keys.delete((field, data[field]))
+                    keys.append(self.unique_key(field, data[field]))
+        return keys
+
+    def _redis_mapping(self, data: dict[str, Any]) -> dict[str, Any]:
+        mapping = {self.entity_key(data["id"]): to_json(data)}
+        for field in self.unique_fields:
+            if data.get(field) is not None:
+                mapping[self.unique_key(field, data[field])] = data["id"]
+        return mapping
+
+    def _verified(self, data: Optional[dict[str, Any]], field: str, value: Any) -> Optional[dict[str, Any]]:
+        if data is None:
+            return None
+        if data.get(field) != value:
+            # 唯一键映射已过期，按未命中处理
+            self._keys.delete((field, value))
+            return None
+        return data
+
+    def get(self, id: Any) -> Optional[dict[str, Any]]:
+        data = self._local_get(id)
+        if data is not None:
+            return data
+        if self._use_redis(redis_client):
+            try:
+                raw = redis_client.get(self.entity_key(id))
+            except RedisError:
+                logger.warning("Failed to read entity cache from redis", exc_info=True)
+                raw = None
+            if raw is not None:
+                self._count("redis_hits")
+                cached: dict[str, Any] = json.loads(raw)
+                self._remember(cached)
+                return cached
+        self._count("misses")
+        return None
+
+    def get_by_key(self, field: str, value: Any) -> Optional[dict[str, Any]]:
+        id = self._keys.get((field, value))
+        if id is None and self._use_redis(redis_client):
+            try:
+                id = redis_client.get(self.unique_key(field, value))
+            except RedisError:
+                logger.warning("Failed to read entity cache from redis", exc_info=True)
+        if id is None:
+            self._count("misses")
+            return None
+        return self._verified(self.get(int(id)), field, value)
+
+    def set(self, data: dict[str, Any]) -> None:
+        self._remember(data)
+        if self._use_redis(redis_client):
+            try:
+                with redis_client.pipeline(transaction=False) as pipe:
+                    for key, value in self._redis_mapping(data).items():
+                        pipe.set(key, value, ex=self.redis_ttl)
+                    pipe.execute()
+            except RedisError:
+                logger.warning("Failed to write entity cache to redis", exc_info=True)
+
+    def invalidate(self, *ids: Any) -> None:
+        keys = [key for id in ids for key in self._forget(id)]
+        if keys and self._use_redis(redis_client):
+            try:
+                redis_client.delete(*keys)
+            except RedisError:
+                logger.warning("Failed to invalidate entity cache in redis", exc_info=True)
+
+    async def aget(self, id: Any) -> Optional[dict[str, Any]]:
+        data = self._local_get(id)
+        if data is not None:
+            return data
+        if self._use_redis(async_redis_client):
+            try:
+                raw = await async_redis_client.get(self.entity_key(id))
+            except RedisError:
+                logger.warning("Failed to read entity cache from redis", exc_info=True)
+                raw = None
+            if raw is not None:
+                self._count("redis_hits")
+                cached: dict[str, Any] = json.loads(raw)
+                self._remember(cached)
+                return cached
+        self._count("misses")
+        return None
+
+    async def aget_by_key(self, field: str, value: Any) -> Optional[dict[str, Any]]:
+        id = self._keys.get((field, value))
+        if id is None and self._use_redis(async_redis_client):
+            try:
+                id = await async_redis_client.get(self.unique_key(field, value))
+            except RedisError:
+                logger.warning("Failed to read entity cache from redis", exc_info=True)
+        if id is None:
+            self._count("misses")
+            return None
+        return self._verified(await self.aget(int(id)), field, value)
+
+    async def aset(self, data: dict[str, Any]) -> None:
+        self._remember(data)
+        if self._use_redis(async_redis_client):
+            try:
+                async with async_redis_client.pipeline(transaction=False) as pipe:
+                    for key, value in self._redis_mapping(data).items():
+                        pipe.set(key, value, ex=self.redis_ttl)
+                    await pipe.execute()
+            except RedisError:
+                logger.warning("Failed to write entity cache to redis", exc_info=True)
+
+    async def ainvalidate(self, *ids: Any) -> None:
+        keys = [key for id in ids for key in self._forget(id)]
+        if keys and self._use_redis(async_redis_client):
+            try:
+                await async_redis_client.delete(*keys)
+            except RedisError:
+                logger.warning("Failed to invalidate entity cache in redis", exc_info=True)
+
+    def evict_local(self, ids: Optional[list[Any]]) -> None:
+        """Evict entities written by another node, the writer has already invalidated the Redis tier."""
+        if ids is None:
+            self.clear()
+            return
+        for id in ids:
+            self._forget(id)
+
+    def clear(self) -> None:
+        self._entities.clear()
+        self._keys.clear()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "size": len(self._entities),
+            "max_size": self._entities.max_size,
+            "local_hits": self.local_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
+
+
+_entity_caches: dict[str, EntityCache] = {}
+_entity_caches_lock = threading.Lock()
+
+
+def get_entity_cache(model_class: type) -> Optional[EntityCache]:
+    """Entity cache shared by all repositories of ``model_class`` in this process, None when disabled."""
+    if not higgs_config.ENTITY_CACHE_ENABLED:
+        return None
+
+    table = model_class.__table__  # type: ignore[attr-defined]
+    with _entity_caches_lock:
+        cache = _entity_caches.get(table.name)
+        if cache is None:
+            cache = EntityCache(
+                namespace=table.name,
+                unique_fields=[col.name for col in table.columns if col.unique],
+                max_size=higgs_config.ENTITY_CACHE_MAX_SIZE,
+                ttl=higgs_config.ENTITY_CACHE_TTL,
+                redis_enabled=higgs_config.ENTITY_CACHE_REDIS_ENABLED,
+                redis_ttl=higgs_config.ENTITY_CACHE_REDIS_TTL,
+            )
+            _entity_caches[table.name] = cache
+            invalidation_bus.subscribe(table.name, cache.evict_local)
+        return cache
+
+
+def entity_cache_stats() -> dict[str, dict[str, Any]]:
+    return {name: cache.stats() for name, cache in _entity_caches.items()}
@@ -1,10 +1,11 @@
 from typing import Optional
 
-from sqlmodel import Session, select
+from sqlmodel import Session, col, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from models.hero import Hero
 
-from .base import BaseRepository
+from .base import AsyncBaseRepository, BaseRepository
 
 
 class HeroRepository(BaseRepository[Hero]):
@@ -20,8 +21,22 @@ class HeroRepository(BaseRepository[Hero]):
         return self.session.exec(statement).first()
 
     def get_by_age_range(self, min_age: int, max_age: int) -> list[Hero]:
-        statement = select(Hero).where(
-            Hero.age >= min_age,
-            Hero.age <= max_age
-        )
-        return list(self.session.exec(statement).all())
\ No newline at end of file
+        statement = select(Hero).where(col(Hero.age) >= min_age, col(Hero.age) <= max_age)
+        return list(self.session.exec(statement).all())
+
+
+class AsyncHeroRepository(AsyncBaseRepository[Hero]):
+    def __init__(self, session: AsyncSession):
+        super().__init__(session, Hero)
+
+    async def get_by_name(self, name: str) -> Optional[Hero]:
+        statement = select(Hero).where(Hero.name == name)
+        return (await self.session.exec(statement)).first()
+
+    async def get_by_secret_name(self, secret_name: str) -> Optional[Hero]:
+        statement = select(Hero).where(Hero.secret_name == secret_name)
+        return (await self.session.exec(statement)).first()
+
+    async def get_by_age_range(self, min_age: int, max_age: int) -> list[Hero]:
+        statement = select(Hero).where(col(Hero.age) >= min_age, col(Hero.age) <= max_age)
+        return list((await self.session.exec(statement)).all())
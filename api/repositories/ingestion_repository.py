@@ -0,0 +1,60 @@
+from collections.abc import Sequence
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlmodel import col, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from models.ingestion import IngestionCheckpoint, IngestionStatus
+
+from .base import AsyncBaseRepository
+
+
+class AsyncIngestionCheckpointRepository(AsyncBaseRepository[IngestionCheckpoint]):
+    def __init__(self, session: AsyncSession):
+        super().__init__(session, IngestionCheckpoint)
+
+    async def get_checkpoints(self, collection: str) -> dict[str, IngestionCheckpoint]:
+        statement = select(IngestionCheckpoint).where(IngestionCheckpoint.collection == collection)
+        return {checkpoint.source: checkpoint for checkpoint in (await self.session.exec(statement)).all()}
+
+    async def save(
+        self,
+        collection: str,
+        source: str,
+        content_hash: str,
+        chunks: int,
+        status: IngestionStatus,
+        error: Optional[str] = None,
+    ) -> None:
+        values = {
+            "collection": collection,
+            "source": source,
+            "content_hash": content_hash,
+            "chunks": chunks,
+            "status": status,
+            "error": error,
+            "updated_at": datetime.utcnow(),
+        }
+        statement = pg_insert(IngestionCheckpoint).values(values)
+        statement = statement.on_conflict_do_update(
+            index_elements=["collection", "source"],
+            set_={name: statement.excluded[name] for name in values if name not in ("collection", "source")},
+        )
+        await self.session.exec(statement)  # type: ignore[call-overload]
+        await self.session.commit()
+
+    async def set_status(
+        self, collection: str, sources: Sequence[str], status: IngestionStatus, error: Optional[str] = None
+    ) -> None:
+        if not sources:
+            return
+        statement = (
+            update(IngestionCheckpoint)
+            .where(col(IngestionCheckpoint.collection) == collection, col(IngestionCheckpoint.source).in_(sources))
+            .values(status=status, error=error, updated_at=datetime.utcnow())
+        )
+        await self.session.exec(statement)  # type: ignore[call-overload]
+        await self.session.commit()
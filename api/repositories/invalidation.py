@@ -0,0 +1,249 @@
+import asyncio
+import json
+import logging
+import threading
+import uuid
+from collections.abc import AsyncIterator, Callable, Iterable
+from typing import Any, Optional
+
+from sqlalchemy import make_url, text
+
+from configs import higgs_config
+
+logger = logging.getLogger(__name__)
+
+# 断线重连的等待时间（秒）
+RECONNECT_DELAY = 1.0
+
+# handler 收到 None 表示该 namespace 需要整体失效
+InvalidationHandler = Callable[[Optional[list[Any]]], None]
+
+
+class PostgresInvalidationBackend:
+    """Publish with ``pg_notify`` on a pooled connection, listen on a dedicated autocommit connection."""
+
+    # NOTIFY 的 payload 必须小于 8000 字节
+    max_payload_bytes: Optional[int] = 7999
+
+    def __init__(self, channel: str):
+        self.channel = channel
+
+    async def publish(self, payload: str) -> None:
+        from models.engine import async_engine
+
+        async with async_engine.connect() as conn:
+            await conn.execute(
+                text("SELECT pg_notify(:channel, :payload)"), {"channel": self.channel, "payload": payload}
+            )
+            await conn.commit()
+
+    async def listen(self) -> AsyncIterator[str]:
+        import psycopg
+        from psycopg import sql
+
+        url = make_url(higgs_config.SQLALCHEMY_ASYNC_DATABASE_URI).set(drivername="postgresql")
+        async with await psycopg.AsyncConnection.connect(
+            url.render_as_string(hide_password=False), autocommit=True
+        ) as conn:
+            await conn.execute(sql.SQL("LISTEN {}").format(sql.Identifier(self.channel)))
+            async for notify in conn.notifies():
+                yield notify.payload
+
+
+class RedisInvalidationBackend:
+    max_payload_bytes: Optional[int] = None
+
+    def __init__(self, channel: str):
+        self.channel = channel
+
+    async def publish(self, payload: str) -> None:
+        from extensions.ext_redis import async_redis_client
+
+        await async_redis_client.publish(self.channel, payload)
+
+    async def listen(self) -> AsyncIterator[str]:
+        from extensions.ext_redis import async_redis_client
+
+        pubsub = async_redis_client.pubsub()
+        try:
+            await pubsub.subscribe(self.channel)
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    data = message["data"]
+                    yield data.decode() if isinstance(data, bytes) else data
+        finally:
+            await pubsub.aclose()
+
+
+class InvalidationBus:
+    """Broadcast cache invalidation events between API replicas.
+
+    Writers call ``publish`` (thread safe, never blocks), pending ids are coalesced per namespace and
+    flushed every ``flush_interval`` seconds as one message per namespace. Receivers dispatch the ids
+    to the handlers subscribed to the namespace; messages sent by this process are ignored since the
+    local caches were already evicted by the writer.
+    """
+
+    def __init__(self, backend, flush_interval: float, max_ids: int):
+        self.backend = backend
+        self.flush_interval = flush_interval
+        self.max_ids = max_ids
+        self.node_id = uuid.uuid4().hex
+        self._handlers: dict[str, list[InvalidationHandler]] = {}
+        self._pending: dict[str, Optional[set[Any]]] = {}
+        self._lock = threading.Lock()
+        self._tasks: list[asyncio.Task] = []
+        self.published_events = 0
+        self.published_messages = 0
+        self.received_messages = 0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def subscribe(self, namespace: str, handler: InvalidationHandler) -> None:
+        self._handlers.setdefault(namespace, []).append(handler)
+
+    def publish(self, namespace: str, ids: Optional[Iterable[Any]] = None) -> None:
+        """Queue an invalidation of ``ids`` (or of the whole namespace when None)."""
+        if not self.running:
+            return
+        with self._lock:
+            self.published_events += 1
+            if ids is None:
+                self._pending[namespace] = None
+                return
+            pending = self._pending.setdefault(namespace, set())
+            if pending is None:
+                return
+            pending.update(ids)
+            if len(pending) > self.max_ids:
+                # 超过上限后不再逐个记录，接收方直接清空整个 namespace
+                self._pending[namespace] = None
+
+    def _drain(self) -> dict[str, Optional[set[Any]]]:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        return pending
+
+    def _encode(self, namespace: str, ids: Optional[list[Any]]) -> str:
+        return json.dumps({"node": self.node_id, "ns": namespace, "ids": ids}, separators=(",", ":"))
+
+    def _payloads(self, namespace: str, ids: Optional[set[Any]]) -> list[str]:
+        """Messages of one namespace, ids split across several when the backend limits the payload size."""
+        if ids is None:
+            return [self._encode(namespace, None)]
+        ordered = sorted(ids)
+        payload = self._encode(namespace, ordered)
+        limit = getattr(self.backend, "max_payload_bytes", None)
+        if limit is None or len(payload.encode()) <= limit:
+            return [payload]
+
+        header = len(self._encode(namespace, []).encode())
+        chunks: list[list[Any]] = [[]]
+        size = header
+        for id in ordered:
+            # 加上分隔的逗号
+            id_size = len(json.dumps(id).encode()) + 1
+            if header + id_size > limit:
+                # 单个 id 就超过上限，接收方直接清空整个 namespace
+                return [self._encode(namespace, None)]
+            if size + id_size > limit:
+                chunks.append([])
+                size = header
+            chunks[-1].append(id)
+            size += id_size
+        return [self._encode(namespace, chunk) for chunk in chunks]
+
+    async def flush(self) -> None:
+        for namespace, ids in self._drain().items():
+            try:
+                for payload in self._payloads(namespace, ids):
+                    await self.backend.publish(payload)
+                    self.published_messages += 1
+            except Exception:
+                logger.warning("Failed to publish cache invalidation of %s", namespace, exc_info=True)
+
+    def dispatch(self, payload: str) -> None:
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            logger.warning("Invalid cache invalidation payload: %s", payload)
+            return
+        if message.get("node") == self.node_id:
+            return
+        self.received_messages += 1
+        self._invoke(message["ns"], message["ids"])
+
+    def evict_all(self) -> None:
+        for namespace in self._handlers:
+            self._invoke(namespace, None)
+
+    def _invoke(self, namespace: str, ids: Optional[list[Any]]) -> None:
+        for handler in self._handlers.get(namespace, []):
+            try:
+                handler(ids)
+            except Exception:
+                logger.exception("Cache invalidation handler of %s failed", namespace)
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # 刷新失败不能结束任务，否则之后的失效事件都不会再发出
+                logger.exception("Failed to flush cache invalidations")
+
+    async def _listen_loop(self) -> None:
+        while True:
+            try:
+                async for payload in self.backend.listen():
+                    self.dispatch(payload)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.warning("Cache invalidation listener disconnected, reconnecting", exc_info=True)
+            # 断线期间可能漏掉事件，本地缓存整体失效
+            self.evict_all()
+            await asyncio.sleep(RECONNECT_DELAY)
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._tasks = [
+            asyncio.create_task(self._listen_loop(), name="cache-invalidation-listener"),
+            asyncio.create_task(self._flush_loop(), name="cache-invalidation-flusher"),
+        ]
+
+    async def stop(self) -> None:
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # 停止前把剩余的事件发出去
+        await self.flush()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "running": self.running,
+            "backend": higgs_config.CACHE_INVALIDATION_BACKEND,
+            "published_events": self.published_events,
+            "published_messages": self.published_messages,
+            "received_messages": self.received_messages,
+        }
+
+
+def _create_backend():
+    if higgs_config.CACHE_INVALIDATION_BACKEND == "redis":
+        return RedisInvalidationBackend(higgs_config.CACHE_INVALIDATION_CHANNEL)
+    return PostgresInvalidationBackend(higgs_config.CACHE_INVALIDATION_CHANNEL)
+
+
+invalidation_bus = InvalidationBus(
+    _create_backend(),
+    flush_interval=higgs_config.CACHE_INVALIDATION_FLUSH_INTERVAL,
+    max_ids=higgs_config.CACHE_INVALIDATION_MAX_IDS,
+)
@@ -0,0 +1,76 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Optional
+
+from sqlalchemy import Select, tuple_
+from sqlmodel import select
+
+PAGE_DEFAULT_LIMIT = 100
+# 单页的行数上限，避免一次请求读出整张表
+PAGE_MAX_LIMIT = 1000
+
+
+def encode_cursor(order_by: str, values: list[Any]) -> str:
+    """Encode the sort key of the last row into an opaque, url-safe cursor token."""
+    dumped = [{"dt": value.isoformat()} if isinstance(value, datetime) else value for value in values]
+    payload = json.dumps({"o": order_by, "v": dumped}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, order_by: str) -> list[Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if payload["o"] != order_by:
+            raise ValueError
+        return [datetime.fromisoformat(value["dt"]) if isinstance(value, dict) else value for value in payload["v"]]
+    except (ValueError, KeyError, TypeError, binascii.Error):
+        raise ValueError(f"Invalid cursor for order_by '{order_by}'")
+
+
+def keyset_columns(model_class: type, order_by: str) -> list:
+    """Columns of the keyset, always ending with the primary key so that the order is total."""
+    if not hasattr(model_class, order_by):
+        raise ValueError(f"Unknown order_by field '{order_by}'")
+    if order_by == "id":
+        return [model_class.id]  # type: ignore[attr-defined]
+    return [getattr(model_class, order_by), model_class.id]  # type: ignore[attr-defined]
+
+
+def build_page_statement(
+    model_class: type, cursor: Optional[str], limit: int, order_by: str, fields: Optional[list[str]] = None
+):
+    """Select whole entities, or only ``fields`` (plus the keyset columns) for read-only row access."""
+    columns = keyset_columns(model_class, order_by)
+    statement: Select
+    if fields is None:
+        statement = select(model_class)
+    else:
+        selected = [getattr(model_class, field) for field in fields]
+        selected += [col for col in columns if col.key not in fields]
+        statement = select(*selected)
+    # 多取一行用于判断是否还有下一页
+    statement = statement.order_by(*columns).limit(limit + 1)
+    if cursor:
+        values = decode_cursor(cursor, order_by)
+        if len(values) != len(columns):
+            raise ValueError(f"Invalid cursor for order_by '{order_by}'")
+        if len(columns) == 1:
+            statement = statement.where(columns[0] > values[0])
+        else:
+            statement = statement.where(tuple_(*columns) > tuple_(*values))
+    return statement
+
+
+def build_page(rows: list, limit: int, order_by: str) -> tuple[list, Optional[str]]:
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+    fields = [order_by] if order_by == "id" else [order_by, "id"]
+    if isinstance(last, dict):
+        return rows, encode_cursor(order_by, [last[field] for field in fields])
+    return rows, encode_cursor(order_by, [getattr(last, field) for field in fields])
@@ -0,0 +1,27 @@
+from sqlalchemy import func, or_
+from sqlmodel import select
+
+from models.search import SEARCH_SIMILARITY_FUNCTION
+
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+
+
+def search_score(columns: list, query: str):
+    similarity = getattr(func, SEARCH_SIMILARITY_FUNCTION)
+    scores = [similarity(func.coalesce(col, ""), query) for col in columns]
+    return func.greatest(*scores) if len(scores) > 1 else scores[0]
+
+
+def build_search_statement(
+    model_class: type, columns: list, query: str, limit: int = SEARCH_DEFAULT_LIMIT, skip: int = 0
+):
+    """Substring match served by the GIN indexes on ``columns``, ranked by similarity to ``query``."""
+    condition = or_(*[col.contains(query, autoescape=True) for col in columns])
+    return (
+        select(model_class)
+        .where(condition)
+        .order_by(search_score(columns, query).desc(), model_class.id)  # type: ignore[attr-defined]
+        .offset(skip)
+        .limit(min(limit, SEARCH_MAX_LIMIT))
+    )
@@ -1,10 +1,13 @@
+from collections.abc import AsyncIterator, Iterator
 from typing import Optional
 
-from sqlmodel import Session, select
+from sqlmodel import Session, col, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from models.user import User
 
-from .base import BaseRepository
+from .base import STREAM_BATCH_SIZE, AsyncBaseRepository, BaseRepository
+from .search import SEARCH_DEFAULT_LIMIT, build_search_statement
 
 
 class UserRepository(BaseRepository[User]):
@@ -12,20 +15,46 @@ class UserRepository(BaseRepository[User]):
         super().__init__(session, User)
 
     def get_by_username(self, username: str) -> Optional[User]:
-        statement = select(User).where(User.username == username)
-        return self.session.exec(statement).first()
+        return self.get_by_unique("username", username)
 
     def get_by_email(self, email: str) -> Optional[User]:
-        statement = select(User).where(User.email == email)
-        return self.session.exec(statement).first()
+        return self.get_by_unique("email", email)
 
     def get_active_users(self) -> list[User]:
         statement = select(User).where(User.is_active == True)
         return list(self.session.exec(statement).all())
 
-    def search_by_name(self, name_query: str) -> list[User]:
-        statement = select(User).where(
-            User.full_name.contains(name_query) |
-            User.username.contains(name_query)
-        )
-        return list(self.session.exec(statement).all())
\ No newline at end of file
+    def iter_users(self, active_only: bool = True, batch_size: int = STREAM_BATCH_SIZE) -> Iterator[list[User]]:
+        statement = select(User).order_by(col(User.id))
+        if active_only:
+            statement = statement.where(User.is_active == True)
+        return self.iter_batches(statement, batch_size=batch_size)
+
+    def search_by_name(self, name_query: str, limit: int = SEARCH_DEFAULT_LIMIT, skip: int = 0) -> list[User]:
+        statement = build_search_statement(User, [User.username, User.full_name], name_query, limit=limit, skip=skip)
+        return list(self.session.exec(statement).all())
+
+
+class AsyncUserRepository(AsyncBaseRepository[User]):
+    def __init__(self, session: AsyncSession):
+        super().__init__(session, User)
+
+    async def get_by_username(self, username: str) -> Optional[User]:
+        return await self.get_by_unique("username", username)
+
+    async def get_by_email(self, email: str) -> Optional[User]:
+        return await self.get_by_unique("email", email)
+
+    async def get_active_users(self) -> list[User]:
+        statement = select(User).where(User.is_active == True)
+        return list((await self.session.exec(statement)).all())
+
+    def iter_users(self, active_only: bool = True, batch_size: int = STREAM_BATCH_SIZE) -> AsyncIterator[list[User]]:
+        statement = select(User).order_by(col(User.id))
+        if active_only:
+            statement = statement.where(User.is_active == True)
+        return self.iter_batches(statement, batch_size=batch_size)
+
+    async def search_by_name(self, name_query: str, limit: int = SEARCH_DEFAULT_LIMIT, skip: int = 0) -> list[User]:
+        statement = build_search_statement(User, [User.username, User.full_name], name_query, limit=limit, skip=skip)
+        return list((await self.session.exec(statement)).all())
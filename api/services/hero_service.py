@@ -1,9 +1,20 @@
 from typing import Optional
 
 from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from models.hero import Hero
-from repositories.hero_repository import HeroRepository
+from models.batch import BatchItemResult
+from models.hero import Hero, HeroCreate
+from repositories.hero_repository import AsyncHeroRepository, HeroRepository
+
+
+def _batch_results(heroes: list[Hero]) -> list[BatchItemResult]:
+    # hero 没有唯一约束，每一行都会写入，bulk_create 按输入顺序返回
+    return [BatchItemResult(index=index, status="created", id=hero.id) for index, hero in enumerate(heroes)]
+
+
+def _new_heroes(heroes_data: list[HeroCreate]) -> list[Hero]:
+    return [Hero(name=data.name, secret_name=data.secret_name, age=data.age) for data in heroes_data]
 
 
 class HeroService:
@@ -17,6 +28,34 @@ class HeroService:
     def get_all_heroes(self, skip: int = 0, limit: int = 100) -> list[Hero]:
         return self.hero_repo.get_all(skip=skip, limit=limit)
 
+    def get_heroes_page(self, cursor: Optional[str] = None, limit: int = 100) -> tuple[list[Hero], Optional[str]]:
+        return self.hero_repo.get_page(cursor=cursor, limit=limit)
+
     def create_hero(self, name: str, secret_name: str, age: Optional[int] = None) -> Hero:
         hero = Hero(name=name, secret_name=secret_name, age=age)
         return self.hero_repo.create(hero)
+
+    def bulk_create_heroes(self, heroes_data: list[HeroCreate]) -> list[BatchItemResult]:
+        return _batch_results(self.hero_repo.bulk_create(_new_heroes(heroes_data)))
+
+
+class AsyncHeroService:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+        self.hero_repo = AsyncHeroRepository(session)
+
+    async def get_hero_by_id(self, hero_id: int) -> Optional[Hero]:
+        return await self.hero_repo.get_by_id(hero_id)
+
+    async def get_all_heroes(self, skip: int = 0, limit: int = 100) -> list[Hero]:
+        return await self.hero_repo.get_all(skip=skip, limit=limit)
+
+    async def get_heroes_page(self, cursor: Optional[str] = None, limit: int = 100) -> tuple[list[Hero], Optional[str]]:
+        return await self.hero_repo.get_page(cursor=cursor, limit=limit)
+
+    async def create_hero(self, name: str, secret_name: str, age: Optional[int] = None) -> Hero:
+        hero = Hero(name=name, secret_name=secret_name, age=age)
+        return await self.hero_repo.create(hero)
+
+    async def bulk_create_heroes(self, heroes_data: list[HeroCreate]) -> list[BatchItemResult]:
+        return _batch_results(await self.hero_repo.bulk_create(_new_heroes(heroes_data)))
@@ -1,89 +1,262 @@
+from collections.abc import AsyncIterator, Iterator
 from datetime import datetime
-from typing import Optional
+from typing import Literal, Optional
 
+from pydantic_core import to_json
+from sqlalchemy.exc import IntegrityError
 from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
+from models.batch import BatchItemResult
 from models.user import User, UserCreate, UserRead, UserUpdate
-from repositories.user_repository import UserRepository
+from repositories.search import SEARCH_DEFAULT_LIMIT
+from repositories.user_repository import AsyncUserRepository, UserRepository
 
+# 批量 upsert 时按用户名匹配，冲突后更新的字段
+USER_UPSERT_COLUMNS = ["email", "full_name", "updated_at"]
+USER_UPSERT_KEY = ["username"]
 
+# 只读列表接口直接查询 UserRead 所需的列
+USER_READ_FIELDS = list(UserRead.model_fields)
+
+ExportFormat = Literal["ndjson", "json"]
+EXPORT_MEDIA_TYPES: dict[str, str] = {"ndjson": "application/x-ndjson", "json": "application/json"}
+
+
+def _export_chunk(users: list[User], format: ExportFormat, first: bool) -> bytes:
+    rows = [UserRead.model_validate(user).model_dump_json() for user in users]
+    if format == "ndjson":
+        return ("\n".join(rows) + "\n").encode()
+    # json 格式按批次拼接成一个数组
+    return (("" if first else ",") + ",".join(rows)).encode()
+
+
+def _batch_results(
+    users_data: list[UserCreate], rows: list[tuple[User, bool]], upsert: bool = False
+) -> list[BatchItemResult]:
+    written = {user.username: (user, created) for user, created in rows}
+    # 同一批次里重复的用户名只写入一行：插入时保留第一次出现的，upsert 时保留最后一次出现的
+    kept: dict[str, int] = {}
+    for index, data in enumerate(users_data):
+        if upsert or data.username not in kept:
+            kept[data.username] = index
+    results = []
+    for index, data in enumerate(users_data):
+        row = written.get(data.username)
+        if kept[data.username] != index:
+            results.append(
+                BatchItemResult(
+                    index=index,
+                    status="skipped",
+                    detail=f"Duplicate username '{data.username}' in batch, item {kept[data.username]} was written",
+                )
+            )
+        elif row is None or row[0].email != data.email:
+            results.append(
+                BatchItemResult(
+                    index=index,
+                    status="skipped",
+                    detail=f"Username '{data.username}' or email '{data.email}' already exists",
+                )
+            )
+        else:
+            user, created = row
+            results.append(BatchItemResult(index=index, status="created" if created else "updated", id=user.id))
+    return results
+
+
+def _unique_violation_error(error: IntegrityError, username: Optional[str], email: Optional[str]) -> ValueError:
+    """Map a unique violation on username_idx / email_idx back to the messages of the former pre-checks."""
+    diag = getattr(error.orig, "diag", None)
+    constraint = getattr(diag, "constraint_name", None) or str(error.orig)
+    if "email" in constraint:
+        return ValueError(f"Email '{email}' already exists")
+    if "username" in constraint:
+        return ValueError(f"Username '{username}' already exists")
+    raise error
+
+
+def _update_values(user_data: UserUpdate) -> dict:
+    values = user_data.model_dump(exclude_none=True)
+    values["updated_at"] = datetime.utcnow()
+    return values
+
+
+def _new_user(user_data: UserCreate) -> User:
+    return User(username=user_data.username, email=user_data.email, full_name=user_data.full_name)
+
+
+def _read(user: Optional[User]) -> Optional[UserRead]:
+    return UserRead.model_validate(user) if user else None
+
+
+def _read_all(users: list[User]) -> list[UserRead]:
+    return [UserRead.model_validate(user) for user in users]
+
+
+def _batch_email_conflict() -> ValueError:
+    # upsert 按用户名冲突更新时，邮箱仍可能与其他用户重复
+    return ValueError("Email already exists for another user in this batch")
+
+
+# 同步和异步的 service 只在 I/O 上不同，语句和结果的处理都放在上面的函数里
 class UserService:
     def __init__(self, session: Session):
         self.session = session
         self.user_repo = UserRepository(session)
 
     def create_user(self, user_data: UserCreate) -> UserRead:
-        # 检查用户名和邮箱是否已存在
-        if self.user_repo.get_by_username(user_data.username):
-            raise ValueError(f"Username '{user_data.username}' already exists")
-
-        if self.user_repo.get_by_email(user_data.email):
-            raise ValueError(f"Email '{user_data.email}' already exists")
-
-        # 创建新用户
-        user = User(
-            username=user_data.username,
-            email=user_data.email,
-            full_name=user_data.full_name,
-        )
-
-        created_user = self.user_repo.create(user)
+        # 依赖 username_idx / email_idx 唯一索引保证唯一性，一条 INSERT ... RETURNING 完成写入
+        try:
+            created_user = self.user_repo.create_returning(_new_user(user_data))
+        except IntegrityError as e:
+            self.session.rollback()
+            raise _unique_violation_error(e, user_data.username, user_data.email)
         return UserRead.model_validate(created_user)
 
     def get_user(self, user_id: int) -> Optional[UserRead]:
-        user = self.user_repo.get_by_id(user_id)
-        if user:
-            return UserRead.model_validate(user)
-        return None
+        return _read(self.user_repo.get_by_id(user_id))
 
     def get_user_by_username(self, username: str) -> Optional[UserRead]:
-        user = self.user_repo.get_by_username(username)
-        if user:
-            return UserRead.model_validate(user)
-        return None
+        return _read(self.user_repo.get_by_username(username))
 
     def update_user(self, user_id: int, user_data: UserUpdate) -> Optional[UserRead]:
-        user = self.user_repo.get_by_id(user_id)
-        if not user:
-            return None
+        # 一条 UPDATE ... RETURNING 完成更新，用户不存在时返回 None
+        try:
+            updated_user = self.user_repo.update_returning(user_id, _update_values(user_data))
+        except IntegrityError as e:
+            self.session.rollback()
+            raise _unique_violation_error(e, user_data.username, user_data.email)
+        return _read(updated_user)
 
-        # 更新字段
-        if user_data.username is not None:
-            # 检查用户名是否已被其他用户使用
-            existing = self.user_repo.get_by_username(user_data.username)
-            if existing and existing.id != user_id:
-                raise ValueError(f"Username '{user_data.username}' already exists")
-            user.username = user_data.username
+    def bulk_create_users(self, users_data: list[UserCreate], upsert: bool = False) -> list[BatchItemResult]:
+        users = [_new_user(data) for data in users_data]
+        try:
+            if upsert:
+                rows = self.user_repo.bulk_upsert(
+                    users, conflict_columns=USER_UPSERT_KEY, update_columns=USER_UPSERT_COLUMNS
+                )
+            else:
+                rows = [(user, True) for user in self.user_repo.bulk_create(users)]
+        except IntegrityError:
+            self.session.rollback()
+            raise _batch_email_conflict()
+        return _batch_results(users_data, rows, upsert=upsert)
 
-        if user_data.email is not None:
-            # 检查邮箱是否已被其他用户使用
-            existing = self.user_repo.get_by_email(user_data.email)
-            if existing and existing.id != user_id:
-                raise ValueError(f"Email '{user_data.email}' already exists")
-            user.email = user_data.email
+    def delete_user(self, user_id: int) -> bool:
+        return self.user_repo.delete_by_id(user_id)
 
-        if user_data.full_name is not None:
-            user.full_name = user_data.full_name
+    def get_all_users(self, skip: int = 0, limit: int = 100) -> list[UserRead]:
+        return _read_all(self.user_repo.get_all(skip=skip, limit=limit))
 
-        if user_data.is_active is not None:
-            user.is_active = user_data.is_active
+    def get_users_page(
+        self, cursor: Optional[str] = None, limit: int = 100, order_by: str = "id"
+    ) -> tuple[list[UserRead], Optional[str]]:
+        users, next_cursor = self.user_repo.get_page(cursor=cursor, limit=limit, order_by=order_by)
+        return _read_all(users), next_cursor
 
-        user.updated_at = datetime.utcnow()
+    def get_users_page_json(
+        self, cursor: Optional[str] = None, limit: int = 100, order_by: str = "id"
+    ) -> tuple[bytes, Optional[str]]:
+        """Same page as get_users_page, serialized straight from the selected columns to JSON bytes."""
+        rows, next_cursor = self.user_repo.get_page_rows(
+            USER_READ_FIELDS, cursor=cursor, limit=limit, order_by=order_by
+        )
+        return to_json(rows), next_cursor
 
-        updated_user = self.user_repo.update(user)
-        return UserRead.model_validate(updated_user)
+    def get_active_users(self) -> list[UserRead]:
+        return _read_all(self.user_repo.get_active_users())
 
-    def delete_user(self, user_id: int) -> bool:
-        return self.user_repo.delete_by_id(user_id)
+    def export_users(self, active_only: bool = True, format: ExportFormat = "ndjson") -> Iterator[bytes]:
+        """Serialize users batch by batch from a server-side cursor, one chunk per batch."""
+        if format == "json":
+            yield b"["
+        first = True
+        for users in self.user_repo.iter_users(active_only=active_only):
+            yield _export_chunk(users, format, first)
+            first = False
+        if format == "json":
+            yield b"]"
 
-    def get_all_users(self, skip: int = 0, limit: int = 100) -> list[UserRead]:
-        users = self.user_repo.get_all(skip=skip, limit=limit)
-        return [UserRead.model_validate(user) for user in users]
+    def search_users(self, query: str, limit: int = SEARCH_DEFAULT_LIMIT, skip: int = 0) -> list[UserRead]:
+        return _read_all(self.user_repo.search_by_name(query, limit=limit, skip=skip))
 
-    def get_active_users(self) -> list[UserRead]:
-        users = self.user_repo.get_active_users()
-        return [UserRead.model_validate(user) for user in users]
 
-    def search_users(self, query: str) -> list[UserRead]:
-        users = self.user_repo.search_by_name(query)
-        return [UserRead.model_validate(user) for user in users]
\ No newline at end of file
+class AsyncUserService:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+        self.user_repo = AsyncUserRepository(session)
+
+    async def create_user(self, user_data: UserCreate) -> UserRead:
+        # 依赖 username_idx / email_idx 唯一索引保证唯一性，一条 INSERT ... RETURNING 完成写入
+        try:
+            created_user = await self.user_repo.create_returning(_new_user(user_data))
+        except IntegrityError as e:
+            await self.session.rollback()
+            raise _unique_violation_error(e, user_data.username, user_data.email)
+        return UserRead.model_validate(created_user)
+
+    async def get_user(self, user_id: int) -> Optional[UserRead]:
+        return _read(await self.user_repo.get_by_id(user_id))
+
+    async def get_user_by_username(self, username: str) -> Optional[UserRead]:
+        return _read(await self.user_repo.get_by_username(username))
+
+    async def update_user(self, user_id: int, user_data: UserUpdate) -> Optional[UserRead]:
+        # 一条 UPDATE ... RETURNING 完成更新，用户不存在时返回 None
+        try:
+            updated_user = await self.user_repo.update_returning(user_id, _update_values(user_data))
+        except IntegrityError as e:
+            await self.session.rollback()
+            raise _unique_violation_error(e, user_data.username, user_data.email)
+        return _read(updated_user)
+
+    async def bulk_create_users(self, users_data: list[UserCreate], upsert: bool = False) -> list[BatchItemResult]:
+        users = [_new_user(data) for data in users_data]
+        try:
+            if upsert:
+                rows = await self.user_repo.bulk_upsert(
+                    users, conflict_columns=USER_UPSERT_KEY, update_columns=USER_UPSERT_COLUMNS
+                )
+            else:
+                rows = [(user, True) for user in await self.user_repo.bulk_create(users)]
+        except IntegrityError:
+            await self.session.rollback()
+            raise _batch_email_conflict()
+        return _batch_results(users_data, rows, upsert=upsert)
+
+    async def delete_user(self, user_id: int) -> bool:
+        return await self.user_repo.delete_by_id(user_id)
+
+    async def get_all_users(self, skip: int = 0, limit: int = 100) -> list[UserRead]:
+        return _read_all(await self.user_repo.get_all(skip=skip, limit=limit))
+
+    async def get_users_page(
+        self, cursor: Optional[str] = None, limit: int = 100, order_by: str = "id"
+    ) -> tuple[list[UserRead], Optional[str]]:
+        users, next_cursor = await self.user_repo.get_page(cursor=cursor, limit=limit, order_by=order_by)
+        return _read_all(users), next_cursor
+
+    async def get_users_page_json(
+        self, cursor: Optional[str] = None, limit: int = 100, order_by: str = "id"
+    ) -> tuple[bytes, Optional[str]]:
+        rows, next_cursor = await self.user_repo.get_page_rows(
+            USER_READ_FIELDS, cursor=cursor, limit=limit, order_by=order_by
+        )
+        return to_json(rows), next_cursor
+
+    async def get_active_users(self) -> list[UserRead]:
+        return _read_all(await self.user_repo.get_active_users())
+
+    async def export_users(self, active_only: bool = True, format: ExportFormat = "ndjson") -> AsyncIterator[bytes]:
+        if format == "json":
+            yield b"["
+        first = True
+        async for users in self.user_repo.iter_users(active_only=active_only):
+            yield _export_chunk(users, format, first)
+            first = False
+        if format == "json":
+            yield b"]"
+
+    async def search_users(self, query: str, limit: int = SEARCH_DEFAULT_LIMIT, skip: int = 0) -> list[UserRead]:
+        return _read_all(await self.user_repo.search_by_name(query, limit=limit, skip=skip))
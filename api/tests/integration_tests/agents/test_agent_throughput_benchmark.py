@@ -0,0 +1,64 @@
+import argparse
+import asyncio
+
+import pytest
+
+from benchmarks.agent_throughput import free_port, run_level, start_api_server, start_mock_server, stop, summarize
+
+# 每个并发等级发出的请求数
+REQUESTS_PER_CLIENT = 4
+
+
+@pytest.fixture(scope="module")
+def api_server(db_engine):
+    # api 指向自带的 mock 服务，不消耗模型 token
+    args = argparse.Namespace(
+        mock_port=free_port(),
+        api_port=free_port(),
+        workers=1,
+        ttft=0.2,
+        tokens_per_second=50.0,
+        completion_tokens=64,
+        error_rate=0.0,
+    )
+    mock = api = None
+    try:
+        mock = start_mock_server(args)
+        api = start_api_server(args)
+        yield f"http://127.0.0.1:{args.api_port}", api.pid
+    finally:
+        stop(api)
+        stop(mock)
+
+
+@pytest.mark.benchmark(group="POST /agents/{agent_id}/runs")
+@pytest.mark.parametrize("concurrency", [1, 8, 32])
+def test_agent_run_throughput(benchmark, api_server, concurrency):
+    base_url, server_pid = api_server
+
+    def level():
+        return asyncio.run(
+            run_level(
+                base_url,
+                "basic-agent",
+                concurrency,
+                REQUESTS_PER_CLIENT * concurrency,
+                "Tell me the latest news",
+                timeout=120,
+            )
+        )
+
+    results, duration = benchmark.pedantic(level, rounds=1, iterations=1)
+
+    report = summarize(concurrency, results, duration, server_pid)
+    benchmark.extra_info.update(
+        {
+            "ttft_ms": report.ttft_ms,
+            "latency_ms": report.latency_ms,
+            "tokens_per_second": report.tokens_per_second,
+            "requests_per_second": report.requests_per_second,
+            "peak_rss_mb": report.peak_rss_mb,
+        }
+    )
+    assert report.errors == 0, [result.error for result in results if not result.ok][:3]
+    assert report.ttft_ms["p50"] >= 200
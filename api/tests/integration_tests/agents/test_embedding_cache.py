@@ -0,0 +1,35 @@
+import asyncio
+import uuid
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from agents.embedding_cache import CACHE_TABLE, PostgresEmbeddingCacheBackend, content_hash, encode_embedding
+from configs import higgs_config
+
+
+def test_postgres_backend_keeps_the_first_embedding(db_engine, monkeypatch):
+    model = f"test-{uuid.uuid4().hex[:8]}"
+    alpha, beta = content_hash("alpha"), content_hash("beta")
+
+    async def scenario():
+        engine = create_async_engine(higgs_config.SQLALCHEMY_ASYNC_DATABASE_URI)
+        monkeypatch.setattr(PostgresEmbeddingCacheBackend, "_engine", lambda self: engine)
+        backend = PostgresEmbeddingCacheBackend()
+        try:
+            await backend.set_many(model, {alpha: encode_embedding([1.0]), beta: encode_embedding([2.0])})
+            # 同一文本的嵌入不变，重复写入保留已有的值
+            await backend.set_many(model, {alpha: encode_embedding([3.0])})
+            return (
+                await backend.get_many(model, [alpha, beta, content_hash("gamma")]),
+                await backend.get_many(f"{model}-other", [alpha]),
+            )
+        finally:
+            async with engine.begin() as conn:
+                await conn.execute(text(f"DELETE FROM {CACHE_TABLE} WHERE model = :model"), {"model": model})
+            await engine.dispose()
+
+    found, other = asyncio.run(scenario())
+
+    assert found == {alpha: encode_embedding([1.0]), beta: encode_embedding([2.0])}
+    assert other == {}
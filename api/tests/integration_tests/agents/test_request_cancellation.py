@@ -0,0 +1,101 @@
+import argparse
+import json
+import time
+import uuid
+
+import httpx
+import pytest
+
+from benchmarks.agent_throughput import free_port, start_api_server, start_mock_server, stop
+
+# 截止时间远长于读到第一个 token 的时间，远短于整段生成（64 个 token，每秒 5 个）
+RUN_DEADLINE = 3.0
+
+
+@pytest.fixture(scope="module")
+def servers(db_engine):
+    args = argparse.Namespace(
+        mock_port=free_port(),
+        api_port=free_port(),
+        workers=1,
+        ttft=0.2,
+        tokens_per_second=5.0,
+        completion_tokens=64,
+        error_rate=0.0,
+    )
+    mock = api = None
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setenv("REQUEST_DEADLINES", json.dumps({"/agents/*/runs*": RUN_DEADLINE}))
+        try:
+            mock = start_mock_server(args)
+            api = start_api_server(args)
+            yield f"http://127.0.0.1:{args.api_port}", f"http://127.0.0.1:{args.mock_port}"
+        finally:
+            stop(api)
+            stop(mock)
+
+
+def run_data(stream: bool) -> dict[str, str]:
+    return {
+        "message": "Tell me the latest news",
+        "stream": str(stream).lower(),
+        "session_id": str(uuid.uuid4()),
+        "user_id": "test",
+    }
+
+
+def cancelled(mock_url: str) -> int:
+    return httpx.get(f"{mock_url}/stats").json()["cancelled"]
+
+
+def wait_cancelled(mock_url: str, count: int, timeout: float = 10) -> int:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if (current := cancelled(mock_url)) >= count:
+            return current
+        time.sleep(0.1)
+    return cancelled(mock_url)
+
+
+def test_streaming_run_cancelled_on_disconnect(servers):
+    api_url, mock_url = servers
+    before = cancelled(mock_url)
+    with httpx.Client(base_url=api_url, timeout=30) as client:
+        with client.stream("POST", "/agents/basic-agent/runs", data=run_data(stream=True)) as response:
+            assert response.status_code == 200
+            event = None
+            for line in response.iter_lines():
+                if line.startswith("event:"):
+                    event = line[6:].strip()
+                elif line.startswith("data:") and event == "RunContent" and json.loads(line[5:]).get("content"):
+                    break
+        # 读到第一个 token 后断开
+
+    assert wait_cancelled(mock_url, before + 1) == before + 1
+
+
+def test_run_cancelled_on_disconnect(servers):
+    api_url, mock_url = servers
+    before = cancelled(mock_url)
+    with httpx.Client(base_url=api_url, timeout=1) as client:
+        # 非流式的运行在生成结束前超时，客户端断开
+        with pytest.raises(httpx.ReadTimeout):
+            client.post("/agents/basic-agent/runs", data=run_data(stream=False))
+
+    assert wait_cancelled(mock_url, before + 1) == before + 1
+
+
+def test_streaming_run_truncated_after_deadline(servers):
+    api_url, mock_url = servers
+    before = cancelled(mock_url)
+    start = time.monotonic()
+    with httpx.Client(base_url=api_url, timeout=30) as client:
+        with client.stream("POST", "/agents/basic-agent/runs", data=run_data(stream=True)) as response:
+            assert response.status_code == 200
+            # 截止时间到了连接被断开，而不是正常结束的 body
+            with pytest.raises(httpx.RemoteProtocolError):
+                for _ in response.iter_lines():
+                    pass
+
+    assert time.monotonic() - start < RUN_DEADLINE + 5
+    assert wait_cancelled(mock_url, before + 1) == before + 1
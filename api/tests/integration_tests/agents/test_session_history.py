@@ -0,0 +1,109 @@
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from agno.db.base import SessionType
+from agno.models.message import Message
+from agno.run.agent import RunOutput
+from agno.run.base import RunStatus
+from agno.session import AgentSession
+from sqlalchemy import delete, text
+from sqlmodel import col
+
+from agents.session_history import BoundedPostgresDb, HistoryWindow
+from models.agent_session import AgentSessionRun, AgentSessionSummary
+from models.engine import metadata
+
+
+class SummaryModel:
+    """Summary model answering with the prompts it was given, so the test can see what was folded in."""
+
+    def __init__(self):
+        self.prompts: list[str] = []
+
+    def response(self, messages: list[Message]) -> SimpleNamespace:
+        self.prompts.append(str(messages[-1].content))
+        return SimpleNamespace(content=f"summary {len(self.prompts)}")
+
+
+@pytest.fixture
+def summary_model():
+    return SummaryModel()
+
+
+@pytest.fixture
+def db(db_engine, summary_model, monkeypatch):
+    monkeypatch.setattr("agents.session_history.higgs_config.SESSION_WRITE_BEHIND_ENABLED", False)
+    monkeypatch.setattr("agents.session_history.higgs_config.SESSION_SUMMARY_ENABLED", False)
+    monkeypatch.setattr("agents.session_history.higgs_config.SESSION_SUMMARY_BATCH_RUNS", 2)
+    monkeypatch.setattr("agents.session_cache.higgs_config.SESSION_CACHE_ENABLED", False)
+    metadata.create_all(db_engine, tables=[AgentSessionRun.__table__, AgentSessionSummary.__table__])  # type: ignore[list-item]
+    table = f"test_sessions_{uuid.uuid4().hex[:8]}"
+    db = BoundedPostgresDb(
+        db_engine=db_engine, session_table=table, window=HistoryWindow(max_runs=2), summary_model=lambda: summary_model
+    )
+    session_ids: list[str] = []
+    db.session_ids = session_ids  # type: ignore[attr-defined]
+    yield db
+    db.writer.close(5)
+    with db_engine.begin() as conn:
+        conn.execute(delete(AgentSessionRun).where(col(AgentSessionRun.session_id).in_(session_ids)))
+        conn.execute(delete(AgentSessionSummary).where(col(AgentSessionSummary.session_id).in_(session_ids)))
+        conn.execute(text(f'DROP TABLE IF EXISTS {db.db_schema}."{table}"'))
+
+
+def agent_session(db, turns: int) -> AgentSession:
+    session_id = str(uuid.uuid4())
+    db.session_ids.append(session_id)
+    runs = [
+        RunOutput(
+            run_id=f"{session_id}-{turn}",
+            session_id=session_id,
+            status=RunStatus.completed,
+            messages=[
+                Message(role="user", content=f"question {turn}"),
+                Message(role="assistant", content=f"answer {turn}"),
+            ],
+        )
+        for turn in range(turns)
+    ]
+    return AgentSession(session_id=session_id, agent_id="test-agent", user_id="user", runs=runs)
+
+
+def test_runs_leaving_the_window_are_archived(db):
+    session = agent_session(db, turns=5)
+    db.upsert_session(session)
+
+    loaded = db.get_session(session.session_id, SessionType.AGENT)
+    assert [run.run_id for run in loaded.runs] == [f"{session.session_id}-{turn}" for turn in (3, 4)]
+    archived = db.get_archived_runs(session.session_id)
+    assert [run.run_id for run in archived] == [f"{session.session_id}-{turn}" for turn in (0, 1, 2)]
+
+
+def test_archived_runs_are_folded_into_the_summary(db, summary_model):
+    session = agent_session(db, turns=5)
+    db.upsert_session(session)
+
+    # 每轮最多摘要 2 个 run，3 个归档的 run 分两轮
+    assert db.summarize_session(session.session_id) == "summary 2"
+    assert "question 0" in summary_model.prompts[0]
+    assert "question 2" not in summary_model.prompts[0]
+    assert "<previous_summary>\nsummary 1\n</previous_summary>" in summary_model.prompts[1]
+    assert "question 2" in summary_model.prompts[1]
+
+    loaded = db.get_session(session.session_id, SessionType.AGENT)
+    assert loaded.summary.summary == "summary 2"
+    # 已经摘要过的 run 不会重复摘要
+    assert db.summarize_session(session.session_id) == "summary 2"
+    assert len(summary_model.prompts) == 2
+
+
+def test_deleting_a_session_deletes_its_history(db):
+    session = agent_session(db, turns=5)
+    db.upsert_session(session)
+    db.summarize_session(session.session_id)
+
+    assert db.delete_session(session.session_id)
+    assert db.get_session(session.session_id, SessionType.AGENT) is None
+    assert db.get_archived_runs(session.session_id) == []
+    assert db._get_summary(session.session_id) is None
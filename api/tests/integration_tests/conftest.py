@@ -0,0 +1,57 @@
+import uuid
+
+import pytest
+from sqlalchemy import event, inspect, text
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session, delete
+
+from models.engine import engine, metadata
+from models.hero import Hero
+from models.search import SEARCH_EXTENSION
+from models.user import User
+
+
+@pytest.fixture(scope="session")
+def db_engine():
+    """Engine of the database configured through ``.env``, with the tables the tests write to."""
+    try:
+        with engine.connect():
+            pass
+    except OperationalError:
+        pytest.skip("Postgres is not reachable")
+    # 没有执行迁移的数据库上直接建表
+    if not inspect(engine).has_table(User.__tablename__):
+        with engine.begin() as conn:
+            conn.execute(text(f"CREATE EXTENSION IF NOT EXISTS {SEARCH_EXTENSION}"))
+    metadata.create_all(engine, tables=[User.__table__, Hero.__table__])  # type: ignore[list-item]
+    return engine
+
+
+@pytest.fixture
+def session(db_engine):
+    with Session(db_engine, expire_on_commit=False) as session:
+        yield session
+
+
+@pytest.fixture
+def prefix(session):
+    """Unique prefix of the usernames and hero names a test writes, those rows are removed afterwards."""
+    value = f"test-{uuid.uuid4().hex[:8]}"
+    yield value
+    session.rollback()
+    session.exec(delete(User).where(User.username.startswith(value)))  # type: ignore[call-overload,attr-defined]
+    session.exec(delete(Hero).where(Hero.name.startswith(value)))  # type: ignore[call-overload,attr-defined]
+    session.commit()
+
+
+@pytest.fixture
+def statements(db_engine):
+    """SQL statements sent through the sync engine while the test runs."""
+    executed: list[str] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(db_engine, "before_cursor_execute", record)
+    yield executed
+    event.remove(db_engine, "before_cursor_execute", record)
@@ -0,0 +1,57 @@
+from typing import Optional
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlmodel import Session, delete
+
+from controllers.service_api.demo import router as demo_router
+from dependencies.services import AsyncUserServiceDep
+from models.engine import async_engine
+from models.user import User, UserRead
+from repositories.user_repository import UserRepository
+
+LIMIT = 1000
+
+pytestmark = pytest.mark.benchmark(group="GET /v1/demo/users?limit=1000")
+
+
+@pytest.fixture(scope="module")
+def client(db_engine):
+    # 至少 LIMIT 个用户，两个接口都返回满页
+    prefix = "test-user-list"
+    with Session(db_engine) as session:
+        UserRepository(session).bulk_create(
+            [User(username=f"{prefix}-{index}", email=f"{prefix}-{index}@example.com") for index in range(LIMIT)]
+        )
+
+    app = FastAPI()
+    app.include_router(demo_router, prefix="/v1")
+
+    # 精简读取路径之前的实现：ORM 实体逐个转成 UserRead，再经过 response_model 校验
+    @app.get("/hydrated/users", response_model=list[UserRead])
+    async def get_users_hydrated(user_service: AsyncUserServiceDep, limit: int = 100, cursor: Optional[str] = None):
+        users, _ = await user_service.get_users_page(cursor=cursor, limit=limit)
+        return users
+
+    with TestClient(app) as client:
+        yield client
+        # 异步连接池绑定在 TestClient 的事件循环上
+        client.portal.call(async_engine.dispose)  # type: ignore[union-attr]
+
+    with Session(db_engine) as session:
+        session.exec(delete(User).where(User.username.startswith(f"{prefix}-")))  # type: ignore[call-overload,attr-defined]
+        session.commit()
+
+
+def test_hydrated_user_list(benchmark, client):
+    response = benchmark(client.get, "/hydrated/users", params={"limit": LIMIT})
+    assert response.status_code == 200
+    assert len(response.json()) == LIMIT
+
+
+def test_lean_user_list(benchmark, client):
+    response = benchmark(client.get, "/v1/demo/users", params={"limit": LIMIT})
+    assert response.status_code == 200
+    assert len(response.json()) == LIMIT
+    assert response.json() == client.get("/hydrated/users", params={"limit": LIMIT}).json()
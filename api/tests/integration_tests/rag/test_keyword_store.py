@@ -0,0 +1,94 @@
+import asyncio
+import uuid
+
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from configs import higgs_config
+from rag.keyword_store import KeywordDocument
+from rag.keyword_store.postgres import PostgresKeywordStore
+
+pytest.importorskip("jieba")
+
+DOCUMENTS = [
+    KeywordDocument("a", "向量数据库支持向量检索和向量索引", {"source": "docs"}),
+    KeywordDocument("b", "B 树索引", {"source": "docs"}),
+    KeywordDocument("c", "检索增强生成先检索再生成回答", {"source": "faq"}),
+    KeywordDocument("d", "北京的天气很好", {"source": "faq"}),
+]
+
+
+@pytest.fixture(autouse=True)
+def in_thread(monkeypatch):
+    # 测试中分词在线程里执行，不启动进程池
+    monkeypatch.setattr("rag.cpu_pool.higgs_config.RETRIEVAL_SERVICE_EXECUTORS", 0)
+
+
+def run_with_store(db_engine, scenario):
+    """Run ``scenario(store)`` on a new collection of the test database, dropped afterwards."""
+
+    async def run():
+        engine = create_async_engine(higgs_config.SQLALCHEMY_ASYNC_DATABASE_URI)
+        store = PostgresKeywordStore(f"test_{uuid.uuid4().hex[:8]}", engine=engine)
+        try:
+            return await scenario(store)
+        finally:
+            await store.drop_collection()
+            await engine.dispose()
+
+    return asyncio.run(run())
+
+
+def test_bm25_ranks_by_term_frequency_and_rarity(db_engine):
+    async def scenario(store: PostgresKeywordStore):
+        assert await store.add(DOCUMENTS) == 4
+        return (
+            await store.search("向量检索"),
+            await store.search("索引"),
+            await store.search("上海"),
+            await store.count(),
+        )
+
+    vector_search, index, missing, count = run_with_store(db_engine, scenario)
+
+    # "向量" 只出现在 a 中且出现三次，a 排在只含 "检索" 的 c 之前
+    assert [result.id for result in vector_search] == ["a", "c"]
+    assert vector_search[0].score > vector_search[1].score > 0
+    # "索引" 在 a、b 中各出现一次，较短的 b 得分更高
+    assert [result.id for result in index] == ["b", "a"]
+    assert missing == []
+    assert count == 4
+
+
+def test_filters_and_top_k_limit_the_results(db_engine):
+    async def scenario(store: PostgresKeywordStore):
+        await store.add(DOCUMENTS)
+        return (
+            await store.search("检索", filters={"source": "faq"}),
+            await store.search("数据库 检索", top_k=1),
+        )
+
+    faq, top = run_with_store(db_engine, scenario)
+
+    assert [result.id for result in faq] == ["c"]
+    assert len(top) == 1
+
+
+def test_updates_and_deletes_are_searchable_without_rebuild(db_engine):
+    async def scenario(store: PostgresKeywordStore):
+        await store.add(DOCUMENTS)
+        before = await store.search("天气")
+        # 同一 id 的文档被替换，旧的检索词不再命中
+        await store.add([KeywordDocument("d", "上海的天气也很好", {"source": "faq"})])
+        replaced = await store.search("北京"), await store.search("上海")
+        deleted = await store.delete_by_ids(["a"]), await store.delete({"source": "faq"})
+        return before, replaced, deleted, await store.search("检索"), await store.count()
+
+    before, (beijing, shanghai), deleted, after, count = run_with_store(db_engine, scenario)
+
+    assert [result.id for result in before] == ["d"]
+    assert beijing == []
+    assert [result.id for result in shanghai] == ["d"]
+    assert deleted == (1, 2)
+    assert after == []
+    assert count == 1
@@ -0,0 +1,90 @@
+import asyncio
+import uuid
+
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from configs import higgs_config
+from rag.vector_store import VectorDocument
+from rag.vector_store.pgvector import PGVectorStore
+
+DOCUMENTS = [
+    VectorDocument("a", [1.0, 0.0, 0.0], "alpha", {"source": "docs", "lang": "en"}),
+    VectorDocument("b", [0.9, 0.1, 0.0], "beta", {"source": "docs", "lang": "zh"}),
+    VectorDocument("c", [0.0, 1.0, 0.0], "gamma", {"source": "faq", "lang": "en"}),
+    VectorDocument("d", [0.0, 0.0, 1.0], "delta", {"source": "faq", "lang": "fr"}),
+]
+
+
+def run_with_store(db_engine, scenario, **kwargs):
+    """Run ``scenario(store)`` on a new collection of the test database, dropped afterwards."""
+
+    async def run():
+        engine = create_async_engine(higgs_config.SQLALCHEMY_ASYNC_DATABASE_URI)
+        store = PGVectorStore(f"test_{uuid.uuid4().hex[:8]}", 3, engine=engine, **kwargs)
+        try:
+            return await scenario(store)
+        finally:
+            await store.drop_collection()
+            await engine.dispose()
+
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("index_type", ["hnsw", "ivfflat"])
+def test_search_returns_the_closest_documents(db_engine, index_type):
+    async def scenario(store: PGVectorStore):
+        assert await store.upsert(DOCUMENTS) == 4
+        await store.create_index()
+        return await store.search([1.0, 0.05, 0.0], top_k=3), await store.search([1.0, 0.0, 0.0], exact=True)
+
+    approximate, exact = run_with_store(db_engine, scenario, index_type=index_type)
+
+    assert [result.id for result in approximate][:2] == ["a", "b"]
+    assert approximate[0].score > approximate[1].score
+    assert exact[0].id == "a"
+    assert exact[0].score == pytest.approx(1.0)
+
+
+def test_filters_select_on_metadata(db_engine):
+    async def scenario(store: PGVectorStore):
+        await store.upsert(DOCUMENTS)
+        return (
+            await store.search([1.0, 0.0, 0.0], top_k=4, filters={"source": "faq"}),
+            await store.search([1.0, 0.0, 0.0], top_k=4, filters={"lang": ["zh", "fr"]}),
+            await store.search([1.0, 0.0, 0.0], top_k=4, score_threshold=0.5),
+        )
+
+    faq, any_lang, similar = run_with_store(db_engine, scenario)
+
+    assert {result.id for result in faq} == {"c", "d"}
+    assert {result.id for result in any_lang} == {"b", "d"}
+    assert [result.id for result in similar] == ["a", "b"]
+
+
+def test_upsert_replaces_and_delete_removes(db_engine):
+    async def scenario(store: PGVectorStore):
+        await store.upsert(DOCUMENTS)
+        await store.upsert([VectorDocument("a", [0.0, 1.0, 0.0], "alpha v2", {"source": "faq"})])
+        replaced = await store.search([0.0, 1.0, 0.0], top_k=4, filters={"source": "faq"}, exact=True)
+        deleted = await store.delete({"source": "faq"}), await store.delete_by_ids(["b", "missing"])
+        return replaced, deleted, await store.count()
+
+    replaced, deleted, count = run_with_store(db_engine, scenario)
+
+    replaced_a = next(result for result in replaced if result.id == "a")
+    assert (replaced_a.content, replaced_a.metadata) == ("alpha v2", {"source": "faq"})
+    assert replaced_a.score == pytest.approx(1.0)
+    assert deleted == (3, 1)
+    assert count == 0
+
+
+def test_existing_index_decides_the_index_type(db_engine):
+    async def scenario(store: PGVectorStore):
+        await store.upsert(DOCUMENTS)
+        await store.create_index("ivfflat")
+        reopened = PGVectorStore(store.collection, 3, index_type="hnsw", engine=store._engine())
+        await reopened.create_collection()
+        return reopened.index_type
+
+    assert run_with_store(db_engine, scenario, index_type="hnsw") == "ivfflat"
@@ -0,0 +1,44 @@
+import asyncio
+import uuid
+
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import delete
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from configs import higgs_config
+from models.engine import metadata
+from models.ingestion import IngestionCheckpoint
+from repositories.ingestion_repository import AsyncIngestionCheckpointRepository
+
+
+def test_checkpoints_are_upserted_per_source(db_engine):
+    metadata.create_all(db_engine, tables=[IngestionCheckpoint.__table__])  # type: ignore[list-item]
+    collection = f"test_{uuid.uuid4().hex[:8]}"
+
+    async def scenario():
+        engine = create_async_engine(higgs_config.SQLALCHEMY_ASYNC_DATABASE_URI)
+        try:
+            async with AsyncSession(engine, expire_on_commit=False) as session:
+                repository = AsyncIngestionCheckpointRepository(session)
+                await repository.save(collection, "a.txt", "hash-1", 3, "processing")
+                await repository.save(collection, "b.txt", "hash-2", 1, "processing")
+                # 同一文件再次导入时覆盖原来的检查点
+                await repository.save(collection, "a.txt", "hash-3", 2, "processing")
+                await repository.set_status(collection, ["a.txt"], "done")
+                await repository.set_status(collection, ["b.txt"], "failed", "store unavailable")
+                await repository.set_status(collection, [], "done")
+                checkpoints = await repository.get_checkpoints(collection)
+                other = await repository.get_checkpoints(f"{collection}_other")
+                await session.exec(delete(IngestionCheckpoint).where(IngestionCheckpoint.collection == collection))  # type: ignore[call-overload]
+                await session.commit()
+                return checkpoints, other
+        finally:
+            await engine.dispose()
+
+    checkpoints, other = asyncio.run(scenario())
+
+    assert other == {}
+    assert set(checkpoints) == {"a.txt", "b.txt"}
+    a, b = checkpoints["a.txt"], checkpoints["b.txt"]
+    assert (a.content_hash, a.chunks, a.status, a.error) == ("hash-3", 2, "done", None)
+    assert (b.status, b.error) == ("failed", "store unavailable")
@@ -0,0 +1,59 @@
+import pytest
+from sqlmodel import select
+
+from models.hero import Hero, HeroCreate
+from models.user import User, UserCreate
+from services.hero_service import HeroService
+from services.user_service import UserService
+
+
+@pytest.mark.parametrize("upsert", [False, True])
+def test_duplicate_username_with_different_emails(session, prefix, upsert):
+    users_data = [
+        UserCreate(username=f"{prefix}-a", email=f"{prefix}-first@example.com"),
+        UserCreate(username=f"{prefix}-b", email=f"{prefix}-b@example.com"),
+        UserCreate(username=f"{prefix}-a", email=f"{prefix}-last@example.com"),
+    ]
+
+    results = UserService(session).bulk_create_users(users_data, upsert=upsert)
+
+    # 插入保留第一次出现的行，upsert 保留最后一次出现的行
+    written, duplicate = (2, 0) if upsert else (0, 2)
+    user = session.exec(select(User).where(User.username == f"{prefix}-a")).one()
+    assert user.email == users_data[written].email
+    assert [result.index for result in results] == [0, 1, 2]
+    assert results[written].status == "created"
+    assert results[written].id == user.id
+    assert results[duplicate].status == "skipped"
+    assert "Duplicate username" in (results[duplicate].detail or "")
+    assert results[1].status == "created"
+
+
+def test_upsert_updates_existing_username(session, prefix):
+    service = UserService(session)
+    service.bulk_create_users([UserCreate(username=f"{prefix}-a", email=f"{prefix}-old@example.com")])
+
+    results = service.bulk_create_users(
+        [UserCreate(username=f"{prefix}-a", email=f"{prefix}-new@example.com", full_name="New")], upsert=True
+    )
+
+    assert [result.status for result in results] == ["updated"]
+    user = session.exec(select(User).where(User.username == f"{prefix}-a")).one()
+    assert (user.id, user.email, user.full_name) == (results[0].id, f"{prefix}-new@example.com", "New")
+
+
+@pytest.mark.parametrize("copy_threshold", [None, 10])
+def test_hero_results_follow_request_order(session, prefix, monkeypatch, copy_threshold):
+    if copy_threshold is not None:
+        # 小批量也走 COPY 临时表的路径
+        monkeypatch.setattr("repositories.base.BULK_COPY_THRESHOLD", copy_threshold)
+    monkeypatch.setattr("repositories.base.BULK_INSERT_BATCH_SIZE", 7)
+    heroes_data = [
+        HeroCreate(name=f"{prefix}-{index}", secret_name=f"secret-{index}", age=index) for index in range(25)
+    ]
+
+    results = HeroService(session).bulk_create_heroes(heroes_data)
+
+    assert [result.index for result in results] == list(range(len(heroes_data)))
+    names = dict(session.exec(select(Hero.id, Hero.name).where(Hero.name.startswith(prefix))).all())  # type: ignore[attr-defined]
+    assert [names[result.id] for result in results] == [data.name for data in heroes_data]
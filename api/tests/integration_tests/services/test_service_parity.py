@@ -0,0 +1,80 @@
+import asyncio
+from typing import Any
+
+import pytest
+
+from models.engine import async_engine, async_session_maker
+from models.user import UserCreate, UserUpdate
+from services.user_service import AsyncUserService, UserService
+
+
+def normalize(value: Any, prefix: str) -> Any:
+    """Results of one variant with the ids, timestamps and prefix left out, to compare with the other."""
+    if isinstance(value, list | tuple):
+        return [normalize(item, prefix) for item in value]
+    if hasattr(value, "model_dump"):
+        value = value.model_dump(exclude={"id", "created_at", "updated_at"})
+    if isinstance(value, dict):
+        return {key: normalize(item, prefix) for key, item in value.items()}
+    if isinstance(value, str):
+        return value.replace(prefix, "<prefix>")
+    return value
+
+
+def users(prefix: str, *names: str, email: str = "") -> list[UserCreate]:
+    return [UserCreate(username=f"{prefix}-{name}", email=f"{prefix}-{name}{email}@example.com") for name in names]
+
+
+def run_sync(session, prefix: str) -> list:
+    service = UserService(session)
+    results: list = []
+    created = service.create_user(users(prefix, "a")[0])
+    results.append(created)
+    results.append(service.get_user(created.id))
+    results.append(service.get_user_by_username(f"{prefix}-a"))
+    results.append(service.update_user(created.id, UserUpdate(full_name="Renamed")))
+    results.append(service.update_user(-1, UserUpdate(full_name="Nobody")))
+    with pytest.raises(ValueError) as duplicate:
+        service.create_user(users(prefix, "a", email="-other")[0])
+    results.append(str(duplicate.value))
+    results.append(service.bulk_create_users(users(prefix, "b", "c", "b")))
+    results.append(service.bulk_create_users(users(prefix, "c", "d", email="-new"), upsert=True))
+    results.append(service.delete_user(created.id))
+    results.append(service.get_user(created.id))
+    return results
+
+
+async def run_async(prefix: str) -> list:
+    try:
+        async with async_session_maker() as session:
+            service = AsyncUserService(session)
+            results: list = []
+            created = await service.create_user(users(prefix, "a")[0])
+            results.append(created)
+            results.append(await service.get_user(created.id))
+            results.append(await service.get_user_by_username(f"{prefix}-a"))
+            results.append(await service.update_user(created.id, UserUpdate(full_name="Renamed")))
+            results.append(await service.update_user(-1, UserUpdate(full_name="Nobody")))
+            with pytest.raises(ValueError) as duplicate:
+                await service.create_user(users(prefix, "a", email="-other")[0])
+            results.append(str(duplicate.value))
+            results.append(await service.bulk_create_users(users(prefix, "b", "c", "b")))
+            results.append(await service.bulk_create_users(users(prefix, "c", "d", email="-new"), upsert=True))
+            results.append(await service.delete_user(created.id))
+            results.append(await service.get_user(created.id))
+            return results
+    finally:
+        # 连接池绑定在 asyncio.run 的事件循环上
+        await async_engine.dispose()
+
+
+def test_sync_and_async_user_services_agree(session, prefix):
+    # 两个变体各自写入一组用户，都以 prefix 开头，测试结束后一起删除
+    sync_prefix, async_prefix = f"{prefix}-sync", f"{prefix}-async"
+
+    sync_results = normalize(run_sync(session, sync_prefix), sync_prefix)
+    async_results = normalize(asyncio.run(run_async(async_prefix)), async_prefix)
+
+    assert sync_results == async_results
+    assert sync_results[3]["full_name"] == "Renamed"
+    assert [result["status"] for result in sync_results[7]] == ["updated", "created"]
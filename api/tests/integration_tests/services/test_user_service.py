@@ -0,0 +1,47 @@
+import pytest
+
+from models.user import UserCreate, UserUpdate
+from services.user_service import UserService
+
+
+def test_create_user_is_one_statement(session, prefix, statements):
+    user = UserService(session).create_user(UserCreate(username=f"{prefix}-a", email=f"{prefix}-a@example.com"))
+
+    assert user.username == f"{prefix}-a"
+    assert len(statements) == 1
+    assert statements[0].lstrip().upper().startswith("INSERT")
+
+
+def test_update_user_is_one_statement(session, prefix, statements):
+    service = UserService(session)
+    user = service.create_user(UserCreate(username=f"{prefix}-a", email=f"{prefix}-a@example.com"))
+    statements.clear()
+
+    updated = service.update_user(user.id, UserUpdate(full_name="Renamed"))
+
+    assert updated is not None
+    assert updated.full_name == "Renamed"
+    assert len(statements) == 1
+    assert statements[0].lstrip().upper().startswith("UPDATE")
+
+
+def test_update_missing_user_returns_none(session, statements):
+    assert UserService(session).update_user(-1, UserUpdate(full_name="Nobody")) is None
+    assert len(statements) == 1
+
+
+@pytest.mark.parametrize(
+    ("username", "email", "message"),
+    [
+        ("{prefix}-a", "{prefix}-other@example.com", "Username '{prefix}-a' already exists"),
+        ("{prefix}-other", "{prefix}-a@example.com", "Email '{prefix}-a@example.com' already exists"),
+    ],
+)
+def test_unique_violations_keep_their_messages(session, prefix, statements, username, email, message):
+    service = UserService(session)
+    service.create_user(UserCreate(username=f"{prefix}-a", email=f"{prefix}-a@example.com"))
+    statements.clear()
+
+    with pytest.raises(ValueError, match=message.format(prefix=prefix)):
+        service.create_user(UserCreate(username=username.format(prefix=prefix), email=email.format(prefix=prefix)))
+    assert len(statements) == 1
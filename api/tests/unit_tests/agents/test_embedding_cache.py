@@ -0,0 +1,123 @@
+import asyncio
+
+import pytest
+from redis.exceptions import RedisError
+
+from agents.embedding_cache import (
+    CachedEmbedder,
+    EmbeddingCache,
+    content_hash,
+    decode_embedding,
+    encode_embedding,
+    normalize_text,
+    with_embedding_cache,
+)
+from agents.embeddings import HashingEmbedder
+from extensions.ext_redis import async_redis_client
+
+
+class CountingEmbedder(HashingEmbedder):
+    def __init__(self, dimensions: int = 8):
+        super().__init__(dimensions)
+        self.requests: list[list[str]] = []
+
+    async def aembed(self, texts: list[str]) -> list[list[float]]:
+        self.requests.append(texts)
+        return await super().aembed(texts)
+
+
+@pytest.fixture(autouse=True)
+def config(monkeypatch):
+    monkeypatch.setattr("agents.embedding_cache.higgs_config.EMBEDDING_CACHE_ENABLED", True)
+    monkeypatch.setattr("agents.embedding_cache.higgs_config.EMBEDDING_CACHE_BACKEND", "redis")
+    monkeypatch.setattr("agents.embedding_cache.higgs_config.EMBEDDING_CACHE_BATCH_SIZE", 2)
+    monkeypatch.setattr("agents.embedding_cache.higgs_config.EMBEDDING_CACHE_REDIS_TTL", 3600)
+    monkeypatch.setattr("agents.embedding_cache.higgs_config.EMBEDDING_CACHE_COMPRESSION", "none")
+
+
+def test_texts_differing_in_whitespace_or_width_share_a_key():
+    assert normalize_text("  hello\n\tworld ") == "hello world"
+    assert content_hash("ＡＢＣ　１２３") == content_hash("ABC 123")
+    assert content_hash("hello") != content_hash("Hello")
+
+
+@pytest.mark.parametrize("compression", ["none", "zlib"])
+def test_embeddings_round_trip_as_float32(compression):
+    embedding = [0.1, -0.25, 1.0, 0.0] * 64
+    encoded = encode_embedding(embedding, compression)
+
+    assert encoded[:1] == (b"z" if compression == "zlib" else b"f")
+    assert decode_embedding(encoded) == pytest.approx(embedding, abs=1e-7)
+    if compression == "none":
+        assert len(encoded) == 1 + 4 * len(embedding)
+    else:
+        assert len(encoded) < 4 * len(embedding)
+
+
+def test_only_missing_texts_are_embedded(fake_redis):
+    inner = CountingEmbedder()
+    embedder = CachedEmbedder(inner, EmbeddingCache())
+
+    first = asyncio.run(embedder.aembed(["alpha", "beta"]))
+    second = asyncio.run(embedder.aembed(["beta ", "gamma", "alpha"]))
+
+    assert inner.requests == [["alpha", "beta"], ["gamma"]]
+    assert second[0] == pytest.approx(first[1])
+    assert second[2] == pytest.approx(first[0])
+    assert embedder.cache.stats() == {
+        "enabled": True,
+        "backend": "redis",
+        "hits": 2,
+        "misses": 3,
+        "stores": 3,
+        "errors": 0,
+        "hit_rate": 0.4,
+    }
+    key = f"embedding:hashing:8:{content_hash('alpha')}"
+    assert 0 < fake_redis.ttl(key) <= 3600
+
+
+def test_the_model_and_dimensions_are_part_of_the_key(fake_redis):
+    cache = EmbeddingCache()
+    small, large = CountingEmbedder(8), CountingEmbedder(16)
+
+    asyncio.run(CachedEmbedder(small, cache).aembed(["alpha"]))
+    asyncio.run(CachedEmbedder(large, cache).aembed(["alpha"]))
+
+    assert small.requests == [["alpha"]]
+    assert large.requests == [["alpha"]]
+
+
+def test_equivalent_texts_share_the_cached_embedding(fake_redis):
+    cache = EmbeddingCache()
+    asyncio.run(cache.set_many("model", ["alpha"], [[1.0, 0.0]]))
+
+    embeddings = asyncio.run(cache.get_many("model", ["alpha", " alpha", "beta", "gamma", "delta"]))
+
+    assert embeddings == [[1.0, 0.0], [1.0, 0.0], None, None, None]
+    assert (cache.hits, cache.misses) == (2, 3)
+
+
+def test_backend_errors_become_misses(fake_redis, monkeypatch):
+    def unavailable(*args, **kwargs):
+        raise RedisError("unavailable")
+
+    for command in ("mget", "pipeline"):
+        monkeypatch.setattr(async_redis_client._client, command, unavailable)
+    inner = CountingEmbedder()
+    embedder = CachedEmbedder(inner, EmbeddingCache())
+
+    embeddings = asyncio.run(embedder.aembed(["alpha", "beta"]))
+
+    assert len(embeddings) == 2
+    assert inner.requests == [["alpha", "beta"]]
+    assert embedder.cache.errors == 2
+    assert embedder.cache.stores == 0
+
+
+def test_the_cache_can_be_disabled(monkeypatch):
+    embedder = HashingEmbedder(8)
+    assert isinstance(with_embedding_cache(embedder), CachedEmbedder)
+
+    monkeypatch.setattr("agents.embedding_cache.higgs_config.EMBEDDING_CACHE_ENABLED", False)
+    assert with_embedding_cache(embedder) is embedder
@@ -0,0 +1,64 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+from agno.models.message import Message
+from agno.models.metrics import Metrics
+from agno.models.response import ModelResponse
+
+from agents.models import HedgingMixin
+
+
+class Backend:
+    """Times the call on ``assistant_message`` and ``run_response`` the way agno's OpenAIChat does."""
+
+    def __init__(self, name: str, delay: float):
+        self.id = name
+        self.provider = "test"
+        self.base_url = f"http://{name}"
+        self.delay = delay
+
+    async def ainvoke(self, messages, assistant_message, response_format, tools, tool_choice, run_response):
+        run_response.metrics.set_time_to_first_token()
+        assistant_message.metrics.start_timer()
+        await asyncio.sleep(self.delay)
+        assistant_message.metrics.stop_timer()
+        return ModelResponse(content=self.id)
+
+
+class PrimaryBackend:
+    # HedgingMixin 通过 super() 调用主模型自身的实现
+    ainvoke = Backend.ainvoke
+
+
+class HedgedModel(HedgingMixin, PrimaryBackend):
+    def __init__(self, delay: float, fallback_models: list, hedge_delay: float):
+        self.id = "primary"
+        self.provider = "test"
+        self.base_url = "http://primary"
+        self.delay = delay
+        self.fallback_models = fallback_models
+        self.hedge_delay = hedge_delay
+
+
+@pytest.fixture(autouse=True)
+def hedging_enabled(monkeypatch):
+    monkeypatch.setattr("agents.models.higgs_config.MODEL_HEDGING_ENABLED", True)
+    monkeypatch.setattr("agents.models.higgs_config.MODEL_MAX_HEDGES", 1)
+
+
+def test_hedge_does_not_restart_the_winner_timers():
+    model = HedgedModel(delay=0.2, fallback_models=[Backend("hedge", delay=1.0)], hedge_delay=0.1)
+    assistant_message = Message(role="assistant")
+    run_response = SimpleNamespace(metrics=Metrics())
+    run_response.metrics.start_timer()
+
+    started = time.monotonic()
+    response = asyncio.run(model.ainvoke([], assistant_message, None, None, None, run_response))
+
+    # 主请求胜出，计时来自主请求而不是之后发出的对冲请求
+    assert response.content == "primary"
+    assert assistant_message.metrics.duration == pytest.approx(0.2, abs=0.05)
+    assert run_response.metrics.time_to_first_token < 0.05
+    assert time.monotonic() - started < 0.5
@@ -0,0 +1,113 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from agno.agent import Agent
+from agno.db.in_memory import InMemoryDb
+from agno.models.openai import OpenAIChat
+
+from agents.registry import AgentRegistry
+
+
+class ChatServer:
+    """Chat completions endpoint echoing the last message, recording the messages of each request."""
+
+    def __init__(self):
+        self.requests: dict[str, list[str]] = {}
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        messages = [message["content"] for message in json.loads(request.content)["messages"]]
+        # 让并发的运行在等待模型时交错
+        await asyncio.sleep(0.01)
+        self.requests[messages[-1]] = messages
+        return httpx.Response(
+            200,
+            json={
+                "id": "chatcmpl-test",
+                "object": "chat.completion",
+                "created": 0,
+                "model": "test",
+                "choices": [
+                    {
+                        "index": 0,
+                        "finish_reason": "stop",
+                        "message": {"role": "assistant", "content": f"echo {messages[-1]}"},
+                    }
+                ],
+                "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+            },
+        )
+
+
+@pytest.fixture
+def server():
+    return ChatServer()
+
+
+@pytest.fixture
+def registry(server):
+    def build() -> Agent:
+        return Agent(
+            id="test-agent",
+            model=OpenAIChat(
+                id="test", api_key="test", http_client=httpx.AsyncClient(transport=httpx.MockTransport(server))
+            ),
+            db=InMemoryDb(),
+            add_history_to_context=True,
+            add_session_state_to_context=True,
+        )
+
+    registry = AgentRegistry()
+    registry.register("test-agent", build)
+    return registry
+
+
+def test_agent_is_built_once(registry):
+    agent = registry.get("test-agent")
+
+    assert registry.get("test-agent") is agent
+    assert registry.stats() == {"registered": 1, "built": 1, "builds": 1, "hits": 1}
+    with pytest.raises(KeyError):
+        registry.get("missing")
+
+
+def test_register_replaces_the_built_agent(registry):
+    agent = registry.get("test-agent")
+    registry.register("test-agent", lambda: Agent(id="test-agent"))
+
+    assert registry.get("test-agent") is not agent
+    assert registry.stats()["builds"] == 2
+
+
+def test_concurrent_runs_do_not_share_session_state(registry, server):
+    agent = registry.get("test-agent")
+    sessions = [f"s{index}" for index in range(4)]
+
+    async def converse(session_id: str) -> None:
+        for turn in range(3):
+            await registry.get("test-agent").arun(
+                f"{session_id}-{turn}",
+                session_id=session_id,
+                user_id=f"user-{session_id}",
+                session_state={"owner": session_id} if turn == 0 else None,
+            )
+
+    async def run_all() -> None:
+        await asyncio.gather(*(converse(session_id) for session_id in sessions))
+
+    asyncio.run(run_all())
+
+    for session_id in sessions:
+        history: list[str] = []
+        for turn in range(3):
+            system, *messages = server.requests[f"{session_id}-{turn}"]
+            # 每次请求只带本会话的历史和 session state
+            assert f"'owner': '{session_id}'" in system
+            assert f"'current_user_id': 'user-{session_id}'" in system
+            assert messages == [*history, f"{session_id}-{turn}"]
+            history += [f"{session_id}-{turn}", f"echo {session_id}-{turn}"]
+        assert agent.get_session_state(session_id=session_id)["owner"] == session_id
+    # 运行的会话不会留在共享的实例上
+    assert agent.session_id is None
+    assert not agent.session_state
@@ -0,0 +1,35 @@
+import pytest
+
+from agents.response_cache import ResponseCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr("repositories.cache.time.monotonic", clock)
+    return clock
+
+
+def test_local_tier_honours_request_ttl(clock, monkeypatch):
+    monkeypatch.setattr("agents.response_cache.higgs_config.LLM_RESPONSE_CACHE_BACKEND", "memory")
+    monkeypatch.setattr("agents.response_cache.higgs_config.LLM_RESPONSE_CACHE_TTL", 3600)
+    cache = ResponseCache()
+    messages = [{"role": "user", "content": "hi"}]
+    short = cache.build_request("ns", "model", messages, {"temperature": 0}, stream=False, semantic=False, ttl=10)
+    default = cache.build_request("ns", "model", messages, {"temperature": 1}, stream=False, semantic=False)
+    cache.set(short, [{"content": "short"}])
+    cache.set(default, [{"content": "default"}])
+
+    clock.now += 11
+
+    # 单条的 ttl 先到期，其余条目仍按全局 TTL
+    assert cache.get(short) is None
+    assert cache.get(default) == [{"content": "default"}]
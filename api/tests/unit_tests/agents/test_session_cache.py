@@ -0,0 +1,121 @@
+import pytest
+from redis import RedisError
+
+from agents.session_cache import SessionCache
+
+NAMESPACE = "agent_session:test"
+
+
+def session(session_id: str = "s1", user_id: str = "alice", turn: int = 1) -> dict:
+    return {"session_id": session_id, "user_id": user_id, "runs": [{"run_id": f"r{turn}"}]}
+
+
+@pytest.fixture(autouse=True)
+def config(monkeypatch):
+    monkeypatch.setattr("agents.session_cache.higgs_config.SESSION_CACHE_ENABLED", True)
+    monkeypatch.setattr("agents.session_cache.higgs_config.SESSION_CACHE_REDIS_ENABLED", True)
+
+
+def test_local_tier_without_redis():
+    cache = SessionCache(NAMESPACE)
+    assert cache.get("s1") is None
+    cache.set(session())
+
+    assert cache.get("s1") == session()
+    # 与 get_session 一样按 user_id 过滤
+    assert cache.get("s1", user_id="bob") is None
+    # 从数据库读出的会话不覆盖更新的写入
+    cache.set(session(turn=0), fill=True)
+    assert cache.get("s1") == session()
+    cache.invalidate(["s1"])
+    assert cache.get("s1") is None
+    assert cache.stats()["misses"] == 2
+
+
+def test_disabled_cache_is_bypassed(monkeypatch):
+    monkeypatch.setattr("agents.session_cache.higgs_config.SESSION_CACHE_ENABLED", False)
+    cache = SessionCache(NAMESPACE)
+    cache.set(session())
+
+    assert cache.get("s1") is None
+
+
+def test_redis_tier_is_shared_between_workers(fake_redis):
+    writer, reader = SessionCache(NAMESPACE), SessionCache(NAMESPACE)
+    writer.set(session())
+
+    assert reader.get("s1") == session()
+    assert reader.get("s1") == session()
+    assert reader.stats()["redis_hits"] == 1
+    assert reader.stats()["local_hits"] == 1
+
+
+def test_local_copy_older_than_redis_is_not_used(fake_redis):
+    writer, reader = SessionCache(NAMESPACE), SessionCache(NAMESPACE)
+    writer.set(session(turn=1))
+    assert reader.get("s1") == session(turn=1)
+
+    # 另一个 worker 写入了下一轮，本地的副本版本已经过期
+    writer.set(session(turn=2))
+
+    assert reader.get("s1") == session(turn=2)
+    assert reader.stats()["stale_local"] == 1
+    assert reader.stats()["redis_hits"] == 2
+    assert reader.get("s1") == session(turn=2)
+    assert reader.stats()["local_hits"] == 1
+
+
+def test_local_copy_is_dropped_when_redis_lost_the_session(fake_redis):
+    writer, reader = SessionCache(NAMESPACE), SessionCache(NAMESPACE)
+    writer.set(session())
+    reader.get("s1")
+    fake_redis.delete(writer.version_key("s1"))
+
+    assert reader.get("s1") is None
+    assert reader.stats()["stale_local"] == 1
+
+
+def test_fill_does_not_overwrite_a_newer_write(fake_redis):
+    cache = SessionCache(NAMESPACE)
+    cache.set(session(turn=2))
+    version = fake_redis.get(cache.version_key("s1"))
+
+    SessionCache(NAMESPACE).set(session(turn=1), fill=True)
+
+    assert fake_redis.get(cache.version_key("s1")) == version
+    assert SessionCache(NAMESPACE).get("s1") == session(turn=2)
+
+
+def test_invalidate_clears_both_tiers(fake_redis):
+    cache = SessionCache(NAMESPACE)
+    cache.set(session())
+    cache.invalidate(["s1"])
+
+    assert fake_redis.get(cache.data_key("s1")) is None
+    assert fake_redis.get(cache.version_key("s1")) is None
+    assert cache.get("s1") is None
+
+
+def test_redis_errors_are_misses_and_skip_the_local_tier(fake_redis, monkeypatch):
+    cache = SessionCache(NAMESPACE)
+    cache.set(session())
+    down = True
+
+    def failing(command):
+        def call(*args, **kwargs):
+            if down:
+                raise RedisError("unavailable")
+            return command(*args, **kwargs)
+
+        return call
+
+    for name in ("get", "mget", "pipeline"):
+        monkeypatch.setattr(fake_redis, name, failing(getattr(fake_redis, name)))
+    # 无法确认版本时不使用本地副本，也不缓存新的写入
+    assert cache.get("s1") is None
+    cache.set(session(turn=2))
+    assert len(cache._local) == 0
+
+    down = False
+    assert cache.get("s1") == session(turn=1)
+    assert cache.stats()["errors"] == 2
@@ -0,0 +1,108 @@
+import threading
+
+import pytest
+from agno.models.message import Message
+from agno.run.agent import RunOutput
+from agno.run.base import RunStatus
+
+from agents.session_history import HistoryWindow, RollingSummarizer, _format_run
+
+
+def run(run_id: str, chars: int = 40, status: RunStatus = RunStatus.completed) -> RunOutput:
+    return RunOutput(
+        run_id=run_id,
+        status=status,
+        messages=[
+            # 从历史带入的消息不计入 token
+            Message(role="user", content="h" * 1000, from_history=True),
+            Message(role="user", content="u" * (chars // 2)),
+            Message(role="assistant", content="a" * (chars // 2)),
+        ],
+    )
+
+
+def ids(runs: list[RunOutput]) -> list[str]:
+    return [run.run_id for run in runs]  # type: ignore[misc]
+
+
+def test_window_keeps_the_latest_runs():
+    runs = [run(f"r{index}") for index in range(5)]
+
+    evicted, kept = HistoryWindow(max_runs=2).split(runs)
+
+    assert ids(evicted) == ["r0", "r1", "r2"]
+    assert ids(kept) == ["r3", "r4"]
+
+
+def test_window_is_bounded_by_tokens():
+    # 每个 run 估算 10 个 token
+    runs = [run(f"r{index}") for index in range(5)]
+
+    evicted, kept = HistoryWindow(max_runs=10, max_tokens=25).split(runs)
+
+    assert ids(evicted) == ["r0", "r1", "r2"]
+    assert ids(kept) == ["r3", "r4"]
+
+
+def test_window_always_keeps_the_latest_run():
+    runs = [run("r0"), run("r1", chars=4000)]
+
+    evicted, kept = HistoryWindow(max_runs=10, max_tokens=100).split(runs)
+
+    assert ids(evicted) == ["r0"]
+    assert ids(kept) == ["r1"]
+
+
+def test_unfinished_runs_are_not_evicted():
+    runs = [run("r0"), run("r1", status=RunStatus.paused), run("r2"), run("r3")]
+
+    evicted, kept = HistoryWindow(max_runs=1).split(runs)
+
+    assert ids(evicted) == ["r0", "r2"]
+    assert ids(kept) == ["r1", "r3"]
+
+
+def test_format_run_keeps_the_new_turns():
+    assert _format_run(run("r0", chars=4)) == "User: uu\nAssistant: aa"
+
+
+@pytest.fixture
+def summarizer():
+    summarizer = RollingSummarizer(workers=2)
+    yield summarizer
+    summarizer._executor.shutdown(wait=True)
+
+
+def test_summarizer_runs_one_job_per_session_and_reruns_when_dirty(summarizer):
+    started = threading.Event()
+    release = threading.Event()
+    calls: list[str] = []
+
+    def job() -> None:
+        calls.append("s1")
+        started.set()
+        release.wait(5)
+
+    summarizer.schedule("s1", job)
+    started.wait(5)
+    # 运行期间再次归档，只在当前一轮结束后再跑一轮
+    summarizer.schedule("s1", job)
+    summarizer.schedule("s1", job)
+    release.set()
+    summarizer._executor.shutdown(wait=True)
+
+    assert calls == ["s1", "s1"]
+    assert summarizer.stats()["scheduled"] == 1
+    assert summarizer.stats()["completed"] == 2
+    assert summarizer.stats()["running"] == 0
+
+
+def test_summarizer_counts_failures(summarizer):
+    def job() -> None:
+        raise RuntimeError("model unavailable")
+
+    summarizer.schedule("s1", job)
+    summarizer._executor.shutdown(wait=True)
+
+    assert summarizer.stats()["failed"] == 1
+    assert summarizer.stats()["running"] == 0
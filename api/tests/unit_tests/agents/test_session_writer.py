@@ -0,0 +1,206 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from agents.session_writer import PendingSession, SessionWriteBehind
+
+
+class Store:
+    """Flush target recording the batches it wrote, optionally blocking or failing them."""
+
+    def __init__(self):
+        self.batches: list[list[PendingSession]] = []
+        self.deleted: list[str] = []
+        self.failures = 0
+        self.release = threading.Event()
+        self.release.set()
+        self.flushing = threading.Event()
+
+    def flush(self, batch: list[PendingSession]) -> None:
+        self.flushing.set()
+        self.release.wait(5)
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("write failed")
+        self.batches.append(batch)
+
+    def delete(self, session_ids: list[str]) -> None:
+        self.deleted.extend(session_ids)
+
+    @property
+    def written(self) -> dict[str, PendingSession]:
+        return {pending.session_id: pending for batch in self.batches for pending in batch}
+
+
+def wait_for(predicate, timeout: float = 5) -> None:
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+@pytest.fixture(autouse=True)
+def config(monkeypatch):
+    monkeypatch.setattr("agents.session_writer.higgs_config.SESSION_WRITE_BEHIND_MAX_PENDING", 2)
+    monkeypatch.setattr("agents.session_writer.higgs_config.SESSION_WRITE_BEHIND_BATCH_SIZE", 10)
+    monkeypatch.setattr("agents.session_writer.higgs_config.SESSION_WRITE_BEHIND_FLUSH_INTERVAL", 0.01)
+    monkeypatch.setattr("agents.session_writer.higgs_config.SESSION_WRITE_BEHIND_ENQUEUE_TIMEOUT", 0.2)
+    monkeypatch.setattr("agents.session_writer.RETRY_BACKOFF", 0.01)
+
+
+@pytest.fixture
+def store():
+    return Store()
+
+
+@pytest.fixture
+def writer(store):
+    writer = SessionWriteBehind(store.flush, delete=store.delete, name="test-writer")
+    yield writer
+    store.release.set()
+    writer.close(5)
+
+
+def test_writes_of_one_session_are_coalesced(store, writer):
+    store.release.clear()
+    writer.put("s1", {"n": 1}, {"r1": {"id": 1}})
+    assert writer.put("s1", {"n": 2}, {"r2": {"id": 2}})
+    assert writer.get("s1") == {"n": 2}
+
+    store.release.set()
+    writer.close(5)
+    assert store.written["s1"].session == {"n": 2}
+    assert set(store.written["s1"].archived_runs) == {"r1", "r2"}
+    assert writer.stats()["coalesced"] == 1
+
+
+def test_put_when_full_waits_then_writes_inline(store, writer):
+    store.release.clear()
+    writer.put("s0", {}, {})
+    store.flushing.wait(5)
+    assert writer.put("s1", {}, {})
+    assert writer.put("s2", {}, {})
+
+    start = time.monotonic()
+    assert not writer.put("s3", {}, {})
+    assert time.monotonic() - start >= 0.2
+    assert writer.stats()["backpressure_waits"] == 1
+    assert writer.stats()["inline_writes"] == 1
+
+
+def test_put_when_full_does_not_wait_on_an_event_loop(store, writer):
+    store.release.clear()
+    writer.put("s0", {}, {})
+    store.flushing.wait(5)
+    writer.put("s1", {}, {})
+    writer.put("s2", {}, {})
+
+    async def put() -> tuple[bool, float]:
+        start = time.monotonic()
+        return writer.put("s3", {}, {}), time.monotonic() - start
+
+    queued, elapsed = asyncio.run(put())
+    assert not queued
+    assert elapsed < 0.1
+    assert writer.stats()["backpressure_waits"] == 0
+
+
+def test_session_in_flight_is_queued_over_the_bound(store, writer):
+    store.release.clear()
+    writer.put("s0", {"n": 1}, {})
+    store.flushing.wait(5)
+    writer.put("s1", {}, {})
+    writer.put("s2", {}, {})
+
+    assert writer.put("s0", {"n": 2}, {})
+    store.release.set()
+    writer.close(5)
+    assert store.written["s0"].session == {"n": 2}
+
+
+def test_failed_batch_is_requeued(store, writer):
+    store.failures = 1
+    writer.put("s1", {"n": 1}, {"r1": {}})
+    wait_for(lambda: store.batches)
+
+    assert store.written["s1"].session == {"n": 1}
+    assert set(store.written["s1"].archived_runs) == {"r1"}
+    assert writer.stats()["failures"] == 1
+
+
+def test_requeue_keeps_the_newer_snapshot(store, writer):
+    store.failures = 1
+    store.release.clear()
+    writer.put("s1", {"n": 1}, {"r1": {}})
+    store.flushing.wait(5)
+    writer.put("s1", {"n": 2}, {"r2": {}})
+    store.release.set()
+    wait_for(lambda: store.batches)
+
+    assert store.written["s1"].session == {"n": 2}
+    assert set(store.written["s1"].archived_runs) == {"r1", "r2"}
+
+
+def test_close_drains_pending_writes(store, writer):
+    for index in range(2):
+        writer.put(f"s{index}", {"n": index}, {})
+    writer.close(5)
+
+    assert set(store.written) == {"s0", "s1"}
+    assert not writer.put("s2", {}, {})
+    assert writer.stats()["depth"] == 0
+
+
+def test_close_drops_writes_that_fail(store, writer):
+    store.failures = 1
+    store.release.clear()
+    writer.put("s1", {}, {})
+    store.flushing.wait(5)
+    writer.close(0)
+    store.release.set()
+    writer.close(5)
+
+    assert not store.batches
+    assert writer.stats()["dropped"] == 1
+
+
+def test_discarded_session_in_flight_is_deleted_after_its_write(store, writer):
+    store.release.clear()
+    writer.put("s1", {}, {})
+    store.flushing.wait(5)
+
+    start = time.monotonic()
+    writer.discard(["s1"])
+    assert time.monotonic() - start < 0.1
+    assert writer.get("s1") is None
+
+    store.release.set()
+    writer.close(5)
+    assert store.deleted == ["s1"]
+
+
+def test_discarded_pending_session_is_not_written(store, writer):
+    store.release.clear()
+    writer.put("s0", {}, {})
+    store.flushing.wait(5)
+    writer.put("s1", {}, {})
+    writer.discard(["s1"])
+    store.release.set()
+    writer.close(5)
+
+    assert "s1" not in store.written
+    assert not store.deleted
+
+
+def test_update_of_session_in_flight_is_written_again(store, writer):
+    store.release.clear()
+    writer.put("s1", {"name": "old"}, {})
+    store.flushing.wait(5)
+
+    updated = writer.update("s1", lambda session: session.update(name="new"))
+    assert updated == {"name": "new"}
+    store.release.set()
+    writer.close(5)
+
+    assert [batch[0].session for batch in store.batches] == [{"name": "old"}, {"name": "new"}]
@@ -0,0 +1,12 @@
+import pytest
+
+from extensions import ext_redis
+
+
+@pytest.fixture
+def fake_redis():
+    """In-process fake behind ``redis_client`` and ``async_redis_client``, removed after the test."""
+    ext_redis.init_fake()
+    yield ext_redis.redis_client._client
+    ext_redis.redis_client.reset()
+    ext_redis.async_redis_client.reset()
@@ -0,0 +1,60 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from controllers.service_api.demo import router
+from dependencies.services import get_async_hero_service, get_async_user_service
+from repositories.pagination import PAGE_MAX_LIMIT
+
+
+class Service:
+    """Stands in for the hero and user services, recording the paging arguments it was called with."""
+
+    def __init__(self):
+        self.calls: list[dict] = []
+
+    async def get_heroes_page(self, **kwargs):
+        self.calls.append(kwargs)
+        return [], None
+
+    async def get_users_page_json(self, **kwargs):
+        self.calls.append(kwargs)
+        return b"[]", None
+
+    async def get_all_heroes(self, **kwargs):
+        self.calls.append(kwargs)
+        return []
+
+    get_all_users = get_all_heroes
+
+
+@pytest.fixture
+def service():
+    return Service()
+
+
+@pytest.fixture
+def client(service):
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_async_hero_service] = lambda: service
+    app.dependency_overrides[get_async_user_service] = lambda: service
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("path", ["/demo/heroes", "/demo/users"])
+@pytest.mark.parametrize("query", ["limit=0", f"limit={PAGE_MAX_LIMIT + 1}", "limit=-1", "skip=-1"])
+def test_list_limits_are_validated(client, service, path, query):
+    response = client.get(f"{path}?{query}")
+
+    assert response.status_code == 422
+    assert not service.calls
+
+
+@pytest.mark.parametrize("path", ["/demo/heroes", "/demo/users"])
+def test_list_limits_in_range_are_passed_on(client, service, path):
+    assert client.get(path).status_code == 200
+    assert client.get(f"{path}?limit={PAGE_MAX_LIMIT}&skip=5").status_code == 200
+
+    assert service.calls[0]["limit"] == 100
+    assert service.calls[1] == {"skip": 5, "limit": PAGE_MAX_LIMIT}
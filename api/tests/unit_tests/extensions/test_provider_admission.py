@@ -0,0 +1,269 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from redis.exceptions import RedisError
+
+from extensions.provider_admission import (
+    AdmissionRejectedError,
+    LocalAdmissionBackend,
+    Priority,
+    ProviderLimiter,
+    RedisAdmissionBackend,
+)
+
+PROVIDER = "https://api.example.com"
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture(autouse=True)
+def config(monkeypatch):
+    for name, value in {
+        "PROVIDER_ADMISSION_QUEUE_SIZE": 10,
+        "PROVIDER_ADMISSION_INTERACTIVE_TIMEOUT": 2.0,
+        "PROVIDER_ADMISSION_BATCH_TIMEOUT": 2.0,
+        "PROVIDER_ADMISSION_POLL_INTERVAL": 0.01,
+        "PROVIDER_ADMISSION_THROTTLE_BACKOFF": 30.0,
+        "PROVIDER_ADMISSION_LEASE_TTL": 60,
+        "PROVIDER_REQUESTS_PER_MINUTE": 0,
+        "PROVIDER_TOKENS_PER_MINUTE": 0,
+    }.items():
+        monkeypatch.setattr(f"extensions.provider_admission.higgs_config.{name}", value)
+
+
+def limiter(max_concurrency: int = 1, requests_per_minute: int = 0, tokens_per_minute: int = 0) -> ProviderLimiter:
+    return ProviderLimiter(PROVIDER, LocalAdmissionBackend(max_concurrency, requests_per_minute, tokens_per_minute))
+
+
+async def until_queued(limiter: ProviderLimiter, count: int) -> None:
+    while limiter._queued() < count:
+        await asyncio.sleep(0)
+
+
+def test_waiters_are_admitted_by_priority_then_arrival():
+    async def scenario() -> list[str]:
+        admission = limiter()
+        held = await admission.acquire(1)
+        order: list[str] = []
+
+        async def call(name: str, priority: Priority) -> None:
+            lease = await admission.acquire(1, priority)
+            order.append(name)
+            await lease.arelease()
+
+        tasks = []
+        for name, priority in [
+            ("batch-1", Priority.BATCH),
+            ("interactive-1", Priority.INTERACTIVE),
+            ("batch-2", Priority.BATCH),
+            ("interactive-2", Priority.INTERACTIVE),
+        ]:
+            tasks.append(asyncio.create_task(call(name, priority)))
+            await until_queued(admission, len(tasks))
+        await held.arelease()
+        await asyncio.gather(*tasks)
+        return order
+
+    assert asyncio.run(scenario()) == ["interactive-1", "interactive-2", "batch-1", "batch-2"]
+
+
+def test_calls_are_shed_when_the_queue_is_full(monkeypatch):
+    monkeypatch.setattr("extensions.provider_admission.higgs_config.PROVIDER_ADMISSION_QUEUE_SIZE", 1)
+
+    async def scenario() -> AdmissionRejectedError:
+        admission = limiter()
+        held = await admission.acquire(1)
+        waiter = asyncio.create_task(admission.acquire(1))
+        await until_queued(admission, 1)
+        with pytest.raises(AdmissionRejectedError) as rejected:
+            await admission.acquire(1)
+        await held.arelease()
+        await (await waiter).arelease()
+        return rejected.value
+
+    rejected = asyncio.run(scenario())
+    assert rejected.reason == "queue_full"
+
+
+def test_calls_are_shed_when_the_expected_wait_exceeds_their_deadline():
+    async def scenario() -> ProviderLimiter:
+        admission = limiter()
+        # 每个许可平均持有 10 秒，排在一个调用之后预计要等 10 秒
+        admission.hold_avg = 10.0
+        held = await admission.acquire(1)
+        waiter = asyncio.create_task(admission.acquire(1))
+        await until_queued(admission, 1)
+        with pytest.raises(AdmissionRejectedError, match="expected_wait"):
+            await admission.acquire(1)
+        await held.arelease()
+        await (await waiter).arelease()
+        return admission
+
+    admission = asyncio.run(scenario())
+    assert admission.stats()["priorities"]["interactive"]["shed"] == {"expected_wait": 1}
+
+
+def test_calls_are_shed_when_their_deadline_passes_in_the_queue(monkeypatch):
+    monkeypatch.setattr("extensions.provider_admission.higgs_config.PROVIDER_ADMISSION_BATCH_TIMEOUT", 0.05)
+
+    async def scenario() -> ProviderLimiter:
+        admission = limiter()
+        held = await admission.acquire(1)
+        with pytest.raises(AdmissionRejectedError, match="deadline"):
+            await admission.acquire(1, Priority.BATCH)
+        await held.arelease()
+        return admission
+
+    admission = asyncio.run(scenario())
+    assert admission.backend.in_flight == 0
+    assert admission.stats()["queue_depth"] == 0
+
+
+def test_cancelled_waiter_holds_no_lease():
+    async def scenario() -> ProviderLimiter:
+        admission = limiter()
+        held = await admission.acquire(1)
+        waiter = asyncio.create_task(admission.acquire(1))
+        await until_queued(admission, 1)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        await held.arelease()
+        # 取消的调用不占用槽位，之后的调用立即获得许可
+        lease = await asyncio.wait_for(admission.acquire(1), 0.5)
+        await lease.arelease()
+        return admission
+
+    admission = asyncio.run(scenario())
+    assert admission.backend.in_flight == 0
+    assert admission.stats()["queue_depth"] == 0
+
+
+def test_rate_budgets_refill_over_time(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr("extensions.provider_admission.time.monotonic", clock)
+    backend = LocalAdmissionBackend(max_concurrency=10, requests_per_minute=2, tokens_per_minute=1000)
+
+    for _ in range(2):
+        lease_id, _ = backend.try_acquire(100)
+        backend.release(lease_id)
+    lease_id, retry_after = backend.try_acquire(100)
+    assert lease_id is None
+    # 每 30 秒补充一个请求
+    assert retry_after == pytest.approx(30)
+
+    clock.now += 30
+    lease_id, _ = backend.try_acquire(700)
+    assert lease_id is not None
+    # 只剩 100 个 token，每秒补充 1000 / 60 个
+    lease_id, retry_after = backend.try_acquire(600)
+    assert lease_id is None
+    assert retry_after == pytest.approx(30)
+
+    # 实际用量比预估少 500，退还之后不用等待 token
+    backend.settle(-500)
+    clock.now += 30
+    lease_id, retry_after = backend.try_acquire(600)
+    assert lease_id is not None
+
+
+def test_throttle_blocks_the_provider_for_the_backoff(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr("extensions.provider_admission.time.monotonic", clock)
+    admission = limiter()
+
+    admission.throttle()
+    lease_id, retry_after = admission.backend.try_acquire(1)
+    assert lease_id is None
+    assert retry_after == pytest.approx(30)
+    clock.now += 30
+    assert admission.backend.try_acquire(1)[0] is not None
+    assert admission.stats()["throttled"] == 1
+
+
+def test_acquire_sync_polls_until_a_slot_is_released():
+    admission = limiter()
+    held = admission.acquire_sync(1)
+    releaser = threading.Timer(0.1, held.release)
+    releaser.start()
+
+    started = time.monotonic()
+    lease = admission.acquire_sync(1)
+    assert time.monotonic() - started >= 0.1
+    lease.release()
+    releaser.join()
+    assert admission.backend.in_flight == 0
+
+
+def test_acquire_sync_is_shed_after_its_deadline(monkeypatch):
+    monkeypatch.setattr("extensions.provider_admission.higgs_config.PROVIDER_ADMISSION_INTERACTIVE_TIMEOUT", 0.05)
+    admission = limiter()
+    held = admission.acquire_sync(1)
+
+    with pytest.raises(AdmissionRejectedError, match="deadline"):
+        admission.acquire_sync(1)
+    held.release()
+
+
+@pytest.fixture
+def redis_backend(fake_redis, monkeypatch):
+    pytest.importorskip("lupa")
+    monkeypatch.setattr("extensions.provider_admission.higgs_config.PROVIDER_REQUESTS_PER_MINUTE", 2)
+    monkeypatch.setattr("extensions.provider_admission.higgs_config.PROVIDER_TOKENS_PER_MINUTE", 1000)
+    return RedisAdmissionBackend(PROVIDER, LocalAdmissionBackend(1, 2, 1000))
+
+
+def test_redis_scripts_share_the_budgets_between_workers(redis_backend, fake_redis):
+    other_worker = RedisAdmissionBackend(PROVIDER, LocalAdmissionBackend(1, 2, 1000))
+
+    lease_id, _ = redis_backend.try_acquire(100)
+    assert lease_id is not None
+    assert not lease_id.startswith("local:")
+    # 并发槽位被另一个 worker 占用，等待释放
+    assert other_worker.try_acquire(100) == (None, None)
+
+    redis_backend.release(lease_id)
+    lease_id, _ = other_worker.try_acquire(100)
+    assert lease_id is not None
+    other_worker.release(lease_id)
+    # 每分钟 2 个请求的预算已经用完
+    lease_id, retry_after = redis_backend.try_acquire(100)
+    assert lease_id is None
+    assert 0 < retry_after <= 30
+
+    level = float(fake_redis.hget("provider_admission:{https://api.example.com}:tokens", "level"))
+    assert level == pytest.approx(800, abs=1)
+    redis_backend.settle(300)
+    level = float(fake_redis.hget("provider_admission:{https://api.example.com}:tokens", "level"))
+    assert level == pytest.approx(500, abs=1)
+
+
+def test_redis_throttle_is_seen_by_every_worker(redis_backend):
+    asyncio.run(redis_backend.athrottle(30))
+
+    lease_id, retry_after = asyncio.run(
+        RedisAdmissionBackend(PROVIDER, LocalAdmissionBackend(1, 2, 1000)).atry_acquire(1)
+    )
+    assert lease_id is None
+    assert 29 < retry_after <= 30
+
+
+def test_redis_errors_fall_back_to_local_limits(redis_backend, fake_redis, monkeypatch):
+    def unavailable(*args, **kwargs):
+        raise RedisError("unavailable")
+
+    monkeypatch.setattr(fake_redis, "eval", unavailable)
+    lease_id, _ = redis_backend.try_acquire(100)
+    assert lease_id is not None
+    assert lease_id.startswith("local:")
+    assert redis_backend.in_flight == 1
+    redis_backend.release(lease_id)
+    assert redis_backend.in_flight == 0
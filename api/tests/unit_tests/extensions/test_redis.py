@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+import redis
+
+from extensions import ext_redis
+
+
+@pytest.fixture(autouse=True)
+def batch_size(monkeypatch):
+    monkeypatch.setattr("extensions.ext_redis.higgs_config.REDIS_BATCH_SIZE", 2)
+
+
+@pytest.fixture
+def executed(fake_redis, monkeypatch):
+    """Number of pipelines executed, one round trip each."""
+    counter = {"count": 0}
+    pipeline = type(fake_redis).pipeline
+
+    def counting_pipeline(self, transaction=True):
+        pipe = pipeline(self, transaction)
+        execute = pipe.execute
+
+        def counted():
+            counter["count"] += 1
+            return execute()
+
+        pipe.execute = counted
+        return pipe
+
+    monkeypatch.setattr(type(fake_redis), "pipeline", counting_pipeline)
+    return counter
+
+
+def test_mget_many_keeps_the_order_of_the_keys_in_one_round_trip(fake_redis, executed):
+    fake_redis.set("k1", "v1")
+    fake_redis.set("k3", "v3")
+    fake_redis.set("k5", "v5")
+
+    assert ext_redis.mget_many(["k1", "k2", "k3", "k4", "k5"]) == [b"v1", None, b"v3", None, b"v5"]
+    assert executed["count"] == 1
+    assert ext_redis.mget_many([]) == []
+
+
+def test_mget_many_on_a_cluster_uses_mget_nonatomic(fake_redis, monkeypatch):
+    monkeypatch.setattr("extensions.ext_redis.higgs_config.REDIS_USE_CLUSTERS", True)
+    fake_redis.set("k1", "v1")
+    calls = []
+    mget_nonatomic = fake_redis.mget_nonatomic
+    monkeypatch.setattr(fake_redis, "mget_nonatomic", lambda keys: calls.append(keys) or mget_nonatomic(keys))
+
+    assert ext_redis.mget_many(["k1", "k2"]) == [b"v1", None]
+    assert calls == [["k1", "k2"]]
+
+
+def test_set_many_and_delete_many(fake_redis, executed):
+    ext_redis.set_many({f"k{index}": index for index in range(5)}, ex=60)
+
+    assert executed["count"] == 3
+    assert fake_redis.get("k4") == b"4"
+    assert 0 < fake_redis.ttl("k0") <= 60
+    assert ext_redis.delete_many([f"k{index}" for index in range(6)]) == 5
+    assert fake_redis.get("k0") is None
+
+
+def test_async_helpers_share_the_keyspace(fake_redis):
+    async def roundtrip():
+        await ext_redis.aset_many({"k1": "v1", "k2": "v2", "k3": "v3"})
+        found = await ext_redis.amget_many(["k1", "missing", "k3"])
+        deleted = await ext_redis.adelete_many(["k1", "k2", "k3"])
+        return found, deleted
+
+    found, deleted = asyncio.run(roundtrip())
+    assert found == [b"v1", None, b"v3"]
+    assert deleted == 3
+    assert fake_redis.get("k2") is None
+
+
+def test_pool_stats(fake_redis):
+    assert ext_redis.pool_stats() == {"sync": {}, "async": {}}
+
+    ext_redis.redis_client.reset()
+    ext_redis.redis_client.initialize(redis.Redis(max_connections=8))
+    stats = ext_redis.pool_stats()["sync"]
+    assert stats == {"max_connections": 8, "available_connections": 0, "in_use_connections": 0}
+
+
+def test_pool_stats_before_init():
+    assert ext_redis.pool_stats() == {}
+
+
+def test_health_check(fake_redis, monkeypatch):
+    assert asyncio.run(ext_redis.health_check()) >= 0
+
+    def unreachable():
+        raise redis.ConnectionError("unreachable")
+
+    monkeypatch.setattr(fake_redis, "ping", unreachable)
+    with pytest.raises(redis.RedisError):
+        asyncio.run(ext_redis.health_check())
@@ -0,0 +1,53 @@
+import anyio
+import pytest
+
+from contexts.deadline import remaining_time
+from extensions.ext_request_cancellation import RequestCancellationMiddleware, route_deadline
+
+
+async def receive():
+    await anyio.sleep_forever()
+
+
+async def send(message):
+    pass
+
+
+def request_scope(path: str) -> dict:
+    return {"type": "http", "method": "POST", "path": path}
+
+
+@pytest.mark.parametrize("path", ["/v1/demo/users/export", "/v1/demo/users/batch", "/v1/demo/heroes/batch"])
+def test_bulk_routes_have_no_deadline(path):
+    assert route_deadline(path) == 0
+
+
+def test_runs_have_a_longer_deadline():
+    assert route_deadline("/agents/basic-agent/runs") == 300
+    assert route_deadline("/v1/demo/users") == 60
+
+
+@pytest.mark.parametrize(
+    ("path", "bounded"),
+    [("/v1/demo/users/batch", False), ("/v1/demo/heroes/batch", False), ("/v1/demo/users", True)],
+)
+def test_statement_timeout_follows_the_route_deadline(path, bounded):
+    # models.engine 的 after_begin 钩子按 remaining_time() 设置 statement_timeout
+    seen = []
+
+    async def app(scope, receive, send):
+        seen.append(remaining_time())
+
+    anyio.run(RequestCancellationMiddleware(app), request_scope(path), receive, send)
+    assert (seen[0] is not None) == bounded
+    if bounded:
+        assert 59 < seen[0] <= 60
+
+
+def test_app_error_is_not_wrapped_in_exception_group():
+    async def app(scope, receive, send):
+        raise ValueError("boom")
+
+    middleware = RequestCancellationMiddleware(app)
+    with pytest.raises(ValueError, match="boom"):
+        anyio.run(middleware, request_scope("/health"), receive, send)
@@ -0,0 +1,37 @@
+import json
+
+from rag.chunking import parse, parse_and_chunk, split_text
+
+
+def test_parse_by_extension():
+    assert parse("notes.md", "﻿# Title".encode()) == "# Title"
+    assert parse("page.html", b"<p>one</p><script>x()</script><p>two</p>") == "\n\none\n\ntwo"
+    assert parse("rows.csv", b"name,city\nalice,paris\nbob,\n") == "name: alice\ncity: paris\n\nname: bob"
+    assert json.loads(parse("data.json", '{"name": "北京"}'.encode()) or "") == {"name": "北京"}
+    assert parse("data.jsonl", b'{"a": 1}\n\n{"b": 2}\n') == '{\n "a": 1\n}\n\n{\n "b": 2\n}'
+    assert parse("image.png", b"\x89PNG") is None
+
+
+def test_split_text_cuts_at_the_coarsest_separator():
+    text = "first paragraph.\n\nsecond paragraph is longer. it has two sentences."
+
+    assert split_text(text, 30) == ["first paragraph.", "second paragraph is longer.", "it has two sentences."]
+    assert split_text("short", 30) == ["short"]
+    # 没有分隔符时按字符硬切
+    assert split_text("a" * 25, 10) == ["a" * 10, "a" * 10, "a" * 5]
+
+
+def test_split_text_overlaps_whole_pieces():
+    chunks = split_text("one. two. three. four. five.", 12, overlap=6)
+
+    # "three. " 比重叠长度长，不会重复到下一个片段
+    assert chunks == ["one. two.", "two. three.", "four. five."]
+    assert all(len(chunk) <= 12 for chunk in chunks)
+
+
+def test_parse_and_chunk_numbers_the_chunks():
+    chunks = parse_and_chunk("docs/a.txt", "第一段。\n\n第二段。".encode(), 5, 0)
+
+    assert [(chunk.index, chunk.content) for chunk in chunks or []] == [(0, "第一段。"), (1, "第二段。")]
+    assert chunks[1].metadata == {"source": "docs/a.txt", "chunk": 1}  # type: ignore[index]
+    assert parse_and_chunk("a.bin", b"", 5, 0) is None
@@ -0,0 +1,178 @@
+import asyncio
+import os
+import time
+from typing import Optional
+
+import pytest
+
+from contexts.deadline import request_deadline
+from rag.cpu_pool import run_cpu_bound, shutdown_cpu_pool
+from rag.executor import RetrievalExecutor, RetrievalSource
+from rag.rerank import jaccard, maximal_marginal_relevance
+from rag.retrieval import RetrievalResult, RetrievedDocument
+
+
+class StubRetriever:
+    """Returns fixed documents after ``delay`` seconds, or raises ``error``."""
+
+    def __init__(self, collection: str, ids: list[str], delay: float = 0.0, error: Optional[Exception] = None):
+        self.collection = collection
+        self.ids = ids
+        self.delay = delay
+        self.error = error
+        self.running = 0
+        self.max_running = 0
+        self.calls: list[dict] = []
+
+    async def retrieve(self, query, top_k=None, filters=None, mode="hybrid", fusion=None, vector_weight=None):
+        self.calls.append({"top_k": top_k, "filters": filters, "mode": mode})
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(self.delay)
+            if self.error is not None:
+                raise self.error
+            documents = [
+                RetrievedDocument(id, f"{self.collection} {id}", {}, 1.0, collection=self.collection)
+                for id in self.ids[:top_k]
+            ]
+            return RetrievalResult(documents, {"total": self.delay * 1000})
+        finally:
+            self.running -= 1
+
+
+@pytest.fixture(autouse=True)
+def config(monkeypatch):
+    for name, value in {
+        "RETRIEVAL_SERVICE_EXECUTORS": 0,
+        "RETRIEVAL_TOP_K": 3,
+        "RETRIEVAL_CANDIDATES": 10,
+        "RETRIEVAL_RRF_K": 60,
+        "RETRIEVAL_SOURCE_TIMEOUT": 1.0,
+        "RETRIEVAL_MMR_ENABLED": False,
+        "RETRIEVAL_MMR_LAMBDA": 0.5,
+    }.items():
+        monkeypatch.setattr(f"rag.executor.higgs_config.{name}", value)
+
+
+def executor(*retrievers: StubRetriever) -> RetrievalExecutor:
+    executor = RetrievalExecutor()
+    for retriever in retrievers:
+        executor._retrievers[retriever.collection] = retriever  # type: ignore[assignment]
+    return executor
+
+
+def test_rankings_are_merged_by_weighted_rank():
+    docs = StubRetriever("docs", ["a", "b"])
+    faq = StubRetriever("faq", ["a", "c"])
+    result = asyncio.run(
+        executor(docs, faq).retrieve(
+            "query", [RetrievalSource("docs"), RetrievalSource("faq", {"lang": "en"}, "keyword", weight=3.0)]
+        )
+    )
+
+    # 同一 id 在不同集合中是不同的文档
+    assert [(document.collection, document.id) for document in result.documents] == [
+        ("faq", "a"),
+        ("faq", "c"),
+        ("docs", "a"),
+    ]
+    assert result.documents[0].score == pytest.approx(3.0 / 61)
+    assert result.documents[2].score == pytest.approx(1.0 / 61)
+    assert faq.calls == [{"top_k": 3, "filters": {"lang": "en"}, "mode": "keyword"}]
+    assert [(report.collection, report.status, report.documents) for report in result.sources] == [
+        ("docs", "ok", 2),
+        ("faq", "ok", 2),
+    ]
+    assert set(result.timings) == {"sources", "merge", "total"}
+
+
+def test_slow_and_failing_sources_are_reported_and_left_out():
+    executor_ = executor(
+        StubRetriever("docs", ["a"]),
+        StubRetriever("slow", ["b"], delay=5.0),
+        StubRetriever("broken", ["c"], error=RuntimeError("connection refused")),
+    )
+    started = time.monotonic()
+    result = asyncio.run(
+        executor_.retrieve(
+            "query", [RetrievalSource("docs"), RetrievalSource("slow", timeout=0.05), RetrievalSource("broken")]
+        )
+    )
+
+    assert time.monotonic() - started < 1.0
+    assert [document.id for document in result.documents] == ["a"]
+    slow, broken = result.sources[1:]
+    assert slow.status == "timeout"
+    assert broken.status == "error"
+    assert broken.error == "connection refused"
+    assert executor_.stats()["timeouts"] == 1
+    assert executor_.stats()["errors"] == 1
+    assert executor_.stats()["source_queries"] == 3
+
+
+def test_source_timeout_is_bounded_by_the_request_deadline():
+    executor_ = executor(StubRetriever("slow", ["a"], delay=5.0))
+
+    async def scenario():
+        request_deadline.set(time.monotonic() + 0.05)
+        return await executor_.retrieve("query", [RetrievalSource("slow", timeout=10.0)])
+
+    started = time.monotonic()
+    result = asyncio.run(scenario())
+    assert time.monotonic() - started < 1.0
+    assert result.sources[0].status == "timeout"
+
+
+def test_sources_are_searched_up_to_the_pool_size(monkeypatch):
+    monkeypatch.setattr("rag.executor.higgs_config.RETRIEVAL_SERVICE_EXECUTORS", 2)
+    shared = StubRetriever("shared", ["a"], delay=0.02)
+    executor_ = executor()
+    # 所有来源共用一个检索器，以便统计同时执行的数量
+    monkeypatch.setattr(executor_, "retriever", lambda collection: shared)
+
+    asyncio.run(executor_.retrieve("query", [RetrievalSource(f"c{index}") for index in range(6)]))
+
+    assert len(shared.calls) == 6
+    assert shared.max_running == 2
+    assert executor_.stats()["max_concurrency"] == 2
+
+
+def test_jaccard_similarity():
+    assert jaccard(frozenset({"a", "b"}), frozenset({"b", "c"})) == pytest.approx(1 / 3)
+    assert jaccard(frozenset(), frozenset({"a"})) == 0.0
+
+
+def test_mmr_skips_near_duplicates():
+    pytest.importorskip("jieba")
+    contents = ["postgres vector index", "postgres vector index tuning", "redis cache eviction"]
+
+    # 只看相关性时按得分选择，降低 lambda 后近似重复的文档让位给不同的文档
+    assert maximal_marginal_relevance(contents, [3.0, 2.0, 1.0], 2, 1.0) == [0, 1]
+    assert maximal_marginal_relevance(contents, [3.0, 2.0, 1.0], 2, 0.5) == [0, 2]
+    assert maximal_marginal_relevance(contents, [1.0, 1.0, 1.0], 5, 0.5) == [0, 2, 1]
+
+
+def test_mmr_reranks_the_merged_candidates():
+    pytest.importorskip("jieba")
+    retriever = StubRetriever("docs", ["a", "b", "c", "d"])
+    executor_ = executor(retriever)
+
+    result = asyncio.run(executor_.retrieve("query", [RetrievalSource("docs")], top_k=2, mmr=True))
+
+    # 启用 MMR 时每个来源取 RETRIEVAL_CANDIDATES 个候选
+    assert retriever.calls[0]["top_k"] == 10
+    assert len(result.documents) == 2
+    assert "mmr" in result.timings
+
+
+def test_run_cpu_bound_uses_a_thread_without_a_pool():
+    assert asyncio.run(run_cpu_bound(os.getpid)) == os.getpid()
+
+
+def test_run_cpu_bound_uses_the_process_pool(monkeypatch):
+    monkeypatch.setattr("rag.cpu_pool.higgs_config.RETRIEVAL_SERVICE_EXECUTORS", 1)
+    try:
+        assert asyncio.run(run_cpu_bound(os.getpid)) != os.getpid()
+    finally:
+        shutdown_cpu_pool()
@@ -0,0 +1,253 @@
+import asyncio
+import contextlib
+from typing import Optional
+
+import httpx
+import openai
+import pytest
+
+from agents.embeddings import HashingEmbedder
+from extensions.storage.opendal_storage import LocalFileStorage
+from models.ingestion import IngestionCheckpoint
+from rag.ingestion import IngestionPipeline, IngestionRunningError
+from rag.ingestion.jobs import IngestionJobs
+from rag.ingestion.pipeline import chunk_id
+
+COLLECTION = "docs"
+
+
+class MemoryCheckpoints:
+    """Stands in for AsyncIngestionCheckpointRepository, keyed by (collection, source)."""
+
+    def __init__(self):
+        self.rows: dict[tuple[str, str], IngestionCheckpoint] = {}
+
+    async def get_checkpoints(self, collection: str) -> dict[str, IngestionCheckpoint]:
+        return {source: row.model_copy() for (name, source), row in self.rows.items() if name == collection}
+
+    async def save(self, collection, source, content_hash, chunks, status, error=None) -> None:
+        self.rows[(collection, source)] = IngestionCheckpoint(
+            collection=collection, source=source, content_hash=content_hash, chunks=chunks, status=status, error=error
+        )
+
+    async def set_status(self, collection, sources, status, error=None) -> None:
+        for source in sources:
+            self.rows[(collection, source)].status = status
+            self.rows[(collection, source)].error = error
+
+    def status(self) -> dict[str, str]:
+        return {source: row.status for (_, source), row in self.rows.items()}
+
+
+class MemoryStore:
+    def __init__(self):
+        self.documents: dict[str, object] = {}
+        self.fail_on: Optional[str] = None
+
+    async def create_collection(self) -> None:
+        pass
+
+    async def upsert(self, documents) -> int:
+        return await self.add(documents)
+
+    async def add(self, documents) -> int:
+        for document in documents:
+            if self.fail_on is not None and self.fail_on in document.content:
+                raise RuntimeError("store unavailable")
+        self.documents.update((document.id, document) for document in documents)
+        return len(documents)
+
+
+class MemoryRetriever:
+    def __init__(self, embedder=None):
+        self.embedder = embedder or HashingEmbedder(16)
+        self.vector_store = MemoryStore()
+        self.keyword_store = MemoryStore()
+        self.deleted: list[dict] = []
+
+    async def delete(self, filters) -> None:
+        self.deleted.append(filters)
+        for store in (self.vector_store, self.keyword_store):
+            store.documents = {
+                id: document
+                for id, document in store.documents.items()
+                if document.metadata["source"] != filters["source"]  # type: ignore[attr-defined]
+            }
+
+
+@pytest.fixture
+def checkpoints(monkeypatch):
+    checkpoints = MemoryCheckpoints()
+    monkeypatch.setattr("rag.ingestion.pipeline.async_session_maker", contextlib.nullcontext)
+    monkeypatch.setattr("rag.ingestion.pipeline.AsyncIngestionCheckpointRepository", lambda session: checkpoints)
+    return checkpoints
+
+
+@pytest.fixture(autouse=True)
+def config(monkeypatch):
+    for name, value in {
+        "RETRIEVAL_SERVICE_EXECUTORS": 0,
+        "INGESTION_CHUNK_SIZE": 20,
+        "INGESTION_CHUNK_OVERLAP": 0,
+        "INGESTION_EMBEDDING_BATCH_SIZE": 4,
+        "INGESTION_EMBEDDING_BATCH_TOKENS": 1000,
+        "INGESTION_EMBEDDING_CONCURRENCY": 2,
+        "INGESTION_FILE_CONCURRENCY": 2,
+        "INGESTION_MAX_PENDING_CHUNKS": 8,
+    }.items():
+        monkeypatch.setattr(f"rag.ingestion.pipeline.higgs_config.{name}", value)
+    monkeypatch.setattr("rag.ingestion.pipeline.EMBEDDING_BACKOFF", 0.0)
+
+
+@pytest.fixture
+def files(tmp_path):
+    (tmp_path / "a.txt").write_text("alpha one.\n\nalpha two.\n\nalpha three.")
+    (tmp_path / "b.md").write_text("beta")
+    (tmp_path / "empty.txt").write_text("")
+    (tmp_path / "image.png").write_bytes(b"\x89PNG")
+    return tmp_path
+
+
+def ingest(files, retriever: MemoryRetriever, force: bool = False) -> IngestionPipeline:
+    pipeline = IngestionPipeline(COLLECTION, LocalFileStorage(str(files)), retriever)  # type: ignore[arg-type]
+    asyncio.run(pipeline.run(force=force))
+    return pipeline
+
+
+def test_files_are_chunked_embedded_and_checkpointed(files, checkpoints):
+    retriever = MemoryRetriever()
+    report = ingest(files, retriever).report
+
+    assert report.status == "done"
+    assert (report.documents, report.ingested, report.unsupported, report.failed) == (4, 3, 1, 0)
+    assert report.chunks == 4
+    assert set(retriever.vector_store.documents) == {chunk_id("a.txt", index) for index in range(3)} | {
+        chunk_id("b.md", 0)
+    }
+    assert retriever.keyword_store.documents.keys() == retriever.vector_store.documents.keys()
+    assert checkpoints.status() == {"a.txt": "done", "b.md": "done", "empty.txt": "done"}
+    assert checkpoints.rows[(COLLECTION, "a.txt")].chunks == 3
+    assert retriever.deleted == []
+
+
+def test_unchanged_files_are_skipped_and_changed_ones_replaced(files, checkpoints):
+    retriever = MemoryRetriever()
+    ingest(files, retriever)
+    first_hash = checkpoints.rows[(COLLECTION, "a.txt")].content_hash
+
+    (files / "a.txt").write_text("alpha rewritten.")
+    report = ingest(files, retriever).report
+
+    assert (report.ingested, report.skipped, report.chunks) == (1, 2, 1)
+    # 变化的文件先删除上次导入的全部片段，片段变少时不会残留
+    assert retriever.deleted == [{"source": "a.txt"}]
+    assert chunk_id("a.txt", 1) not in retriever.vector_store.documents
+    assert checkpoints.rows[(COLLECTION, "a.txt")].content_hash != first_hash
+    assert checkpoints.rows[(COLLECTION, "a.txt")].chunks == 1
+
+    forced = ingest(files, retriever, force=True).report
+    assert (forced.ingested, forced.skipped) == (3, 0)
+
+
+def test_interrupted_files_are_ingested_again(files, checkpoints):
+    retriever = MemoryRetriever()
+    ingest(files, retriever)
+    # 上次导入在写入 a.txt 的片段时中断
+    checkpoints.rows[(COLLECTION, "a.txt")].status = "processing"
+
+    report = ingest(files, retriever).report
+
+    assert (report.ingested, report.skipped) == (1, 2)
+    assert retriever.deleted == [{"source": "a.txt"}]
+    assert checkpoints.status()["a.txt"] == "done"
+
+
+def test_failed_batches_mark_their_files_failed(files, checkpoints):
+    retriever = MemoryRetriever()
+    retriever.keyword_store.fail_on = "beta"
+    report = ingest(files, retriever).report
+
+    assert report.status == "done"
+    assert report.failed == 1
+    assert report.failures == {"b.md": "store unavailable"}
+    assert checkpoints.status()["b.md"] == "failed"
+    assert checkpoints.rows[(COLLECTION, "b.md")].error == "store unavailable"
+    assert checkpoints.status()["a.txt"] == "done"
+
+    # 失败的文件在下次导入时重试
+    retriever.keyword_store.fail_on = None
+    retry = ingest(files, retriever).report
+    assert (retry.ingested, retry.skipped, retry.failed) == (1, 2, 0)
+    assert checkpoints.status()["b.md"] == "done"
+
+
+def status_error(status_code: int) -> openai.APIStatusError:
+    response = httpx.Response(status_code, request=httpx.Request("POST", "https://api.example.com/embeddings"))
+    if status_code == 429:
+        return openai.RateLimitError("rate limited", response=response, body=None)
+    return openai.APIStatusError("request too large", response=response, body=None)
+
+
+class FlakyEmbedder(HashingEmbedder):
+    """Rejects batches of more than ``max_texts`` texts and fails the first ``rate_limited`` calls."""
+
+    def __init__(self, max_texts: int = 100, rate_limited: int = 0):
+        super().__init__(16)
+        self.max_texts = max_texts
+        self.rate_limited = rate_limited
+
+    async def aembed(self, texts: list[str]) -> list[list[float]]:
+        if self.rate_limited:
+            self.rate_limited -= 1
+            raise status_error(429)
+        if len(texts) > self.max_texts:
+            raise status_error(413)
+        return await super().aembed(texts)
+
+
+def test_rejected_batches_are_split(files, checkpoints):
+    embedder = FlakyEmbedder(max_texts=1)
+    pipeline = IngestionPipeline(COLLECTION, LocalFileStorage(str(files)), MemoryRetriever(embedder))  # type: ignore[arg-type]
+    texts = ["one", "two", "three", "four"]
+
+    embeddings = asyncio.run(pipeline._embed(embedder, texts))
+
+    assert embeddings == embedder.embed(texts)
+    # 4 个拆成 2 + 2，再各拆成 1 + 1
+    assert pipeline.report.splits == 3
+    # 上限减半两次到 MIN_BATCH_TOKENS，之后每次成功恢复配置值的十分之一
+    assert pipeline._batch_tokens == 256 + 4 * 100
+
+
+def test_transient_errors_are_retried(files, checkpoints):
+    report = ingest(files, MemoryRetriever(FlakyEmbedder(rate_limited=2))).report
+
+    assert report.retries == 2
+    assert report.failed == 0
+    assert report.ingested == 3
+
+
+def test_one_job_per_collection(files, checkpoints, monkeypatch):
+    monkeypatch.setattr(
+        "rag.ingestion.jobs.IngestionPipeline",
+        lambda collection: IngestionPipeline(collection, LocalFileStorage(str(files)), MemoryRetriever()),  # type: ignore[arg-type]
+    )
+    jobs = IngestionJobs()
+
+    async def scenario():
+        job = jobs.start(COLLECTION)
+        with pytest.raises(IngestionRunningError):
+            jobs.start(COLLECTION)
+        other = jobs.start("faq")
+        await asyncio.gather(job.task, other.task)
+        # 结束之后可以再次导入
+        again = jobs.start(COLLECTION)
+        await again.task
+        return job, again
+
+    job, again = asyncio.run(scenario())
+    assert job.to_dict()["status"] == "done"
+    assert job.to_dict()["ingested"] == 3
+    assert again.to_dict()["skipped"] == 3
+    assert [item.id for item in jobs.list()][-1] == again.id
+    assert jobs.get(job.id) is job
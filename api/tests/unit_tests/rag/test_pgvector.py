@@ -0,0 +1,75 @@
+import json
+
+import pytest
+
+from rag.vector_store import create_vector_store
+from rag.vector_store.pgvector import PGVectorStore, build_filter, ivfflat_lists, vector_literal
+
+
+def test_vector_literal():
+    assert vector_literal([1, 0.5, -2.25]) == "[1.0,0.5,-2.25]"
+
+
+@pytest.mark.parametrize(("rows", "lists"), [(0, 1), (999, 1), (500_000, 500), (4_000_000, 2000)])
+def test_ivfflat_lists_follow_the_pgvector_guidance(rows, lists):
+    assert ivfflat_lists(rows) == lists
+
+
+def test_build_filter():
+    assert build_filter(None) == ("", {})
+
+    where, params = build_filter({"source": "docs", "lang": ["en", "zh"], "year": 2024})
+
+    assert where == (
+        "WHERE metadata @> CAST(:filter AS jsonb) AND CAST(:values_0 AS jsonb) @> jsonb_build_array(metadata -> :key_0)"
+    )
+    assert json.loads(params["filter"]) == {"source": "docs", "year": 2024}
+    assert params["key_0"] == "lang"
+    assert json.loads(params["values_0"]) == ["en", "zh"]
+
+
+@pytest.mark.parametrize("collection", ["Docs", "docs;drop", "", "x" * 49])
+def test_collection_names_are_validated(collection):
+    with pytest.raises(ValueError, match="Invalid collection name"):
+        PGVectorStore(collection, 3)
+
+
+def test_embedding_dimensions_are_checked():
+    store = PGVectorStore("docs", 3)
+
+    with pytest.raises(ValueError, match="2 dimensions in collection docs of 3"):
+        store._check_dimensions([0.1, 0.2])
+
+
+@pytest.mark.parametrize(
+    ("distance", "raw", "score"), [("cosine", 0.25, 0.75), ("l2", 0.25, -0.25), ("inner_product", -3, 3)]
+)
+def test_scores_grow_with_similarity(distance, raw, score):
+    assert PGVectorStore("docs", 3, distance=distance)._score(raw) == score
+
+
+def test_index_sql(monkeypatch):
+    monkeypatch.setattr("rag.vector_store.pgvector.higgs_config.PGVECTOR_HNSW_M", 16)
+    monkeypatch.setattr("rag.vector_store.pgvector.higgs_config.PGVECTOR_HNSW_EF_CONSTRUCTION", 64)
+    store = PGVectorStore("docs", 3, distance="l2")
+
+    assert store._index_sql("hnsw") == (
+        "CREATE INDEX IF NOT EXISTS vector_docs_embedding_idx ON vector_docs "
+        "USING hnsw (embedding vector_l2_ops) WITH (m = 16, ef_construction = 64)"
+    )
+    assert store._index_sql("ivfflat", lists=10, concurrently=True) == (
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS vector_docs_embedding_idx ON vector_docs "
+        "USING ivfflat (embedding vector_l2_ops) WITH (lists = 10)"
+    )
+
+
+def test_create_vector_store(monkeypatch):
+    monkeypatch.setattr("rag.vector_store.higgs_config.VECTOR_STORE", "pgvector")
+    assert isinstance(create_vector_store("docs", 3), PGVectorStore)
+
+    monkeypatch.setattr("rag.vector_store.higgs_config.VECTOR_STORE", "")
+    with pytest.raises(ValueError, match="not configured"):
+        create_vector_store("docs", 3)
+    monkeypatch.setattr("rag.vector_store.higgs_config.VECTOR_STORE", "milvus")
+    with pytest.raises(ValueError, match="not supported"):
+        create_vector_store("docs", 3)
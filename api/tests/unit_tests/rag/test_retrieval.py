@@ -0,0 +1,207 @@
+import asyncio
+from collections.abc import Sequence
+from typing import Optional
+
+import pytest
+
+from agents.embeddings import HashingEmbedder
+from rag.keyword_store import KeywordDocument, KeywordSearchResult, KeywordStore
+from rag.retrieval import HybridRetriever, reciprocal_rank_fusion, weighted_fusion
+from rag.vector_store import MetadataFilter, VectorSearchResult
+
+
+def vector(id: str, score: float) -> VectorSearchResult:
+    return VectorSearchResult(id, f"content {id}", {}, score)
+
+
+def keyword(id: str, score: float) -> KeywordSearchResult:
+    return KeywordSearchResult(id, f"content {id}", {}, score)
+
+
+def test_rrf_scores_by_rank_in_each_search():
+    documents = reciprocal_rank_fusion(
+        [vector("a", 0.9), vector("b", 0.8)], [keyword("b", 12.0), keyword("c", 3.0)], k=60
+    )
+
+    assert [document.id for document in documents] == ["b", "a", "c"]
+    b, a, c = documents
+    assert b.score == pytest.approx(0.5 / 62 + 0.5 / 61)
+    assert a.score == pytest.approx(0.5 / 61)
+    assert c.score == pytest.approx(0.5 / 62)
+    assert (b.vector_rank, b.keyword_rank) == (2, 1)
+    assert (b.vector_score, b.keyword_score) == (0.8, 12.0)
+    assert c.vector_rank is None
+    assert a.keyword_rank is None
+
+
+def test_rrf_ignores_the_scale_of_the_scores():
+    # BM25 得分没有上界，只有名次参与融合
+    small = reciprocal_rank_fusion([vector("a", 0.9)], [keyword("b", 1.0), keyword("a", 0.5)])
+    large = reciprocal_rank_fusion([vector("a", 0.9)], [keyword("b", 1000.0), keyword("a", 500.0)])
+
+    assert [(document.id, document.score) for document in small] == [
+        (document.id, document.score) for document in large
+    ]
+
+
+def test_rrf_weights_the_searches():
+    documents = reciprocal_rank_fusion([vector("a", 0.9)], [keyword("b", 5.0)], k=60, vector_weight=0.8)
+
+    assert [document.id for document in documents] == ["a", "b"]
+    assert documents[0].score == pytest.approx(0.8 / 61)
+    assert documents[1].score == pytest.approx(0.2 / 61)
+
+
+def test_weighted_fusion_normalizes_each_search():
+    documents = weighted_fusion(
+        [vector("a", 0.9), vector("b", 0.5), vector("c", 0.1)],
+        [keyword("c", 30.0), keyword("b", 10.0)],
+        vector_weight=0.5,
+    )
+
+    scores = {document.id: document.score for document in documents}
+    assert scores["a"] == pytest.approx(0.5)
+    assert scores["b"] == pytest.approx(0.25)
+    assert scores["c"] == pytest.approx(0.5)
+
+
+def test_weighted_fusion_of_equal_scores():
+    documents = weighted_fusion([vector("a", 0.7), vector("b", 0.7)], [])
+
+    assert [document.score for document in documents] == [pytest.approx(0.5), pytest.approx(0.5)]
+
+
+class MemoryKeywordStore(KeywordStore):
+    """Matches the documents containing the query, scored by the number of occurrences."""
+
+    def __init__(self, collection: str):
+        super().__init__(collection)
+        self.documents: dict[str, KeywordDocument] = {}
+        self.searches: list[int] = []
+
+    async def create_collection(self) -> None:
+        pass
+
+    async def drop_collection(self) -> None:
+        self.documents.clear()
+
+    async def add(self, documents: Sequence[KeywordDocument]) -> int:
+        self.documents.update((document.id, document) for document in documents)
+        return len(documents)
+
+    async def delete(self, filters: MetadataFilter) -> int:
+        raise NotImplementedError
+
+    async def delete_by_ids(self, ids: Sequence[str]) -> int:
+        return sum(self.documents.pop(id, None) is not None for id in ids)
+
+    async def search(
+        self, query: str, top_k: int = 4, filters: Optional[MetadataFilter] = None
+    ) -> list[KeywordSearchResult]:
+        self.searches.append(top_k)
+        results = [
+            KeywordSearchResult(document.id, document.content, document.metadata, document.content.count(query))
+            for document in self.documents.values()
+            if query in document.content
+        ]
+        return sorted(results, key=lambda result: result.score, reverse=True)[:top_k]
+
+    async def count(self) -> int:
+        return len(self.documents)
+
+
+class MemoryVectorStore:
+    def __init__(self):
+        self.documents: dict = {}
+        self.searches: list[int] = []
+
+    async def upsert(self, documents) -> int:
+        self.documents.update((document.id, document) for document in documents)
+        return len(documents)
+
+    async def delete_by_ids(self, ids) -> int:
+        return sum(self.documents.pop(id, None) is not None for id in ids)
+
+    async def search(self, embedding, top_k=4, filters=None) -> list[VectorSearchResult]:
+        self.searches.append(top_k)
+        results = [
+            VectorSearchResult(
+                document.id,
+                document.content,
+                document.metadata,
+                sum(x * y for x, y in zip(embedding, document.embedding)),
+            )
+            for document in self.documents.values()
+        ]
+        return sorted(results, key=lambda result: result.score, reverse=True)[:top_k]
+
+
+@pytest.fixture
+def retriever(monkeypatch):
+    monkeypatch.setattr("rag.retrieval.higgs_config.RETRIEVAL_TOP_K", 2)
+    monkeypatch.setattr("rag.retrieval.higgs_config.RETRIEVAL_CANDIDATES", 10)
+    monkeypatch.setattr("rag.retrieval.higgs_config.RETRIEVAL_FUSION", "rrf")
+    monkeypatch.setattr("rag.retrieval.higgs_config.RETRIEVAL_RRF_K", 60)
+    monkeypatch.setattr("rag.retrieval.higgs_config.RETRIEVAL_VECTOR_WEIGHT", 0.5)
+    retriever = HybridRetriever(
+        "docs",
+        embedder=HashingEmbedder(64),
+        vector_store=MemoryVectorStore(),  # type: ignore[arg-type]
+        keyword_store=MemoryKeywordStore("docs"),
+    )
+    asyncio.run(
+        retriever.add_documents(
+            [
+                KeywordDocument("cats", "cats purr and cats sleep", {"topic": "pets"}),
+                KeywordDocument("dogs", "dogs bark at the mail carrier", {"topic": "pets"}),
+                KeywordDocument("tax", "file the tax return before april", {"topic": "finance"}),
+            ]
+        )
+    )
+    return retriever
+
+
+def test_documents_are_indexed_in_both_stores(retriever):
+    assert set(retriever.vector_store.documents) == {"cats", "dogs", "tax"}
+    assert set(retriever.keyword_store.documents) == {"cats", "dogs", "tax"}
+    assert asyncio.run(retriever.add_documents([])) == 0
+
+    asyncio.run(retriever.delete_by_ids(["tax"]))
+    assert set(retriever.vector_store.documents) == {"cats", "dogs"}
+    assert set(retriever.keyword_store.documents) == {"cats", "dogs"}
+
+
+def test_hybrid_retrieval_fuses_both_searches(retriever):
+    result = asyncio.run(retriever.retrieve("cats"))
+
+    # 混合检索时每路多取候选，融合后再截断到 top_k
+    assert retriever.vector_store.searches == [10]
+    assert retriever.keyword_store.searches == [10]
+    assert len(result.documents) == 2
+    top = result.documents[0]
+    assert top.id == "cats"
+    assert top.vector_rank == 1
+    assert top.keyword_rank == 1
+    assert top.collection == "docs"
+    assert set(result.timings) == {"embedding", "vector", "keyword", "fusion", "total"}
+
+
+def test_single_mode_retrieval_skips_the_other_search(retriever):
+    keyword_only = asyncio.run(retriever.retrieve("bark", mode="keyword"))
+    assert [document.id for document in keyword_only.documents] == ["dogs"]
+    assert keyword_only.documents[0].score == pytest.approx(1 / 61)
+    assert retriever.vector_store.searches == []
+    assert "embedding" not in keyword_only.timings
+
+    vector_only = asyncio.run(retriever.retrieve("tax return", mode="vector", top_k=1))
+    assert [document.id for document in vector_only.documents] == ["tax"]
+    # 单路检索只取 top_k 个候选
+    assert retriever.keyword_store.searches == [2]
+    assert retriever.vector_store.searches == [1]
+
+
+def test_retrieval_uses_the_requested_fusion(retriever):
+    result = asyncio.run(retriever.retrieve("cats", fusion="weighted", vector_weight=0.0))
+
+    assert result.documents[0].id == "cats"
+    assert result.documents[0].score == pytest.approx(1.0)
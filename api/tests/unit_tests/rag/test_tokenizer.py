@@ -0,0 +1,22 @@
+import pytest
+
+from rag.keyword_store.tokenizer import batch_term_frequencies, term_frequencies, tokenize
+
+pytest.importorskip("jieba")
+
+
+def test_search_mode_also_yields_the_contained_words():
+    tokens = tokenize("中华人民共和国的首都是北京")
+
+    assert "中华人民共和国" in tokens
+    assert {"中华", "人民", "共和国", "首都", "北京"} <= set(tokens)
+
+
+def test_stopwords_punctuation_and_case_are_dropped():
+    assert tokenize("The Python 和 PostgreSQL！") == ["python", "postgresql"]
+    assert tokenize("，。！ ...") == []
+
+
+def test_term_frequencies_count_repeated_terms():
+    assert term_frequencies("vector 向量 Vector") == {"vector": 2, "向量": 1}
+    assert batch_term_frequencies(["北京", ""]) == [{"北京": 1}, {}]
@@ -0,0 +1,202 @@
+import asyncio
+import json
+
+import pytest
+from redis import RedisError
+from sqlalchemy import event
+from sqlmodel import Session, create_engine
+
+from models.user import User
+from repositories.cache import EntityCache, LRUTTLCache
+from repositories.user_repository import UserRepository
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr("repositories.cache.time.monotonic", clock)
+    return clock
+
+
+def make_cache(redis_enabled: bool = False) -> EntityCache:
+    return EntityCache("user", ["username"], max_size=10, ttl=60, redis_enabled=redis_enabled, redis_ttl=300)
+
+
+def user(id: int, username: str) -> dict:
+    return {"id": id, "username": username, "email": f"{username}@example.com"}
+
+
+def test_lru_ttl_cache_expires_entries(clock):
+    cache = LRUTTLCache(max_size=10, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=5)
+
+    clock.now += 10
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    clock.now += 60
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_lru_ttl_cache_evicts_the_least_recently_used():
+    cache = LRUTTLCache(max_size=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_local_tier_hits_and_misses():
+    cache = make_cache()
+    assert cache.get(1) is None
+    cache.set(user(1, "alice"))
+
+    assert cache.get(1) == user(1, "alice")
+    assert cache.get_by_key("username", "alice") == user(1, "alice")
+    # 没有命中的查询不会被缓存
+    assert cache.get(2) is None
+    assert cache.stats() == {
+        "size": 1,
+        "max_size": 10,
+        "local_hits": 2,
+        "redis_hits": 0,
+        "misses": 2,
+        "invalidations": 0,
+    }
+
+
+def test_stale_unique_key_is_a_miss():
+    cache = make_cache()
+    cache.set(user(1, "alice"))
+    # 另一个节点改了用户名，本节点只收到了实体的更新
+    cache._entities.set(1, user(1, "bob"))
+
+    assert cache.get_by_key("username", "alice") is None
+    assert cache._keys.get(("username", "alice")) is None
+
+
+def test_redis_tier_is_shared_between_workers(fake_redis):
+    writer = make_cache(redis_enabled=True)
+    writer.set(user(1, "alice"))
+    assert json.loads(fake_redis.get("entity:user:1")) == user(1, "alice")
+    assert 0 < fake_redis.ttl("entity:user:username:alice") <= 300
+
+    reader = make_cache(redis_enabled=True)
+    assert reader.get_by_key("username", "alice") == user(1, "alice")
+    assert reader.get(1) == user(1, "alice")
+    assert reader.stats()["redis_hits"] == 1
+    assert reader.stats()["local_hits"] == 1
+
+
+def test_invalidate_clears_both_tiers(fake_redis):
+    cache = make_cache(redis_enabled=True)
+    cache.set(user(1, "alice"))
+    cache.invalidate(1)
+
+    assert cache.get(1) is None
+    assert cache.get_by_key("username", "alice") is None
+    assert fake_redis.get("entity:user:1") is None
+    assert fake_redis.get("entity:user:username:alice") is None
+
+
+def test_redis_errors_fall_back_to_the_local_tier(fake_redis, monkeypatch):
+    def unavailable(*args, **kwargs):
+        raise RedisError("unavailable")
+
+    for command in ("get", "delete", "pipeline"):
+        monkeypatch.setattr(fake_redis, command, unavailable)
+    cache = make_cache(redis_enabled=True)
+
+    cache.set(user(1, "alice"))
+    assert cache.get(1) == user(1, "alice")
+    assert cache.get(2) is None
+    assert cache.get_by_key("username", "bob") is None
+    cache.invalidate(1)
+    assert cache.get(1) is None
+
+
+def test_async_tier_shares_the_keyspace(fake_redis):
+    async def roundtrip():
+        await make_cache(redis_enabled=True).aset(user(1, "alice"))
+        reader = make_cache(redis_enabled=True)
+        found = await reader.aget_by_key("username", "alice")
+        await reader.ainvalidate(1)
+        return found, await make_cache(redis_enabled=True).aget(1)
+
+    found, after = asyncio.run(roundtrip())
+    assert found == user(1, "alice")
+    assert after is None
+
+
+def test_evict_local_keeps_the_redis_tier(fake_redis):
+    cache = make_cache(redis_enabled=True)
+    cache.set(user(1, "alice"))
+    cache.set(user(2, "bob"))
+    cache.evict_local([1])
+    assert cache._entities.get(1) is None
+    assert cache._entities.get(2) is not None
+    assert fake_redis.get("entity:user:1") is not None
+
+    cache.evict_local(None)
+    assert len(cache._entities) == 0
+
+
+@pytest.fixture
+def repository(fake_redis, monkeypatch):
+    monkeypatch.setattr("repositories.cache.higgs_config.ENTITY_CACHE_ENABLED", True)
+    monkeypatch.setattr("repositories.cache.higgs_config.ENTITY_CACHE_REDIS_ENABLED", True)
+    monkeypatch.setattr("repositories.cache._entity_caches", {})
+    engine = create_engine("sqlite://")
+    User.__table__.create(engine)  # type: ignore[attr-defined]
+    queries: list[str] = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: queries.append(statement))
+    with Session(engine, expire_on_commit=False) as session:
+        repository = UserRepository(session)
+        repository.queries = queries  # type: ignore[attr-defined]
+        yield repository
+
+
+def test_repository_reads_through_the_cache(repository):
+    created = repository.create(User(username="alice", email="alice@example.com"))
+    repository.session.expunge_all()
+    repository.queries.clear()
+
+    assert repository.get_by_id(created.id).username == "alice"
+    assert repository.get_by_id(created.id).username == "alice"
+    assert repository.get_by_username("alice").id == created.id
+    assert len(repository.queries) == 1
+
+
+def test_repository_writes_invalidate_the_cache(repository, fake_redis):
+    created = repository.create(User(username="alice", email="alice@example.com"))
+    repository.get_by_id(created.id)
+    assert fake_redis.get(f"entity:user:{created.id}") is not None
+
+    created.full_name = "Alice"
+    repository.update(created)
+    assert fake_redis.get(f"entity:user:{created.id}") is None
+    repository.session.expunge_all()
+    assert repository.get_by_id(created.id).full_name == "Alice"
+
+    repository.update_returning(created.id, {"username": "alicia"})
+    repository.session.expunge_all()
+    assert repository.get_by_username("alice") is None
+    assert repository.get_by_username("alicia").id == created.id
+
+    repository.delete_by_id(created.id)
+    repository.session.expunge_all()
+    assert repository.get_by_id(created.id) is None
+    assert repository.cache.stats()["invalidations"] == 3
@@ -0,0 +1,97 @@
+import asyncio
+import json
+from typing import Optional
+
+from repositories.invalidation import InvalidationBus
+
+
+class RecordingBackend:
+    def __init__(self):
+        self.payloads: list[str] = []
+        self.max_payload_bytes: Optional[int] = None
+
+    async def publish(self, payload: str) -> None:
+        self.payloads.append(payload)
+
+
+def make_bus(max_ids: int = 500) -> tuple[InvalidationBus, RecordingBackend]:
+    backend = RecordingBackend()
+    bus = InvalidationBus(backend, flush_interval=0.01, max_ids=max_ids)
+    # publish 只在后台任务运行时记录事件
+    bus._tasks = [object()]  # type: ignore[list-item]
+    return bus, backend
+
+
+def messages(backend: RecordingBackend) -> dict:
+    return {message["ns"]: message["ids"] for message in map(json.loads, backend.payloads)}
+
+
+def test_flush_coalesces_ids_per_namespace():
+    bus, backend = make_bus()
+    bus.publish("user", [3, 1])
+    bus.publish("user", [2, 3])
+    bus.publish("hero")
+
+    asyncio.run(bus.flush())
+
+    assert messages(backend) == {"user": [1, 2, 3], "hero": None}
+
+
+def test_unsortable_ids_do_not_stop_the_other_namespaces():
+    bus, backend = make_bus()
+    bus.publish("user", [1, "a"])
+    bus.publish("hero", [7])
+
+    asyncio.run(bus.flush())
+
+    assert messages(backend) == {"hero": [7]}
+
+
+def test_flush_loop_survives_a_failing_flush():
+    bus, backend = make_bus()
+    calls = 0
+    flush = bus.flush
+
+    async def failing_flush():
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            raise RuntimeError("boom")
+        await flush()
+
+    bus.flush = failing_flush  # type: ignore[method-assign]
+
+    async def run():
+        task = asyncio.create_task(bus._flush_loop())
+        bus.publish("user", [1])
+        while not backend.payloads:
+            await asyncio.sleep(0.01)
+        task.cancel()
+
+    asyncio.run(asyncio.wait_for(run(), timeout=5))
+    assert calls >= 2
+    assert messages(backend) == {"user": [1]}
+
+
+def test_flush_splits_ids_over_the_payload_limit():
+    bus, backend = make_bus()
+    backend.max_payload_bytes = 300
+    session_ids = [f"{index:04d}-6f9619ff-8b86-d011-b42d-00cf4fc964ff" for index in range(40)]
+    bus.publish("agent_session", session_ids)
+
+    asyncio.run(bus.flush())
+
+    assert len(backend.payloads) > 1
+    assert all(len(payload.encode()) <= 300 for payload in backend.payloads)
+    received = [id for payload in backend.payloads for id in json.loads(payload)["ids"]]
+    assert received == sorted(session_ids)
+
+
+def test_flush_evicts_the_namespace_when_one_id_exceeds_the_limit():
+    bus, backend = make_bus()
+    backend.max_payload_bytes = 100
+    bus.publish("agent_session", ["x" * 200])
+
+    asyncio.run(bus.flush())
+
+    assert messages(backend) == {"agent_session": None}